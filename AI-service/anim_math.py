@@ -0,0 +1,183 @@
+"""
+Batched quaternion and spline math for the animation pipeline.
+
+Everything works on NumPy arrays with the component axis last, so a whole
+clip — (K, 4) keyframes of one bone or (K, B, 4) for a skeleton — goes
+through one call instead of one Python call per keyframe:
+
+- Euler angles → quaternions, Hamilton product, normalization, angles,
+  rotation matrices
+- nlerp / slerp with hemisphere correction
+- CUBICSPLINE tangents: damped Catmull-Rom (what the packed clips use) and
+  plain finite differences, both along the key axis with optional looping
+- cubic Hermite evaluation between keys (glTF CUBICSPLINE sampling)
+
+Quaternions are [x, y, z, w] (glTF order), float64.
+"""
+import numpy as np
+
+
+def quat_from_euler(euler):
+    """(..., 3) Euler angles (radians) → (..., 4) quaternions [x, y, z, w]."""
+    half = np.asarray(euler, dtype=np.float64) / 2
+    c, s = np.cos(half), np.sin(half)
+    cx, cy, cz = c[..., 0], c[..., 1], c[..., 2]
+    sx, sy, sz = s[..., 0], s[..., 1], s[..., 2]
+    return np.stack([
+        sx * cy * cz - cx * sy * sz,
+        cx * sy * cz + sx * cy * sz,
+        cx * cy * sz - sx * sy * cz,
+        cx * cy * cz + sx * sy * sz,
+    ], axis=-1)
+
+
+def quat_mul(a, b):
+    """Hamilton product a * b of (..., 4) quaternions (broadcasting)."""
+    a = np.asarray(a, dtype=np.float64)
+    b = np.asarray(b, dtype=np.float64)
+    ax, ay, az, aw = a[..., 0], a[..., 1], a[..., 2], a[..., 3]
+    bx, by, bz, bw = b[..., 0], b[..., 1], b[..., 2], b[..., 3]
+    return np.stack([
+        aw * bx + ax * bw + ay * bz - az * by,
+        aw * by - ax * bz + ay * bw + az * bx,
+        aw * bz + ax * by - ay * bx + az * bw,
+        aw * bw - ax * bx - ay * by - az * bz,
+    ], axis=-1)
+
+
+def quat_normalize(q, eps: float = 1e-8):
+    """Unit quaternions; near-zero inputs become identity."""
+    q = np.asarray(q, dtype=np.float64)
+    length = np.sqrt((q * q).sum(axis=-1, keepdims=True))
+    identity = np.zeros_like(q)
+    identity[..., 3] = 1.0
+    return np.where(length > eps, q / np.maximum(length, eps), identity)
+
+
+def quat_to_matrix(q):
+    """(..., 4) unit quaternions → (..., 3, 3) rotation matrices."""
+    q = np.asarray(q, dtype=np.float64)
+    x, y, z, w = q[..., 0], q[..., 1], q[..., 2], q[..., 3]
+    xx, yy, zz = x * x, y * y, z * z
+    xy, xz, yz = x * y, x * z, y * z
+    wx, wy, wz = w * x, w * y, w * z
+    return np.stack([
+        1 - 2 * (yy + zz), 2 * (xy - wz), 2 * (xz + wy),
+        2 * (xy + wz), 1 - 2 * (xx + zz), 2 * (yz - wx),
+        2 * (xz - wy), 2 * (yz + wx), 1 - 2 * (xx + yy),
+    ], axis=-1).reshape(q.shape[:-1] + (3, 3))
+
+
+def quat_angle(a, b=None):
+    """Rotation angle (radians) between unit quaternions a and b (default identity)."""
+    a = np.asarray(a, dtype=np.float64)
+    dot = np.abs(a[..., 3] if b is None else (a * np.asarray(b, dtype=np.float64)).sum(axis=-1))
+    return 2 * np.arccos(np.minimum(dot, 1.0))
+
+
+def _same_hemisphere(a, b):
+    """b, negated where it lies in the opposite hemisphere to a (q and -q are one rotation)."""
+    dot = (a * b).sum(axis=-1, keepdims=True)
+    return np.where(dot < 0, -b, b), np.abs(dot)
+
+
+def nlerp(a, b, t):
+    """
+    Normalized linear blend of (..., 4) quaternions at t (scalar or (...,)),
+    along the shorter arc. Cheap and close to slerp for small angles.
+    """
+    a = np.asarray(a, dtype=np.float64)
+    b, _ = _same_hemisphere(a, np.asarray(b, dtype=np.float64))
+    t = np.asarray(t, dtype=np.float64)[..., None]
+    return quat_normalize(a + (b - a) * t)
+
+
+def slerp(a, b, t):
+    """Spherical linear blend of (..., 4) unit quaternions at t, along the shorter arc."""
+    a = np.asarray(a, dtype=np.float64)
+    b, dot = _same_hemisphere(a, np.asarray(b, dtype=np.float64))
+    t = np.asarray(t, dtype=np.float64)[..., None]
+    theta = np.arccos(np.minimum(dot, 1.0))
+    sin_theta = np.sin(theta)
+    # Nearly parallel: fall back to nlerp, where sin θ → 0 loses precision
+    near = sin_theta < 1e-6
+    safe = np.where(near, 1.0, sin_theta)
+    wa = np.where(near, 1 - t, np.sin((1 - t) * theta) / safe)
+    wb = np.where(near, t, np.sin(t * theta) / safe)
+    return quat_normalize(wa * a + wb * b)
+
+
+def _key_neighbours(times, is_loop):
+    """Previous / next key indices and times per key (wrapping when looping)."""
+    n = len(times)
+    prev_idx = np.arange(-1, n - 1)
+    next_idx = np.arange(1, n + 1)
+    prev_t = times[np.maximum(prev_idx, 0)]
+    next_t = times[np.minimum(next_idx, n - 1)]
+    if is_loop:
+        next_idx[-1] = 0
+        prev_t[0] = times[0] - (times[-1] - times[-2])
+        next_t[-1] = times[-1] + (times[1] - times[0])
+    else:
+        prev_idx[0] = 0
+        next_idx[-1] = n - 1
+    return prev_idx, next_idx, prev_t, next_t
+
+
+def catmull_rom_tangents(times, values, is_loop: bool = False, damping: float = 0.85):
+    """
+    CUBICSPLINE tangents for keyframes `values` (K, ...) at `times` (K,):
+    damping · (v[i+1] − v[i−1]) / (t[i+1] − t[i−1]), one-sided at the ends
+    unless the clip loops (then wrapping around). In- and out-tangents are
+    the same array.
+    """
+    times = np.asarray(times, dtype=np.float64)
+    values = np.asarray(values, dtype=np.float64)
+    n = len(times)
+    if n < 2:
+        return np.zeros_like(values)
+    prev_idx, next_idx, prev_t, next_t = _key_neighbours(times, is_loop)
+    dt = next_t - prev_t
+    dt[np.abs(dt) < 1e-10] = 1e-10
+    dt = dt.reshape((n,) + (1,) * (values.ndim - 1))
+    return (values[next_idx] - values[prev_idx]) / dt * damping
+
+
+def finite_difference_tangents(times, values, is_loop: bool = False):
+    """
+    Three-point finite-difference tangents (K, ...): the mean of the
+    slopes into and out of each key, one-sided at the ends unless looping.
+    Matches Catmull-Rom on uniform keys (without damping) and follows
+    uneven key spacing more closely.
+    """
+    times = np.asarray(times, dtype=np.float64)
+    values = np.asarray(values, dtype=np.float64)
+    n = len(times)
+    if n < 2:
+        return np.zeros_like(values)
+    prev_idx, next_idx, prev_t, next_t = _key_neighbours(times, is_loop)
+    shape = (n,) + (1,) * (values.ndim - 1)
+    dt_in = (times - prev_t).reshape(shape)
+    dt_out = (next_t - times).reshape(shape)
+    slope_in = np.divide(values - values[prev_idx], dt_in,
+                         out=np.zeros_like(values), where=np.abs(dt_in) > 1e-10)
+    slope_out = np.divide(values[next_idx] - values, dt_out,
+                          out=np.zeros_like(values), where=np.abs(dt_out) > 1e-10)
+    # One-sided ends: only the slope that exists
+    has_in = (np.abs(dt_in) > 1e-10).astype(np.float64)
+    has_out = (np.abs(dt_out) > 1e-10).astype(np.float64)
+    return (slope_in + slope_out) / np.maximum(has_in + has_out, 1.0)
+
+
+def hermite(v0, out0, v1, in1, s, dt):
+    """
+    Cubic Hermite curve between two keys at s ∈ [0, 1] (the glTF
+    CUBICSPLINE formula): values v0 → v1 (..., C), tangents out0 / in1
+    per second, dt the key spacing. s and dt broadcast over the leading axes.
+    """
+    s = np.asarray(s, dtype=np.float64)[..., None]
+    dt = np.asarray(dt, dtype=np.float64)[..., None]
+    s2 = s * s
+    s3 = s2 * s
+    return ((2 * s3 - 3 * s2 + 1) * v0 + (s3 - 2 * s2 + s) * dt * out0 +
+            (-2 * s3 + 3 * s2) * v1 + (s3 - s2) * dt * in1)
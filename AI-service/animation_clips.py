@@ -0,0 +1,1100 @@
+"""
+Procedural animation clips as declarative per-bone curve tables.
+
+Each clip is a function of the normalized clip time t (a (frames,) array
+over [0, 1]) returning a bone table {bone: (pitch, yaw, roll)} whose
+entries are Euler-angle curves (radians; arrays or constants) built from
+a small vocabulary: phase-shifted harmonics, easing curves, rectifiers and
+envelopes. Multi-stage clips (wind-up → strike → recover) are a sequence of
+phases, each a bone table over its own slice of t; bones a phase leaves
+out rest at identity.
+
+evaluate_clip() evaluates a clip for a skeleton on a (frames × bones × 3)
+Euler grid, converts it to quaternions in one batched call, fills static
+bones from their parents and adds the hip translation curves.
+"""
+import numpy as np
+
+import anim_math as _anim_math
+
+
+NUM_KEYS = 60   # keyframes per clip — 60 for ultra-smooth CUBICSPLINE curves
+
+
+# ── Curve vocabulary (elementwise over t) ──
+
+def _sin(t, k, lag=0.0):
+    """sin(k·π·t − lag): k = 2 is one full cycle over the clip."""
+    return np.sin(t * k * np.pi - lag)
+
+
+def _cos(t, k, lag=0.0):
+    """cos(k·π·t − lag)."""
+    return np.cos(t * k * np.pi - lag)
+
+
+def _rect(x):
+    """Half-wave rectifier max(0, x)."""
+    return np.where(x > 0, x, 0.0)
+
+
+def _rect_pow(x, exponent):
+    """max(0, x) ** exponent — sharpens (< 1) or softens (> 1) a rectified wave."""
+    # libm pow per element: np.power's SIMD pow can differ in the last bit
+    return np.array([v ** exponent for v in _rect(x).tolist()])
+
+
+def _ease_in_out(t):
+    """Smooth Hermite ease-in-out (S-curve). Maps [0,1]→[0,1]."""
+    return t * t * (3.0 - 2.0 * t)
+
+
+def _ease_in_out_quint(t):
+    """Quintic ease-in-out for very smooth transitions."""
+    p = 2 * t - 2
+    return np.where(t < 0.5, 16 * t * t * t * t * t, 0.5 * p * p * p * p * p + 1)
+
+
+def _ease_out_cubic(t):
+    """Cubic ease-out — fast start, smooth deceleration."""
+    p = 1 - t
+    return 1 - p * p * p
+
+
+def _ease_in_cubic(t):
+    """Cubic ease-in — smooth start, fast end."""
+    return t * t * t
+
+
+def _phases(t, *phases):
+    """
+    Piecewise bone table. phases are (end, table_fn) pairs in time order,
+    the last with end None; table_fn gets the t values in [previous end, end).
+    Returns {bone: (3, frames) curves}.
+    """
+    num_frames = len(t)
+    table = {}
+    lo = 0
+    for end, table_fn in phases:
+        hi = num_frames if end is None else int(np.searchsorted(t, end))
+        if hi > lo:
+            for bone, channels in table_fn(t[lo:hi]).items():
+                curves = table.get(bone)
+                if curves is None:
+                    curves = table[bone] = np.zeros((3, num_frames))
+                for c in range(3):
+                    curves[c, lo:hi] = channels[c]
+        lo = hi
+    return table
+
+
+# ══════════════════════════════════════════════════════════
+# Clips
+# ══════════════════════════════════════════════════════════
+
+def _walk(t):
+    """Biomechanically accurate gait cycle: counter-rotating spine, heel-to-toe roll."""
+    stride = _sin(t, 2)                                  # one complete L-R cycle
+    bounce = _sin(t, 4)                                  # vertical oscillation, 2x per stride
+    stride_asym = _sin(t, 2) + 0.15 * _sin(t, 4)         # sharper push-off
+    upper_lag = _sin(t, 2, 0.18)                         # upper body lags ~10°
+    arm_lag = _sin(t, 2, 0.30)                           # arms lag ~17°
+    contact_l = _rect(_sin(t, 2, -0.4))                  # foot contact phases
+    contact_r = _rect(np.sin(t * 2 * np.pi - np.pi + 0.4))
+    knee_flex_l = _rect_pow(-stride, 1.3) * 0.45         # flex during back-swing
+    knee_flex_r = _rect_pow(stride, 1.3) * 0.45
+    return {
+        "hips": (bounce * 0.025, stride * 0.07, stride * 0.025),
+        "spine": (bounce * 0.012, -upper_lag * 0.05, -upper_lag * 0.018),
+        "spine1": (0, -upper_lag * 0.03, -upper_lag * 0.008),
+        "spine2": (0, -upper_lag * 0.02, 0),
+        "neck": (bounce * 0.008, upper_lag * 0.015, 0),
+        "head": (bounce * 0.010, upper_lag * 0.02, -stride * 0.008),
+        "thigh_l": (stride_asym * 0.30, 0, -0.02 + bounce * 0.008),
+        "thigh_r": (-stride_asym * 0.30, 0, 0.02 - bounce * 0.008),
+        "shin_l": (knee_flex_l + _rect(stride) * 0.08, 0, 0),      # + loading response
+        "shin_r": (knee_flex_r + _rect(-stride) * 0.08, 0, 0),
+        "foot_l": (-stride * 0.18 + _rect(-stride) * 0.10, 0, 0),
+        "foot_r": (stride * 0.18 + _rect(stride) * 0.10, 0, 0),
+        "toe_l": (contact_l * 0.15, 0, 0),
+        "toe_r": (contact_r * 0.15, 0, 0),
+        "shoulder_l": (-arm_lag * 0.08, 0, -arm_lag * 0.025),
+        "shoulder_r": (arm_lag * 0.08, 0, arm_lag * 0.025),
+        "arm_l": (-arm_lag * 0.18, 0, -0.04 - np.abs(arm_lag) * 0.02),
+        "arm_r": (arm_lag * 0.18, 0, 0.04 + np.abs(arm_lag) * 0.02),
+        "forearm_l": (-0.12 + _rect(arm_lag) * 0.08, 0, 0),
+        "forearm_r": (-0.12 + _rect(-arm_lag) * 0.08, 0, 0),
+        "hand_l": (arm_lag * 0.04, 0, arm_lag * 0.025),
+        "hand_r": (-arm_lag * 0.04, 0, -arm_lag * 0.025),
+    }
+
+
+def _run(t):
+    """Exaggerated walk with flight phase."""
+    stride = _sin(t, 2)
+    stride_asym = stride + 0.2 * _sin(t, 4)
+    bounce = _sin(t, 4)
+    upper_lag = _sin(t, 2, 0.22)
+    arm_lag = _sin(t, 2, 0.35)
+    knee_l = _rect_pow(-stride, 1.2) * 0.65
+    knee_r = _rect_pow(stride, 1.2) * 0.65
+    return {
+        "thigh_l": (stride_asym * 0.42, 0, -0.02),
+        "thigh_r": (-stride_asym * 0.42, 0, 0.02),
+        "shin_l": (knee_l + _rect(stride) * 0.10, 0, 0),
+        "shin_r": (knee_r + _rect(-stride) * 0.10, 0, 0),
+        "foot_l": (-stride * 0.22 + _rect(-stride) * 0.15, 0, 0),
+        "foot_r": (stride * 0.22 + _rect(stride) * 0.15, 0, 0),
+        "toe_l": (_rect(stride) * 0.18, 0, 0),
+        "toe_r": (_rect(-stride) * 0.18, 0, 0),
+        "hips": (0.06 + bounce * 0.04, stride * 0.10, stride * 0.035),
+        "spine": (0.05 + bounce * 0.015, -upper_lag * 0.10, -upper_lag * 0.02),
+        "spine1": (0.03, -upper_lag * 0.06, 0),
+        "spine2": (0.02, -upper_lag * 0.03, 0),
+        "neck": (bounce * 0.018, 0, 0),
+        "head": (bounce * 0.022, upper_lag * 0.015, 0),
+        "shoulder_l": (-arm_lag * 0.12, 0, -arm_lag * 0.04),
+        "shoulder_r": (arm_lag * 0.12, 0, arm_lag * 0.04),
+        "arm_l": (-arm_lag * 0.30, 0, -0.05 - np.abs(arm_lag) * 0.03),
+        "arm_r": (arm_lag * 0.30, 0, 0.05 + np.abs(arm_lag) * 0.03),
+        "forearm_l": (-0.25 + _rect(arm_lag) * 0.12, 0, 0),
+        "forearm_r": (-0.25 + _rect(-arm_lag) * 0.12, 0, 0),
+        "hand_l": (0, 0, arm_lag * 0.05),
+        "hand_r": (0, 0, -arm_lag * 0.05),
+    }
+
+
+def _run_fast(t):
+    """Sprint cycle — same structure as run, longer stride and stronger lean."""
+    stride = _sin(t, 2)
+    stride_asym = stride + 0.25 * _sin(t, 4)
+    bounce = _sin(t, 4)
+    upper_lag = _sin(t, 2, 0.25)
+    arm_lag = _sin(t, 2, 0.40)
+    knee_l = _rect_pow(-stride, 1.15) * 0.75
+    knee_r = _rect_pow(stride, 1.15) * 0.75
+    return {
+        "thigh_l": (stride_asym * 0.50, 0, -0.025),
+        "thigh_r": (-stride_asym * 0.50, 0, 0.025),
+        "shin_l": (knee_l + _rect(stride) * 0.12, 0, 0),
+        "shin_r": (knee_r + _rect(-stride) * 0.12, 0, 0),
+        "foot_l": (-stride * 0.25 + _rect(-stride) * 0.18, 0, 0),
+        "foot_r": (stride * 0.25 + _rect(stride) * 0.18, 0, 0),
+        "toe_l": (_rect(stride) * 0.20, 0, 0),
+        "toe_r": (_rect(-stride) * 0.20, 0, 0),
+        "hips": (0.10 + bounce * 0.05, stride * 0.12, stride * 0.045),
+        "spine": (0.10 + bounce * 0.018, -upper_lag * 0.12, -upper_lag * 0.025),
+        "spine1": (0.05, -upper_lag * 0.06, 0),
+        "spine2": (0.03, -upper_lag * 0.03, 0),
+        "neck": (bounce * 0.022, 0, 0),
+        "head": (bounce * 0.028, 0, 0),
+        "shoulder_l": (-arm_lag * 0.14, 0, -arm_lag * 0.05),
+        "shoulder_r": (arm_lag * 0.14, 0, arm_lag * 0.05),
+        "arm_l": (-arm_lag * 0.40, 0, -0.06 - np.abs(arm_lag) * 0.04),
+        "arm_r": (arm_lag * 0.40, 0, 0.06 + np.abs(arm_lag) * 0.04),
+        "forearm_l": (-0.45 + _rect(arm_lag) * 0.15, 0, 0),
+        "forearm_r": (-0.45 + _rect(-arm_lag) * 0.15, 0, 0),
+        "hand_l": (0, 0, arm_lag * 0.06),
+        "hand_r": (0, 0, -arm_lag * 0.06),
+    }
+
+
+def _attack(t):
+    def wind_up(t):                      # ease-in for anticipation, weight to back foot
+        p = _ease_in_cubic(t / 0.3)
+        return {
+            "shoulder_r": (-p * 0.35, 0, -p * 0.08),
+            "arm_r": (-p * 1.2, 0, -p * 0.2),
+            "forearm_r": (-p * 0.7, 0, 0),
+            "hips": (0, p * 0.12, 0),
+            "spine": (0, p * 0.08, 0),
+            "spine2": (0, p * 0.25, 0),
+            "thigh_r": (-p * 0.08, 0, 0),
+            "head": (0, p * 0.08, 0),
+        }
+
+    def strike(t):                       # swing arm, twist torso
+        p = (t - 0.3) / 0.2
+        return {
+            "shoulder_r": (-0.35 + p * 0.55, 0, -0.08 + p * 0.08),
+            "arm_r": (-1.2 + p * 1.8, 0, -0.2 + p * 0.2),
+            "forearm_r": (-0.7 + p * 0.7, 0, 0),
+            "hips": (0, 0.12 - p * 0.24, 0),
+            "spine": (p * 0.06, 0.08 - p * 0.16, 0),
+            "spine2": (p * 0.15, 0.25 - p * 0.55, 0),
+        }
+
+    def recover(t):                      # linear return to rest
+        ease = 1 - (t - 0.5) / 0.5
+        return {
+            "shoulder_r": (0.2 * ease, 0, 0),
+            "arm_r": (0.6 * ease, 0, 0),
+            "hips": (0, -0.12 * ease, 0),
+            "spine": (0.06 * ease, -0.08 * ease, 0),
+            "spine2": (0.12 * ease, -0.30 * ease, 0),
+        }
+
+    return _phases(t, (0.3, wind_up), (0.5, strike), (None, recover))
+
+
+def _dance(t):
+    """Layered sine rhythms at different frequencies and offsets."""
+    beat = _sin(t, 4)                    # main beat (2 per cycle)
+    beat_lag = _sin(t, 4, 0.25)          # upper body lags
+    half = _sin(t, 2)                    # half-time sway
+    double = _sin(t, 8)                  # double-time accent
+    groove = _cos(t, 4)
+    groove_lag = _cos(t, 4, 0.3)
+    arm_beat = _sin(t, 4, 0.35)
+    return {
+        "hips": (beat * 0.04 + double * 0.01, half * 0.18, groove * 0.10),
+        "spine": (beat_lag * 0.03, -half * 0.12, -groove_lag * 0.06),
+        "spine1": (0, -half * 0.06, 0),
+        "spine2": (beat_lag * 0.02, -half * 0.04, groove_lag * 0.03),
+        "neck": (beat * 0.03, half * 0.05, groove * 0.02),
+        "head": (beat * 0.05 + double * 0.015, half * 0.06, groove * 0.04),
+        "shoulder_l": (groove_lag * 0.12, 0, arm_beat * 0.08),
+        "shoulder_r": (-groove_lag * 0.12, 0, -arm_beat * 0.08),
+        "arm_l": (groove_lag * 0.30 - 0.45, 0, arm_beat * 0.18),
+        "arm_r": (-groove_lag * 0.30 - 0.45, 0, -arm_beat * 0.18),
+        "forearm_l": (-0.55 + arm_beat * 0.18, 0, 0),
+        "forearm_r": (-0.55 - arm_beat * 0.18, 0, 0),
+        "hand_l": (arm_beat * 0.06, 0, arm_beat * 0.04),
+        "hand_r": (-arm_beat * 0.06, 0, -arm_beat * 0.04),
+        "thigh_l": (_rect(beat) * 0.28 + _rect(-half) * 0.05, 0, 0),
+        "thigh_r": (_rect(-beat) * 0.28 + _rect(half) * 0.05, 0, 0),
+        "shin_l": (_rect(beat) * 0.15, 0, 0),
+        "shin_r": (_rect(-beat) * 0.15, 0, 0),
+    }
+
+
+def _agree(t):
+    """Damped nods — smaller over time, like a natural gesture."""
+    envelope = 1.0 - 0.4 * t
+    nod = _sin(t, 6) * 0.28 * envelope
+    nod_lag = _sin(t, 6, 0.2) * 0.28 * envelope
+    return {
+        "head": (nod, 0, nod * 0.03),
+        "neck": (nod_lag * 0.35, 0, 0),
+        "spine2": (nod_lag * 0.08, 0, 0),
+        "spine": (nod_lag * 0.04, 0, 0),
+        "shoulder_l": (nod * 0.02, 0, 0),
+        "shoulder_r": (nod * 0.02, 0, 0),
+    }
+
+
+def _alert(t):
+    def startle(t):
+        p = _ease_in_out(t / 0.3)
+        return {
+            "spine": (-p * 0.1, 0, 0),
+            "spine2": (-p * 0.05, p * 0.06, 0),
+            "head": (0, p * 0.5, p * 0.03),
+            "neck": (0, p * 0.15, 0),
+            "hips": (0, 0, -p * 0.02),
+        }
+
+    def scan(t):
+        u = (t - 0.3) / 0.7
+        look = _sin(u, 2)
+        look_lag = _sin(u, 2, 0.15)
+        return {
+            "head": (_sin(u, 4) * 0.04, 0.5 * look, look * 0.03),
+            "neck": (0, 0.15 * look_lag, 0),
+            "spine2": (-0.05, look_lag * 0.08, 0),
+            "spine": (-0.1, look * 0.1, 0),
+            "hips": (0, 0, look * 0.015),
+        }
+
+    return _phases(t, (0.3, startle), (None, scan))
+
+
+def _arise(t):
+    """Stand up from a crouch: head leads, upper body next, legs last."""
+    crouch_raw = _rect(1 - t * 2)
+    crouch = crouch_raw * crouch_raw                     # quadratic deceleration
+    upper_crouch = _rect(1 - np.minimum(t * 2.2, 1.0))
+    upper_crouch = upper_crouch * upper_crouch
+    head_crouch = _rect_pow(1 - np.minimum(t * 2.5, 1.0), 2)
+    return {
+        "hips": (crouch * 0.4, 0, 0),
+        "spine": (upper_crouch * 0.3, 0, 0),
+        "spine1": (upper_crouch * 0.15, 0, 0),
+        "neck": (head_crouch * 0.12, 0, 0),
+        "head": (head_crouch * 0.18, 0, 0),
+        "shoulder_l": (upper_crouch * 0.1, 0, upper_crouch * 0.05),
+        "shoulder_r": (upper_crouch * 0.1, 0, -upper_crouch * 0.05),
+        "arm_l": (upper_crouch * 0.2, 0, upper_crouch * 0.1),
+        "arm_r": (upper_crouch * 0.2, 0, -upper_crouch * 0.1),
+        "forearm_l": (-upper_crouch * 0.3, 0, 0),
+        "forearm_r": (-upper_crouch * 0.3, 0, 0),
+        "thigh_l": (crouch * 0.8, 0, 0),
+        "thigh_r": (crouch * 0.8, 0, 0),
+        "shin_l": (-crouch * 1.0, 0, 0),
+        "shin_r": (-crouch * 1.0, 0, 0),
+    }
+
+
+def _dead(t):
+    """Overlapping ragdoll collapse: extremities go limp first, gravity accelerates."""
+    def hit(t):                          # head whips back, arms flinch
+        p = _ease_out_cubic(t / 0.12)
+        p_limb = _ease_out_cubic(np.minimum(t / 0.12 * 0.80, 1.0))
+        return {
+            "spine": (-p * 0.15, 0, 0),
+            "spine1": (-p * 0.08, 0, 0),
+            "neck": (-p * 0.12, 0, p * 0.04),
+            "head": (-p * 0.28, 0, p * 0.06),
+            "arm_l": (0, 0, p_limb * 0.22),
+            "arm_r": (0, 0, -p_limb * 0.18),
+            "shoulder_l": (0, 0, p_limb * 0.06),
+            "shoulder_r": (0, 0, -p_limb * 0.05),
+        }
+
+    def stagger(t):                      # knees buckle, spine cascades forward
+        u = (t - 0.12) / 0.26
+        p = _ease_in_out(u)
+        p_spine = _ease_in_out(np.minimum(u * 1.10, 1.0))
+        p_head = _ease_in_out(np.minimum(u * 0.85, 1.0))
+        return {
+            "hips": (p * 0.32, 0, p * 0.08),
+            "spine": (-0.15 + p_spine * 0.38, 0, p_spine * 0.05),
+            "spine1": (-0.08 + p_spine * 0.15, 0, p_spine * 0.03),
+            "neck": (-0.12 + p_head * 0.25, 0, p_head * 0.06),
+            "head": (-0.28 + p_head * 0.55, 0, p_head * 0.10),
+            "thigh_l": (p * 0.32, 0, 0),
+            "thigh_r": (p * 0.22, 0, 0),
+            "shin_l": (-p * 0.52, 0, 0),
+            "shin_r": (-p * 0.42, 0, 0),
+            "arm_l": (-p * 0.25, 0, 0.22 + p * 0.28),
+            "arm_r": (-p * 0.18, 0, -0.18 - p * 0.22),
+            "forearm_l": (-p * 0.35, 0, 0),
+            "forearm_r": (-p * 0.28, 0, 0),
+            "shoulder_l": (-p * 0.08, 0, 0.06 + p * 0.08),
+            "shoulder_r": (-p * 0.06, 0, -0.05 - p * 0.06),
+        }
+
+    def collapse(t):                     # accelerating fall, arms flop outward
+        u = (t - 0.38) / 0.30
+        p = _ease_in_cubic(u)
+        p_limb = _ease_in_cubic(np.minimum(u * 0.85, 1.0))
+        return {
+            "hips": (0.32 + p * 0.58, 0, 0.08 + p * 0.15),
+            "spine": (0.23 + p * 0.14, 0, p * 0.08),
+            "spine1": (0.07 + p * 0.08, 0, p * 0.04),
+            "neck": (0.13 + p * 0.10, 0, p * 0.06),
+            "head": (0.27 + p * 0.20, 0, p * 0.15),
+            "thigh_l": (0.32 + p * 0.15, 0, 0),
+            "thigh_r": (0.22 + p * 0.10, 0, p * 0.10),
+            "shin_l": (-0.52 + p * 0.18, 0, 0),
+            "shin_r": (-0.42 + p * 0.14, 0, 0),
+            "arm_l": (-0.25 - p_limb * 0.25, 0, 0.50 + p_limb * 0.30),
+            "arm_r": (-0.18 - p_limb * 0.18, 0, -0.40 - p_limb * 0.22),
+            "forearm_l": (-0.35 - p_limb * 0.10, 0, p_limb * 0.08),
+            "forearm_r": (-0.28 - p_limb * 0.08, 0, -p_limb * 0.06),
+            "hand_l": (-p_limb * 0.15, 0, 0),
+            "hand_r": (-p_limb * 0.12, 0, 0),
+            "shoulder_l": (-0.08 - p * 0.05, 0, 0.14 + p * 0.08),
+            "shoulder_r": (-0.06 - p * 0.04, 0, -0.11 - p * 0.06),
+        }
+
+    def settled(t):                      # damped bounce on ground contact
+        p = (t - 0.68) / 0.32
+        settle = 1 + np.sin(p * np.pi * 2) * 0.025 * (1 - p)
+        sway = np.sin(p * np.pi) * 0.02 * (1 - p)
+        return {
+            "hips": (0.90 * settle, 0, 0.23),
+            "spine": (0.37 * settle, 0, 0.08 + sway),
+            "spine1": (0.15 * settle, 0, sway * 0.5),
+            "neck": (0.23, 0, (1 - p) * 0.03),
+            "head": (0.47, 0, 0.15 + (1 - p) * 0.05),
+            "thigh_l": (0.47, 0, 0),
+            "thigh_r": (0.32, 0, 0.10),
+            "shin_l": (-0.34, 0, 0),
+            "shin_r": (-0.28, 0, 0),
+            "arm_l": (-0.50, 0, 0.80),
+            "arm_r": (-0.36, 0, -0.62),
+            "forearm_l": (-0.45, 0, 0.08),
+            "forearm_r": (-0.36, 0, -0.06),
+            "hand_l": (-0.15, 0, 0),
+            "hand_r": (-0.12, 0, 0),
+            "shoulder_l": (-0.13, 0, 0.22),
+            "shoulder_r": (-0.10, 0, -0.17),
+        }
+
+    return _phases(t, (0.12, hit), (0.38, stagger), (0.68, collapse), (None, settled))
+
+
+def _sit_down(t):
+    """Legs lead, torso follows, arms and head settle last."""
+    p_lower = _ease_in_out_quint(t)
+    p_upper = _ease_in_out_quint(_rect((t - 0.05) / 0.95))
+    p_arms = _ease_in_out_quint(_rect((t - 0.10) / 0.90))
+    p_head = _ease_in_out_quint(_rect((t - 0.12) / 0.88))
+    return {
+        "hips": (p_lower * 0.15, 0, 0),
+        "spine": (-p_upper * 0.10, 0, 0),
+        "spine1": (-p_upper * 0.05, 0, 0),
+        "neck": (-p_head * 0.04, 0, 0),
+        "head": (-p_head * 0.08, 0, 0),
+        "thigh_l": (p_lower * 1.2, 0, 0),
+        "thigh_r": (p_lower * 1.2, 0, 0),
+        "shin_l": (-p_lower * 1.1, 0, 0),
+        "shin_r": (-p_lower * 1.1, 0, 0),
+        "arm_l": (-p_arms * 0.3, 0, p_arms * 0.15),
+        "arm_r": (-p_arms * 0.3, 0, -p_arms * 0.15),
+        "forearm_l": (-p_arms * 0.4, 0, 0),
+        "forearm_r": (-p_arms * 0.4, 0, 0),
+    }
+
+
+def _jump(t):
+    """Anticipation crouch, explosive launch, float, impact absorption."""
+    def crouch(t):                       # full body compression, arms wind back
+        p = _ease_in_out(t / 0.22)
+        p_upper = _ease_in_out(np.minimum(t / 0.22 * 1.15, 1.0))
+        p_arm = _ease_in_out(np.minimum(t / 0.22 * 0.85, 1.0))
+        return {
+            "hips": (p * 0.18, 0, 0),
+            "spine": (p_upper * 0.08, 0, 0),
+            "spine1": (p_upper * 0.04, 0, 0),
+            "head": (-p_upper * 0.08, 0, 0),
+            "neck": (-p_upper * 0.04, 0, 0),
+            "thigh_l": (p * 0.55, 0, 0),
+            "thigh_r": (p * 0.55, 0, 0),
+            "shin_l": (-p * 0.70, 0, 0),
+            "shin_r": (-p * 0.70, 0, 0),
+            "foot_l": (p * 0.15, 0, 0),
+            "foot_r": (p * 0.15, 0, 0),
+            "shoulder_l": (p_arm * 0.08, 0, p_arm * 0.04),
+            "shoulder_r": (p_arm * 0.08, 0, -p_arm * 0.04),
+            "arm_l": (p_arm * 0.35, 0, p_arm * 0.12),
+            "arm_r": (p_arm * 0.35, 0, -p_arm * 0.12),
+            "forearm_l": (-p_arm * 0.20, 0, 0),
+            "forearm_r": (-p_arm * 0.20, 0, 0),
+        }
+
+    def launch(t):                       # explosive extension, arms sweep up
+        u = (t - 0.22) / 0.18
+        p = _ease_out_cubic(u)
+        p_arm = _ease_out_cubic(np.minimum(u * 0.80, 1.0))
+        return {
+            "hips": (0.18 - p * 0.30, 0, 0),
+            "spine": (0.08 - p * 0.14, 0, 0),
+            "spine1": (0.04 - p * 0.06, 0, 0),
+            "head": (-0.08 + p * 0.02, 0, 0),
+            "thigh_l": (0.55 - p * 0.65, 0, 0),
+            "thigh_r": (0.55 - p * 0.65, 0, 0),
+            "shin_l": (-0.70 + p * 0.70, 0, 0),
+            "shin_r": (-0.70 + p * 0.70, 0, 0),
+            "foot_l": (0.15 - p * 0.40, 0, 0),
+            "foot_r": (0.15 - p * 0.40, 0, 0),
+            "arm_l": (0.35 - p_arm * 1.15, 0, 0.12 + p_arm * 0.18),
+            "arm_r": (0.35 - p_arm * 1.15, 0, -0.12 - p_arm * 0.18),
+            "forearm_l": (-0.20 + p_arm * 0.10, 0, 0),
+            "forearm_r": (-0.20 + p_arm * 0.10, 0, 0),
+        }
+
+    def airborne(t):                     # extended pose, slight tuck, arms wide
+        p = (t - 0.40) / 0.22
+        float_bob = np.sin(p * np.pi) * 0.04
+        return {
+            "hips": (-0.12, 0, 0),
+            "spine": (-0.06 + float_bob, 0, 0),
+            "head": (-0.06, 0, 0),
+            "arm_l": (-0.80, 0, 0.30 + float_bob),
+            "arm_r": (-0.80, 0, -0.30 - float_bob),
+            "forearm_l": (-0.10, 0, 0),
+            "forearm_r": (-0.10, 0, 0),
+            "thigh_l": (-0.10 + p * 0.20, 0, 0),
+            "thigh_r": (-0.10 + p * 0.20, 0, 0),
+            "shin_l": (-p * 0.15, 0, 0),
+            "shin_r": (-p * 0.15, 0, 0),
+        }
+
+    def landing(t):                      # compress, spring back; head and arms settle late
+        u = (t - 0.62) / 0.38
+        p = _ease_out_cubic(u)
+        settle = np.sin(p * np.pi * 2.5) * (1 - p) * 0.15
+        p_head = _ease_out_cubic(np.minimum(u * 0.75, 1.0))
+        p_arm = _ease_out_cubic(np.minimum(u * 0.65, 1.0))
+        return {
+            "hips": (-0.12 + p * 0.30 + settle, 0, 0),
+            "spine": (-0.06 + p * 0.10 + settle * 0.6, 0, 0),
+            "spine1": (settle * 0.3, 0, 0),
+            "head": (-0.06 + p_head * 0.08 + settle * 0.4, 0, 0),
+            "neck": (settle * 0.25, 0, 0),
+            "thigh_l": (0.10 + p * 0.25 + settle * 0.8, 0, 0),
+            "thigh_r": (0.10 + p * 0.25 + settle * 0.8, 0, 0),
+            "shin_l": (-0.15 - p * 0.25, 0, 0),
+            "shin_r": (-0.15 - p * 0.25, 0, 0),
+            "foot_l": (settle * 0.3, 0, 0),
+            "foot_r": (settle * 0.3, 0, 0),
+            "arm_l": (-0.80 + p_arm * 0.80, 0, 0.30 - p_arm * 0.30),
+            "arm_r": (-0.80 + p_arm * 0.80, 0, -0.30 + p_arm * 0.30),
+            "forearm_l": (-0.10 + p_arm * 0.10, 0, 0),
+            "forearm_r": (-0.10 + p_arm * 0.10, 0, 0),
+        }
+
+    return _phases(t, (0.22, crouch), (0.40, launch), (0.62, airborne), (None, landing))
+
+
+def _wave(t):
+    """Raise arm (0–0.15), wave (0.15–0.85), lower (0.85–1); body sways after the hand."""
+    raising, waving = t < 0.15, t < 0.85
+    arm_up = np.select([raising, waving],
+                       [_ease_in_out(t / 0.15), 1.0], 1.0 - _ease_in_out((t - 0.85) / 0.15))
+    wave_v = np.select([raising, waving], [0.0, _sin((t - 0.15) / 0.70, 7) * 0.28], 0.0)
+    body_wave = np.where(t > 0.15, _sin(t, 7, 0.25) * 0.28, 0.0)
+    head_wave = np.where(t > 0.15, _sin(t, 7, 0.15) * 0.28, 0.0)
+    return {
+        "shoulder_r": (-arm_up * 0.22, 0, -arm_up * 0.15),
+        "arm_r": (-arm_up * 1.35, 0, -arm_up * 0.22),
+        "forearm_r": (-arm_up * 0.50, 0, wave_v),
+        "hand_r": (0, wave_v * 0.9, wave_v * 0.3),
+        "spine": (0, body_wave * 0.03, body_wave * 0.02),
+        "spine1": (0, body_wave * 0.02, 0),
+        "neck": (0, head_wave * 0.04, head_wave * 0.02),
+        "head": (head_wave * 0.03, head_wave * 0.08, head_wave * 0.04),
+        "arm_l": (body_wave * 0.04, 0, -body_wave * 0.02),
+        "hips": (0, 0, body_wave * 0.015 - arm_up * 0.02),
+    }
+
+
+def _clap(t):
+    """Rhythmic clapping: sharp contact, slower separation, energy builds then fades."""
+    raw_clap = _sin(t, 8)
+    clap = _rect_pow(raw_clap, 0.7)                      # sharper peak (hands meet)
+    clap_out = _rect_pow(-raw_clap, 1.3)                 # slower separate
+    clap_mix = clap - clap_out * 0.4
+    body_clap = _rect_pow(_sin(t, 8, 0.20), 0.7)         # body reacts to the impact
+    head_clap = _rect_pow(_sin(t, 8, 0.12), 0.7)
+    energy = np.where(t < 0.9, np.minimum(t * 1.3, 1.0), np.maximum(1.0 - (t - 0.9) * 7, 0.3))
+    return {
+        "shoulder_l": (-0.15 * energy, 0, -clap_mix * 0.10 * energy),
+        "shoulder_r": (-0.15 * energy, 0, clap_mix * 0.10 * energy),
+        "arm_l": (-0.65 * energy, 0, (-0.30 + clap * 0.35) * energy),
+        "arm_r": (-0.65 * energy, 0, (0.30 - clap * 0.35) * energy),
+        "forearm_l": ((-0.85 + clap * 0.20) * energy, 0, 0),
+        "forearm_r": ((-0.85 + clap * 0.20) * energy, 0, 0),
+        "hand_l": (clap * 0.12 * energy, 0, clap * 0.06 * energy),
+        "hand_r": (clap * 0.12 * energy, 0, -clap * 0.06 * energy),
+        "head": (head_clap * 0.10 * energy, 0, 0),
+        "neck": (body_clap * 0.04 * energy, 0, 0),
+        "spine": (body_clap * 0.05 * energy, 0, 0),
+        "spine1": (body_clap * 0.03 * energy, 0, 0),
+        "hips": (body_clap * 0.03 * energy, 0, 0),
+    }
+
+
+def _punch(t):
+    """Wind-up, explosive strike, elastic recovery; torso leads, head whips."""
+    def wind_up(t):                      # weight back, rotate right, chambered fist
+        p = _ease_in_cubic(t / 0.28)
+        p_head = _ease_in_cubic(np.minimum(t / 0.28 * 0.85, 1.0))
+        return {
+            "hips": (-p * 0.04, p * 0.18, 0),
+            "spine": (0, p * 0.22, 0),
+            "spine1": (0, p * 0.10, 0),
+            "head": (-p_head * 0.06, p_head * 0.10, 0),
+            "neck": (0, p_head * 0.05, 0),
+            "shoulder_r": (p * 0.10, 0, -p * 0.08),
+            "arm_r": (-p * 0.55, p * 0.12, -p * 0.18),
+            "forearm_r": (-p * 0.90, 0, 0),
+            "hand_r": (p * 0.20, 0, 0),
+            "arm_l": (-p * 0.40, 0, p * 0.08),
+            "forearm_l": (-p * 0.65, 0, 0),
+            "thigh_r": (-p * 0.08, 0, 0),
+            "thigh_l": (p * 0.10, 0, 0),
+        }
+
+    def strike(t):                       # torso rotation drives the fist forward
+        u = (t - 0.28) / 0.14
+        p = _ease_out_cubic(u)
+        p_arm = _ease_out_cubic(np.minimum(u * 0.80, 1.0))
+        p_head = _ease_out_cubic(np.minimum(u * 0.70, 1.0))
+        return {
+            "hips": (-0.04 + p * 0.08, 0.18 - p * 0.42, 0),
+            "spine": (p * 0.10, 0.22 - p * 0.55, 0),
+            "spine1": (p * 0.05, 0.10 - p * 0.22, 0),
+            "head": (-0.06 + p_head * 0.06, 0.10 - p_head * 0.20, 0),
+            "arm_r": (-0.55 + p_arm * 1.05, 0.12 - p_arm * 0.12, -0.18 + p_arm * 0.18),
+            "forearm_r": (-0.90 + p_arm * 0.72, 0, 0),
+            "hand_r": (0.20 - p_arm * 0.20, 0, 0),
+            "shoulder_r": (0.10 - p * 0.15, 0, -0.08 + p * 0.12),
+            "arm_l": (-0.40, 0, 0.08),
+            "forearm_l": (-0.65 - p * 0.10, 0, 0),
+            "thigh_l": (0.10 + p * 0.10, 0, 0),
+        }
+
+    def recover(t):                      # elastic settle back to neutral
+        p = _ease_in_out((t - 0.42) / 0.58)
+        overshoot = np.sin(p * np.pi * 1.5) * (1 - p) * 0.08
+        return {
+            "hips": (0.04 * (1 - p), -0.24 * (1 - p) + overshoot, 0),
+            "spine": (0.10 * (1 - p), -0.33 * (1 - p) + overshoot, 0),
+            "spine1": (0.05 * (1 - p), -0.12 * (1 - p), 0),
+            "head": (0, -0.10 * (1 - p), 0),
+            "arm_r": (0.50 * (1 - p), 0, 0),
+            "forearm_r": (-0.18 * (1 - p), 0, 0),
+            "arm_l": (-0.40 * (1 - p), 0, 0.08 * (1 - p)),
+            "forearm_l": (-0.75 * (1 - p), 0, 0),
+            "thigh_l": (0.20 * (1 - p), 0, 0),
+        }
+
+    return _phases(t, (0.28, wind_up), (0.42, strike), (None, recover))
+
+
+def _kick(t):
+    """Chamber, snap kick, hold, recovery; the upper body counterbalances."""
+    def chamber(t):                      # load onto left leg, bring right knee up
+        p = _ease_in_out(t / 0.20)
+        p_upper = _ease_in_out(np.minimum(t / 0.20 * 0.85, 1.0))
+        return {
+            "hips": (p * 0.04, -p * 0.06, -p * 0.08),
+            "spine": (-p_upper * 0.06, 0, p_upper * 0.04),
+            "spine1": (-p_upper * 0.03, 0, 0),
+            "head": (-p_upper * 0.04, -p_upper * 0.08, 0),
+            "thigh_r": (p * 0.55, 0, 0),
+            "shin_r": (-p * 0.70, 0, 0),
+            "foot_r": (-p * 0.15, 0, 0),
+            "thigh_l": (p * 0.12, 0, 0),
+            "shin_l": (-p * 0.15, 0, 0),
+            "arm_l": (-p * 0.35, 0, p * 0.10),
+            "arm_r": (-p * 0.30, 0, -p * 0.08),
+            "forearm_l": (-p * 0.50, 0, 0),
+            "forearm_r": (-p * 0.45, 0, 0),
+        }
+
+    def snap(t):                         # hip leads, shin snaps out
+        u = (t - 0.20) / 0.18
+        p = _ease_out_cubic(u)
+        p_shin = _ease_out_cubic(np.minimum(u * 0.75, 1.0))
+        return {
+            "hips": (0.04 + p * 0.06, -0.06 - p * 0.04, -0.08),
+            "spine": (-0.06 - p * 0.06, 0, 0.04),
+            "head": (-0.04, -0.08 + p * 0.04, 0),
+            "thigh_r": (0.55 + p * 0.50, 0, 0),
+            "shin_r": (-0.70 + p_shin * 0.68, 0, 0),
+            "foot_r": (-0.15 - p * 0.20, 0, 0),
+            "arm_l": (-0.35 - p * 0.15, 0, 0.10 + p * 0.08),
+            "arm_r": (-0.30 + p * 0.20, 0, -0.08 - p * 0.06),
+        }
+
+    def hold(t):                         # impact frame, slight wobble at the peak
+        p = (t - 0.38) / 0.12
+        return {
+            "hips": (0.10, -0.10, -0.08),
+            "spine": (-0.12, 0, 0.04),
+            "thigh_r": (1.05, 0, 0),
+            "shin_r": (-0.02 + p * 0.05, 0, 0),
+            "foot_r": (-0.35, 0, 0),
+            "arm_l": (-0.50, 0, 0.18),
+            "head": (-0.04, -0.04, 0),
+        }
+
+    def recover(t):                      # retract leg, settle body
+        u = (t - 0.50) / 0.50
+        p = _ease_in_out(u)
+        settle = np.sin(p * np.pi * 1.5) * (1 - p) * 0.06
+        p_upper = _ease_in_out(np.minimum(u * 0.80, 1.0))
+        return {
+            "hips": (0.10 * (1 - p) + settle, -0.10 * (1 - p), -0.08 * (1 - p)),
+            "spine": (-0.12 * (1 - p_upper), 0, 0.04 * (1 - p_upper)),
+            "spine1": (settle * 0.5, 0, 0),
+            "head": (settle * 0.3, 0, 0),
+            "thigh_r": (1.05 * (1 - p), 0, 0),
+            "shin_r": (-p * 0.15, 0, 0),
+            "foot_r": (-0.35 * (1 - p), 0, 0),
+            "thigh_l": (0.12 * (1 - p), 0, 0),
+            "shin_l": (-0.15 * (1 - p), 0, 0),
+            "arm_l": (-0.50 * (1 - p), 0, 0.18 * (1 - p)),
+            "arm_r": (-0.10 * (1 - p), 0, -0.14 * (1 - p)),
+            "forearm_l": (-0.50 * (1 - p), 0, 0),
+            "forearm_r": (-0.45 * (1 - p), 0, 0),
+        }
+
+    return _phases(t, (0.20, chamber), (0.38, snap), (0.50, hold), (None, recover))
+
+
+def _celebrate(t):
+    """Fist pumps and body bounce with layered timing."""
+    beat = _sin(t, 4)
+    beat_lag = _sin(t, 4, 0.25)
+    groove = _cos(t, 4)
+    pump = _rect(_sin(t, 4))
+    pump_lag = _rect(_sin(t, 4, 0.3))                    # arms lag behind
+    double = _sin(t, 8) * 0.3                            # micro-bounces
+    return {
+        "hips": (pump * 0.04 + double * 0.01, beat * 0.14, groove * 0.07),
+        "spine": (-pump_lag * 0.08, -beat_lag * 0.10, -groove * 0.04),
+        "spine1": (-pump_lag * 0.04, -beat_lag * 0.05, 0),
+        "neck": (pump * 0.05, beat * 0.04, 0),
+        "head": (-pump * 0.14 + double * 0.02, beat * 0.08, groove * 0.03),
+        "shoulder_l": (-pump_lag * 0.15, 0, pump_lag * 0.10),
+        "shoulder_r": (-pump_lag * 0.15, 0, -pump_lag * 0.10),
+        "arm_l": (-0.5 - pump_lag * 0.85, 0, 0.2 + pump_lag * 0.18),
+        "arm_r": (-0.5 - pump_lag * 0.85, 0, -0.2 - pump_lag * 0.18),
+        "forearm_l": (-0.6 - pump_lag * 0.35, 0, 0),
+        "forearm_r": (-0.6 - pump_lag * 0.35, 0, 0),
+        "hand_l": (pump_lag * 0.08, 0, pump_lag * 0.05),
+        "hand_r": (pump_lag * 0.08, 0, -pump_lag * 0.05),
+        "thigh_l": (pump * 0.18, 0, 0),
+        "thigh_r": (_rect(-beat) * 0.18, 0, 0),
+        "shin_l": (pump * 0.08, 0, 0),
+        "shin_r": (_rect(-beat) * 0.08, 0, 0),
+    }
+
+
+def _bow(t):
+    """Bow with a spine cascade, a breathing hold and a reverse cascade back up."""
+    def bend(t):                         # hips start, head follows last
+        u = t / 0.30
+        p = _ease_in_out(u)
+        p_spine = _ease_in_out(np.minimum(u * 1.10, 1.0))
+        p_head = _ease_in_out(np.minimum(u * 0.85, 1.0))
+        p_arms = _ease_in_out(np.minimum(u * 0.80, 1.0))
+        return {
+            "hips": (p * 0.35, 0, 0),
+            "spine": (p_spine * 0.25, 0, 0),
+            "spine1": (p_spine * 0.15, 0, 0),
+            "spine2": (p_spine * 0.08, 0, 0),
+            "neck": (p_head * 0.08, 0, 0),
+            "head": (p_head * 0.15, 0, 0),
+            "shoulder_l": (p_arms * 0.04, 0, p_arms * 0.03),
+            "shoulder_r": (p_arms * 0.04, 0, -p_arms * 0.03),
+            "arm_l": (p_arms * 0.12, 0, p_arms * 0.06),
+            "arm_r": (p_arms * 0.12, 0, -p_arms * 0.06),
+            "forearm_l": (-p_arms * 0.08, 0, 0),
+            "forearm_r": (-p_arms * 0.08, 0, 0),
+            "thigh_l": (p * 0.06, 0, 0),
+            "thigh_r": (p * 0.06, 0, 0),
+            "shin_l": (-p * 0.04, 0, 0),
+            "shin_r": (-p * 0.04, 0, 0),
+        }
+
+    def hold(t):                         # subtle breathing for a life-like feel
+        hold_t = (t - 0.30) / 0.38
+        breath = np.sin(hold_t * np.pi * 2.5) * 0.012
+        micro_sway = np.sin(hold_t * np.pi * 5) * 0.004
+        return {
+            "hips": (0.35, 0, micro_sway),
+            "spine": (0.25 + breath, 0, 0),
+            "spine1": (0.15 + breath * 0.6, 0, 0),
+            "spine2": (0.08 + breath * 0.3, 0, 0),
+            "neck": (0.08, 0, 0),
+            "head": (0.15, 0, micro_sway * 0.5),
+            "arm_l": (0.12, 0, 0.06),
+            "arm_r": (0.12, 0, -0.06),
+            "shoulder_l": (0.04 + breath * 0.3, 0, 0.03),
+            "shoulder_r": (0.04 + breath * 0.3, 0, -0.03),
+            "thigh_l": (0.06, 0, 0),
+            "thigh_r": (0.06, 0, 0),
+        }
+
+    def rise(t):                         # head rises first, hips last
+        u = (t - 0.68) / 0.32
+        r = 1 - _ease_in_out(u)
+        r_head = 1 - _ease_in_out(np.minimum(u * 1.20, 1.0))
+        r_arms = 1 - _ease_in_out(np.minimum(u * 1.10, 1.0))
+        return {
+            "hips": (0.35 * r, 0, 0),
+            "spine": (0.25 * r, 0, 0),
+            "spine1": (0.15 * r, 0, 0),
+            "spine2": (0.08 * r, 0, 0),
+            "neck": (0.08 * r_head, 0, 0),
+            "head": (0.15 * r_head, 0, 0),
+            "arm_l": (0.12 * r_arms, 0, 0.06 * r_arms),
+            "arm_r": (0.12 * r_arms, 0, -0.06 * r_arms),
+            "shoulder_l": (0.04 * r_arms, 0, 0.03 * r_arms),
+            "shoulder_r": (0.04 * r_arms, 0, -0.03 * r_arms),
+            "forearm_l": (-0.08 * r_arms, 0, 0),
+            "forearm_r": (-0.08 * r_arms, 0, 0),
+            "thigh_l": (0.06 * r, 0, 0),
+            "thigh_r": (0.06 * r, 0, 0),
+            "shin_l": (-0.04 * r, 0, 0),
+            "shin_r": (-0.04 * r, 0, 0),
+        }
+
+    return _phases(t, (0.30, bend), (0.68, hold), (None, rise))
+
+
+def _look_around(t):
+    """Slow head/body scan left and right; neck and body lag the gaze."""
+    look = _sin(t, 2)
+    look_lag = _sin(t, 2, 0.20)
+    look_body = _sin(t, 2, 0.40)
+    vertical = _sin(t, 4) * 0.06                         # bob as attention shifts
+    vertical_lag = _sin(t, 4, 0.15) * 0.04
+    return {
+        "head": (vertical, look * 0.48, look * 0.06),
+        "neck": (vertical_lag, look_lag * 0.18, look_lag * 0.02),
+        "spine2": (0, look_body * 0.10, look_body * 0.015),
+        "spine1": (0, look_body * 0.06, 0),
+        "spine": (0, look_body * 0.04, 0),
+        "hips": (0, 0, look_body * 0.025),
+        "arm_l": (look_body * 0.03, 0, look_body * 0.015),
+        "arm_r": (-look_body * 0.03, 0, -look_body * 0.015),
+    }
+
+
+CLIPS = {
+    "walk": _walk, "run": _run, "run_fast": _run_fast, "attack": _attack,
+    "dance": _dance, "agree": _agree, "alert": _alert, "arise": _arise,
+    "dead": _dead, "sit_down": _sit_down, "jump": _jump, "wave": _wave,
+    "clap": _clap, "punch": _punch, "kick": _kick, "celebrate": _celebrate,
+    "bow": _bow, "look_around": _look_around,
+}
+
+
+# ── Hip translation curves (deltas from the rest translation) ──
+
+def _locomotion_hips(amp):
+    """Figure-8 hip motion: vertical bounce 2x per stride, lateral sway 1x, lean on push-off."""
+    def curve(t):
+        bounce_y = _sin(t, 4) * amp
+        sway_x = _sin(t, 2) * amp * 0.4
+        lean_z = _sin(t, 4, -0.5) * amp * 0.15
+        return np.stack([sway_x, bounce_y, lean_z], axis=1)
+    return curve
+
+
+def _sit_down_hips(t):
+    p = t * t * (3 - 2 * t)
+    return np.stack([np.zeros_like(t), -p * 0.08, np.zeros_like(t)], axis=1)
+
+
+def _jump_hips(t):
+    rise = (t - 0.25) / 0.40
+    fall = (t - 0.65) / 0.35
+    y = np.select([t < 0.25, t < 0.65],
+                  [-(t / 0.25) * 0.02,                   # crouch down
+                   -0.02 + rise * 0.08],                 # jump up
+                  0.06 * (1 - fall * fall))              # land
+    return np.stack([np.zeros_like(t), y, np.zeros_like(t)], axis=1)
+
+
+HIP_TRANSLATIONS = {
+    "walk": _locomotion_hips(0.010), "run": _locomotion_hips(0.018),
+    "run_fast": _locomotion_hips(0.025), "dance": _locomotion_hips(0.012),
+    "celebrate": _locomotion_hips(0.014),
+    "sit_down": _sit_down_hips, "jump": _jump_hips,
+}
+
+
+# ── Evaluation ──
+
+# Bones a clip leaves static inherit 15% of their parent's rotation as
+# follow-through, so no bone sits rigidly at identity (prevents tearing)
+BONE_PARENT = {
+    "hips": "root", "spine": "hips", "spine1": "spine",
+    "spine2": "spine1", "neck": "spine2", "head": "neck",
+    "shoulder_l": "spine2", "arm_l": "shoulder_l",
+    "forearm_l": "arm_l", "hand_l": "forearm_l",
+    "shoulder_r": "spine2", "arm_r": "shoulder_r",
+    "forearm_r": "arm_r", "hand_r": "forearm_r",
+    "thigh_l": "hips", "shin_l": "thigh_l",
+    "foot_l": "shin_l", "toe_l": "foot_l",
+    "thigh_r": "hips", "shin_r": "thigh_r",
+    "foot_r": "shin_r", "toe_r": "foot_r",
+}
+INHERIT_FACTOR = 0.15
+
+
+def _inherit_static_bones(rotations, bone_index, bone_order):
+    """Fill bones still at identity from their parent, parent-first in skeleton order."""
+    moving = (np.abs(rotations[..., :3]) > 1e-5).any(axis=(0, 2)) | \
+             (np.abs(rotations[..., 3] - 1.0) > 1e-5).any(axis=0)
+    for bone in bone_order:
+        parent = BONE_PARENT.get(bone)
+        j = bone_index[bone]
+        if moving[j] or bone == "root" or parent not in bone_index:
+            continue
+        scaled = rotations[:, bone_index[parent]].copy()
+        scaled[:, :3] *= INHERIT_FACTOR       # scale the rotation (valid for small angles)
+        x, y, z, w = scaled.T
+        length = np.sqrt(x * x + y * y + z * z + w * w)
+        ok = length > 1e-8
+        rotations[ok, j] = scaled[ok] / length[ok, None]
+
+
+def evaluate_clip(animation_id: str, bone_names, duration: float, num_keys: int = NUM_KEYS):
+    """
+    Keyframes of one clip for a skeleton.
+
+    Returns {bone_name: {"times": (K,) float64, "rotations": (K, 4)
+    quaternions [x, y, z, w], "translations": (K, 3) hip deltas or None}}
+    for every name in bone_names (bones the clip doesn't drive stay at
+    identity unless they inherit from a parent). Unknown clips are all
+    identity.
+    """
+    bone_order = list(dict.fromkeys(bone_names))
+    bone_index = {b: j for j, b in enumerate(bone_order)}
+    t = np.arange(num_keys) / (num_keys - 1)
+    times = np.arange(num_keys) * duration / (num_keys - 1)
+
+    # (frames × bones × 3) Euler grid → one batched quaternion conversion
+    euler = np.zeros((num_keys, len(bone_order), 3))
+    clip = CLIPS.get(animation_id)
+    if clip is not None:
+        for bone, channels in clip(t).items():
+            j = bone_index.get(bone)
+            if j is None:
+                continue
+            if isinstance(channels, np.ndarray):
+                euler[:, j] = channels.T
+            else:
+                for c in range(3):
+                    euler[:, j, c] = channels[c]
+    rotations = _anim_math.quat_from_euler(euler)
+    _inherit_static_bones(rotations, bone_index, bone_order)
+
+    keyframes = {b: {"times": times, "rotations": rotations[:, j], "translations": None}
+                 for b, j in bone_index.items()}
+    hip_curve = HIP_TRANSLATIONS.get(animation_id)
+    if hip_curve is not None and "hips" in keyframes:
+        keyframes["hips"]["translations"] = hip_curve(t)
+    return keyframes
+
+
+# ── Keyframe reduction ──
+
+# Points of every span between two keys (fractions of it) where the reduced
+# curve is checked against the full one, besides the keys themselves. The
+# error between two keys peaks off-centre, so the midpoint alone let up to
+# 0.33° through a 0.25° bound; every 1/16 of the span keeps the library
+# clips within it (worst 0.2498° over 2000 samples per clip)
+SPAN_SAMPLES = np.arange(1, 16) / 16
+
+def _kept_neighbours(kept):
+    """(K, B) kept mask → nearest kept key at or before (L) / at or after (R) every key."""
+    num_keys = len(kept)
+    idx = np.arange(num_keys)[:, None]
+    before = np.maximum.accumulate(np.where(kept, idx, -1), axis=0)
+    after = np.minimum.accumulate(np.where(kept, idx, num_keys)[::-1], axis=0)[::-1]
+    return before, after
+
+
+def _kept_tangents(times, values, kept, is_loop):
+    """anim_math.catmull_rom_tangents() of every channel's kept keys, at (K, B) key positions."""
+    num_keys, num_channels = kept.shape
+    before, after = _kept_neighbours(kept)
+    prev_idx = np.empty_like(before)
+    next_idx = np.empty_like(after)
+    prev_idx[1:] = before[:-1]
+    next_idx[:-1] = after[1:]
+    if is_loop:
+        prev_idx[0] = num_keys - 1
+        next_idx[-1] = 0
+        prev_t, next_t = times[prev_idx], times[next_idx]
+        prev_t[0] = times[0] - (times[-1] - times[before[-2]])
+        next_t[-1] = times[-1] + (times[after[1]] - times[0])
+    else:
+        prev_idx[0] = 0
+        next_idx[-1] = num_keys - 1
+        prev_t, next_t = times[prev_idx], times[next_idx]
+    dt = next_t - prev_t
+    dt[np.abs(dt) < 1e-10] = 1e-10
+    cols = np.arange(num_channels)
+    return (values[next_idx, cols] - values[prev_idx, cols]) / dt[..., None] * 0.85
+
+
+def _hermite(times, values, tangents, lo, hi, sample_times):
+    """glTF CUBICSPLINE value between keys lo and hi (M, B) at sample_times (M,)."""
+    cols = np.arange(values.shape[1])
+    t0 = times[lo]
+    td = times[hi] - t0
+    s = np.divide(sample_times[:, None] - t0, td, out=np.zeros_like(td), where=td > 0)
+    s2 = s * s
+    s3 = s2 * s
+    return ((2 * s3 - 3 * s2 + 1)[..., None] * values[lo, cols]
+            + (td * (s3 - 2 * s2 + s))[..., None] * tangents[lo, cols]
+            + (3 * s2 - 2 * s3)[..., None] * values[hi, cols]
+            + (td * (s3 - s2))[..., None] * tangents[hi, cols])
+
+
+def _curve_error(fit, ref, rotations):
+    """Angle between quaternions (radians) or distance between points, (M, B)."""
+    if not rotations:
+        return np.linalg.norm(fit - ref, axis=-1)
+    return _anim_math.quat_angle(_anim_math.quat_normalize(fit), _anim_math.quat_normalize(ref))
+
+
+def _reduce_pass(times, values, kept, fractions, tolerance, is_loop, rotations):
+    """
+    Greedy key insertion of reduce_keys() from `kept` until the error at
+    every key and at `fractions` of every span is within `tolerance`.
+    """
+    num_keys, num_channels = values.shape[:2]
+
+    # Reference: the full curve at every key and at the sample points of
+    # every span, stacked span-sample-major: (S·(K-1), B)
+    num_samples = len(fractions)
+    mid_t = (times[:-1] + fractions[:, None] * np.diff(times)).ravel()
+    seg = np.broadcast_to(np.tile(np.arange(num_keys - 1), num_samples)[:, None],
+                          (num_samples * (num_keys - 1), num_channels))
+    ref_mid = _hermite(times, values, _anim_math.catmull_rom_tangents(times, values, is_loop),
+                       seg, seg + 1, mid_t)
+
+    kept = kept.copy()
+    while True:
+        tangents = _kept_tangents(times, values, kept, is_loop)
+        before, after = _kept_neighbours(kept)
+        err_key = _curve_error(_hermite(times, values, tangents, before, after, times), values, rotations)
+        lo = np.tile(before[:-1], (num_samples, 1))
+        hi = np.tile(after[1:], (num_samples, 1))
+        err_mid = _curve_error(_hermite(times, values, tangents, lo, hi, mid_t), ref_mid, rotations)
+        err_mid = err_mid.reshape(num_samples, num_keys - 1, num_channels).max(axis=0)
+        over = np.maximum(err_key.max(axis=0), err_mid.max(axis=0)) > tolerance
+
+        # Score each dropped key by the worst error at it or next to it, then
+        # add the worst key of every span (between kept keys) that is over
+        score = err_key.copy()
+        score[:-1] = np.maximum(score[:-1], err_mid)
+        score[1:] = np.maximum(score[1:], err_mid)
+        score[kept] = -1.0
+        if not (over & (score.max(axis=0) >= 0)).any():
+            return kept, tangents
+        flat = score.T.ravel()                          # channel-major: spans are contiguous
+        starts = np.flatnonzero(kept.T.ravel())
+        span_len = np.diff(np.append(starts, flat.size))
+        worst = flat == np.repeat(np.maximum.reduceat(flat, starts), span_len)
+        ranks = np.cumsum(worst)
+        worst &= ranks - np.repeat(ranks[starts] - worst[starts], span_len) == 1   # first per span
+        channel_max = np.repeat(score.max(axis=0), num_keys)
+        add = worst & (flat > np.maximum(tolerance, 0.5 * channel_max))
+        if not add.any():
+            # Over only through the tangents of kept keys: add each channel's worst
+            add = worst & (flat == channel_max) & (flat >= 0) & np.repeat(over, num_keys)
+        kept |= add.reshape(num_channels, num_keys).T
+
+
+def reduce_keys(times, values, tolerance: float, is_loop: bool = False, rotations: bool = False):
+    """
+    Error-bounded keyframe reduction for a batch of channels.
+
+    times (K,), values (K, B, C) keyframes of B channels. Keeps the first
+    and last key, then greedily adds, per channel, the key where the
+    CUBICSPLINE curve through the kept keys (Catmull-Rom tangents re-fit
+    over them) strays furthest from the full curve, until the error at
+    every key and at the SPAN_SAMPLES points between every pair of keys is
+    within `tolerance`: radians for quaternion channels (rotations=True),
+    distance otherwise. Between those samples the error is not checked.
+    A first pass checks span midpoints only; the dense pass then starts
+    from its keys and usually adds just a few.
+
+    Returns (kept (K, B) bool, tangents (K, B, C)); tangents are valid at
+    the kept keys.
+    """
+    times = np.asarray(times, dtype=np.float64)
+    values = np.asarray(values, dtype=np.float64)
+    num_keys, num_channels = values.shape[:2]
+    if num_keys < 3:
+        kept = np.ones((num_keys, num_channels), dtype=bool)
+        return kept, _anim_math.catmull_rom_tangents(times, values, is_loop)
+
+    kept = np.zeros((num_keys, num_channels), dtype=bool)
+    kept[[0, -1]] = True
+    for fractions in (np.array([0.5]), SPAN_SAMPLES):
+        kept, tangents = _reduce_pass(times, values, kept, fractions, tolerance, is_loop, rotations)
+    return kept, tangents
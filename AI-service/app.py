@@ -35,6 +35,7 @@ from preprocessing import preprocess_image, preprocess_for_hunyuan3d, select_bes
 from stable_diffusion import text_to_image, text_to_multiview
 from hunyuan3d_wrapper import image_to_3d, hunyuan3d_generator
 from postprocessing import postprocess_mesh, render_mesh_thumbnail
+from mesh_quantization import maybe_quantize_glb, load_trimesh
 
 # Import Phase 2 services
 try:
@@ -216,6 +217,7 @@ def text_to_3d_endpoint():
         
         final_model_path = str(OUTPUT_DIR / f"{job_id}.glb")
         postprocess_mesh(raw_model_path, final_model_path, source='hunyuan3d')
+        quantization = maybe_quantize_glb(final_model_path)
         
         # Cleanup raw model
         try:
@@ -246,7 +248,8 @@ def text_to_3d_endpoint():
             'jobId': job_id,
             'modelPath': f"/outputs/{job_id}.glb",
             'imageUrl': thumbnail_url,
-            'elapsed': elapsed
+            'elapsed': elapsed,
+            'quantization': quantization
         })
         
     except Exception as e:
@@ -341,6 +344,7 @@ def image_to_3d_endpoint():
         
         final_model_path = str(OUTPUT_DIR / f"{job_id}.glb")
         postprocess_mesh(raw_model_path, final_model_path, source='hunyuan3d')
+        quantization = maybe_quantize_glb(final_model_path)
         
         # Cleanup raw model
         try:
@@ -371,7 +375,8 @@ def image_to_3d_endpoint():
             'modelPath': f"/outputs/{job_id}.glb",
             'imageUrl': thumbnail_url,
             'preprocessedImage': f"/outputs/{job_id}_preprocessed.png",
-            'elapsed': elapsed
+            'elapsed': elapsed,
+            'quantization': quantization
         })
         
     except Exception as e:
@@ -447,6 +452,7 @@ def _run_batch_generation(job_id, prompt, mode, num_variants):
             # Post-process
             final_model_path = str(OUTPUT_DIR / f"{job_id}_v{i}.glb")
             postprocess_mesh(raw_model_path, final_model_path, source='hunyuan3d')
+            quantization = maybe_quantize_glb(final_model_path)
             
             try:
                 os.remove(raw_model_path)
@@ -465,7 +471,8 @@ def _run_batch_generation(job_id, prompt, mode, num_variants):
                 'previewUrl': f"/outputs/{job_id}_v{i}_preview.png",
                 'preprocessedUrl': f"/outputs/{job_id}_v{i}_preprocessed.png",
                 'seed': seed,
-                'variant': i + 1
+                'variant': i + 1,
+                'quantization': quantization
             }
             jobs[job_id]['variants'].append(variant_data)
             jobs[job_id]['variants_completed'] = i + 1
@@ -619,8 +626,7 @@ def apply_hunyuan_texture_endpoint():
         start_time = time.time()
         
         # Load the untextured mesh
-        import trimesh as tm
-        mesh = tm.load(model_path, force='mesh')
+        mesh = load_trimesh(model_path, force='mesh')
         
         # Load and apply Hunyuan3D-Paint texture pipeline
         from hunyuan3d_wrapper import hunyuan3d_generator
@@ -640,6 +646,7 @@ def apply_hunyuan_texture_endpoint():
         # Save textured model
         textured_path = model_path.replace('.glb', '_textured.glb')
         textured_mesh.export(textured_path)
+        quantization = maybe_quantize_glb(textured_path)
         
         elapsed = time.time() - start_time
         textured_rel = f"/outputs/{os.path.basename(textured_path)}"
@@ -649,7 +656,8 @@ def apply_hunyuan_texture_endpoint():
         return jsonify({
             'ok': True,
             'texturedModelPath': textured_rel,
-            'elapsed': elapsed
+            'elapsed': elapsed,
+            'quantization': quantization
         })
         
     except Exception as e:
@@ -724,6 +732,7 @@ if __name__ == '__main__':
 ║  Texture:     POST /api/phase2/texture                      ║
 ║  Rig:         POST /api/phase2/rig                          ║
 ║  Animate:     POST /api/phase2/animate                      ║
+║  Animate+:    POST /api/phase2/animate-batch                ║
 ║  Remesh:      POST /api/phase2/remesh                       ║
 ║  Export:      POST /api/phase2/export                       ║
 ║                                                              ║
@@ -0,0 +1,413 @@
+"""
+Benchmark tool: animation math (anim_math) against the per-keyframe list code.
+
+Sections:
+  equivalence — randomized property checks of anim_math against the
+             previous list implementations (kept below as the reference):
+             Euler → quaternion, Hamilton product and Catmull-Rom tangents
+             must match; nlerp must match the old blend on same-hemisphere
+             pairs and take the shorter arc otherwise; slerp must hit both
+             ends, stay unit length and move at constant angular speed;
+             finite-difference tangents must reproduce linear motion and
+             equal undamped Catmull-Rom on uniform keys.
+  quaternion — K keyframes × 23 bones: Euler → quaternion, Hamilton
+             product and blend per keyframe (old) vs one batched call.
+  tangents — K keyframes × 23 bones of quaternions: per-bone list
+             Catmull-Rom (old) vs one call over (K, 23, 4).
+  preview  — skin_preview on a synthetic skinned tube GLB: batched LBS
+             against a per-vertex sum of weighted joint matrices,
+             rasterizer coverage against a per-pixel inside test, then
+             60-frame clip render times with and without the preview LOD.
+
+Usage:
+  python benchmark_animation.py [section] [keyframe counts...]
+  python benchmark_animation.py tangents 60 600
+"""
+import math
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+
+import anim_math
+import glb_io
+import skin_preview
+
+DEFAULT_SIZES = [60, 240, 1000]
+NUM_BONES = 23  # humanoid skeleton
+TRIALS = 200
+PREVIEW_VERTICES = [5_000, 20_000, 50_000]
+PREVIEW_FRAMES = 60
+TUBE_BONES = 4
+
+
+# ── Previous per-keyframe list implementations, kept as the reference ──
+
+def ref_quaternion_from_euler(rx, ry, rz):
+    cx = math.cos(rx / 2); sx = math.sin(rx / 2)
+    cy = math.cos(ry / 2); sy = math.sin(ry / 2)
+    cz = math.cos(rz / 2); sz = math.sin(rz / 2)
+    return [
+        sx * cy * cz - cx * sy * sz,
+        cx * sy * cz + sx * cy * sz,
+        cx * cy * sz - sx * sy * cz,
+        cx * cy * cz + sx * sy * sz
+    ]
+
+
+def ref_blend_q(a, b, t):
+    r = [a[j] + (b[j] - a[j]) * t for j in range(4)]
+    ln = math.sqrt(sum(x*x for x in r))
+    return [x / ln for x in r] if ln > 1e-8 else [0, 0, 0, 1]
+
+
+def ref_q_mul(a, b):
+    ax, ay, az, aw = a
+    bx, by, bz, bw = b
+    return [
+        aw*bx + ax*bw + ay*bz - az*by,
+        aw*by - ax*bz + ay*bw + az*bx,
+        aw*bz + ax*by - ay*bx + az*bw,
+        aw*bw - ax*bx - ay*by - az*bz,
+    ]
+
+
+def ref_catmull_rom_tangents(times, values, component_count, is_loop=False):
+    n = len(times)
+    in_tangents = []
+    out_tangents = []
+    for i in range(n):
+        if n < 2:
+            tang = [0.0] * component_count
+            in_tangents.append(tang)
+            out_tangents.append(tang[:])
+            continue
+        if i == 0:
+            if is_loop:
+                prev_v = values[-1]
+                prev_t = times[0] - (times[-1] - times[-2])
+            else:
+                prev_v = values[0]
+                prev_t = times[0]
+            next_v = values[1]
+            next_t = times[1]
+        elif i == n - 1:
+            prev_v = values[-2]
+            prev_t = times[-2]
+            if is_loop:
+                next_v = values[0]
+                next_t = times[-1] + (times[1] - times[0])
+            else:
+                next_v = values[-1]
+                next_t = times[-1]
+        else:
+            prev_v = values[i - 1]
+            prev_t = times[i - 1]
+            next_v = values[i + 1]
+            next_t = times[i + 1]
+        dt = next_t - prev_t
+        if abs(dt) < 1e-10:
+            dt = 1e-10
+        tang = [(next_v[j] - prev_v[j]) / dt for j in range(component_count)]
+        tang = [t * 0.85 for t in tang]
+        in_tangents.append(tang)
+        out_tangents.append(tang[:])
+    return in_tangents, out_tangents
+
+
+# ── Helpers ──
+
+def measure(fn, *args, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn(*args)
+        best = min(best, time.perf_counter() - t0)
+    return out, best
+
+
+def random_quats(rng, shape):
+    return anim_math.quat_normalize(rng.normal(size=shape + (4,)))
+
+
+def random_times(rng, n):
+    """Sorted key times with uneven gaps and the odd duplicate key."""
+    gaps = rng.exponential(size=n - 1) * (rng.random(n - 1) > 0.05)
+    return np.concatenate([[0.0], np.cumsum(gaps)]) * rng.uniform(0.1, 5.0)
+
+
+def ref_skin_vertex(weights, position, joint_matrices):
+    """One vertex, one frame: Σ w_j · M_j · p."""
+    p = np.append(position, 1.0)
+    return sum(w * (m @ p)[:3] for w, m in zip(weights, joint_matrices) if w)
+
+
+def ref_coverage(screen, triangles, size):
+    """Pixels whose centre lies inside (or on the edge of) any triangle."""
+    yc, xc = np.mgrid[0:size, 0:size] + 0.5
+    covered = np.zeros((size, size), dtype=bool)
+    for a, b, c in screen[triangles][..., :2]:
+        d = [(q[0] - p[0]) * (yc - p[1]) - (q[1] - p[1]) * (xc - p[0])
+             for p, q in ((a, b), (b, c), (c, a))]
+        covered |= ((d[0] >= 0) & (d[1] >= 0) & (d[2] >= 0)) | ((d[0] <= 0) & (d[1] <= 0) & (d[2] <= 0))
+    return covered
+
+
+def tube_glb(path, num_vertices, bones=TUBE_BONES, height=2.0):
+    """
+    Closed-ring tube along +y with about num_vertices vertices, skinned to a
+    chain of `bones` joints (each vertex blended between its two nearest
+    joints), and the clip that bends every joint around z.
+    Returns (gltf, bin_data, tracks).
+    """
+    segments = max(8, int(math.sqrt(num_vertices / 4)))
+    rings = max(2, num_vertices // segments)
+    angle = np.arange(segments) * 2 * np.pi / segments
+    y = np.linspace(0, height, rings)
+    positions = np.zeros((rings, segments, 3), dtype=np.float32)
+    positions[..., 0] = 0.15 * np.cos(angle)
+    positions[..., 1] = y[:, None]
+    positions[..., 2] = 0.15 * np.sin(angle)
+    ring = np.arange(rings - 1)[:, None] * segments
+    a = ring + np.arange(segments)
+    b = ring + (np.arange(segments) + 1) % segments
+    triangles = np.stack([a, b, a + segments, b, b + segments, a + segments], axis=-1).reshape(-1, 3)
+
+    bone_at = np.clip(y / height * bones - 0.5, 0, bones - 1)
+    lo = np.minimum(bone_at.astype(np.int64), bones - 2)
+    frac = bone_at - lo
+    joints = np.zeros((rings, 4), dtype=np.uint16)
+    weights = np.zeros((rings, 4), dtype=np.float32)
+    joints[:, 0], joints[:, 1] = lo, lo + 1
+    weights[:, 0], weights[:, 1] = 1 - frac, frac
+    joints, weights = np.repeat(joints, segments, axis=0), np.repeat(weights, segments, axis=0)
+
+    spacing = height / bones
+    inverse_bind = np.tile(np.eye(4, dtype=np.float32), (bones, 1, 1))
+    inverse_bind[:, 1, 3] = -np.arange(bones) * spacing
+    gltf = {
+        "asset": {"version": "2.0"},
+        "scene": 0,
+        "scenes": [{"nodes": [0, bones]}],
+        "nodes": [{"name": f"bone{j}", "translation": [0, spacing if j else 0, 0],
+                   **({"children": [j + 1]} if j + 1 < bones else {})} for j in range(bones)],
+    }
+    doc = glb_io.GLTFDocument(gltf)
+    attributes = {
+        "POSITION": doc.add_accessor(positions.reshape(-1, 3), "VEC3", target=34962, min_max=True),
+        "JOINTS_0": doc.add_accessor(joints, "VEC4", target=34962),
+        "WEIGHTS_0": doc.add_accessor(weights, "VEC4", target=34962),
+    }
+    indices = doc.add_accessor(triangles.astype(np.uint32).ravel(), "SCALAR", target=34963)
+    gltf["meshes"] = [{"primitives": [{"attributes": attributes, "indices": indices}]}]
+    gltf["nodes"].append({"name": "tube", "mesh": 0, "skin": 0})
+    gltf["skins"] = [{"joints": list(range(bones)), "skeleton": 0,
+                      "inverseBindMatrices": doc.add_accessor(
+                          inverse_bind.transpose(0, 2, 1).reshape(-1, 16), "MAT4")}]
+    doc.save(path)
+
+    times = np.linspace(0, 1, 31)
+    bend = 0.5 * np.sin(2 * np.pi * times)
+    rotation = np.zeros((len(times), 4))
+    rotation[:, 2], rotation[:, 3] = np.sin(bend / 2), np.cos(bend / 2)
+    tracks = [{"node": j, "path": "rotation", "interpolation": "LINEAR", "times": times, "values": rotation}
+              for j in range(1, bones)]
+    return (*glb_io.read_glb(path), tracks)
+
+
+# ── Sections ──
+
+def bench_equivalence(sizes):
+    rng = np.random.default_rng(0)
+    results = []
+
+    def check(name, worst, limit):
+        results.append(worst <= limit)
+        print(f"   {name:<48} max err {worst:9.2e}  {'✅' if worst <= limit else '❌'}")
+
+    print(f"🧪 anim_math vs per-keyframe reference ({TRIALS} random trials each)")
+
+    euler = rng.uniform(-2 * np.pi, 2 * np.pi, size=(TRIALS, 3))
+    ref = np.array([ref_quaternion_from_euler(*e) for e in euler.tolist()])
+    check("quat_from_euler", np.abs(anim_math.quat_from_euler(euler) - ref).max(), 1e-15)
+
+    a, b = random_quats(rng, (TRIALS,)), random_quats(rng, (TRIALS,))
+    ref = np.array([ref_q_mul(x, y) for x, y in zip(a.tolist(), b.tolist())])
+    check("quat_mul (Hamilton product)", np.abs(anim_math.quat_mul(a, b) - ref).max(), 0.0)
+
+    t = rng.random(TRIALS)
+    flip = np.where((a * b).sum(axis=1, keepdims=True) < 0, -1.0, 1.0)
+    ref = np.array([ref_blend_q(x, y, s) for x, y, s in zip(a.tolist(), (b * flip).tolist(), t)])
+    check("nlerp (same-hemisphere pairs = old blend)", np.abs(anim_math.nlerp(a, b * flip, t) - ref).max(), 1e-15)
+    check("nlerp (opposite pairs take the shorter arc)", np.abs(anim_math.nlerp(a, -b * flip, t) - ref).max(), 1e-15)
+
+    s = anim_math.slerp(a, b, t)
+    b_near = b * flip
+    ends = max(np.abs(anim_math.slerp(a, b, np.zeros(TRIALS)) - a).max(),
+               np.abs(anim_math.slerp(a, b, np.ones(TRIALS)) - b_near).max())
+    check("slerp endpoints", ends, 1e-12)
+    check("slerp unit length", np.abs(np.linalg.norm(s, axis=1) - 1).max(), 1e-12)
+    speed = np.abs(anim_math.quat_angle(a, s) - t * anim_math.quat_angle(a, b))
+    check("slerp constant angular speed", speed.max(), 1e-6)
+    tiny = anim_math.quat_normalize(a + 1e-9 * rng.normal(size=a.shape))
+    check("slerp ≈ nlerp for tiny angles",
+          np.abs(anim_math.slerp(a, tiny, t) - anim_math.nlerp(a, tiny, t)).max(), 1e-12)
+
+    worst = 0.0
+    for trial in range(TRIALS):
+        n = int(rng.integers(1, 80))
+        comps = 4 if trial % 2 else 3
+        times = random_times(rng, n) if n > 1 else np.zeros(1)
+        values = rng.normal(size=(n, comps))
+        loop = bool(trial % 3 == 0) and n > 1
+        ref_in, ref_out = ref_catmull_rom_tangents(times.tolist(), values.tolist(), comps, loop)
+        new = anim_math.catmull_rom_tangents(times, values, loop)
+        worst = max(worst, np.abs(new - np.array(ref_in).reshape(n, comps)).max(),
+                    np.abs(new - np.array(ref_out).reshape(n, comps)).max())
+    check("catmull_rom_tangents (uneven keys, loops)", worst, 0.0)
+
+    times = np.sort(rng.uniform(0, 3, size=40))
+    slope, offset = rng.normal(size=4), rng.normal(size=4)
+    linear = times[:, None] * slope + offset
+    check("finite_difference_tangents on linear motion",
+          np.abs(anim_math.finite_difference_tangents(times, linear) - slope).max(), 1e-9)
+    uniform = np.linspace(0, 2, 50)
+    values = rng.normal(size=(50, NUM_BONES, 4))
+    fd = anim_math.finite_difference_tangents(uniform, values, True)
+    cr = anim_math.catmull_rom_tangents(uniform, values, True, damping=1.0)
+    check("finite differences = Catmull-Rom on uniform keys", np.abs(fd - cr).max(), 1e-9)
+
+    print(f"   {sum(results)}/{len(results)} checks passed")
+    return all(results)
+
+
+def bench_quaternion(sizes):
+    rng = np.random.default_rng(1)
+    print(f"🔁 Quaternion ops (K keyframes × {NUM_BONES} bones)")
+    print(f"   {'K':>6} | {'op':>15} | {'per-key lists':>13} | {'batched':>9} | speedup")
+    for k in sizes:
+        euler = rng.uniform(-np.pi, np.pi, size=(k, NUM_BONES, 3))
+        a, b = random_quats(rng, (k, NUM_BONES)), random_quats(rng, (k, NUM_BONES))
+        t = rng.random((k, NUM_BONES))
+        e_list, a_list, b_list, t_list = euler.tolist(), a.tolist(), b.tolist(), t.tolist()
+        cases = [
+            ("euler → quat",
+             lambda: [[ref_quaternion_from_euler(*e) for e in row] for row in e_list],
+             lambda: anim_math.quat_from_euler(euler)),
+            ("Hamilton product",
+             lambda: [[ref_q_mul(x, y) for x, y in zip(ra, rb)] for ra, rb in zip(a_list, b_list)],
+             lambda: anim_math.quat_mul(a, b)),
+            ("nlerp",
+             lambda: [[ref_blend_q(x, y, s) for x, y, s in zip(ra, rb, rt)]
+                      for ra, rb, rt in zip(a_list, b_list, t_list)],
+             lambda: anim_math.nlerp(a, b, t)),
+            ("slerp", None, lambda: anim_math.slerp(a, b, t)),
+        ]
+        for name, old, new in cases:
+            _, t_new = measure(new)
+            if old is None:
+                print(f"   {k:>6} | {name:>15} | {'—':>13} | {t_new * 1e3:7.3f}ms | —")
+                continue
+            _, t_old = measure(old)
+            print(f"   {k:>6} | {name:>15} | {t_old * 1e3:11.3f}ms | {t_new * 1e3:7.3f}ms | "
+                  f"{t_old / t_new:6.1f}x")
+
+
+def bench_tangents(sizes):
+    rng = np.random.default_rng(2)
+    print(f"📈 CUBICSPLINE tangents (K keyframes × {NUM_BONES} bones, VEC4, looping)")
+    print(f"   {'K':>6} | {'per-bone lists':>14} | {'catmull-rom':>11} | {'finite diff':>11} | speedup | identical")
+    for k in sizes:
+        times = np.arange(k) * 2.0 / max(k - 1, 1)
+        values = random_quats(rng, (k, NUM_BONES))
+        columns = [values[:, j].tolist() for j in range(NUM_BONES)]
+        t_list = times.tolist()
+        old, t_old = measure(lambda: [ref_catmull_rom_tangents(t_list, c, 4, True)[0] for c in columns])
+        new, t_new = measure(lambda: anim_math.catmull_rom_tangents(times, values, True))
+        _, t_fd = measure(lambda: anim_math.finite_difference_tangents(times, values, True))
+        same = np.array_equal(np.array(old).transpose(1, 0, 2), new)
+        print(f"   {k:>6} | {t_old * 1e3:12.3f}ms | {t_new * 1e3:9.3f}ms | {t_fd * 1e3:9.3f}ms | "
+              f"{t_old / t_new:6.1f}x | {same}")
+
+
+def bench_preview(sizes):
+    rng = np.random.default_rng(3)
+    results = []
+
+    def check(name, worst, limit, unit="max err"):
+        results.append(worst <= limit)
+        print(f"   {name:<48} {unit} {worst:9.2e}  {'✅' if worst <= limit else '❌'}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print("🧪 skin_preview vs per-vertex / per-pixel reference")
+        gltf, bin_data, tracks = tube_glb(os.path.join(tmp, "tube.glb"), 2_000)
+        mesh = skin_preview.SkinnedMesh(gltf, bin_data)
+        joints = skin_preview.pose(mesh, tracks, rng.random(8))
+        posed = skin_preview.skin_vertices(mesh.weights, mesh.positions, joints)
+        picks = rng.choice(len(mesh), 200, replace=False)
+        worst = max(np.abs(posed[f, v] - ref_skin_vertex(mesh.weights[v], mesh.positions[v], joints[f])).max()
+                    for f in range(len(joints)) for v in picks)
+        check("skin_vertices (batched LBS) vs Σ w·M·p", worst, 1e-5)
+        bind = skin_preview.skin_vertices(mesh.weights, mesh.positions, skin_preview.pose(mesh, [], [0.0]))
+        check("bind pose reproduces the mesh", np.abs(bind[0] - mesh.positions).max(), 1e-5)
+
+        # Coarse tube: every triangle spans pixels, so coverage must be exact
+        # (sub-pixel triangles are splatted, which only approximates it)
+        size = 96
+        gltf, bin_data, tracks = tube_glb(os.path.join(tmp, "coarse.glb"), 160)
+        coarse = skin_preview.SkinnedMesh(gltf, bin_data)
+        posed = skin_preview.skin_vertices(coarse.weights, coarse.positions,
+                                           skin_preview.pose(coarse, tracks, [0.0, 0.3, 0.6]))
+        for frame, vertices in enumerate(posed):
+            screen = vertices @ skin_preview.camera_rotation().T
+            lo, hi = screen[:, :2].min(axis=0), screen[:, :2].max(axis=0)
+            scale = size * 0.9 / (hi - lo).max()
+            screen = (screen - [*lo, 0]) * [scale, -scale, scale] + [size * 0.05, size * 0.95, 0]
+            ours = skin_preview.rasterize(screen[None].astype(np.float32), coarse.triangles, size)[0] > 0
+            ref = ref_coverage(screen, coarse.triangles, size)
+            check(f"rasterize coverage, frame {frame} (pixels off)", np.count_nonzero(ours != ref), 0, "count")
+
+        print(f"⏱️ Clip render, {PREVIEW_FRAMES} frames at {skin_preview.SkinPreviewConfig.SIZE}px "
+              f"(LOD target {skin_preview.SkinPreviewConfig.LOD_VERTICES})")
+        print(f"   {'vertices':>8} | {'rendered':>8} | {'full mesh':>9} | {'with LOD':>9} | < 1 s")
+        for num_vertices in PREVIEW_VERTICES:
+            gltf, bin_data, tracks = tube_glb(os.path.join(tmp, f"tube{num_vertices}.glb"), num_vertices)
+            full = skin_preview.SkinnedMesh(gltf, bin_data)
+            _, t_full = measure(skin_preview.render_clip, full, tracks, 1.0, True, PREVIEW_FRAMES)
+
+            def with_lod():
+                lod = full.decimated(skin_preview.SkinPreviewConfig.LOD_VERTICES)
+                return lod, skin_preview.render_clip(lod, tracks, 1.0, True, PREVIEW_FRAMES)
+
+            (lod, _), t_lod = measure(with_lod)
+            results.append(t_lod < 1.0)
+            print(f"   {len(full):>8} | {len(lod):>8} | {t_full * 1e3:7.0f}ms | {t_lod * 1e3:7.0f}ms | "
+                  f"{'✅' if t_lod < 1.0 else '❌'}")
+
+    print(f"   {sum(results)}/{len(results)} checks passed")
+    return all(results)
+
+
+SECTIONS = {
+    "equivalence": bench_equivalence,
+    "quaternion": bench_quaternion,
+    "tangents": bench_tangents,
+    "preview": bench_preview,
+}
+
+
+def main():
+    args = sys.argv[1:]
+    section = args.pop(0) if args and args[0] in SECTIONS else None
+    sizes = [int(a) for a in args] or DEFAULT_SIZES
+    ok = True
+    for name, fn in SECTIONS.items():
+        if section in (None, name):
+            ok = fn(sizes) is not False and ok
+            print()
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,484 @@
+"""
+Benchmark tool: rigging kernels on synthetic point clouds.
+
+Sections:
+  distance — point-to-bone-segment distances: the old (N, J, 3) float64
+             broadcast vs the blocked float32 kernel in rig_kernels.
+             Peak memory is measured with tracemalloc (NumPy reports its
+             allocations there), so the blocked kernel should stay flat
+             apart from its (N, J) float32 output.
+  geodesic — per-bone geodesic distances on a tube mesh: one Dijkstra per
+             seed (old) vs one multi-source min_only Dijkstra per bone, with
+             and without a 4-sigma cutoff.
+  weighting — full weighting stage on a tube mesh: geodesic Dijkstra +
+             8 Laplacian + 4 KD-tree smoothing passes vs one heat-diffusion
+             solve. Reports wall time and smoothness (mean / max per-edge
+             weight jump, lower = smoother) and how often the dominant bone
+             is the Euclidean-nearest bone segment.
+  smoothing — geodesic weights smoothed by 8 Laplacian + 4 KD-tree passes
+             vs one implicit (I + λL) W = W0 solve, cold and with the
+             cached factorization, plus the solve followed by a 0.3
+             per-edge gradient bound.
+  parallel — geodesic weighting + KD-tree smoothing with workers=1 vs all
+             cores (process pool for Dijkstra, threads for distance tiles
+             and KD-tree queries); outputs must be bitwise identical. The
+             first parallel run includes starting the worker pool.
+  proxy    — full geodesic weighting + smoothing on the whole tube vs the
+             proxy path (decimate to PROXY_RIG_TARGET_VERTS, weight the
+             proxy, barycentric transfer back, Laplacian passes on the full
+             mesh). Reports time, peak memory, roughness and how often the
+             dominant bone matches the full pipeline. "transfer" carries the
+             full-resolution weights to the proxy and back through the same
+             stencils, isolating the transfer from weighting at proxy
+             resolution (on the tube, every ring vertex ties for a bone's
+             geodesic seeds, so the two resolutions pick different seeds).
+  markers  — re-rig after moving one marker: a fresh _compute_rig_weights
+             vs one reusing the _RigSession of the previous rig (cached
+             unique map, graph, per-bone distance fields, smoothing
+             operators); outputs must be bitwise identical.
+  template — humanoid rig of a capsule-body mesh (thicker and squatter
+             than the template): geodesic weighting vs weighting="template"
+             (fit the pre-weighted template, closest-triangle transfer,
+             Laplacian pass). Reports time, roughness, sharp edges (weight
+             jump > 0.5, where skin creases or tears when bent) and how often
+             the dominant bone matches geodesic, exactly or up to a
+             parent/child neighbour. The one-off template build is excluded.
+  spatial  — kNN spatial weight smoothing (k=20, 4 passes): the old
+             (N, k, J) float64 gather + einsum vs the float32 CSR operator
+             (S @ W), with the KD-tree query excluded from both timings.
+
+Usage:
+  python benchmark_rigging.py [section] [vertex counts...]
+  python benchmark_rigging.py distance 50000 200000 500000
+"""
+import os
+import sys
+import time
+import tracemalloc
+import numpy as np
+
+import rig_kernels
+
+DEFAULT_SIZES = [25_000, 50_000, 100_000, 200_000]
+NUM_BONES = 23  # humanoid skeleton
+
+
+def measure(fn, *args, **kwargs):
+    """Run fn once; return (result, seconds, peak MB of traced allocations)."""
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    result = fn(*args, **kwargs)
+    elapsed = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak / (1024 * 1024)
+
+
+def synthetic_body(num_verts, seed=0):
+    """Points on a unit-ish body volume plus a random 23-bone skeleton inside it."""
+    rng = np.random.default_rng(seed)
+    P = rng.normal(size=(num_verts, 3)) * [0.25, 0.8, 0.15]
+    seg_a = rng.normal(size=(NUM_BONES, 3)) * [0.15, 0.5, 0.05]
+    seg_b = seg_a + rng.normal(size=(NUM_BONES, 3)) * 0.15
+    return P, seg_a, seg_b
+
+
+def broadcast_dist_sq(P, seg_a, seg_b):
+    """The previous (N, J, 3) float64 broadcast, kept as the reference."""
+    Pv = P[:, np.newaxis, :]
+    A = seg_a[np.newaxis, :, :]
+    AB = seg_b[np.newaxis, :, :] - A
+    AP = Pv - A
+    ab_sq = np.maximum(np.sum(AB * AB, axis=2), 1e-12)
+    t = np.clip(np.sum(AP * AB, axis=2) / ab_sq, 0.0, 1.0)
+    diff = Pv - (A + t[:, :, np.newaxis] * AB)
+    return np.sum(diff * diff, axis=2)
+
+
+def synthetic_tube(num_verts, seed=0):
+    """
+    Closed-ring tube mesh (~num_verts vertices) along Y with a bone chain down
+    its axis. Returns (P, tris, seg_a, seg_b).
+    """
+    cols = 64
+    rows = max(2, num_verts // cols)
+    ang = np.linspace(0.0, 2 * np.pi, cols, endpoint=False)
+    y = np.linspace(-1.0, 1.0, rows)
+    radius = 0.2 + 0.05 * np.sin(y * 6)[:, None]
+    P = np.stack([np.cos(ang)[None, :] * radius,
+                  np.repeat(y[:, None], cols, axis=1),
+                  np.sin(ang)[None, :] * radius], axis=-1).reshape(-1, 3)
+
+    r, c = np.meshgrid(np.arange(rows - 1), np.arange(cols), indexing='ij')
+    v00 = r * cols + c
+    v01 = r * cols + (c + 1) % cols
+    v10 = v00 + cols
+    v11 = v01 + cols
+    tris = np.concatenate([np.stack([v00, v10, v01], -1).reshape(-1, 3),
+                           np.stack([v01, v10, v11], -1).reshape(-1, 3)])
+
+    knots = np.linspace(-1.0, 1.0, NUM_BONES + 1)
+    seg_a = np.stack([np.zeros(NUM_BONES), knots[:-1], np.zeros(NUM_BONES)], axis=1)
+    seg_b = np.stack([np.zeros(NUM_BONES), knots[1:], np.zeros(NUM_BONES)], axis=1)
+    return P, tris, seg_a, seg_b
+
+
+def edge_graph(P, tris):
+    from scipy.sparse import coo_matrix
+    e = np.vstack([tris[:, [0, 1]], tris[:, [1, 2]], tris[:, [2, 0]]])
+    lens = np.linalg.norm(P[e[:, 0]] - P[e[:, 1]], axis=1)
+    return coo_matrix((np.concatenate([lens, lens]),
+                       (np.concatenate([e[:, 0], e[:, 1]]), np.concatenate([e[:, 1], e[:, 0]]))),
+                      shape=(len(P), len(P))).tocsr()
+
+
+def per_seed_geodesic(graph, seeds):
+    """Previous approach: Dijkstra from every unique seed, then per-bone minimum."""
+    from scipy.sparse.csgraph import dijkstra
+    unique = np.unique(seeds)
+    dense = dijkstra(graph, directed=False, indices=unique)      # (S, N)
+    row = {v: i for i, v in enumerate(unique.tolist())}
+    out = np.full((len(seeds), graph.shape[0]), np.inf)
+    for b, bone_seeds in enumerate(seeds):
+        for v in bone_seeds:
+            np.minimum(out[b], dense[row[int(v)]], out=out[b])
+    return out
+
+
+def per_bone_geodesic(graph, seeds, limit=np.inf):
+    from scipy.sparse.csgraph import dijkstra
+    out = np.empty((len(seeds), graph.shape[0]))
+    for b, bone_seeds in enumerate(seeds):
+        out[b] = dijkstra(graph, directed=False, indices=bone_seeds, min_only=True, limit=limit)
+    return out
+
+
+def bench_geodesic(sizes):
+    print(f"🌐 Geodesic distances (J={NUM_BONES}, 8 seeds/bone)")
+    print(f"   {'N':>9} | {'per-seed (old)':>22} | {'per-bone min_only':>22} | "
+          f"{'+ 4σ cutoff':>22} | weight diff @4σ")
+    for n in sizes:
+        P, tris, seg_a, seg_b = synthetic_tube(n)
+        graph = edge_graph(P, tris)
+        seeds = rig_kernels.nearest_points_per_segment(P, seg_a, seg_b, 8)
+        sigma = 1.5 * float(np.linalg.norm(seg_b - seg_a, axis=1).mean())
+
+        ref, t_ref, m_ref = measure(per_seed_geodesic, graph, seeds)
+        out, t_new, m_new = measure(per_bone_geodesic, graph, seeds)
+        cut, t_cut, m_cut = measure(per_bone_geodesic, graph, seeds, 4 * sigma)
+        assert np.array_equal(ref, out)
+
+        # Normalized Gaussian weights; vertices beyond the cutoff from every
+        # bone take the Euclidean fallback in the rigger, so compare the rest
+        kept = np.isfinite(cut).any(axis=0)
+
+        def weights(d):
+            w = np.exp(-np.where(np.isfinite(d), d, np.inf).T[kept] ** 2 / (2 * sigma * sigma))
+            return w / w.sum(axis=1, keepdims=True)
+        diff = float(np.abs(weights(ref) - weights(cut)).max())
+        print(f"   {len(P):>9,} | {t_ref:7.3f}s {m_ref:9.1f} MB | {t_new:7.3f}s {m_new:9.1f} MB | "
+              f"{t_cut:7.3f}s {m_cut:9.1f} MB | {diff:.1e} ({(~kept).mean():.1%} fallback)")
+
+
+def tube_skeleton(seg_a, seg_b):
+    """Joint list (name, parent, pos) for the chain produced by synthetic_tube."""
+    return [(f"bone{i}", i - 1, seg_a[i].tolist()) for i in range(len(seg_a))]
+
+
+def roughness(W, tris):
+    """Mean / max L1 jump of the weight vector across mesh edges (lower = smoother)."""
+    e = np.vstack([tris[:, [0, 1]], tris[:, [1, 2]], tris[:, [2, 0]]])
+    jump = np.abs(W[e[:, 0]] - W[e[:, 1]]).sum(axis=1)
+    return jump.mean(), jump.max()
+
+
+def bench_weighting(sizes):
+    import contextlib
+    import io
+    with contextlib.redirect_stdout(io.StringIO()):
+        import phase2_service as p2
+
+    def geodesic_pipeline(P, tris, joints):
+        skin = p2._compute_vertex_weights_geodesic(P.ravel(), joints, tris.ravel(), "humanoid")
+        skin = p2._smooth_vertex_weights(skin, tris.ravel(), len(P), len(joints),
+                                         iterations=8, strength=0.38)
+        return p2._spatial_smooth_weights(skin, P.ravel(), len(P), len(joints),
+                                          iterations=4, strength=0.28, k_neighbors=20)
+
+    def heat_pipeline(P, tris, joints):
+        return p2._compute_vertex_weights_heat(P.ravel(), joints, tris.ravel(), "humanoid")
+
+    print(f"🔥 Weighting engines (J={NUM_BONES} chain on a tube)")
+    print(f"   {'N':>9} | {'geodesic+smoothing':>44} | {'heat (one solve)':>44}")
+    for n in sizes:
+        P, tris, seg_a, seg_b = synthetic_tube(n)
+        joints = tube_skeleton(seg_a, seg_b)
+        with contextlib.redirect_stdout(io.StringIO()):
+            geo, t_geo, m_geo = measure(geodesic_pipeline, P, tris, joints)
+            heat, t_heat, m_heat = measure(heat_pipeline, P, tris, joints)
+        nearest = rig_kernels.point_segment_dist_sq(P, *p2._bone_segments(joints)).argmin(axis=1)
+
+        cells = []
+        for skin, t, m in ((geo, t_geo, m_geo), (heat, t_heat, m_heat)):
+            W = skin.to_dense(len(joints))
+            mean_jump, max_jump = roughness(W, tris)
+            own = float((W.argmax(axis=1) == nearest).mean())
+            cells.append(f"{t:6.2f}s {m:7.1f} MB rough {mean_jump:.4f}/{max_jump:.3f} own {own:4.0%}")
+        print(f"   {len(P):>9,} | {cells[0]} | {cells[1]}")
+
+
+def bench_smoothing(sizes):
+    import contextlib
+    import io
+    with contextlib.redirect_stdout(io.StringIO()):
+        import phase2_service as p2
+
+    def iterative(skin, P, tris, J):
+        skin = p2._smooth_vertex_weights(skin, tris.ravel(), len(P), J, iterations=8, strength=0.38)
+        return p2._spatial_smooth_weights(skin, P.ravel(), len(P), J,
+                                          iterations=4, strength=0.28, k_neighbors=20)
+
+    def implicit(skin, P, tris, J, max_delta=None):
+        return p2._implicit_smooth_weights(skin, tris.ravel(), P.ravel(), len(P), J,
+                                           max_delta=max_delta)
+
+    print(f"🧊 Weight smoothing (J={NUM_BONES} chain on a tube, λ={p2.Phase2Config.IMPLICIT_SMOOTHING_LAMBDA})")
+    print(f"   {'N':>9} | {'variant':>16} | {'time':>7} {'peak':>10} | roughness mean/max | own")
+    for n in sizes:
+        P, tris, seg_a, seg_b = synthetic_tube(n)
+        joints = tube_skeleton(seg_a, seg_b)
+        J = len(joints)
+        nearest = rig_kernels.point_segment_dist_sq(P, seg_a, seg_b).argmin(axis=1)
+        p2._implicit_smoother_cache.clear()
+        with contextlib.redirect_stdout(io.StringIO()):
+            skin = p2._compute_vertex_weights_geodesic(P.ravel(), joints, tris.ravel(), "humanoid")
+            runs = [("iterative", *measure(iterative, skin, P, tris, J)),
+                    ("implicit", *measure(implicit, skin, P, tris, J)),
+                    ("implicit cached", *measure(implicit, skin, P, tris, J)),
+                    ("+ bound 0.3", *measure(implicit, skin, P, tris, J, 0.3))]
+        for label, out, t, m in runs:
+            W = out.to_dense(J)
+            mean_jump, max_jump = roughness(W, tris)
+            own = float((W.argmax(axis=1) == nearest).mean())
+            print(f"   {len(P):>9,} | {label:>16} | {t:6.2f}s {m:7.1f} MB | "
+                  f"{mean_jump:.4f} / {max_jump:.3f}    | {own:4.0%}")
+
+
+def bench_parallel(sizes):
+    import contextlib
+    import io
+    with contextlib.redirect_stdout(io.StringIO()):
+        import phase2_service as p2
+
+    def pipeline(P, tris, joints, workers):
+        skin = p2._compute_vertex_weights_geodesic(P.ravel(), joints, tris.ravel(), "humanoid",
+                                                   workers=workers)
+        return p2._spatial_smooth_weights(skin, P.ravel(), len(P), len(joints), iterations=4,
+                                          strength=0.28, k_neighbors=20, workers=workers)
+
+    cores = max(rig_kernels.resolve_workers(0), 2)  # always exercise the pools
+    print(f"🧵 Parallel rigging (J={NUM_BONES} chain on a tube, {os.cpu_count()} cores)")
+    print(f"   {'N':>9} | {'workers=1':>10} | {f'workers={cores}':>10} | speedup | identical")
+    for n in sizes:
+        P, tris, seg_a, seg_b = synthetic_tube(n)
+        joints = tube_skeleton(seg_a, seg_b)
+        with contextlib.redirect_stdout(io.StringIO()):
+            serial, t_serial, _ = measure(pipeline, P, tris, joints, 1)
+            par, t_par, _ = measure(pipeline, P, tris, joints, cores)
+        same = (np.array_equal(serial.joints, par.joints)
+                and np.array_equal(serial.weights, par.weights))
+        print(f"   {len(P):>9,} | {t_serial:9.2f}s | {t_par:9.2f}s | {t_serial / t_par:6.1f}x | {same}")
+
+
+def bench_proxy(sizes):
+    import contextlib
+    import io
+    with contextlib.redirect_stdout(io.StringIO()):
+        import phase2_service as p2
+
+    def full(P, tris, joints):
+        return p2._weight_mesh(P.ravel(), tris.ravel(), joints, "humanoid", "geodesic",
+                               "iterative", 1, p2._ColocationIndex.identity(P))
+
+    def proxy(P, tris, joints):
+        V, T = p2._build_proxy_mesh(P, tris, p2.Phase2Config.PROXY_RIG_TARGET_VERTS)
+        skin = p2._weight_mesh(V.ravel(), T.ravel(), joints, "humanoid", "geodesic",
+                               "iterative", 1, p2._ColocationIndex(V))
+        stencils = rig_kernels.proxy_stencils(P, V, T)
+        skin = p2._transfer_proxy_weights(skin, stencils, len(joints))
+        return p2._smooth_transferred_weights(skin, tris.ravel(), len(P), len(joints),
+                                              p2._ColocationIndex.identity(P))
+
+    def round_trip(P, tris, joints, W_full):
+        # Full weights sampled at the proxy vertices, then transferred back
+        from scipy.spatial import KDTree
+        V, T = p2._build_proxy_mesh(P, tris, p2.Phase2Config.PROXY_RIG_TARGET_VERTS)
+        sampled = p2.SkinWeights.from_dense(W_full[KDTree(P).query(V)[1]])
+        stencils = rig_kernels.proxy_stencils(P, V, T)
+        return p2._transfer_proxy_weights(sampled, stencils, len(joints)).to_dense(len(joints))
+
+    print(f"🪶 Proxy rigging (J={NUM_BONES} chain on a tube, proxy ~{p2.Phase2Config.PROXY_RIG_TARGET_VERTS:,} verts)")
+    print(f"   {'N':>9} | {'full':>40} | {'proxy':>40} | same bone | transfer")
+    for n in sizes:
+        P, tris, seg_a, seg_b = synthetic_tube(n)
+        joints = tube_skeleton(seg_a, seg_b)
+        with contextlib.redirect_stdout(io.StringIO()):
+            runs = [measure(full, P, tris, joints), measure(proxy, P, tris, joints)]
+        cells, dense = [], []
+        for skin, t, m in runs:
+            W = skin.to_dense(len(joints))
+            mean_jump, max_jump = roughness(W, tris)
+            cells.append(f"{t:6.2f}s {m:7.1f} MB rough {mean_jump:.4f}/{max_jump:.3f}")
+            dense.append(W)
+        with contextlib.redirect_stdout(io.StringIO()):
+            W_trip = round_trip(P, tris, joints, dense[0])
+        best = [W.argmax(axis=1) for W in dense + [W_trip]]
+        print(f"   {len(P):>9,} | {cells[0]} | {cells[1]} | {(best[0] == best[1]).mean():8.1%} "
+              f"| {(best[0] == best[2]).mean():7.1%}")
+
+
+def bench_markers(sizes):
+    import contextlib
+    import io
+    with contextlib.redirect_stdout(io.StringIO()):
+        import phase2_service as p2
+
+    layout = p2.RIG_MARKER_LAYOUTS["humanoid"]
+
+    def markers(elbow_dx):
+        out = [{"id": mid, "position": {"x": x, "y": y}} for mid, ((x, y), _) in layout.items()]
+        out[[m["id"] for m in out].index("elbow-a")]["position"]["x"] += elbow_dx
+        return out
+
+    def rig(P, tris, moved, session):
+        return p2._compute_rig_weights(P, tris.ravel(), "humanoid", "geodesic", "iterative", 1,
+                                       markers=moved, session=session)
+
+    print("🎯 Marker re-rig (humanoid skeleton on a tube, elbow marker moved)")
+    print(f"   {'N':>9} | {'fresh':>8} | {'session':>8} | speedup | identical")
+    for n in sizes:
+        P, tris, _, _ = synthetic_tube(n)
+        with contextlib.redirect_stdout(io.StringIO()):
+            session = p2._RigSession(P, tris.ravel())
+            rig(P, tris, markers(0), session)                 # first rig fills the session
+            (_, fresh), t_fresh, _ = measure(rig, P, tris, markers(-4), None)
+            (_, incr), t_incr, _ = measure(rig, P, tris, markers(-4), session)
+        same = (np.array_equal(fresh.joints, incr.joints)
+                and np.array_equal(fresh.weights, incr.weights))
+        print(f"   {len(P):>9,} | {t_fresh:7.2f}s | {t_incr:7.2f}s | {t_fresh / t_incr:6.1f}x | {same}")
+
+
+def synthetic_humanoid(p2, num_verts):
+    """
+    Closed humanoid surface of ~num_verts vertices: the procedural template
+    body with 25% thicker capsules in squatter, deeper bounds.
+    """
+    body = p2.RIG_TEMPLATE_BODIES["humanoid"]
+    bounds_min, bounds_max = [-0.8, 0.0, -0.25], [0.8, 1.7, 0.25]
+    joints = p2._compute_humanoid_joints(bounds_min, bounds_max)
+    seg_a, seg_b = p2._bone_segments(joints)
+    radii = [1.25 * body["radii"].get(name, 0.0) * 1.7 for name, _, _ in joints]
+    resolution = int(84 * np.sqrt(num_verts / 8000))
+    return rig_kernels.capsule_union_surface(seg_a, seg_b, radii, resolution=resolution)
+
+
+def bench_template(sizes):
+    import contextlib
+    import io
+    with contextlib.redirect_stdout(io.StringIO()):
+        import phase2_service as p2
+        p2._get_rig_template("humanoid")                    # build / load outside the timings
+
+    def rig(P, tris, weighting):
+        return p2._compute_rig_weights(P, tris.ravel(), "humanoid", weighting, "iterative", 1)
+
+    print(f"🧍 Template rigging (humanoid capsule body, J={NUM_BONES})")
+    print(f"   {'N':>9} | {'geodesic':>37} | {'template':>37} | same bone | ±1 bone")
+    for n in sizes:
+        P, tris = synthetic_humanoid(p2, n)
+        with contextlib.redirect_stdout(io.StringIO()):
+            runs = [measure(rig, P, tris, "geodesic"), measure(rig, P, tris, "template")]
+        cells, dominant = [], []
+        for (joints, skin), t, _ in runs:
+            W = skin.to_dense(len(joints))
+            mean_jump, max_jump = roughness(W, tris)
+            sharp = (np.abs(W[tris[:, [0, 1, 2]]] - W[tris[:, [1, 2, 0]]]).sum(axis=2) > 0.5).sum()
+            cells.append(f"{t:6.2f}s rough {mean_jump:.4f}/{max_jump:.3f} {sharp:5d} sharp")
+            dominant.append(W.argmax(axis=1))
+        parents = np.array([parent for _, parent, _ in runs[0][0][0]])
+        a, b = dominant
+        near = (a == b) | (parents[a] == b) | (parents[b] == a) | ((parents[a] == parents[b]) & (parents[a] >= 0))
+        print(f"   {len(P):>9,} | {cells[0]} | {cells[1]} | {(a == b).mean():9.1%} | {near.mean():7.1%}")
+
+
+def gather_smooth(W, dists, idx, iterations, strength):
+    """Previous per-pass (N, k, J) float64 gather, kept as the reference."""
+    inv_d = 1.0 / (dists + 1e-8)
+    inv_d /= inv_d.sum(axis=1, keepdims=True)
+    for _ in range(iterations):
+        W = (1.0 - strength) * W + strength * np.einsum('nk,nkj->nj', inv_d, W[idx])
+    return W
+
+
+def csr_smooth(W, dists, idx, iterations, strength):
+    S = rig_kernels.knn_smoothing_operator(dists, idx, len(W))
+    return rig_kernels.knn_smooth(S, W, iterations, strength)
+
+
+def bench_spatial(sizes):
+    print(f"🔄 Spatial kNN smoothing (J={NUM_BONES}, k=20, 4 passes)")
+    print(f"   {'N':>9} | {'gather f64':>22} | {'CSR f32':>22} | memory | max abs diff")
+    for n in sizes:
+        P, seg_a, seg_b = synthetic_body(n)
+        d_sq = rig_kernels.point_segment_dist_sq(P, seg_a, seg_b)
+        W = np.exp(-d_sq / 0.02).astype(np.float64)
+        W /= np.maximum(W.sum(axis=1, keepdims=True), 1e-12)
+        dists, idx = rig_kernels.knn_query(P, 20)
+
+        ref, t_ref, m_ref = measure(gather_smooth, W, dists, idx, 4, 0.28)
+        out, t_new, m_new = measure(csr_smooth, W, dists, idx, 4, 0.28)
+        diff = float(np.abs(out - ref).max())
+        print(f"   {n:>9,} | {t_ref:7.3f}s {m_ref:9.1f} MB | {t_new:7.3f}s {m_new:9.1f} MB | "
+              f"{m_ref / max(m_new, 1e-9):5.1f}x | {diff:.1e}")
+
+
+def bench_distance(sizes):
+    print("📏 Point-to-segment distance kernel "
+          f"(J={NUM_BONES}, tile ceiling={rig_kernels.DEFAULT_MAX_BYTES >> 20} MB)")
+    print(f"   {'N':>9} | {'broadcast f64':>22} | {'blocked f32':>22} | {'top-8 seeds':>22} | max rel err")
+    for n in sizes:
+        P, seg_a, seg_b = synthetic_body(n)
+        ref, t_ref, m_ref = measure(broadcast_dist_sq, P, seg_a, seg_b)
+        out, t_blk, m_blk = measure(rig_kernels.point_segment_dist_sq, P, seg_a, seg_b)
+        _, t_knn, m_knn = measure(rig_kernels.nearest_points_per_segment, P, seg_a, seg_b, 8)
+        err = float(np.abs(out - ref).max() / max(ref.max(), 1e-12))
+        print(f"   {n:>9,} | {t_ref:7.3f}s {m_ref:9.1f} MB | {t_blk:7.3f}s {m_blk:9.1f} MB | "
+              f"{t_knn:7.3f}s {m_knn:9.1f} MB | {err:.1e}")
+        del ref, out
+
+
+SECTIONS = {
+    "distance": bench_distance,
+    "geodesic": bench_geodesic,
+    "weighting": bench_weighting,
+    "smoothing": bench_smoothing,
+    "parallel": bench_parallel,
+    "proxy": bench_proxy,
+    "markers": bench_markers,
+    "template": bench_template,
+    "spatial": bench_spatial,
+}
+
+
+def main():
+    args = sys.argv[1:]
+    section = args.pop(0) if args and args[0] in SECTIONS else None
+    sizes = [int(a) for a in args] or DEFAULT_SIZES
+    for name, fn in SECTIONS.items():
+        if section in (None, name):
+            fn(sizes)
+            print()
+
+
+if __name__ == "__main__":
+    main()
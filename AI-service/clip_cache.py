@@ -0,0 +1,295 @@
+"""
+Persistent cache of packed animation clips.
+
+A clip's keyframes depend only on the animation id, the skin's bone names
+(in joint order), the duration and whether it loops — never on the mesh.
+So each (clip, skeleton signature) is evaluated once and its glTF sampler
+data is stored ready to append to a GLB:
+
+- "rotations": per bone, the (k,) float32 key times and the (k, 3, 4)
+  float32 CUBICSPLINE output block [inTangent, value, outTangent] of its
+  rotation sampler
+- "translations": per bone, the (k,) float64 key times and (k, 3) float64
+  hip offsets; the sampler output adds the node's rest translation, so it
+  is packed per request
+- "identity": bones whose rotation stays at identity for the whole clip
+
+Before packing, each channel's 60 keys are thinned to the fewest that
+keep the curve within ClipCacheConfig.ROTATION_TOLERANCE_DEG /
+TRANSLATION_TOLERANCE (animation_clips.reduce_keys), so k varies per
+channel. Translation channels that never leave the rest pose are dropped
+here; identity rotations are dropped by animate_model_glb for nodes whose
+rest rotation is identity too.
+
+An entry is one file: a short header (magic, JSON length, JSON index of
+the arrays) followed by the raw arrays, memory-mapped on load. The arrays
+handed out are zero-copy views of the map, which GLTFDocument streams
+straight into the output file. Mapped entries stay open in a small LRU;
+on disk, entries past ClipCacheConfig.MAX_MB are evicted least recently
+used first, like the rig cache.
+
+Configure with AI_SERVICE_CLIP_CACHE=true|false and AI_SERVICE_CLIP_CACHE_MB.
+"""
+import hashlib
+import json
+import mmap
+import os
+import struct
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+
+import anim_math as _anim_math
+import animation_clips as _animation_clips
+
+
+class ClipCacheConfig:
+    """Configuration for the packed clip cache"""
+    ENABLED = os.getenv("AI_SERVICE_CLIP_CACHE", "true").lower() == "true"
+    DIR = Path(os.getenv("AI_SERVICE_CLIP_CACHE_DIR", Path(__file__).parent / "cache" / "clips"))
+    MAX_MB = int(os.getenv("AI_SERVICE_CLIP_CACHE_MB", "64"))
+    MEMORY_ENTRIES = 64      # mapped entries kept open (18 clips × 2 skeletons fit)
+
+    # Keyframe reduction before packing (AI_SERVICE_CLIP_REDUCE=false keeps
+    # all keys). Tolerances bound the curve error at the keys and at
+    # animation_clips.SPAN_SAMPLES points between each pair of them;
+    # translations are in model units (rigged models are ~1-2 units tall)
+    REDUCE_KEYS = os.getenv("AI_SERVICE_CLIP_REDUCE", "true").lower() == "true"
+    ROTATION_TOLERANCE_DEG = float(os.getenv("AI_SERVICE_CLIP_ROTATION_TOLERANCE_DEG", "0.25"))
+    TRANSLATION_TOLERANCE = float(os.getenv("AI_SERVICE_CLIP_TRANSLATION_TOLERANCE", "0.0005"))
+    REST_EPSILON_DEG = 0.01          # rotation channels this close to identity are "identity"
+    REST_EPSILON = 1e-6              # translation channels this close to rest are dropped
+
+    # Part of every key: bump whenever animation_clips or the tangent
+    # packing changes its output, so stale entries are never served
+    VERSION = 3
+
+
+_MAGIC = b"GLCP"
+_HEADER = struct.Struct("<4sI")     # magic, JSON index length
+_ALIGN = 16
+
+_lock = threading.Lock()
+_entries = OrderedDict()            # key → clip dict, least recently used first
+
+
+def clip_key(animation_id: str, bone_names, duration: float, loop: bool) -> str:
+    """Cache key for one clip on one skeleton (bone names in skin joint order)."""
+    h = hashlib.blake2b(digest_size=20)
+    params = {
+        "version": ClipCacheConfig.VERSION,
+        "keys": _animation_clips.NUM_KEYS,
+        "animation_id": animation_id,
+        "bones": list(bone_names),
+        "duration": float(duration),
+        "loop": bool(loop),
+        "reduction": [ClipCacheConfig.ROTATION_TOLERANCE_DEG, ClipCacheConfig.TRANSLATION_TOLERANCE,
+                      ClipCacheConfig.REST_EPSILON_DEG, ClipCacheConfig.REST_EPSILON]
+        if ClipCacheConfig.REDUCE_KEYS else None,
+    }
+    h.update(json.dumps(params, sort_keys=True, separators=(",", ":")).encode())
+    return h.hexdigest()
+
+
+def _entry_path(key: str) -> Path:
+    return ClipCacheConfig.DIR / f"{key}.clip"
+
+
+def build(animation_id: str, bone_names, duration: float, loop: bool):
+    """Evaluate, reduce and pack one clip (no caching). Same dict as get()."""
+    keyframes = _animation_clips.evaluate_clip(animation_id, bone_names, duration)
+    clip = {"rotations": {}, "translations": {}, "identity": []}
+    bones = list(keyframes)
+    if not bones:
+        return clip
+    times = np.asarray(keyframes[bones[0]]["times"], dtype=np.float64)
+    reduce = ClipCacheConfig.REDUCE_KEYS
+
+    # All rotation channels at once: (K, B, 4) keys → kept mask + tangents
+    rotations = np.stack([keyframes[b]["rotations"] for b in bones], axis=1)
+    if reduce:
+        kept, tangents = _animation_clips.reduce_keys(
+            times, rotations, np.radians(ClipCacheConfig.ROTATION_TOLERANCE_DEG), loop, rotations=True)
+        angle = _anim_math.quat_angle(rotations)
+        identity = (angle <= np.radians(ClipCacheConfig.REST_EPSILON_DEG)).all(axis=0)
+    else:
+        kept = np.ones(rotations.shape[:2], dtype=bool)
+        tangents = _anim_math.catmull_rom_tangents(times, rotations, loop)
+        identity = np.zeros(len(bones), dtype=bool)
+    blocks = np.stack([tangents, rotations, tangents], axis=2).astype(np.float32)   # (K, B, 3, 4)
+
+    for j, bone in enumerate(bones):
+        keys = np.flatnonzero(kept[:, j])
+        clip["rotations"][bone] = {"times": times[keys].astype(np.float32),
+                                   "block": np.ascontiguousarray(blocks[keys, j])}
+        if identity[j]:
+            clip["identity"].append(bone)
+
+        offsets = keyframes[bone]["translations"]
+        if offsets is None:
+            continue
+        offsets = np.asarray(offsets, dtype=np.float64)
+        keys = np.arange(len(times))
+        if reduce:
+            if np.abs(offsets).max() <= ClipCacheConfig.REST_EPSILON:
+                continue
+            t_kept, _ = _animation_clips.reduce_keys(
+                times, offsets[:, None], ClipCacheConfig.TRANSLATION_TOLERANCE, loop)
+            keys = np.flatnonzero(t_kept[:, 0])
+        clip["translations"][bone] = {"times": times[keys], "values": offsets[keys]}
+    return clip
+
+
+def _load(key: str):
+    """Map one entry from disk, or None."""
+    path = _entry_path(key)
+    try:
+        with open(path, "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, index_len = _HEADER.unpack_from(mm, 0)
+        if magic != _MAGIC:
+            raise ValueError("bad magic")
+        index = json.loads(bytes(mm[_HEADER.size:_HEADER.size + index_len]))
+        data_start = _HEADER.size + index_len
+        data_start += -data_start % _ALIGN
+
+        def view(spec):
+            dtype, shape, offset = np.dtype(spec[0]), tuple(spec[1]), data_start + spec[2]
+            count = int(np.prod(shape))
+            if offset + count * dtype.itemsize > len(mm):
+                raise ValueError("truncated")
+            return np.frombuffer(mm, dtype=dtype, count=count, offset=offset).reshape(shape)
+
+        clip = {group: {bone: {name: view(spec) for name, spec in arrays.items()}
+                        for bone, arrays in index[group].items()}
+                for group in ("rotations", "translations")}
+        clip["identity"] = list(index["identity"])
+        os.utime(path)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"   ⚠️ Discarding unreadable clip cache entry {path.name}: {e}")
+        try:
+            path.unlink(missing_ok=True)
+        except OSError:
+            pass
+        return None
+    return clip
+
+
+def _store(key: str, clip) -> bool:
+    """Write one entry atomically, then evict down to the size limit."""
+    # Index: {group: {bone: {name: [dtype, shape, offset]}}} plus the
+    # identity bones; offsets are relative to the data start (the index
+    # padded to _ALIGN)
+    index = {"rotations": {}, "translations": {}, "identity": list(clip["identity"])}
+    arrays, offsets, cursor = [], [], 0
+    for group in ("rotations", "translations"):
+        for bone, channel in clip[group].items():
+            index[group][bone] = {}
+            for name, arr in channel.items():
+                cursor += -cursor % _ALIGN
+                index[group][bone][name] = [arr.dtype.str, list(arr.shape), cursor]
+                arrays.append(arr)
+                offsets.append(cursor)
+                cursor += arr.nbytes
+    index_bytes = json.dumps(index, separators=(",", ":")).encode()
+    header_len = _HEADER.size + len(index_bytes)
+
+    try:
+        ClipCacheConfig.DIR.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(suffix=".clip.tmp", dir=ClipCacheConfig.DIR)
+        with os.fdopen(fd, "wb") as f:
+            f.write(_HEADER.pack(_MAGIC, len(index_bytes)))
+            f.write(index_bytes)
+            f.write(bytes(-header_len % _ALIGN))
+            written = 0
+            for arr, off in zip(arrays, offsets):
+                f.write(bytes(off - written))
+                f.write(np.ascontiguousarray(arr).tobytes())
+                written = off + arr.nbytes
+        os.replace(tmp, _entry_path(key))
+    except OSError as e:
+        print(f"   ⚠️ Clip cache write failed: {e}")
+        return False
+    _evict()
+    return True
+
+
+def get(animation_id: str, bone_names, duration: float, loop: bool):
+    """
+    Packed clip for a skeleton: {"rotations": {bone: {"times", "block"}},
+    "translations": {bone: {"times", "values"}}, "identity": [bone, ...]}
+    as described in the module docstring.
+    Served from memory, then disk; built and stored on a miss. Every
+    distinct name in bone_names has a rotation block. Treat as read-only.
+    """
+    if not ClipCacheConfig.ENABLED:
+        return build(animation_id, bone_names, duration, loop)
+    key = clip_key(animation_id, bone_names, duration, loop)
+    with _lock:
+        clip = _entries.get(key)
+        if clip is not None:
+            _entries.move_to_end(key)
+            return clip
+
+    clip = _load(key)
+    if clip is None:
+        clip = build(animation_id, bone_names, duration, loop)
+        if _store(key, clip):
+            clip = _load(key) or clip
+    with _lock:
+        _entries[key] = clip
+        _entries.move_to_end(key)
+        while len(_entries) > max(ClipCacheConfig.MEMORY_ENTRIES, 0):
+            _entries.popitem(last=False)
+    return clip
+
+
+def prewarm(library: dict, bone_sets) -> int:
+    """
+    Build (or map) every clip of `library` ({animation_id: {"duration",
+    "loop", ...}}) for each bone name list in bone_sets. Returns the
+    number of clips made ready.
+    """
+    count = 0
+    for bone_names in bone_sets:
+        for animation_id, info in library.items():
+            get(animation_id, bone_names, info.get("duration", 1.0), info.get("loop", False))
+            count += 1
+    return count
+
+
+def _evict():
+    limit = ClipCacheConfig.MAX_MB << 20
+    with _lock:
+        entries = []
+        for path in ClipCacheConfig.DIR.glob("*.clip"):
+            try:
+                st = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries, key=lambda e: e[0]):
+            if total <= limit:
+                break
+            try:
+                path.unlink(missing_ok=True)
+            except OSError:
+                continue        # still mapped (Windows): evicted next time
+            total -= size
+
+
+def clear():
+    """Remove every cached clip (mapped views already handed out stay valid)."""
+    with _lock:
+        _entries.clear()
+        for path in ClipCacheConfig.DIR.glob("*.clip"):
+            try:
+                path.unlink(missing_ok=True)
+            except OSError:
+                pass
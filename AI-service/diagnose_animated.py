@@ -1,45 +1,9 @@
 """Analyze an animated GLB to find untargeted bones and structural issues."""
-import struct, json, os
+import os
 import numpy as np
 from pathlib import Path
-
-def read_glb(path):
-    with open(path, 'rb') as f:
-        magic, version, total_len = struct.unpack('<III', f.read(12))
-        json_len, json_type = struct.unpack('<II', f.read(8))
-        gltf = json.loads(f.read(json_len))
-        bin_data = bytearray()
-        remaining = total_len - 12 - 8 - json_len
-        if remaining > 8:
-            bin_len, bin_type = struct.unpack('<II', f.read(8))
-            bin_data = bytearray(f.read(bin_len))
-    return gltf, bin_data
-
-def read_accessor_floats(gltf, bin_data, acc_idx, components):
-    acc = gltf["accessors"][acc_idx]
-    bv = gltf["bufferViews"][acc["bufferView"]]
-    off = bv.get("byteOffset", 0) + acc.get("byteOffset", 0)
-    count = acc["count"]
-    stride = bv.get("byteStride", components * 4)
-    result = []
-    for i in range(count):
-        o = off + i * stride
-        vals = struct.unpack_from(f'<{components}f', bin_data, o)
-        result.append(vals)
-    return np.array(result)
-
-def read_accessor_ushort(gltf, bin_data, acc_idx, components):
-    acc = gltf["accessors"][acc_idx]
-    bv = gltf["bufferViews"][acc["bufferView"]]
-    off = bv.get("byteOffset", 0) + acc.get("byteOffset", 0)
-    count = acc["count"]
-    stride = bv.get("byteStride", components * 2)
-    result = []
-    for i in range(count):
-        o = off + i * stride
-        vals = struct.unpack_from(f'<{components}H', bin_data, o)
-        result.append(vals)
-    return np.array(result)
+from glb_io import read_glb, read_accessor
+import skin_qa
 
 def main():
     outputs_dir = Path(__file__).parent / "outputs"
@@ -99,28 +63,28 @@ def main():
             # Check rotation amplitude
             if path == "rotation":
                 sampler = anim["samplers"][ch["sampler"]]
-                rots = read_accessor_floats(gltf, bin_data, sampler["output"], 4)
-                max_angle = 0
-                for q in rots:
-                    x, y, z, w = q
-                    angle = 2 * np.arccos(np.clip(abs(w), 0, 1))
-                    max_angle = max(max_angle, np.degrees(angle))
+                rots = read_accessor(gltf, bin_data, sampler["output"])
+                angles = 2 * np.arccos(np.clip(np.abs(rots[:, 3]), 0, 1))
+                max_angle = float(np.degrees(angles.max())) if len(angles) else 0.0
                 print(f"    {nname:20s} rot max: {max_angle:6.1f} deg")
             elif path == "translation":
                 sampler = anim["samplers"][ch["sampler"]]
-                trans = read_accessor_floats(gltf, bin_data, sampler["output"], 3)
+                trans = read_accessor(gltf, bin_data, sampler["output"])
                 max_trans = np.abs(trans).max()
                 print(f"    {nname:20s} trans max: {max_trans:.4f}")
         
         # Find untargeted joint nodes
         if skins:
             joint_indices = skins[0]["joints"]
+            # Joints the clip holds at rest are written without a channel
+            at_rest = {nodes[n].get("name", f"node_{n}") for n in anim.get("extras", {}).get("restNodes", [])}
             untargeted = []
             for ji in joint_indices:
                 jname = nodes[ji].get("name", f"node_{ji}")
-                if jname not in targeted:
+                if jname not in targeted and jname not in at_rest:
                     untargeted.append(jname)
             print(f"\n    TARGETED bones: {len(targeted)}")
+            print(f"    HELD AT REST bones ({len(at_rest)}): {sorted(at_rest)}")
             print(f"    UNTARGETED bones ({len(untargeted)}): {untargeted}")
     
     # Weight distribution per bone
@@ -136,8 +100,8 @@ def main():
             for prim in mesh.get("primitives", []):
                 attrs = prim.get("attributes", {})
                 if "JOINTS_0" in attrs and "WEIGHTS_0" in attrs:
-                    j = read_accessor_ushort(gltf, bin_data, attrs["JOINTS_0"], 4)
-                    w = read_accessor_floats(gltf, bin_data, attrs["WEIGHTS_0"], 4)
+                    j = read_accessor(gltf, bin_data, attrs["JOINTS_0"])
+                    w = read_accessor(gltf, bin_data, attrs["WEIGHTS_0"])
                     all_j.append(j)
                     all_w.append(w)
         
@@ -156,22 +120,16 @@ def main():
             
             # Check specifically: how many verts dominated by untargeted bones?
             if anims and skins:
-                targeted_set = set()
-                for anim in anims:
-                    for ch in anim.get("channels", []):
-                        nidx = ch["target"]["node"]
-                        targeted_set.add(nidx)
-                
-                untargeted_vert_count = 0
-                for vi in range(total_verts):
-                    dom_joint = int(dominant_bone[vi])
-                    dom_node = joint_indices[dom_joint]
-                    if dom_node not in targeted_set:
-                        untargeted_vert_count += 1
-                
+                report = skin_qa.check_glb(gltf, bin_data)
+                untargeted_vert_count = report["untargeted_vertices"]
                 pct = untargeted_vert_count / total_verts * 100
-                print(f"\n    CRITICAL: {untargeted_vert_count} vertices ({pct:.1f}%) dominated by UNTARGETED bones")
-                print(f"    These vertices will NOT move during animation = TEARING SOURCE")
+                if untargeted_vert_count:
+                    print(f"\n    CRITICAL: {untargeted_vert_count} vertices ({pct:.1f}%) dominated by UNTARGETED bones")
+                    print(f"    These vertices will NOT move during animation = TEARING SOURCE")
+                else:
+                    print(f"\n    OK: every vertex is dominated by a bone the animations drive")
+                print(f"\n=== SKIN QA ===")
+                print(f"    {skin_qa.summary(report)}")
 
 if __name__ == "__main__":
     main()
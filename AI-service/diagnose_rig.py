@@ -5,69 +5,16 @@ Checks:
 2. Duplicate/shared vertex positions across primitives
 3. Weight quality at joint regions
 4. Non-manifold edges
+5. Animation amplitude
+6. Inline skin QA report (skin_qa)
 """
-import struct, json, sys, os
+import sys, os
 import numpy as np
 from pathlib import Path
-
-def read_glb(path):
-    with open(path, 'rb') as f:
-        magic, version, total_len = struct.unpack('<III', f.read(12))
-        assert magic == 0x46546C67
-        json_len, json_type = struct.unpack('<II', f.read(8))
-        json_bytes = f.read(json_len)
-        gltf = json.loads(json_bytes)
-        bin_data = bytearray()
-        remaining = total_len - 12 - 8 - json_len
-        if remaining > 8:
-            bin_len, bin_type = struct.unpack('<II', f.read(8))
-            bin_data = bytearray(f.read(bin_len))
-    return gltf, bin_data
-
-def read_accessor_floats(gltf, bin_data, acc_idx, components=3):
-    acc = gltf["accessors"][acc_idx]
-    bv = gltf["bufferViews"][acc["bufferView"]]
-    off = bv.get("byteOffset", 0) + acc.get("byteOffset", 0)
-    count = acc["count"]
-    stride = bv.get("byteStride", components * 4)
-    result = []
-    for i in range(count):
-        o = off + i * stride
-        vals = struct.unpack_from(f'<{components}f', bin_data, o)
-        result.append(vals)
-    return np.array(result)
-
-def read_accessor_ushort(gltf, bin_data, acc_idx, components=4):
-    acc = gltf["accessors"][acc_idx]
-    bv = gltf["bufferViews"][acc["bufferView"]]
-    off = bv.get("byteOffset", 0) + acc.get("byteOffset", 0)
-    count = acc["count"]
-    stride = bv.get("byteStride", components * 2)
-    result = []
-    for i in range(count):
-        o = off + i * stride
-        vals = struct.unpack_from(f'<{components}H', bin_data, o)
-        result.append(vals)
-    return np.array(result)
-
-def read_indices(gltf, bin_data, prim):
-    if "indices" not in prim:
-        return None
-    acc = gltf["accessors"][prim["indices"]]
-    bv = gltf["bufferViews"][acc["bufferView"]]
-    off = bv.get("byteOffset", 0) + acc.get("byteOffset", 0)
-    ct = acc["componentType"]
-    count = acc["count"]
-    result = []
-    for i in range(count):
-        if ct == 5123:
-            val = struct.unpack_from('<H', bin_data, off + i*2)[0]
-        elif ct == 5125:
-            val = struct.unpack_from('<I', bin_data, off + i*4)[0]
-        else:
-            val = struct.unpack_from('<B', bin_data, off + i)[0]
-        result.append(val)
-    return np.array(result, dtype=np.int32)
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+from glb_io import read_glb, read_accessor, read_indices
+import skin_qa
 
 def main():
     outputs_dir = Path(__file__).parent / "outputs"
@@ -96,7 +43,7 @@ def main():
     for mi, mesh in enumerate(gltf.get("meshes", [])):
         for pi, prim in enumerate(mesh.get("primitives", [])):
             attrs = prim.get("attributes", {})
-            pos = read_accessor_floats(gltf, bin_data, attrs["POSITION"], 3)
+            pos = read_accessor(gltf, bin_data, attrs["POSITION"])
             
             has_joints = "JOINTS_0" in attrs
             has_weights = "WEIGHTS_0" in attrs
@@ -125,31 +72,27 @@ def main():
     print("=" * 60)
     
     if len(all_positions) > 1:
+        # Snap positions to a 1e-4 grid and intersect the key sets per pair
+        keys = [np.round(p * 1e4).astype(np.int64) for p in all_positions]
         for i in range(len(all_positions)):
             for j in range(i+1, len(all_positions)):
-                pos_i = all_positions[i]
-                pos_j = all_positions[j]
-                # Find near-duplicate positions (within 1e-5)
-                dists = np.linalg.norm(pos_i[:, None, :] - pos_j[None, :, :], axis=2)
-                close_pairs = np.argwhere(dists < 1e-4)
-                if len(close_pairs) > 0:
-                    print(f"  ⚠️ Prim[{i}] and Prim[{j}]: {len(close_pairs)} shared boundary vertices!")
+                _, ci, cj = np.intersect1d(keys[i].view("V24").ravel(), keys[j].view("V24").ravel(),
+                                           return_indices=True)
+                if len(ci) > 0:
+                    print(f"  ⚠️ Prim[{i}] and Prim[{j}]: {len(ci)} shared boundary vertices!")
                     # Check if those shared vertices have same weights
                     if prim_info[i]["weights_acc"] is not None and prim_info[j]["weights_acc"] is not None:
-                        ji = read_accessor_ushort(gltf, bin_data, prim_info[i]["joints_acc"], 4)
-                        wi = read_accessor_floats(gltf, bin_data, prim_info[i]["weights_acc"], 4)
-                        jj = read_accessor_ushort(gltf, bin_data, prim_info[j]["joints_acc"], 4)
-                        wj = read_accessor_floats(gltf, bin_data, prim_info[j]["weights_acc"], 4)
+                        ji = read_accessor(gltf, bin_data, prim_info[i]["joints_acc"])[ci]
+                        wi = read_accessor(gltf, bin_data, prim_info[i]["weights_acc"])[ci]
+                        jj = read_accessor(gltf, bin_data, prim_info[j]["joints_acc"])[cj]
+                        wj = read_accessor(gltf, bin_data, prim_info[j]["weights_acc"])[cj]
                         
-                        mismatched = 0
-                        for ci, cj in close_pairs[:50]:  # sample up to 50
-                            # Compare dominant bone
-                            dom_i = ji[ci][np.argmax(wi[ci])]
-                            dom_j = jj[cj][np.argmax(wj[cj])]
-                            if dom_i != dom_j:
-                                mismatched += 1
-                        pct = mismatched / min(len(close_pairs), 50) * 100
-                        print(f"     → Dominant bone mismatch: {mismatched}/{min(len(close_pairs),50)} ({pct:.0f}%) — causes seam tearing!")
+                        # Compare dominant bone
+                        dom_i = np.take_along_axis(ji, wi.argmax(axis=1)[:, None], axis=1)[:, 0]
+                        dom_j = np.take_along_axis(jj, wj.argmax(axis=1)[:, None], axis=1)[:, 0]
+                        mismatched = int((dom_i != dom_j).sum())
+                        pct = mismatched / len(ci) * 100
+                        print(f"     → Dominant bone mismatch: {mismatched}/{len(ci)} ({pct:.0f}%) — causes seam tearing!")
                 else:
                     print(f"  ✅ Prim[{i}] and Prim[{j}]: No shared vertices")
     else:
@@ -172,8 +115,8 @@ def main():
     offset = 0
     for info in prim_info:
         if info["weights_acc"] is not None:
-            w = read_accessor_floats(gltf, bin_data, info["weights_acc"], 4)
-            j = read_accessor_ushort(gltf, bin_data, info["joints_acc"], 4)
+            w = read_accessor(gltf, bin_data, info["weights_acc"])
+            j = read_accessor(gltf, bin_data, info["joints_acc"])
             all_w.append(w)
             all_j.append(j)
     
@@ -210,7 +153,7 @@ def main():
             # For simplicity, use the IBM inverse (it encodes the world pos)
             ibm_acc = skin.get("inverseBindMatrices")
             if ibm_acc is not None:
-                ibm_all = read_accessor_floats(gltf, bin_data, ibm_acc, 16)
+                ibm_all = read_accessor(gltf, bin_data, ibm_acc)
                 ibm = ibm_all[idx_in_skin].reshape(4, 4).T  # column-major to row-major
                 world_pos = -ibm[:3, 3]  # translation is -pos in IBM
                 joints_pos[name] = world_pos
@@ -258,33 +201,12 @@ def main():
         idx = info["indices"]
         n_verts = len(info["positions"])
         
-        # Build adjacency
-        adj = {i: set() for i in range(n_verts)}
-        for t in range(0, len(idx), 3):
-            a, b, c = int(idx[t]), int(idx[t+1]), int(idx[t+2])
-            adj[a].update([b, c])
-            adj[b].update([a, c])
-            adj[c].update([a, b])
-        
-        # Flood fill to count components
-        visited = set()
-        components = []
-        for v in range(n_verts):
-            if v in visited:
-                continue
-            # BFS
-            queue = [v]
-            comp = set()
-            while queue:
-                curr = queue.pop()
-                if curr in visited:
-                    continue
-                visited.add(curr)
-                comp.add(curr)
-                for nb in adj.get(curr, []):
-                    if nb not in visited:
-                        queue.append(nb)
-            components.append(len(comp))
+        # Connected components of the triangle graph
+        tris = idx.reshape(-1, 3).astype(np.int64)
+        edges = np.concatenate([tris[:, [0, 1]], tris[:, [1, 2]]])
+        graph = coo_matrix((np.ones(len(edges)), (edges[:, 0], edges[:, 1])), shape=(n_verts, n_verts))
+        _, labels = connected_components(graph, directed=False)
+        components = np.bincount(labels).tolist()
         
         if len(components) == 1:
             print(f"  ✅ Prim[{pi}]: Single connected component ({components[0]} verts)")
@@ -316,17 +238,21 @@ def main():
             output_acc = sampler["output"]
             
             if path == "rotation":
-                rots = read_accessor_floats(gltf, bin_data, output_acc, 4)
+                rots = read_accessor(gltf, bin_data, output_acc)
                 # Convert quats to angles
-                angles = []
-                for q in rots:
-                    x, y, z, w = q
-                    angle = 2 * np.arccos(np.clip(abs(w), 0, 1))
-                    angles.append(np.degrees(angle))
-                max_angle = max(angles) if angles else 0
+                angles = np.degrees(2 * np.arccos(np.clip(np.abs(rots[:, 3]), 0, 1)))
+                max_angle = float(angles.max()) if len(angles) else 0
                 if max_angle > 5:
                     print(f"    {node_name:20s} rot max: {max_angle:6.1f}°")
     
+    # ── 6. Inline skin QA (the same report rig/animate jobs return) ──
+    print()
+    print("=" * 60)
+    print("6. SKIN QA")
+    print("=" * 60)
+    report = skin_qa.check_glb(gltf, bin_data)
+    print(f"  {skin_qa.summary(report)}")
+    
     print()
     print("=" * 60)
     print("SUMMARY")
@@ -0,0 +1,531 @@
+"""
+GLB / glTF binary helpers shared by rigging, animation and the diagnostic tools.
+- Memory-mapped GLB reading with lazily exposed JSON / BIN chunks
+- Copy-free GLB writing from a list of buffer segments (vectored I/O)
+- Zero-copy NumPy views over accessors (byteOffset, byteStride, every componentType)
+- Normalized integer decoding and sparse accessor substitution
+- Triangle index reading for mesh primitives
+- GLTFDocument builder: NumPy-backed buffers, accessor de-duplication, single layout pass
+"""
+import hashlib
+import json
+import mmap
+import os
+import struct
+import numpy as np
+
+GLB_MAGIC = 0x46546C67       # 'glTF'
+CHUNK_JSON = 0x4E4F534A      # 'JSON'
+CHUNK_BIN = 0x004E4942       # 'BIN\0'
+
+# glTF componentType → little-endian numpy dtype
+COMPONENT_DTYPES = {
+    5120: np.dtype('<i1'),   # BYTE
+    5121: np.dtype('<u1'),   # UNSIGNED_BYTE
+    5122: np.dtype('<i2'),   # SHORT
+    5123: np.dtype('<u2'),   # UNSIGNED_SHORT
+    5125: np.dtype('<u4'),   # UNSIGNED_INT
+    5126: np.dtype('<f4'),   # FLOAT
+}
+
+# glTF accessor type → (columns, rows); vectors are a single column
+TYPE_SHAPES = {
+    "SCALAR": (1, 1),
+    "VEC2": (1, 2),
+    "VEC3": (1, 3),
+    "VEC4": (1, 4),
+    "MAT2": (2, 2),
+    "MAT3": (3, 3),
+    "MAT4": (4, 4),
+}
+
+
+def type_components(acc_type: str) -> int:
+    """Number of components per element for a glTF accessor type."""
+    cols, rows = TYPE_SHAPES[acc_type]
+    return cols * rows
+
+
+class GLBFile:
+    """
+    Memory-mapped GLB reader.
+
+    Only the 12-byte header and the chunk table are parsed on open. The JSON
+    chunk is decoded on first access to `.json` and the BIN chunk is exposed as
+    a read-only memoryview into the mapping, so buffer bytes are never copied
+    into Python objects; pages are faulted in only when an accessor touches them.
+    """
+
+    def __init__(self, path: str):
+        self.path = str(path)
+        with open(self.path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            if size < 12:
+                raise ValueError(f"Not a valid GLB file: {self.path}")
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mm)
+
+        magic, self.version, length = struct.unpack_from('<III', self._view, 0)
+        if magic != GLB_MAGIC:
+            self.close()
+            raise ValueError(f"Not a valid GLB file: {self.path}")
+
+        # Chunk table: [(chunk_type, data_offset, data_length), ...]
+        self.chunks = []
+        pos = 12
+        end = min(length, size)
+        while pos + 8 <= end:
+            chunk_len, chunk_type = struct.unpack_from('<II', self._view, pos)
+            self.chunks.append((chunk_type, pos + 8, chunk_len))
+            pos += 8 + chunk_len
+
+        if not self.chunks or self.chunks[0][0] != CHUNK_JSON:
+            self.close()
+            raise ValueError(f"GLB first chunk is not JSON: {self.path}")
+        self._json = None
+
+    def chunk(self, chunk_type: int):
+        """Return a read-only memoryview of the first chunk of `chunk_type`, or None."""
+        for ctype, offset, length in self.chunks:
+            if ctype == chunk_type:
+                return self._view[offset:offset + length]
+        return None
+
+    @property
+    def json(self) -> dict:
+        if self._json is None:
+            self._json = json.loads(bytes(self.chunk(CHUNK_JSON)).decode('utf-8'))
+        return self._json
+
+    @property
+    def bin(self):
+        data = self.chunk(CHUNK_BIN)
+        return data if data is not None else memoryview(b'')
+
+    def close(self):
+        """Unmap the file. If array views are still alive the mapping is left to
+        be released by the garbage collector once the last view goes away."""
+        try:
+            self._view.release()
+            self._mm.close()
+        except BufferError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def read_glb(path: str):
+    """
+    Read a GLB file and return (json_chunk, bin_chunk).
+
+    The BIN chunk is a read-only memoryview backed by a memory map of the file;
+    the mapping stays alive for as long as the memoryview (or any array view
+    built on it) is referenced.
+    """
+    glb = GLBFile(path)
+    return glb.json, glb.bin
+
+
+class BufferSegments:
+    """
+    A BIN chunk assembled from an ordered list of byte segments.
+
+    Appending records a reference to the data instead of growing a bytearray,
+    so the original (memory-mapped) buffer and newly packed arrays are never
+    concatenated in memory; write_glb() streams the segments straight to disk.
+    """
+
+    def __init__(self, base=None):
+        self.segments = []
+        self.length = 0
+        if base is not None and memoryview(base).nbytes:
+            self.segments.append(base)
+            self.length = memoryview(base).nbytes
+
+    def __len__(self):
+        return self.length
+
+    def append(self, data, align: int = 4) -> int:
+        """Append a buffer-like object; returns its byte offset after alignment."""
+        pad = -self.length % align
+        if pad:
+            self.segments.append(bytes(pad))
+            self.length += pad
+        offset = self.length
+        nbytes = memoryview(data).nbytes
+        if nbytes:
+            self.segments.append(data)
+            self.length += nbytes
+        return offset
+
+
+_IOV_MAX = 1024
+
+
+def _write_segments(f, segments):
+    """Write buffer-like segments to an open binary file, vectored when possible."""
+    views = [memoryview(s).cast('B') for s in segments if memoryview(s).nbytes]
+    if not hasattr(os, 'writev'):
+        # Windows: no scatter/gather I/O — still write each segment in place
+        for v in views:
+            f.write(v)
+        return
+
+    f.flush()
+    fd = f.fileno()
+    i = 0
+    while i < len(views):
+        batch = views[i:i + _IOV_MAX]
+        written = os.writev(fd, batch)
+        # Skip fully written segments, trim a partially written one
+        while batch and written >= batch[0].nbytes:
+            written -= batch[0].nbytes
+            batch.pop(0)
+            i += 1
+        if batch and written:
+            views[i] = batch[0][written:]
+
+
+def write_glb(path: str, gltf: dict, bin_segments=()):
+    """
+    Write a GLB file from a glTF dict and the BIN chunk given as a sequence of
+    buffer-like segments (or a BufferSegments). Header, JSON and every segment
+    are streamed to disk with vectored writes; the BIN chunk is never assembled
+    into a single bytes object.
+    """
+    if isinstance(bin_segments, BufferSegments):
+        segments = bin_segments.segments
+    elif isinstance(bin_segments, (list, tuple)):
+        segments = bin_segments
+    else:
+        segments = [bin_segments]
+
+    json_bytes = json.dumps(gltf, separators=(',', ':')).encode('utf-8')
+    json_pad = b' ' * (-len(json_bytes) % 4)
+    json_len = len(json_bytes) + len(json_pad)
+
+    bin_len = sum(memoryview(s).nbytes for s in segments)
+    bin_pad = bytes(-bin_len % 4)
+    bin_len += len(bin_pad)
+
+    total_length = 12 + 8 + json_len
+    parts = [None, json_bytes, json_pad]
+    if bin_len:
+        total_length += 8 + bin_len
+        parts.append(struct.pack('<II', bin_len, CHUNK_BIN))
+        parts.extend(segments)
+        parts.append(bin_pad)
+    parts[0] = struct.pack('<IIIII', GLB_MAGIC, 2, total_length, json_len, CHUNK_JSON)
+
+    with open(path, 'wb') as f:
+        _write_segments(f, parts)
+    return total_length
+
+
+def _element_layout(acc: dict):
+    """Return (dtype, columns, rows, packed column size in bytes) for an accessor."""
+    dtype = COMPONENT_DTYPES.get(acc["componentType"])
+    if dtype is None:
+        raise ValueError(f"Unsupported componentType: {acc['componentType']}")
+    cols, rows = TYPE_SHAPES[acc["type"]]
+    col_bytes = rows * dtype.itemsize
+    # Matrix columns are padded to 4-byte boundaries (MAT2/MAT3 of 1-2 byte types)
+    if cols > 1 and col_bytes % 4:
+        col_bytes += 4 - col_bytes % 4
+    return dtype, cols, rows, col_bytes
+
+
+def _strided_view(bin_data, byte_offset: int, count: int, acc: dict, byte_stride=None):
+    """Build an (count, components) view of `bin_data` without copying."""
+    dtype, cols, rows, col_bytes = _element_layout(acc)
+    elem_bytes = cols * col_bytes
+    stride = byte_stride or elem_bytes
+
+    if count == 0:
+        return np.empty((0, cols * rows), dtype=dtype)
+
+    needed = byte_offset + stride * (count - 1) + elem_bytes
+    if needed > len(bin_data):
+        raise ValueError(f"Accessor reads past end of buffer ({needed} > {len(bin_data)} bytes)")
+
+    if cols == 1 or col_bytes == rows * dtype.itemsize:
+        # Contiguous element: a single 2-D strided view covers it
+        return np.ndarray((count, cols * rows), dtype=dtype, buffer=bin_data,
+                          offset=byte_offset, strides=(stride, dtype.itemsize))
+
+    # Padded matrix columns: view as (count, cols, rows) then drop the padding
+    view = np.ndarray((count, cols, rows), dtype=dtype, buffer=bin_data,
+                      offset=byte_offset, strides=(stride, col_bytes, dtype.itemsize))
+    return view.reshape(count, cols * rows)
+
+
+def accessor_view(gltf: dict, bin_data, acc_idx: int):
+    """
+    Return the raw stored values of an accessor as a NumPy array of shape
+    (count, components) in the accessor's own componentType.
+
+    Dense accessors are returned as zero-copy (possibly strided) views into
+    `bin_data`. Sparse accessors and accessors without a bufferView are
+    materialized, since their values do not exist contiguously in the buffer.
+    """
+    acc = gltf["accessors"][acc_idx]
+    dtype, cols, rows, _ = _element_layout(acc)
+    count = acc["count"]
+
+    if "bufferView" in acc:
+        bv = gltf["bufferViews"][acc["bufferView"]]
+        offset = bv.get("byteOffset", 0) + acc.get("byteOffset", 0)
+        values = _strided_view(bin_data, offset, count, acc, bv.get("byteStride"))
+    else:
+        # No bufferView: initialized to zeros per the glTF spec
+        values = np.zeros((count, cols * rows), dtype=dtype)
+
+    sparse = acc.get("sparse")
+    if sparse:
+        values = np.array(values, copy=True)
+        sp_count = sparse["count"]
+
+        sp_idx = sparse["indices"]
+        idx_bv = gltf["bufferViews"][sp_idx["bufferView"]]
+        idx_acc = {"componentType": sp_idx["componentType"], "type": "SCALAR"}
+        idx = _strided_view(bin_data, idx_bv.get("byteOffset", 0) + sp_idx.get("byteOffset", 0),
+                            sp_count, idx_acc)[:, 0]
+
+        sp_val = sparse["values"]
+        val_bv = gltf["bufferViews"][sp_val["bufferView"]]
+        vals = _strided_view(bin_data, val_bv.get("byteOffset", 0) + sp_val.get("byteOffset", 0),
+                             sp_count, acc)
+        values[idx.astype(np.intp)] = vals
+
+    return values
+
+
+def dequantize(values: np.ndarray, component_type: int, normalized: bool):
+    """
+    Convert stored accessor values to float32 following the glTF rules for
+    normalized integers: unsigned c / max, signed max(c / max, -1).
+    Non-normalized data is returned unchanged (no copy).
+    """
+    if not normalized or component_type == 5126:
+        return values
+    info = np.iinfo(COMPONENT_DTYPES[component_type])
+    out = values.astype(np.float32) / np.float32(info.max)
+    if info.min < 0:
+        np.maximum(out, -1.0, out=out)
+    return out
+
+
+def read_accessor(gltf: dict, bin_data, acc_idx: int):
+    """
+    Read an accessor as a NumPy array of shape (count, components).
+
+    FLOAT and non-normalized integer accessors come back as zero-copy views of
+    `bin_data` whenever possible; normalized integers are decoded to float32.
+    Use accessor_view() to get the raw integers of a normalized accessor.
+    """
+    acc = gltf["accessors"][acc_idx]
+    values = accessor_view(gltf, bin_data, acc_idx)
+    return dequantize(values, acc["componentType"], acc.get("normalized", False))
+
+
+def read_indices(gltf: dict, bin_data, primitive: dict):
+    """
+    Read triangle indices from a glTF mesh primitive.
+    Returns a flat NumPy array (view when possible), or None if non-indexed.
+    """
+    if "indices" not in primitive:
+        return None
+    acc = gltf["accessors"][primitive["indices"]]
+    if acc["componentType"] not in (5121, 5123, 5125) or acc["type"] != "SCALAR":
+        return None
+    return accessor_view(gltf, bin_data, primitive["indices"])[:, 0]
+
+
+# numpy dtype → glTF componentType
+DTYPE_COMPONENTS = {dt: ct for ct, dt in COMPONENT_DTYPES.items()}
+
+
+class GLTFDocument:
+    """
+    In-memory glTF document for building GLB outputs.
+
+    New data is added as NumPy arrays. Each add_accessor() call creates the
+    accessor and its bufferView immediately (so indices are stable) but defers
+    byte placement: layout() assigns every pending bufferView its offset and
+    alignment in one pass after the existing BIN data, and save() streams the
+    result through write_glb() without concatenating buffers.
+
+    Accessors are de-duplicated by content hash — adding the same array with
+    the same type/encoding twice returns the first accessor index.
+    """
+
+    def __init__(self, gltf: dict, bin_data=None):
+        self.gltf = gltf
+        self.base = bin_data if bin_data is not None else memoryview(b'')
+        self._pending = []          # [(bufferView index, contiguous array), ...]
+        self._accessor_keys = {}    # content key → accessor index
+        self.dedup_hits = 0
+
+    @classmethod
+    def load(cls, path: str):
+        gltf, bin_data = read_glb(path)
+        return cls(gltf, bin_data)
+
+    def read_accessor(self, acc_idx: int):
+        """Read an accessor that exists in the loaded BIN data (see read_accessor)."""
+        return read_accessor(self.gltf, self.base, acc_idx)
+
+    def add_accessor(self, array, acc_type: str, normalized: bool = False,
+                     target=None, min_max: bool = False, dedupe: bool = True) -> int:
+        """
+        Add `array` as a new accessor and return its index.
+
+        The componentType comes from the array dtype (float32, uint8, uint16, ...).
+        `array` may be flat or shaped (count, components); a wider (count, k)
+        array stores the extra columns as per-element padding via byteStride
+        (e.g. SHORT VEC3 padded to 8 bytes). `min_max=True` records
+        per-component min/max (required for POSITION and animation inputs).
+        """
+        arr, key = self._prepare(array, acc_type, normalized, target, min_max)
+        if dedupe:
+            if key in self._accessor_keys:
+                self.dedup_hits += 1
+                return self._accessor_keys[key]
+
+        accessors = self.gltf.setdefault("accessors", [])
+        accessors.append(self._store(arr, acc_type, normalized, target, min_max))
+        acc_idx = len(accessors) - 1
+
+        if dedupe:
+            self._accessor_keys[key] = acc_idx
+        return acc_idx
+
+    def replace_accessor(self, acc_idx: int, array, acc_type: str, normalized: bool = False,
+                         target=None, min_max: bool = False) -> int:
+        """
+        Re-point an existing accessor at new data (keeping its index, so every
+        reference to it stays valid). The old bufferView is dropped by
+        layout(repack=True) if nothing else uses it.
+        """
+        arr, _ = self._prepare(array, acc_type, normalized, target, min_max, hash_content=False)
+        old = self.gltf["accessors"][acc_idx]
+        new = self._store(arr, acc_type, normalized, target, min_max)
+        for key in ("name", "extras", "extensions"):
+            if key in old:
+                new[key] = old[key]
+        self.gltf["accessors"][acc_idx] = new
+        return acc_idx
+
+    def _prepare(self, array, acc_type, normalized, target, min_max, hash_content=True):
+        arr = np.ascontiguousarray(array)
+        if arr.dtype not in DTYPE_COMPONENTS:
+            raise ValueError(f"Unsupported accessor dtype: {arr.dtype}")
+        arr = arr.astype(arr.dtype.newbyteorder('<'), copy=False)
+        n_comp = type_components(acc_type)
+        if arr.ndim != 2 or arr.shape[1] < n_comp:
+            arr = arr.reshape(-1, n_comp)
+
+        key = None
+        if hash_content:
+            digest = hashlib.blake2b(memoryview(arr).cast('B'), digest_size=16).digest()
+            key = (digest, arr.shape, DTYPE_COMPONENTS[arr.dtype], acc_type, normalized, target, min_max)
+        return arr, key
+
+    def _store(self, arr, acc_type, normalized, target, min_max) -> dict:
+        """Queue `arr` in a new bufferView and return the accessor dict for it."""
+        n_comp = type_components(acc_type)
+        bv = {"buffer": 0, "byteLength": arr.nbytes}
+        if arr.shape[1] != n_comp:
+            bv["byteStride"] = arr.strides[0]
+        if target is not None:
+            bv["target"] = target
+        views = self.gltf.setdefault("bufferViews", [])
+        views.append(bv)
+        self._pending.append((len(views) - 1, arr))
+
+        acc = {
+            "bufferView": len(views) - 1,
+            "componentType": DTYPE_COMPONENTS[arr.dtype],
+            "count": len(arr),
+            "type": acc_type,
+        }
+        if normalized:
+            acc["normalized"] = True
+        if min_max and len(arr):
+            acc["min"] = arr[:, :n_comp].min(axis=0).tolist()
+            acc["max"] = arr[:, :n_comp].max(axis=0).tolist()
+        return acc
+
+    def layout(self, repack: bool = False) -> BufferSegments:
+        """
+        Assign byte offsets to all pending bufferViews (4-byte aligned, which
+        also satisfies every componentType) and return the BIN segments.
+
+        With `repack=True`, bufferViews no longer referenced anywhere in the
+        document are dropped and the surviving original views are re-laid out
+        as zero-copy slices of the loaded buffer. Call once, right before writing.
+        """
+        views = self.gltf.get("bufferViews", [])
+        pending = dict(self._pending)
+
+        if not repack:
+            segments = BufferSegments(self.base)
+            for bv_idx, arr in self._pending:
+                views[bv_idx]["byteOffset"] = segments.append(arr, align=4)
+        else:
+            used = set()
+            _collect_buffer_view_refs(self.gltf, used)
+            order = [i for i in range(len(views)) if i in used]
+            remap = {old: new for new, old in enumerate(order)}
+            _remap_buffer_view_refs(self.gltf, remap)
+
+            segments = BufferSegments()
+            base = memoryview(self.base).cast('B')
+            for old in order:
+                bv = views[old]
+                if old in pending:
+                    bv["byteOffset"] = segments.append(pending[old], align=4)
+                elif bv.get("buffer", 0) == 0:
+                    start = bv.get("byteOffset", 0)
+                    bv["byteOffset"] = segments.append(base[start:start + bv["byteLength"]], align=4)
+            self.gltf["bufferViews"] = [views[i] for i in order]
+            self._pending = [(remap[i], a) for i, a in self._pending if i in remap]
+
+        if len(segments):
+            buffers = self.gltf.setdefault("buffers", [{}])
+            buffers[0]["byteLength"] = len(segments)
+        return segments
+
+    def save(self, path: str, repack: bool = False) -> int:
+        """Lay out pending data and write the document as a GLB; returns file size."""
+        return write_glb(path, self.gltf, self.layout(repack=repack))
+
+
+def _collect_buffer_view_refs(node, used: set):
+    """Collect every integer stored under a "bufferView" key (accessors, sparse,
+    images, extensions) anywhere in the glTF JSON."""
+    if isinstance(node, dict):
+        for key, value in node.items():
+            if key == "bufferView" and isinstance(value, int):
+                used.add(value)
+            else:
+                _collect_buffer_view_refs(value, used)
+    elif isinstance(node, list):
+        for item in node:
+            _collect_buffer_view_refs(item, used)
+
+
+def _remap_buffer_view_refs(node, remap: dict):
+    if isinstance(node, dict):
+        for key, value in node.items():
+            if key == "bufferView" and isinstance(value, int):
+                node[key] = remap[value]
+            else:
+                _remap_buffer_view_refs(value, remap)
+    elif isinstance(node, list):
+        for item in node:
+            _remap_buffer_view_refs(item, remap)
@@ -0,0 +1,371 @@
+"""
+KHR_mesh_quantization export stage for GLB outputs.
+
+Opt-in post-pass over a finished GLB:
+- POSITION   → normalized SHORT, dequantization folded into the node transform
+               (or a child node), or into the inverse bind matrices for skinned meshes
+- NORMAL     → normalized BYTE
+- TANGENT    → normalized BYTE
+- TEXCOORD_n → normalized UNSIGNED_SHORT (only when the UVs lie in [0, 1])
+
+Skins, animations, indices, materials and images are carried over untouched.
+Each quantized mesh records its dequantization in mesh.extras["quantization"]
+so our own readers (e.g. the rigger) can restore original local-space positions.
+
+trimesh does not decode normalized accessors, so anything that loads our
+GLBs with trimesh goes through load_trimesh(), which dequantizes first.
+
+Enable with AI_SERVICE_MESH_QUANTIZATION=true.
+"""
+import os
+import tempfile
+import numpy as np
+
+import glb_io
+
+
+class QuantizationConfig:
+    """Configuration for the quantized export stage"""
+    ENABLED = os.getenv("AI_SERVICE_MESH_QUANTIZATION", "false").lower() == "true"
+
+    # UVs slightly outside [0, 1] (float noise) are still clamped into range
+    UV_TOLERANCE = 1e-4
+
+
+EXTENSION = "KHR_mesh_quantization"
+
+# Extensions whose payloads we can't see through; files using them are left alone
+_UNSUPPORTED_EXTENSIONS = ("EXT_meshopt_compression", "KHR_draco_mesh_compression")
+
+
+def maybe_quantize_glb(path) -> dict:
+    """Quantize `path` in place if the stage is enabled; returns stats or None."""
+    if not QuantizationConfig.ENABLED or not str(path).lower().endswith(".glb"):
+        return None
+    try:
+        stats = quantize_glb(str(path))
+    except Exception as e:
+        print(f"   ⚠️ Mesh quantization skipped: {e}")
+        return None
+    if stats["quantized"]:
+        print(f"   🗜️ Quantized GLB: {stats['bytes_before']:,} → {stats['bytes_after']:,} bytes "
+              f"({stats['saved_percent']:.1f}% saved)")
+    return stats
+
+
+def quantize_glb(input_path: str, output_path: str = None) -> dict:
+    """
+    Rewrite a GLB with KHR_mesh_quantization vertex attributes.
+
+    Writes to `output_path` (default: overwrite `input_path`) and returns
+    {"quantized", "bytes_before", "bytes_after", "saved_bytes", "saved_percent",
+     "accessors"}.
+    """
+    output_path = output_path or input_path
+    bytes_before = os.path.getsize(input_path)
+
+    glb = glb_io.GLBFile(input_path)
+    try:
+        doc = glb_io.GLTFDocument(glb.json, glb.bin)
+        counts = _quantize_document(doc)
+        if counts:
+            tmp_path = f"{output_path}.tmp"
+            bytes_after = doc.save(tmp_path, repack=True)
+    finally:
+        doc = None
+        glb.close()
+
+    if not counts:
+        if output_path != input_path:
+            with open(input_path, "rb") as src, open(output_path, "wb") as dst:
+                dst.write(src.read())
+        return _stats(False, bytes_before, bytes_before, {})
+
+    os.replace(tmp_path, output_path)
+    return _stats(True, bytes_before, bytes_after, counts)
+
+
+def is_quantized(path) -> bool:
+    """True if `path` is a GLB that uses KHR_mesh_quantization."""
+    if not str(path).lower().endswith(".glb"):
+        return False
+    with glb_io.GLBFile(str(path)) as glb:
+        return EXTENSION in glb.json.get("extensionsUsed", [])
+
+
+def dequantize_glb(input_path: str, output_path: str) -> None:
+    """
+    Write a float copy of a quantized GLB (the inverse of quantize_glb, up to
+    quantization error). Unskinned meshes keep the dequantizing node transform;
+    skinned meshes are restored from mesh.extras since their transform lives
+    in the inverse bind matrices.
+    """
+    glb = glb_io.GLBFile(input_path)
+    try:
+        doc = glb_io.GLTFDocument(glb.json, glb.bin)
+        gltf = doc.gltf
+        skin_of = {n["mesh"]: n["skin"] for n in gltf.get("nodes", []) if "mesh" in n and "skin" in n}
+        skin_dequant = {}
+        done = set()
+        for mesh_idx, mesh in enumerate(gltf.get("meshes", [])):
+            quant = mesh.get("extras", {}).pop("quantization", None)
+            if quant and mesh_idx in skin_of:
+                skin_dequant[skin_of[mesh_idx]] = quant
+            for prim in mesh.get("primitives", []):
+                for name, acc_idx in prim.get("attributes", {}).items():
+                    acc = gltf["accessors"][acc_idx]
+                    if (acc_idx in done or acc.get("componentType") == 5126
+                            or not (name in ("POSITION", "NORMAL", "TANGENT")
+                                    or name.startswith("TEXCOORD_"))):
+                        continue
+                    values = doc.read_accessor(acc_idx).astype(np.float64)
+                    if name == "POSITION" and quant and mesh_idx in skin_of:
+                        values = values * quant["scale"] + np.asarray(quant["offset"])
+                    doc.replace_accessor(acc_idx, values.astype(np.float32), acc["type"],
+                                         target=34962, min_max=(name == "POSITION"))
+                    done.add(acc_idx)
+        for skin_idx, quant in skin_dequant.items():
+            undo = np.eye(4)
+            undo[:3, :3] /= quant["scale"]
+            undo[:3, 3] = -np.asarray(quant["offset"]) / quant["scale"]
+            _bake_into_skin(doc, skin_idx, undo)
+        _remove_extension(gltf)
+        doc.save(output_path, repack=True)
+    finally:
+        doc = None
+        glb.close()
+
+
+def drop_extension_if_unused(gltf: dict) -> bool:
+    """
+    Remove KHR_mesh_quantization from the extension lists once no vertex
+    attribute needs it (e.g. after quantized positions were restored to float).
+    Returns True if the extension was dropped.
+    """
+    if EXTENSION not in gltf.get("extensionsUsed", []):
+        return False
+    accessors = gltf.get("accessors", [])
+    for mesh in gltf.get("meshes", []):
+        for prim in mesh.get("primitives", []):
+            for name, acc_idx in prim.get("attributes", {}).items():
+                if ((name in ("POSITION", "NORMAL", "TANGENT") or name.startswith("TEXCOORD_"))
+                        and accessors[acc_idx].get("componentType") != 5126):
+                    return False
+    _remove_extension(gltf)
+    return True
+
+
+def load_trimesh(path, **kwargs):
+    """trimesh.load() that understands our quantized GLBs."""
+    import trimesh
+    path = str(path)
+    if not is_quantized(path):
+        return trimesh.load(path, **kwargs)
+
+    fd, tmp_path = tempfile.mkstemp(suffix=".glb")
+    os.close(fd)
+    try:
+        dequantize_glb(path, tmp_path)
+        return trimesh.load(tmp_path, **kwargs)
+    finally:
+        os.unlink(tmp_path)
+
+
+def _stats(quantized, before, after, counts) -> dict:
+    return {
+        "quantized": quantized,
+        "bytes_before": before,
+        "bytes_after": after,
+        "saved_bytes": before - after,
+        "saved_percent": 100.0 * (before - after) / before if before else 0.0,
+        "accessors": counts,
+    }
+
+
+def _quantize_document(doc: glb_io.GLTFDocument) -> dict:
+    """Quantize vertex attributes of `doc` in place; returns per-attribute counts."""
+    gltf = doc.gltf
+    used = gltf.get("extensionsUsed", [])
+    if any(ext in used for ext in _UNSUPPORTED_EXTENSIONS):
+        return {}
+
+    meshes = gltf.get("meshes", [])
+    nodes = gltf.get("nodes", [])
+    accessors = gltf.get("accessors", [])
+    counts = {}
+    done = set()
+
+    def quantizable(acc_idx, acc_types):
+        acc = accessors[acc_idx]
+        return (acc_idx not in done and acc.get("componentType") == 5126
+                and acc.get("type") in acc_types and "sparse" not in acc)
+
+    # ---- Normals, tangents, UVs (no transform needed) ----
+    for mesh in meshes:
+        for prim in mesh.get("primitives", []):
+            if prim.get("targets"):
+                continue
+            for name, acc_idx in prim.get("attributes", {}).items():
+                if name == "NORMAL" and quantizable(acc_idx, ("VEC3",)):
+                    n = doc.read_accessor(acc_idx)
+                    length = np.linalg.norm(n, axis=1, keepdims=True)
+                    n = np.divide(n, length, out=np.zeros_like(n), where=length > 0)
+                    q = _pad_rows(_snorm(n, 127, np.int8))
+                    doc.replace_accessor(acc_idx, q, "VEC3", normalized=True, target=34962)
+                elif name == "TANGENT" and quantizable(acc_idx, ("VEC4",)):
+                    t = doc.read_accessor(acc_idx)
+                    doc.replace_accessor(acc_idx, _snorm(t, 127, np.int8), "VEC4",
+                                         normalized=True, target=34962)
+                elif name.startswith("TEXCOORD_") and quantizable(acc_idx, ("VEC2",)):
+                    uv = doc.read_accessor(acc_idx)
+                    tol = QuantizationConfig.UV_TOLERANCE
+                    if len(uv) == 0 or uv.min() < -tol or uv.max() > 1.0 + tol:
+                        continue
+                    q = np.round(np.clip(uv, 0.0, 1.0) * 65535).astype(np.uint16)
+                    doc.replace_accessor(acc_idx, q, "VEC2", normalized=True, target=34962)
+                else:
+                    continue
+                done.add(acc_idx)
+                key = "TEXCOORD" if name.startswith("TEXCOORD_") else name
+                counts[key] = counts.get(key, 0) + 1
+
+    # ---- Positions: group meshes that must share one dequantization transform ----
+    users = {}
+    for node_idx, node in enumerate(nodes):
+        if "mesh" in node:
+            users.setdefault(node["mesh"], []).append((node_idx, node.get("skin")))
+
+    groups = {}  # ("mesh", m) or ("skin", s) → [mesh indices]
+    for mesh_idx, mesh_users in users.items():
+        prims = meshes[mesh_idx].get("primitives", [])
+        if any(p.get("targets") for p in prims):
+            continue
+        pos = [p.get("attributes", {}).get("POSITION") for p in prims]
+        if not pos or any(a is None or not quantizable(a, ("VEC3",)) for a in pos):
+            continue
+        skins = {skin for _, skin in mesh_users}
+        if skins == {None}:
+            groups[("mesh", mesh_idx)] = [mesh_idx]
+        elif len(skins) == 1:
+            groups.setdefault(("skin", skins.pop()), []).append(mesh_idx)
+
+    animated = {ch.get("target", {}).get("node")
+                for anim in gltf.get("animations", []) for ch in anim.get("channels", [])}
+
+    for (kind, key), mesh_ids in groups.items():
+        pos_ids = sorted({p["attributes"]["POSITION"]
+                          for m in mesh_ids for p in meshes[m]["primitives"]})
+        lo = np.min([accessors[a]["min"] if "min" in accessors[a] else doc.read_accessor(a).min(axis=0)
+                     for a in pos_ids], axis=0).astype(np.float64)
+        hi = np.max([accessors[a]["max"] if "max" in accessors[a] else doc.read_accessor(a).max(axis=0)
+                     for a in pos_ids], axis=0).astype(np.float64)
+        offset = (lo + hi) * 0.5
+        scale = float(np.max(hi - lo) * 0.5) or 1.0
+
+        for acc_idx in pos_ids:
+            p = doc.read_accessor(acc_idx).astype(np.float64)
+            q = _pad_rows(_snorm((p - offset) / scale, 32767, np.int16))
+            doc.replace_accessor(acc_idx, q, "VEC3", normalized=True, target=34962, min_max=True)
+            done.add(acc_idx)
+        counts["POSITION"] = counts.get("POSITION", 0) + len(pos_ids)
+
+        dequant = np.eye(4)
+        dequant[:3, :3] *= scale
+        dequant[:3, 3] = offset
+        if kind == "skin":
+            _bake_into_skin(doc, key, dequant)
+        else:
+            for node_idx, _ in users[key]:
+                _apply_to_node(nodes, node_idx, offset, scale, node_idx in animated)
+
+        for m in mesh_ids:
+            meshes[m].setdefault("extras", {})["quantization"] = {
+                "offset": offset.tolist(), "scale": scale}
+
+    if counts:
+        for key in ("extensionsUsed", "extensionsRequired"):
+            exts = gltf.setdefault(key, [])
+            if EXTENSION not in exts:
+                exts.append(EXTENSION)
+    return counts
+
+
+def _remove_extension(gltf):
+    for key in ("extensionsUsed", "extensionsRequired"):
+        exts = [e for e in gltf.get(key, []) if e != EXTENSION]
+        if exts:
+            gltf[key] = exts
+        else:
+            gltf.pop(key, None)
+
+
+def _snorm(values, max_value, dtype):
+    return np.round(np.clip(values, -1.0, 1.0) * max_value).astype(dtype)
+
+
+def _pad_rows(q):
+    """Pad each element to a multiple of 4 bytes (vertex attribute alignment)."""
+    row_bytes = q.shape[1] * q.itemsize
+    pad = (-row_bytes % 4) // q.itemsize
+    if pad == 0:
+        return q
+    return np.hstack([q, np.zeros((len(q), pad), dtype=q.dtype)])
+
+
+def _bake_into_skin(doc, skin_idx, dequant):
+    """Skinned vertices ignore node transforms: fold dequantization into IBM' = IBM · D."""
+    gltf = doc.gltf
+    skins = gltf["skins"]
+    skin = skins[skin_idx]
+    n_joints = len(skin["joints"])
+
+    ibm_idx = skin.get("inverseBindMatrices")
+    if ibm_idx is None:
+        ibm = np.tile(np.eye(4), (n_joints, 1, 1))
+    else:
+        # Column-major storage → row-major matrices
+        ibm = doc.read_accessor(ibm_idx).astype(np.float64).reshape(-1, 4, 4).transpose(0, 2, 1)
+
+    baked = (ibm @ dequant).transpose(0, 2, 1).reshape(-1, 16).astype(np.float32)
+    shared = ibm_idx is not None and sum(
+        s.get("inverseBindMatrices") == ibm_idx for s in skins) > 1
+    if ibm_idx is None or shared:
+        skin["inverseBindMatrices"] = doc.add_accessor(baked, "MAT4", dedupe=False)
+    else:
+        doc.replace_accessor(ibm_idx, baked, "MAT4")
+
+
+def _apply_to_node(nodes, node_idx, offset, scale, animated):
+    """Append the dequantization transform to a mesh node's local transform."""
+    node = nodes[node_idx]
+
+    if animated or node.get("children"):
+        # Can't touch the node's own transform: move the mesh onto a child node
+        child = {"mesh": node.pop("mesh"), "translation": offset.tolist(), "scale": [scale] * 3}
+        if "name" in node:
+            child["name"] = f"{node['name']}_quantized"
+        nodes.append(child)
+        node.setdefault("children", []).append(len(nodes) - 1)
+        return
+
+    if "matrix" in node:
+        m = np.array(node["matrix"], dtype=np.float64).reshape(4, 4).T
+        dequant = np.eye(4)
+        dequant[:3, :3] *= scale
+        dequant[:3, 3] = offset
+        node["matrix"] = (m @ dequant).T.ravel().tolist()
+        return
+
+    # T·R·S·(T_o·S_q) = T'·R·S' with t' = t + R(S·o), s' = S·s_q
+    t = np.array(node.get("translation", [0.0, 0.0, 0.0]), dtype=np.float64)
+    r = node.get("rotation", [0.0, 0.0, 0.0, 1.0])
+    s = np.array(node.get("scale", [1.0, 1.0, 1.0]), dtype=np.float64)
+    node["translation"] = (t + _rotate(r, s * offset)).tolist()
+    node["scale"] = (s * scale).tolist()
+
+
+def _rotate(q, v):
+    """Rotate vector v by unit quaternion q = [x, y, z, w]."""
+    u = np.asarray(q[:3], dtype=np.float64)
+    w = float(q[3])
+    return v + 2.0 * np.cross(u, np.cross(u, v) + w * v)
@@ -9,19 +9,27 @@ import uuid
 import time
 import traceback
 import struct
-import json
-import math
 import copy
+import hashlib
+import importlib.util
+import threading
+from collections import OrderedDict
 from pathlib import Path
 from flask import Blueprint, request, jsonify, send_file
 import numpy as np
-
-# Optional: mesh repair and spatial analysis
-try:
-    import trimesh as _trimesh
-    TRIMESH_AVAILABLE = True
-except ImportError:
-    TRIMESH_AVAILABLE = False
+import glb_io as _glb_io
+import rig_kernels as _rig_kernels
+import rig_cache as _rig_cache
+import rig_templates as _rig_templates
+import anim_math as _anim_math
+import animation_clips as _animation_clips
+import clip_cache as _clip_cache
+import skin_qa as _skin_qa
+import skin_preview as _skin_preview
+from mesh_quantization import maybe_quantize_glb, load_trimesh, drop_extension_if_unused
+
+# Optional: mesh repair and spatial analysis (trimesh is loaded via load_trimesh)
+TRIMESH_AVAILABLE = importlib.util.find_spec("trimesh") is not None
 
 try:
     from scipy.spatial import KDTree as _KDTree
@@ -29,6 +37,13 @@ try:
 except ImportError:
     SCIPY_AVAILABLE = False
 
+# Optional: quadric decimation for proxy rigging (vertex clustering otherwise)
+try:
+    import pymeshlab as _pymeshlab
+    PYMESHLAB_AVAILABLE = True
+except ImportError:
+    PYMESHLAB_AVAILABLE = False
+
 # Create blueprint for Phase 2 routes
 phase2_bp = Blueprint('phase2', __name__, url_prefix='/api/phase2')
 
@@ -104,6 +119,82 @@ class Phase2Config:
     MIN_VRAM_GB = 8              # Minimum VRAM required
     RECOMMENDED_VRAM_GB = 12     # Recommended VRAM
     
+    # Skin attribute encoding for rigged GLB output:
+    #   "float"     — JOINTS_0 UNSIGNED_SHORT, WEIGHTS_0 FLOAT (24 bytes/vertex)
+    #   "compact16" — JOINTS_0 UNSIGNED_BYTE, WEIGHTS_0 normalized UNSIGNED_SHORT (12 bytes/vertex)
+    #   "compact8"  — JOINTS_0 UNSIGNED_BYTE, WEIGHTS_0 normalized UNSIGNED_BYTE (8 bytes/vertex)
+    SKIN_ENCODING = "float"
+    
+    # Memory ceiling for one tile of the blocked point-to-bone distance kernel
+    # (rig_kernels); only the (N, J) float32 result is allocated at full size
+    DISTANCE_KERNEL_MAX_MB = 64
+    
+    # Stop each bone's geodesic search this many sigmas out (None = unbounded);
+    # at 4σ the Gaussian weight is exp(-8) ≈ 3e-4 of the peak
+    GEODESIC_CUTOFF_SIGMAS = None
+    
+    # Vertex weighting engine for rigging (overridable per request):
+    #   "geodesic" — Dijkstra weights + Laplacian + KD-tree smoothing
+    #   "heat"     — heat diffusion, one sparse factorization for all bones
+    #   "template" — copy weights from a pre-weighted template body fitted to
+    #                the mesh (closest-point lookups, no per-mesh weighting)
+    WEIGHTING_ENGINE = "geodesic"
+    
+    # Weight smoothing after the geodesic engine (overridable per request):
+    #   "iterative" — 8 Laplacian passes + 4 KD-tree passes
+    #   "implicit"  — one solve of (I + λL) W = W0 with a cached factorization
+    WEIGHT_SMOOTHING = "iterative"
+    IMPLICIT_SMOOTHING_LAMBDA = 4.0      # diffusion time of the single step
+    IMPLICIT_SMOOTHING_KNN = 0           # add k spatial neighbours per vertex (0 = mesh edges only)
+    IMPLICIT_MAX_WEIGHT_DELTA = None     # per-edge gradient bound after the solve (None = off)
+    IMPLICIT_SMOOTHER_CACHE_SIZE = 4     # factorizations kept for repeat rigs of the same mesh
+    
+    # Workers for one rig request (1 = serial, 0 = all cores). Per-bone
+    # Dijkstra runs in a process pool (it holds the GIL) whose workers import
+    # only rig_kernels, never app.py's torch/diffusers stack; distance tiles
+    # and KD-tree queries run on threads. Output is identical to serial mode.
+    RIG_WORKERS = 1
+    
+    # Meshes with more unique vertices than PROXY_RIG_MIN_VERTS are rigged on
+    # a decimated proxy of ~PROXY_RIG_TARGET_VERTS vertices; weights go back to
+    # every vertex barycentrically from the closest proxy triangle (None = never)
+    PROXY_RIG_MIN_VERTS = 200_000
+    PROXY_RIG_TARGET_VERTS = 15_000
+    # Laplacian passes on the full unique mesh after the transfer, to blend
+    # out the faceting the piecewise-linear interpolation leaves along proxy
+    # edges (the operator is cached on the rig session)
+    PROXY_RIG_SMOOTH_ITERATIONS = 8
+    PROXY_RIG_SMOOTH_STRENGTH = 0.5
+    
+    # Meshes whose marker-independent rig state (unique map, graph, per-bone
+    # distance fields, smoothing operators) stays in memory, so re-rigging
+    # after a marker tweak only re-runs Dijkstra for the bones that moved;
+    # blending and smoothing still cover every bone (0 = off)
+    RIG_SESSION_CACHE_SIZE = 2
+    
+    # Run the inline skin QA (skin_qa: weight sums, joint range, seams,
+    # topology, untargeted bones) on every rig / animate result
+    SKIN_QA = True
+    
+    # Voxel cells along the longest side of the generated capsule-body
+    # templates for weighting="template" (~8k template vertices at 96).
+    # Generated templates are stored: delete cache/templates after changing
+    RIG_TEMPLATE_RESOLUTION = 96
+    
+    # Build (or map) every library clip for the humanoid and quadruped
+    # skeletons in the background when the server registers the Phase 2
+    # routes, so the first animate request per clip only appends packed
+    # blocks (clip_cache). Importing this module never starts it
+    CLIP_CACHE_PREWARM = True
+    
+    # Preview rendered on the CPU (skin_preview: linear blend skinning + a
+    # small rasterizer) next to a rig / animate result: "sprite" (PNG, one
+    # row of frames per clip), "gif" or "none". Off by default — it adds
+    # ~200-500 ms to every call, cache hits included — so clients ask for it
+    # per request. Rig previews play RIG_PREVIEW_ANIMATION from the library
+    PREVIEW_FORMAT = "none"
+    RIG_PREVIEW_ANIMATION = "walk"
+    
     # Model paths (will be populated when models are downloaded)
     TEXTURE_MODEL_PATH = None    # Path to texture generation model
     RIG_MODEL_PATH = None        # Path to auto-rigging model
@@ -257,99 +348,11 @@ class TexturingService:
 # ============================================
 
 def _read_glb(path: str):
-    """Read a GLB file and return (json_chunk, bin_chunk) as dict and bytes."""
-    with open(path, 'rb') as f:
-        magic, version, length = struct.unpack('<III', f.read(12))
-        assert magic == 0x46546C67, "Not a valid GLB file"
-        
-        # JSON chunk
-        chunk_len, chunk_type = struct.unpack('<II', f.read(8))
-        assert chunk_type == 0x4E4F534A  # JSON
-        json_data = json.loads(f.read(chunk_len).decode('utf-8'))
-        
-        # BIN chunk (may not exist)
-        bin_data = b''
-        remaining = length - 12 - 8 - chunk_len
-        if remaining > 8:
-            chunk_len2, chunk_type2 = struct.unpack('<II', f.read(8))
-            if chunk_type2 == 0x004E4942:  # BIN
-                bin_data = f.read(chunk_len2)
-    
-    return json_data, bytearray(bin_data)
-
-
-def _write_glb(path: str, gltf_json: dict, bin_data: bytes):
-    """Write a GLB file from json dict and binary data."""
-    json_str = json.dumps(gltf_json, separators=(',', ':')).encode('utf-8')
-    # Pad JSON to 4-byte alignment
-    while len(json_str) % 4 != 0:
-        json_str += b' '
-    # Pad BIN to 4-byte alignment
-    bin_data = bytearray(bin_data)
-    while len(bin_data) % 4 != 0:
-        bin_data += b'\x00'
-    
-    total_length = 12 + 8 + len(json_str) + 8 + len(bin_data)
-    
-    with open(path, 'wb') as f:
-        # Header
-        f.write(struct.pack('<III', 0x46546C67, 2, total_length))
-        # JSON chunk
-        f.write(struct.pack('<II', len(json_str), 0x4E4F534A))
-        f.write(json_str)
-        # BIN chunk
-        f.write(struct.pack('<II', len(bin_data), 0x004E4942))
-        f.write(bin_data)
-
-
-def _append_to_buffer(bin_data: bytearray, new_bytes: bytes, gltf: dict) -> int:
-    """Append bytes to the binary buffer and return the byte offset. Ensures 4-byte alignment."""
-    # Pad to 4-byte alignment first
-    while len(bin_data) % 4 != 0:
-        bin_data += b'\x00'
-    offset = len(bin_data)
-    bin_data += bytearray(new_bytes)
-    # Update buffer byte length
-    if gltf.get("buffers"):
-        gltf["buffers"][0]["byteLength"] = len(bin_data)
-    return offset
-
-
-def _add_accessor(gltf: dict, buffer_view_idx: int, component_type: int,
-                  count: int, acc_type: str, min_val=None, max_val=None) -> int:
-    """Add an accessor to glTF and return its index."""
-    if "accessors" not in gltf:
-        gltf["accessors"] = []
-    acc = {
-        "bufferView": buffer_view_idx,
-        "componentType": component_type,
-        "count": count,
-        "type": acc_type
-    }
-    if min_val is not None:
-        acc["min"] = min_val
-    if max_val is not None:
-        acc["max"] = max_val
-    gltf["accessors"].append(acc)
-    return len(gltf["accessors"]) - 1
-
-
-def _add_buffer_view(gltf: dict, byte_offset: int, byte_length: int,
-                     target=None, byte_stride=None) -> int:
-    """Add a bufferView and return its index."""
-    if "bufferViews" not in gltf:
-        gltf["bufferViews"] = []
-    bv = {
-        "buffer": 0,
-        "byteOffset": byte_offset,
-        "byteLength": byte_length
-    }
-    if target is not None:
-        bv["target"] = target
-    if byte_stride is not None:
-        bv["byteStride"] = byte_stride
-    gltf["bufferViews"].append(bv)
-    return len(gltf["bufferViews"]) - 1
+    """
+    Read a GLB file and return (json_chunk, bin_chunk).
+    The BIN chunk is a read-only memoryview into a memory map of the file — no copy.
+    """
+    return _glb_io.read_glb(path)
 
 
 def _compute_humanoid_joints(bounds_min, bounds_max):
@@ -447,22 +450,138 @@ def _compute_quadruped_joints(bounds_min, bounds_max):
     return joints
 
 
-def _compute_vertex_weights(positions, joints, character_type):
+# Default marker layouts of the rig panel (front-end RigPanel.jsx), in percent
+# of the view: front view for humanoids (x → X, y ↓ → -Y), side view for
+# quadrupeds (x → Z, head toward -Z). Each marker drives joints with a share
+# of its offset from the default position; "-a" markers are the _l side.
+RIG_MARKER_LAYOUTS = {
+    "humanoid": {
+        "chin":       ((50, 15), {"head": 1.0, "neck": 0.5}),
+        "shoulder-a": ((32, 25), {"arm_l": 1.0, "shoulder_l": 0.5}),
+        "shoulder-b": ((68, 25), {"arm_r": 1.0, "shoulder_r": 0.5}),
+        "elbow-a":    ((24, 40), {"forearm_l": 1.0}),
+        "elbow-b":    ((76, 40), {"forearm_r": 1.0}),
+        "wrist-a":    ((20, 52), {"hand_l": 1.0}),
+        "wrist-b":    ((80, 52), {"hand_r": 1.0}),
+        "groin":      ((50, 55), {"hips": 1.0, "thigh_l": 1.0, "thigh_r": 1.0,
+                                  "spine": 0.66, "spine1": 0.33}),
+        "knee-a":     ((40, 72), {"shin_l": 1.0}),
+        "knee-b":     ((60, 72), {"shin_r": 1.0}),
+        "ankle-a":    ((40, 90), {"foot_l": 1.0, "toe_l": 1.0}),
+        "ankle-b":    ((60, 90), {"foot_r": 1.0, "toe_r": 1.0}),
+    },
+    "quadruped": {
+        "head":        ((15, 30), {"head": 1.0}),
+        "neck":        ((25, 35), {"neck": 1.0}),
+        "spine":       ((50, 40), {"spine": 1.0, "spine1": 0.5}),
+        "hip":         ((75, 38), {"hips": 1.0}),
+        "tail":        ((88, 45), {"tail1": 0.5, "tail2": 1.0}),
+        "front-leg-a": ((28, 70), {"front_arm_l": 1.0, "front_hand_l": 1.0}),
+        "front-leg-b": ((35, 70), {"front_arm_r": 1.0, "front_hand_r": 1.0}),
+        "back-leg-a":  ((70, 70), {"back_shin_l": 1.0, "back_foot_l": 1.0}),
+        "back-leg-b":  ((77, 70), {"back_shin_r": 1.0, "back_foot_r": 1.0}),
+    },
+}
+
+
+def _apply_markers(joints, markers, character_type, bounds_min, bounds_max):
     """
-    Compute per-vertex bone weights using bone-segment distance + Gaussian falloff.
+    Move bounding-box joints by the user's marker edits.
     
-    FALLBACK method — used only when triangle indices or scipy are unavailable.
-    The primary method is _compute_vertex_weights_geodesic() which uses
-    geodesic distance on the mesh surface for SMPL-quality results.
+    markers are the rig panel's [{"id", "position": {"x", "y"}}, ...]. Each
+    known marker's offset from its default layout position, scaled to the mesh
+    bounds, moves the joints it drives (RIG_MARKER_LAYOUTS); untouched markers
+    leave the skeleton exactly as computed. Unknown or malformed markers are
+    ignored.
+    """
+    layout = RIG_MARKER_LAYOUTS.get(character_type, {})
+    offsets = {}
+    for marker in markers or []:
+        if not isinstance(marker, dict) or marker.get("id") not in layout:
+            continue
+        try:
+            x = float(marker["position"]["x"])
+            y = float(marker["position"]["y"])
+        except (KeyError, TypeError, ValueError):
+            continue
+        (x0, y0), shares = layout[marker["id"]]
+        if x == x0 and y == y0:
+            continue
+        for name, share in shares.items():
+            du, dv = offsets.get(name, (0.0, 0.0))
+            offsets[name] = (du + share * (x - x0) / 100.0, dv + share * (y - y0) / 100.0)
+    if not offsets:
+        return joints
     
-    Each vertex gets up to 4 bone influences (glTF JOINTS_0 + WEIGHTS_0).
-    Returns: (joints_array, weights_array) — both as lists of 4-element lists per vertex.
+    axis = 0 if character_type == "humanoid" else 2  # horizontal screen axis
+    extent = [hi - lo for lo, hi in zip(bounds_min, bounds_max)]
+    moved = []
+    for name, parent_idx, pos in joints:
+        if name in offsets:
+            du, dv = offsets[name]
+            pos = list(pos)
+            pos[axis] += du * extent[axis]
+            pos[1] -= dv * extent[1]
+        moved.append((name, parent_idx, pos))
+    print(f"  🎯 Markers moved {len(offsets)} joint(s): {sorted(offsets)[:8]}")
+    return moved
+
+
+class SkinWeights:
     """
-    num_verts = len(positions) // 3
-    num_joints = len(joints)
+    Top-4 skin influences for N vertices, shared by every weighting stage.
     
-    # Reshape positions to (N, 3)
-    P = np.array(positions, dtype=np.float64).reshape(-1, 3)
+    joints:  (N, 4) int16 joint indices
+    weights: (N, 4) float32 weights (rows sum to 1; unused slots are 0)
+    
+    Stages that blend weights work on a dense (N, J) float64 matrix via
+    to_dense() and come back through from_dense(); nothing is materialized
+    as per-vertex Python lists.
+    """
+    __slots__ = ("joints", "weights")
+    
+    def __init__(self, joints, weights):
+        joints = np.asarray(joints)
+        weights = np.asarray(weights)
+        if joints.shape[1] < 4:
+            # Fewer than 4 joints in the skeleton: pad with zero-weight slots
+            pad = ((0, 0), (0, 4 - joints.shape[1]))
+            joints = np.pad(joints, pad)
+            weights = np.pad(weights, pad)
+        self.joints = np.ascontiguousarray(joints, dtype=np.int16)
+        self.weights = np.ascontiguousarray(weights, dtype=np.float32)
+    
+    def __len__(self):
+        return len(self.joints)
+    
+    @classmethod
+    def from_dense(cls, W):
+        """Top-4 of a dense (N, J) weight matrix, renormalized per row."""
+        num_verts, num_joints = W.shape
+        if num_joints > 4:
+            top4_idx = np.argpartition(-W, 4, axis=1)[:, :4]
+        else:
+            top4_idx = np.tile(np.arange(num_joints), (num_verts, 1))
+        top4_w = np.take_along_axis(W, top4_idx, axis=1)
+        totals = top4_w.sum(axis=1, keepdims=True)
+        totals[totals < 1e-10] = 1.0
+        return cls(top4_idx, top4_w / totals)
+    
+    def to_dense(self, num_joints: int):
+        """Scatter into a dense (N, J) float64 matrix."""
+        W = np.zeros((len(self), num_joints), dtype=np.float64)
+        rows = np.repeat(np.arange(len(self)), 4)
+        np.add.at(W, (rows, self.joints.ravel()), self.weights.ravel())
+        return W
+    
+    def take(self, index):
+        """Gather rows, e.g. unique-vertex weights → all original vertices."""
+        return SkinWeights(self.joints[index], self.weights[index])
+
+
+def _bone_segments(joints):
+    """Bone segments (seg_a, seg_b), each (J, 3) float64, shared by every weighting engine."""
+    num_joints = len(joints)
     
     # Build bone segments: from THIS joint toward its CHILD(ren).
     # CRITICAL FIX: The old code used parent→this, which caused child bones
@@ -526,6 +645,28 @@ def _compute_vertex_weights(positions, joints, character_type):
                         best_child = c
             seg_b[i] = np.array(joints[best_child][2], dtype=np.float64)
     
+    return seg_a, seg_b
+
+
+def _compute_vertex_weights(positions, joints, character_type, workers=1):
+    """
+    Compute per-vertex bone weights using bone-segment distance + Gaussian falloff.
+    
+    FALLBACK method — used only when triangle indices or scipy are unavailable.
+    The primary method is _compute_vertex_weights_geodesic() which uses
+    geodesic distance on the mesh surface for SMPL-quality results.
+    
+    Each vertex gets up to 4 bone influences (glTF JOINTS_0 + WEIGHTS_0).
+    Returns SkinWeights ((N, 4) int16 joints, (N, 4) float32 weights).
+    """
+    num_verts = len(positions) // 3
+    num_joints = len(joints)
+    
+    # Reshape positions to (N, 3)
+    P = np.array(positions, dtype=np.float64).reshape(-1, 3)
+    
+    seg_a, seg_b = _bone_segments(joints)
+    
     # Compute adaptive sigma from average bone length
     bone_vecs = seg_b - seg_a
     bone_lengths = np.linalg.norm(bone_vecs, axis=1)
@@ -536,27 +677,10 @@ def _compute_vertex_weights(positions, joints, character_type):
     
     print(f"    📊 Avg bone length: {avg_bone_len:.4f}, sigma: {sigma:.4f}")
     
-    # --- Vectorized point-to-segment distance computation ---
-    # P: (N, 3), seg_a: (J, 3), seg_b: (J, 3)
-    # Broadcast: P -> (N, 1, 3), seg -> (1, J, 3)
-    
-    Pv = P[:, np.newaxis, :]       # (N, 1, 3)
-    A = seg_a[np.newaxis, :, :]    # (1, J, 3)
-    B = seg_b[np.newaxis, :, :]    # (1, J, 3)
-    
-    AB = B - A                      # (1, J, 3) bone direction vectors
-    AP = Pv - A                     # (N, J, 3) vertex-to-segment-start vectors
-    
-    # Project vertex onto bone line: t = dot(AP, AB) / dot(AB, AB)
-    ab_sq = np.sum(AB * AB, axis=2)              # (1, J)
-    ab_sq_safe = np.maximum(ab_sq, 1e-12)        # avoid division by zero
-    ap_dot_ab = np.sum(AP * AB, axis=2)           # (N, J)
-    t = np.clip(ap_dot_ab / ab_sq_safe, 0.0, 1.0)  # (N, J) clamped to segment
-    
-    # Closest point on segment: A + t * AB
-    closest_pt = A + t[:, :, np.newaxis] * AB     # (N, J, 3)
-    diff = Pv - closest_pt                         # (N, J, 3)
-    dist_sq = np.sum(diff * diff, axis=2)          # (N, J)
+    # --- Point-to-segment distance (blocked float32 kernel, bounded memory) ---
+    dist_sq = _rig_kernels.point_segment_dist_sq(
+        P, seg_a, seg_b, max_bytes=Phase2Config.DISTANCE_KERNEL_MAX_MB << 20, workers=workers
+    ).astype(np.float64)                           # (N, J)
     
     # Gaussian weights: exp(-d² / 2σ²)
     raw_weights = np.exp(-dist_sq / sigma_sq_2)    # (N, J)
@@ -566,7 +690,7 @@ def _compute_vertex_weights(positions, joints, character_type):
     raw_weights = raw_weights ** 1.5
     
     # Gentle nearest-bone preference (2x, NOT 25x which creates sharp boundaries)
-    nearest_bone = np.argmin(dist_sq, axis=1)  # (N,)
+    nearest_bone = _rig_kernels.argmin_ties_low(dist_sq)  # (N,), ties → lowest bone index
     raw_weights[np.arange(num_verts), nearest_bone] *= 2.0
     
     # Pick top 4 bones per vertex
@@ -583,14 +707,46 @@ def _compute_vertex_weights(positions, joints, character_type):
     w_sum = np.maximum(w_sum, 1e-10)
     top4_w = top4_w / w_sum
     
-    # Convert to Python lists
-    all_joints = top4_idx.astype(int).tolist()
-    all_weights = top4_w.tolist()
+    return SkinWeights(top4_idx, top4_w)
+
+
+def _geodesic_graph(P, indices, coloc=None):
+    """Edge-length weighted mesh graph (CSR) plus near-zero UV seam bridge edges."""
+    from scipy.sparse import coo_matrix
+    
+    num_verts = len(P)
+    idx_arr = np.array(indices, dtype=np.int32)
+    num_tris = len(idx_arr) // 3
+    tris = idx_arr.reshape(num_tris, 3)
+    
+    # Symmetric weighted adjacency matrix (weight = edge length)
+    edge_pairs = np.vstack([tris[:, [0, 1]], tris[:, [1, 2]], tris[:, [2, 0]]])
+    edge_lens = np.linalg.norm(P[edge_pairs[:, 0]] - P[edge_pairs[:, 1]], axis=1)
+    
+    rows = np.concatenate([edge_pairs[:, 0], edge_pairs[:, 1]])
+    cols = np.concatenate([edge_pairs[:, 1], edge_pairs[:, 0]])
+    vals = np.concatenate([edge_lens, edge_lens])
+    
+    # Add co-located vertex bridge edges (cross UV seams)
+    # GLB meshes have split vertices at UV seams with identical positions but
+    # different indices. Without bridges, geodesic distance can't cross seams.
+    if coloc is None:
+        coloc = _ColocationIndex(P)
+    bridge_rows, bridge_cols = coloc.bridge_pairs()
+    
+    if len(bridge_rows):
+        rows = np.concatenate([rows, bridge_rows.astype(rows.dtype)])
+        cols = np.concatenate([cols, bridge_cols.astype(cols.dtype)])
+        vals = np.concatenate([vals, np.full(len(bridge_rows), 1e-6)])  # near-zero weight = same position
+        print(f"    \U0001f309 Added {len(bridge_rows)} UV seam bridge edges")
     
-    return all_joints, all_weights
+    graph = coo_matrix((vals, (rows, cols)), shape=(num_verts, num_verts)).tocsr()
+    print(f"    \U0001f4ca Mesh graph: {num_verts} verts, {len(edge_pairs)} face edges")
+    return graph
 
 
-def _compute_vertex_weights_geodesic(positions, joints, indices, character_type):
+def _compute_vertex_weights_geodesic(positions, joints, indices, character_type, coloc=None,
+                                     workers=1, state=None):
     """
     SMPL-inspired vertex weight computation using geodesic distance on mesh surface.
     
@@ -605,10 +761,12 @@ def _compute_vertex_weights_geodesic(positions, joints, indices, character_type)
     
     This mimics SMPL/SMPL-X skin weights where bone influence follows the body
     surface topology, not straight-line 3D distance.
-    """
-    from scipy.sparse import coo_matrix
-    from scipy.sparse.csgraph import dijkstra as sp_dijkstra
     
+    `coloc` is the rig request's _ColocationIndex for these positions (built
+    here if not given). With workers > 1 the per-bone Dijkstra passes run in
+    a process pool. With a _WeightingState, the edge graph and each bone's
+    distance field are reused; only bones whose segment moved are re-run.
+    """
     num_verts = len(positions) // 3
     num_joints = len(joints)
     P = np.array(positions, dtype=np.float64).reshape(-1, 3)
@@ -616,149 +774,76 @@ def _compute_vertex_weights_geodesic(positions, joints, indices, character_type)
     print(f"    \U0001f52c SMPL-inspired geodesic weight computation...")
     
     # ── Step 1: Build mesh edge graph ──
-    idx_arr = np.array(indices, dtype=np.int32)
-    num_tris = len(idx_arr) // 3
-    tris = idx_arr.reshape(num_tris, 3)
-    
-    # Symmetric weighted adjacency matrix (weight = edge length)
-    edge_pairs = np.vstack([tris[:, [0, 1]], tris[:, [1, 2]], tris[:, [2, 0]]])
-    edge_lens = np.linalg.norm(P[edge_pairs[:, 0]] - P[edge_pairs[:, 1]], axis=1)
-    
-    rows = np.concatenate([edge_pairs[:, 0], edge_pairs[:, 1]])
-    cols = np.concatenate([edge_pairs[:, 1], edge_pairs[:, 0]])
-    vals = np.concatenate([edge_lens, edge_lens])
-    
-    # Add co-located vertex bridge edges (cross UV seams)
-    # GLB meshes have split vertices at UV seams with identical positions but
-    # different indices. Without bridges, geodesic distance can't cross seams.
-    BRIDGE_DECIMALS = 4
-    _coloc = {}
-    for vi in range(num_verts):
-        key = (round(float(P[vi, 0]), BRIDGE_DECIMALS),
-               round(float(P[vi, 1]), BRIDGE_DECIMALS),
-               round(float(P[vi, 2]), BRIDGE_DECIMALS))
-        if key not in _coloc:
-            _coloc[key] = []
-        _coloc[key].append(vi)
-    
-    bridge_rows, bridge_cols, bridge_vals = [], [], []
-    for _grp in _coloc.values():
-        if len(_grp) <= 1:
-            continue
-        for _a in _grp:
-            for _b in _grp:
-                if _a != _b:
-                    bridge_rows.append(_a)
-                    bridge_cols.append(_b)
-                    bridge_vals.append(1e-6)  # near-zero weight = same position
-    
-    if bridge_rows:
-        rows = np.concatenate([rows, np.array(bridge_rows, dtype=rows.dtype)])
-        cols = np.concatenate([cols, np.array(bridge_cols, dtype=cols.dtype)])
-        vals = np.concatenate([vals, np.array(bridge_vals, dtype=vals.dtype)])
-        print(f"    \U0001f309 Added {len(bridge_rows)} UV seam bridge edges")
-    
-    graph = coo_matrix((vals, (rows, cols)), shape=(num_verts, num_verts)).tocsr()
-    print(f"    \U0001f4ca Mesh graph: {num_verts} verts, {len(edge_pairs)} face edges")
+    if state is not None and state.graph is not None:
+        graph = state.graph
+        print(f"    \U0001f4ca Mesh graph: {num_verts} verts (cached)")
+    else:
+        graph = _geodesic_graph(P, indices, coloc)
+        if state is not None:
+            state.graph = graph
     
     # ── Step 2: Build bone segments (this→child) ──
-    _children_map = [[] for _ in range(num_joints)]
-    for _idx, (_n, _par, _p) in enumerate(joints):
-        if _par >= 0:
-            _children_map[_par].append(_idx)
-    
-    seg_a = np.zeros((num_joints, 3), dtype=np.float64)
-    seg_b = np.zeros((num_joints, 3), dtype=np.float64)
-    
-    for i, (name, parent_idx, pos) in enumerate(joints):
-        this_pos = np.array(pos, dtype=np.float64)
-        seg_a[i] = this_pos
-        
-        ch = _children_map[i]
-        if not ch:
-            if parent_idx >= 0:
-                par_pos = np.array(joints[parent_idx][2], dtype=np.float64)
-                direction = this_pos - par_pos
-                d_len = np.linalg.norm(direction)
-                if d_len > 1e-6:
-                    seg_b[i] = this_pos + direction * 1.0
-                else:
-                    seg_b[i] = this_pos + np.array([0, 0.01, 0])
-            else:
-                seg_b[i] = this_pos + np.array([0, 0.01, 0])
-        elif len(ch) == 1:
-            seg_b[i] = np.array(joints[ch[0]][2], dtype=np.float64)
-        else:
-            if parent_idx >= 0:
-                par_pos = np.array(joints[parent_idx][2], dtype=np.float64)
-                dir_vec = this_pos - par_pos
-                d_len = np.linalg.norm(dir_vec)
-                dir_norm = dir_vec / d_len if d_len > 1e-8 else np.array([0, 1, 0])
-            else:
-                dir_norm = np.array([0, 1, 0])
-            best_child = ch[0]
-            best_dot = -999.0
-            for c in ch:
-                child_pos = np.array(joints[c][2], dtype=np.float64)
-                to_child = child_pos - this_pos
-                tc_len = np.linalg.norm(to_child)
-                if tc_len > 1e-8:
-                    dot = np.dot(dir_norm, to_child / tc_len)
-                    if dot > best_dot:
-                        best_dot = dot
-                        best_child = c
-            seg_b[i] = np.array(joints[best_child][2], dtype=np.float64)
+    seg_a, seg_b = _bone_segments(joints)
     
-    # ── Step 3: Euclidean point-to-segment distance (for seed selection) ──
-    Pv = P[:, np.newaxis, :]       # (N, 1, 3)
-    A = seg_a[np.newaxis, :, :]    # (1, J, 3)
-    B = seg_b[np.newaxis, :, :]    # (1, J, 3)
-    AB = B - A
-    AP = Pv - A
-    ab_sq = np.sum(AB * AB, axis=2)
-    ab_sq_safe = np.maximum(ab_sq, 1e-12)
-    ap_dot_ab = np.sum(AP * AB, axis=2)
-    t = np.clip(ap_dot_ab / ab_sq_safe, 0.0, 1.0)
-    closest_pt = A + t[:, :, np.newaxis] * AB
-    diff = Pv - closest_pt
-    euc_dist_sq = np.sum(diff * diff, axis=2)  # (N, J)
-    
-    # ── Step 4: Multi-seed Dijkstra for geodesic distances ──
+    # ── Step 3+4: Multi-seed Dijkstra for geodesic distances ──
     # Use multiple seeds per bone (closest K vertices to bone segment)
-    # to ensure coverage on both sides of thin geometry.
-    euc_dists = np.sqrt(euc_dist_sq)  # (N, J)
+    # to ensure coverage on both sides of thin geometry. Seeds come from the
+    # blocked distance kernel, which streams tiles and never builds (N, J).
     bone_lengths = np.linalg.norm(seg_b - seg_a, axis=1)
     valid_lengths = bone_lengths[bone_lengths > 1e-6]
     avg_bone_len = float(valid_lengths.mean()) if len(valid_lengths) > 0 else 0.1
     
     SEEDS_PER_BONE = 8
-    all_seeds = []
-    seed_bone_map = []  # which bone each seed belongs to
-    
-    for bone_idx in range(num_joints):
-        bone_euc = euc_dists[:, bone_idx]  # (N,)
-        k = min(SEEDS_PER_BONE, num_verts)
-        closest_k = np.argpartition(bone_euc, k)[:k]
-        for v in closest_k:
-            all_seeds.append(int(v))
-            seed_bone_map.append(bone_idx)
-    
-    # Deduplicate seeds for efficiency
-    unique_seeds = list(set(all_seeds))
-    seed_idx_lookup = {v: i for i, v in enumerate(unique_seeds)}
-    
-    print(f"    \U0001f4ca Running Dijkstra from {len(unique_seeds)} unique seeds ({SEEDS_PER_BONE}/bone)...")
     
-    geo_from_seeds = sp_dijkstra(graph, directed=False, indices=unique_seeds)
-    # Shape: (len(unique_seeds), N)
-    
-    # For each bone, take minimum geodesic distance across its seeds
-    geo_dists = np.full((num_joints, num_verts), np.inf, dtype=np.float64)
-    for seed_pos_in_list, (seed_v, bone_idx) in enumerate(zip(all_seeds, seed_bone_map)):
-        row_idx = seed_idx_lookup[seed_v]
-        np.minimum(geo_dists[bone_idx], geo_from_seeds[row_idx], out=geo_dists[bone_idx])
+    # SMPL-like sigma: wide Gaussian for very smooth weight transitions at joints
+    sigma = avg_bone_len * 1.5
+    sigma_sq_2 = 2.0 * sigma * sigma
     
-    # Handle unreachable vertices (disconnected components)
+    # One multi-source Dijkstra per bone: min_only=True returns the distance to
+    # the NEAREST of the bone's seeds directly — J runs, (J, N) memory — instead
+    # of one run per seed and a dense (S, N) matrix. Past the optional cutoff
+    # the Gaussian weight is effectively zero, so the search stops there.
+    cutoff_sigmas = Phase2Config.GEODESIC_CUTOFF_SIGMAS
+    limit = cutoff_sigmas * sigma if cutoff_sigmas else np.inf
+    
+    # Distance fields depend only on the graph, the bone's segment and the
+    # cutoff: with a state, bones whose segment is unchanged keep theirs
+    segments = np.stack([seg_a, seg_b], axis=1)  # (J, 2, 3)
+    if (state is not None and state.geo_dists is not None and state.geo_limit == limit
+            and state.segments.shape == segments.shape):
+        stale = np.flatnonzero((state.segments != segments).any(axis=(1, 2)))
+        geo_dists = state.geo_dists
+    else:
+        stale = np.arange(num_joints)
+        geo_dists = np.empty((num_joints, num_verts), dtype=np.float64)
+    
+    if len(stale):
+        closest = _rig_kernels.nearest_points_per_segment(
+            P, seg_a[stale], seg_b[stale], SEEDS_PER_BONE,
+            max_bytes=Phase2Config.DISTANCE_KERNEL_MAX_MB << 20, workers=workers
+        )  # (len(stale), k)
+        print(f"    \U0001f4ca Running {len(stale)} multi-source Dijkstra passes "
+              f"({closest.shape[1]} seeds/bone"
+              + (f", {num_joints - len(stale)} bones cached" if len(stale) < num_joints else "")
+              + (f", cutoff {cutoff_sigmas:g}\u03c3 = {limit:.4f}" if cutoff_sigmas else "")
+              + (f", {workers} workers)..." if workers > 1 else ")..."))
+        geo_dists[stale] = _rig_kernels.multi_source_dijkstra(graph, closest, limit=limit,
+                                                              workers=workers)
+    else:
+        print(f"    \U0001f4ca All {num_joints} bone distance fields cached")
+    if state is not None:
+        state.segments, state.geo_dists, state.geo_limit = segments, geo_dists, limit
+    
+    if cutoff_sigmas:
+        # Vertices beyond the cutoff from EVERY bone fall back to Euclidean distance
+        lost = ~np.isfinite(geo_dists).any(axis=0)
+        if lost.any():
+            euc = _rig_kernels.point_segment_dist_sq(P[lost], seg_a, seg_b, workers=workers)
+            geo_dists = geo_dists.copy()  # keep the cached fields raw
+            geo_dists[:, lost] = np.sqrt(euc.T)
+            print(f"    \u26a0\ufe0f {int(lost.sum())} vertices beyond geodesic cutoff \u2192 Euclidean fallback")
+    
+    # Handle unreachable vertices (disconnected components / beyond cutoff)
     finite_mask = np.isfinite(geo_dists)
     if not finite_mask.all():
         max_finite = np.max(geo_dists[finite_mask]) if finite_mask.any() else 1.0
@@ -767,10 +852,6 @@ def _compute_vertex_weights_geodesic(positions, joints, indices, character_type)
         print(f"    \u26a0\ufe0f {unreachable} unreachable vertex-bone pairs clamped")
     
     # ── Step 5: Smooth Gaussian on geodesic distance ──
-    # SMPL-like sigma: wide Gaussian for very smooth weight transitions at joints
-    sigma = avg_bone_len * 1.5
-    sigma_sq_2 = 2.0 * sigma * sigma
-    
     print(f"    \U0001f4ca Avg bone length: {avg_bone_len:.4f}, geodesic sigma: {sigma:.4f}")
     
     # Gaussian weights from geodesic distances (N, J)
@@ -778,7 +859,7 @@ def _compute_vertex_weights_geodesic(positions, joints, indices, character_type)
     raw_weights = np.exp(-geo_dists_T**2 / sigma_sq_2)
     
     # Gentle nearest-bone preference (2x, NOT the old 25x)
-    nearest_bone = np.argmin(geo_dists_T, axis=1)
+    nearest_bone = _rig_kernels.argmin_ties_low(geo_dists_T)
     raw_weights[np.arange(num_verts), nearest_bone] *= 2.0
     
     # NO power^5 sharpening — SMPL uses smooth weight fields
@@ -800,43 +881,50 @@ def _compute_vertex_weights_geodesic(positions, joints, indices, character_type)
     print(f"    \U0001f4ca Geodesic weights: mean_dominant={dominant_w.mean():.3f}, "
           f"min={dominant_w.min():.3f}, max={dominant_w.max():.3f}")
     
-    all_joints = top4_idx.astype(int).tolist()
-    all_weights = top4_w.tolist()
+    return SkinWeights(top4_idx, top4_w)
+
+
+def _compute_vertex_weights_heat(positions, joints, indices, character_type, workers=1):
+    """
+    Heat-diffusion vertex weights (Pinocchio-style bone heat).
+    
+    Each bone's weight is the equilibrium of heat diffusing over the surface
+    from the vertices it is nearest to: (K + M·H) w_j = M·H·p_j, with K the
+    cotangent Laplacian of the de-duplicated mesh and H = 1/d² to the nearest
+    bone. All J right-hand sides are solved against ONE factorization, and the
+    result is already smooth — it replaces geodesic Dijkstra + Laplacian +
+    KD-tree smoothing in the pipeline.
+    """
+    P = np.asarray(positions, dtype=np.float64).reshape(-1, 3)
+    num_joints = len(joints)
+    seg_a, seg_b = _bone_segments(joints)
+    
+    t0 = time.time()
+    W, solver = _rig_kernels.heat_weights(
+        P, indices, seg_a, seg_b, max_bytes=Phase2Config.DISTANCE_KERNEL_MAX_MB << 20,
+        workers=workers
+    )
+    print(f"    \U0001f525 Heat weights: {len(P)} verts \u00d7 {num_joints} bones, "
+          f"one {solver} factorization ({time.time() - t0:.2f}s)")
     
-    return all_joints, all_weights
+    skin = SkinWeights.from_dense(W)
+    dominant_w = skin.weights.max(axis=1)
+    print(f"    \U0001f4ca Heat weights: mean_dominant={dominant_w.mean():.3f}, "
+          f"min={dominant_w.min():.3f}, max={dominant_w.max():.3f}")
+    return skin
 
 
 def _read_mesh_indices(gltf, bin_data, primitive):
     """
     Read triangle indices from a glTF mesh primitive.
-    Returns flat list of vertex indices, or None if non-indexed.
+    Returns a flat NumPy index array (zero-copy view when possible), or None if non-indexed.
     """
-    if "indices" not in primitive:
-        return None
-    
-    idx_accessor = gltf["accessors"][primitive["indices"]]
-    idx_bv = gltf["bufferViews"][idx_accessor["bufferView"]]
-    idx_offset = idx_bv.get("byteOffset", 0) + idx_accessor.get("byteOffset", 0)
-    idx_count = idx_accessor["count"]
-    comp_type = idx_accessor["componentType"]
-    
-    indices = []
-    for i in range(idx_count):
-        if comp_type == 5123:   # UNSIGNED_SHORT
-            val = struct.unpack_from('<H', bin_data, idx_offset + i * 2)[0]
-        elif comp_type == 5125:  # UNSIGNED_INT
-            val = struct.unpack_from('<I', bin_data, idx_offset + i * 4)[0]
-        elif comp_type == 5121:  # UNSIGNED_BYTE
-            val = struct.unpack_from('<B', bin_data, idx_offset + i)[0]
-        else:
-            return None
-        indices.append(val)
-    
-    return indices
+    return _glb_io.read_indices(gltf, bin_data, primitive)
 
 
-def _smooth_vertex_weights(all_joints, all_weights, indices, num_verts, num_joints,
-                           positions=None, iterations=2, strength=0.5):
+def _smooth_vertex_weights(skin, indices, num_verts, num_joints,
+                           positions=None, iterations=2, strength=0.5, coloc=None,
+                           adjacency=None):
     """
     Smooth skinning weights using mesh face-connectivity + UV seam bridging.
     
@@ -850,28 +938,43 @@ def _smooth_vertex_weights(all_joints, all_weights, indices, num_verts, num_join
     Uses sparse matrix multiplication for fast vectorized smoothing.
     
     Args:
-        all_joints: list of [j0,j1,j2,j3] per vertex
-        all_weights: list of [w0,w1,w2,w3] per vertex
+        skin: SkinWeights for the vertices
         indices: flat triangle index list
         num_verts: total vertex count
         num_joints: total joint count
         positions: flat [x,y,z,...] position list (needed for co-located detection)
         iterations: smoothing passes (more = smoother)
         strength: blend factor (0=no smooth, 1=full neighbor average)
+        coloc: shared _ColocationIndex (takes precedence over positions)
+        adjacency: cached _laplacian_operator() result for these indices
     
-    Returns: (smoothed_joints, smoothed_weights) in same format
+    Returns: smoothed SkinWeights
     """
     if indices is None or len(indices) < 3:
-        return all_joints, all_weights
+        return skin
     
-    from scipy.sparse import coo_matrix as _coo, diags as _diags
+    if adjacency is None:
+        adjacency = _laplacian_operator(indices, num_verts, positions, coloc)
+    S, bridge_count = adjacency
+    
+    W = skin.to_dense(num_joints)  # (N, J)
     
-    # Build dense weight matrix (N, J) from sparse top-4 representation (vectorized)
-    J_arr = np.array(all_joints, dtype=np.int32)    # (N, 4)
-    W_arr = np.array(all_weights, dtype=np.float64)  # (N, 4)
-    W = np.zeros((num_verts, num_joints), dtype=np.float64)
-    vi_idx = np.arange(num_verts)[:, None].repeat(4, axis=1)  # (N, 4)
-    np.add.at(W, (vi_idx.ravel(), J_arr.ravel()), W_arr.ravel())
+    # Vectorized Laplacian smoothing: W_new = (1-s)*W + s*(S @ W)
+    for _it in range(iterations):
+        W_avg = S @ W  # (N, J) — average of neighbor weights
+        W = (1.0 - strength) * W + strength * W_avg
+    
+    print(f"    🔄 Laplacian smoothing: {iterations} iters, strength={strength}, "
+          f"{bridge_count} UV seam bridges")
+    return SkinWeights.from_dense(W)
+
+
+def _laplacian_operator(indices, num_verts, positions=None, coloc=None):
+    """
+    Row-normalized face adjacency + UV seam bridges, S = D^-1 A, for
+    _smooth_vertex_weights. Returns (S, bridge_count).
+    """
+    from scipy.sparse import coo_matrix as _coo, diags as _diags
     
     # Build adjacency from face indices
     idx_arr = np.array(indices, dtype=np.int32)
@@ -889,30 +992,13 @@ def _smooth_vertex_weights(all_joints, all_weights, indices, num_verts, num_join
     
     # ── Add co-located vertex bridge edges (cross UV seams) ──
     bridge_count = 0
-    if positions is not None:
-        BRIDGE_DEC = 4
-        _coloc_groups = {}
-        for vi in range(num_verts):
-            key = (round(positions[vi * 3], BRIDGE_DEC),
-                   round(positions[vi * 3 + 1], BRIDGE_DEC),
-                   round(positions[vi * 3 + 2], BRIDGE_DEC))
-            if key not in _coloc_groups:
-                _coloc_groups[key] = []
-            _coloc_groups[key].append(vi)
-        
-        br_rows, br_cols = [], []
-        for _grp in _coloc_groups.values():
-            if len(_grp) <= 1:
-                continue
-            for _a in _grp:
-                for _b in _grp:
-                    if _a != _b:
-                        br_rows.append(_a)
-                        br_cols.append(_b)
-        
-        if br_rows:
-            rows = np.concatenate([rows, np.array(br_rows, dtype=np.int32)])
-            cols = np.concatenate([cols, np.array(br_cols, dtype=np.int32)])
+    if coloc is None and positions is not None:
+        coloc = _ColocationIndex(positions)
+    if coloc is not None:
+        br_rows, br_cols = coloc.bridge_pairs()
+        if len(br_rows):
+            rows = np.concatenate([rows, br_rows.astype(np.int32)])
+            cols = np.concatenate([cols, br_cols.astype(np.int32)])
             bridge_count = len(br_rows)
     
     # Build sparse adjacency matrix (binary: 1 = connected)
@@ -924,30 +1010,10 @@ def _smooth_vertex_weights(all_joints, all_weights, indices, num_verts, num_join
     degrees[degrees < 1e-10] = 1.0
     D_inv = _diags(1.0 / degrees)
     S = D_inv @ A  # row-normalized adjacency
-    
-    # Vectorized Laplacian smoothing: W_new = (1-s)*W + s*(S @ W)
-    for _it in range(iterations):
-        W_avg = S @ W  # (N, J) — average of neighbor weights
-        W = (1.0 - strength) * W + strength * W_avg
-    
-    # Convert back to top-4 sparse format (fully vectorized)
-    if num_joints > 4:
-        top4_idx = np.argpartition(-W, 4, axis=1)[:, :4]  # (N, 4)
-    else:
-        top4_idx = np.tile(np.arange(num_joints), (num_verts, 1))
-    top4_w = np.take_along_axis(W, top4_idx, axis=1)  # (N, 4)
-    totals = top4_w.sum(axis=1, keepdims=True)
-    totals[totals < 1e-10] = 1.0
-    top4_w /= totals
-    new_joints = top4_idx.astype(int).tolist()
-    new_weights = top4_w.tolist()
-    
-    print(f"    🔄 Laplacian smoothing: {iterations} iters, strength={strength}, "
-          f"{bridge_count} UV seam bridges")
-    return new_joints, new_weights
+    return S, bridge_count
 
 
-def _weld_vertex_weights(positions, all_joints, all_weights, num_joints):
+def _weld_vertex_weights(positions, skin, num_joints, coloc=None):
     """
     Ensure vertices at the same spatial position get IDENTICAL weights.
     
@@ -958,59 +1024,35 @@ def _weld_vertex_weights(positions, all_joints, all_weights, num_joints):
     Fix: group by position (4-decimal grid ≈ 0.1mm), force bitwise-identical
     weights for all vertices in each group.
     """
-    num_verts = len(positions) // 3
-    
     # 4 decimal places — coarser grid catches more co-located vertices
-    DECIMALS = 4
-    groups = {}
-    for vi in range(num_verts):
-        key = (
-            round(positions[vi * 3], DECIMALS),
-            round(positions[vi * 3 + 1], DECIMALS),
-            round(positions[vi * 3 + 2], DECIMALS),
-        )
-        if key not in groups:
-            groups[key] = []
-        groups[key].append(vi)
-    
-    welded_count = 0
-    dup_groups = 0
-    for key, verts in groups.items():
-        if len(verts) <= 1:
-            continue
-        dup_groups += 1
-        
-        # Build dense weight vector — average across all co-located vertices
-        avg_w = np.zeros(num_joints, dtype=np.float64)
-        for vi in verts:
-            for k in range(4):
-                avg_w[all_joints[vi][k]] += all_weights[vi][k]
-        avg_w /= len(verts)
-        
-        # Extract top-4 and normalize
-        if num_joints <= 4:
-            top4 = np.arange(num_joints)
-        else:
-            top4 = np.argpartition(-avg_w, 4)[:4]
-        w4 = avg_w[top4]
-        total = w4.sum()
-        if total < 1e-10:
-            total = 1.0
-        w4 = w4 / total
-        
-        # Force bitwise-identical weights to ALL co-located vertices
-        top4_list = top4.astype(int).tolist()
-        w4_list = w4.tolist()
-        for vi in verts:
-            all_joints[vi] = top4_list[:]
-            all_weights[vi] = w4_list[:]
-        welded_count += len(verts)
-    
-    print(f"    🔗 Vertex welding: {dup_groups} dup groups, {welded_count} verts unified")
-    return all_joints, all_weights
-
-
-def _cleanup_tiny_weights(all_joints, all_weights, num_verts, min_weight=0.02):
+    if coloc is None:
+        coloc = _ColocationIndex(positions)
+    
+    dup = coloc.counts > 1
+    dup_groups = int(dup.sum())
+    if not dup_groups:
+        print("    🔗 Vertex welding: 0 dup groups, 0 verts unified")
+        return skin
+    
+    # Average dense weights per group, then top-4 + normalize once per group
+    W = skin.to_dense(num_joints)
+    group_W = np.zeros((coloc.num_unique, num_joints), dtype=np.float64)
+    np.add.at(group_W, coloc.inverse, W)
+    group_W /= coloc.counts[:, None]
+    group_skin = SkinWeights.from_dense(group_W)
+    
+    # Force bitwise-identical weights to ALL co-located vertices
+    welded = dup[coloc.inverse]
+    joints = skin.joints.copy()
+    weights = skin.weights.copy()
+    joints[welded] = group_skin.joints[coloc.inverse[welded]]
+    weights[welded] = group_skin.weights[coloc.inverse[welded]]
+    
+    print(f"    🔗 Vertex welding: {dup_groups} dup groups, {int(welded.sum())} verts unified")
+    return SkinWeights(joints, weights)
+
+
+def _cleanup_tiny_weights(skin, min_weight=0.02):
     """
     Clamp tiny bone weights to zero and redistribute.
     
@@ -1018,29 +1060,23 @@ def _cleanup_tiny_weights(all_joints, all_weights, num_verts, min_weight=0.02):
     each contribute a tiny amount → unpredictable motion → micro-tearing.
     Better to have 2-3 clean influences than 4 noisy ones.
     """
-    cleaned = 0
-    for vi in range(num_verts):
-        w = all_weights[vi]
-        any_tiny = False
-        for k in range(4):
-            if 0 < w[k] < min_weight:
-                w[k] = 0.0
-                any_tiny = True
-                cleaned += 1
-        if any_tiny:
-            total = sum(w)
-            if total > 1e-10:
-                all_weights[vi] = [x / total for x in w]
-            else:
-                # Fallback: give full weight to first bone
-                all_weights[vi] = [1.0, 0.0, 0.0, 0.0]
+    w = skin.weights.copy()
+    tiny = (w > 0) & (w < min_weight)
+    cleaned = int(tiny.sum())
+    
+    rows = tiny.any(axis=1)
+    w[tiny] = 0.0
+    totals = w[rows].sum(axis=1, keepdims=True)
+    # Fallback: give full weight to first bone
+    w[rows] = np.where(totals > 1e-10, w[rows] / np.maximum(totals, 1e-10),
+                       np.array([1.0, 0.0, 0.0, 0.0], dtype=np.float32))
     
     print(f"    🧹 Weight cleanup: {cleaned} tiny weights (<{min_weight}) zeroed")
-    return all_joints, all_weights
+    return SkinWeights(skin.joints, w)
 
 
-def _enforce_weight_gradient(all_joints, all_weights, indices, positions,
-                             num_verts, num_joints, max_delta=0.3, iterations=5):
+def _enforce_weight_gradient(skin, indices, positions,
+                             num_verts, num_joints, max_delta=0.3, iterations=5, coloc=None):
     """
     Enforce smooth weight gradients between adjacent vertices.
     
@@ -1052,96 +1088,208 @@ def _enforce_weight_gradient(all_joints, all_weights, indices, positions,
     problematic boundaries — preserves clean weights in smooth regions.
     """
     if indices is None or len(indices) < 3:
-        return all_joints, all_weights
-    
-    # Build dense weight matrix
-    W = np.zeros((num_verts, num_joints), dtype=np.float64)
-    for vi in range(num_verts):
-        for k in range(4):
-            W[vi, all_joints[vi][k]] += all_weights[vi][k]
+        return skin
     
-    # Build edge list from triangles
-    idx_arr = np.array(indices, dtype=np.int32)
-    num_tris = len(idx_arr) // 3
-    tris = idx_arr.reshape(num_tris, 3)
-    edges = set()
-    for tri in tris:
-        for a, b in [(tri[0], tri[1]), (tri[1], tri[2]), (tri[0], tri[2])]:
-            edges.add((min(a, b), max(a, b)))
-    edges = list(edges)
-    e0 = np.array([e[0] for e in edges], dtype=np.int32)
-    e1 = np.array([e[1] for e in edges], dtype=np.int32)
-    
-    # Also add co-located vertex pairs
-    if positions is not None:
-        BRIDGE_DEC = 4
-        _coloc = {}
-        for vi in range(num_verts):
-            key = (round(positions[vi * 3], BRIDGE_DEC),
-                   round(positions[vi * 3 + 1], BRIDGE_DEC),
-                   round(positions[vi * 3 + 2], BRIDGE_DEC))
-            if key not in _coloc:
-                _coloc[key] = []
-            _coloc[key].append(vi)
-        for grp in _coloc.values():
-            if len(grp) > 1:
-                for ia in range(len(grp)):
-                    for ib in range(ia + 1, len(grp)):
-                        edges.append((grp[ia], grp[ib]))
-        e0 = np.array([e[0] for e in edges], dtype=np.int32)
-        e1 = np.array([e[1] for e in edges], dtype=np.int32)
-    
-    total_fixed = 0
-    for _it in range(iterations):
-        # Compute weight difference for each edge
-        diffs = np.abs(W[e0] - W[e1]).max(axis=1)  # max per-bone diff per edge
-        bad_mask = diffs > max_delta
-        n_bad = bad_mask.sum()
-        if n_bad == 0:
-            break
-        
-        # For bad edges, blend endpoints toward each other
-        bad_e0 = e0[bad_mask]
-        bad_e1 = e1[bad_mask]
-        blend = 0.3  # conservative blend factor
-        
-        W_new = W.copy()
-        for i in range(len(bad_e0)):
-            a, b = bad_e0[i], bad_e1[i]
-            avg = (W[a] + W[b]) * 0.5
-            W_new[a] = (1.0 - blend) * W[a] + blend * avg
-            W_new[b] = (1.0 - blend) * W[b] + blend * avg
-        W = W_new
-        total_fixed += n_bad
+    e0, e1 = _smoothing_edges(indices, positions, coloc)
+    W, total_fixed = _rig_kernels.bound_edge_gradient(
+        skin.to_dense(num_joints), e0, e1, max_delta, blend=0.3, iterations=iterations
+    )
     
     # Normalize rows
     row_sums = W.sum(axis=1, keepdims=True)
     row_sums = np.maximum(row_sums, 1e-10)
     W = W / row_sums
     
-    # Convert back to top-4
-    new_joints = []
-    new_weights = []
-    for vi in range(num_verts):
-        row = W[vi]
-        if num_joints <= 4:
-            top4 = np.arange(num_joints)
-        else:
-            top4 = np.argpartition(-row, 4)[:4]
-        w4 = row[top4]
-        total = w4.sum()
-        if total < 1e-10:
-            total = 1.0
-        w4 = w4 / total
-        new_joints.append(top4.astype(int).tolist())
-        new_weights.append(w4.tolist())
-    
     print(f"    📐 Gradient enforcement: {iterations} iters, max_delta={max_delta}, "
           f"{total_fixed} edge fixes")
-    return new_joints, new_weights
+    return SkinWeights.from_dense(W)
+
+
+def _smoothing_edges(indices, positions=None, coloc=None):
+    """Unique triangle edges plus co-located bridge pairs, as (e0, e1) int64 arrays."""
+    edges = _rig_kernels.mesh_edges(indices)
+    e0, e1 = edges[:, 0], edges[:, 1]
+    if coloc is None and positions is not None:
+        coloc = _ColocationIndex(positions)
+    if coloc is not None:
+        br_a, br_b = coloc.bridge_pairs(symmetric=False)
+        e0 = np.concatenate([e0, br_a.astype(np.int64)])
+        e1 = np.concatenate([e1, br_b.astype(np.int64)])
+    return e0, e1
+
+
+# Factorizations keyed on (positions, edges, λ, k): a repeat rig of the same
+# mesh skips straight to the triangular solves
+_implicit_smoother_cache = OrderedDict()
+_implicit_smoother_lock = threading.Lock()
+
+
+def _get_implicit_smoother(P, e0, e1, lam, k_neighbors, workers=1):
+    h = hashlib.blake2b(digest_size=16)
+    for arr in (P, e0, e1):
+        h.update(np.ascontiguousarray(arr).tobytes())
+    key = (h.hexdigest(), float(lam), int(k_neighbors))
+    
+    with _implicit_smoother_lock:
+        smoother = _implicit_smoother_cache.get(key)
+        if smoother is not None:
+            _implicit_smoother_cache.move_to_end(key)
+            return smoother, True
+    
+    # Factor outside the lock: concurrent rigs of other meshes don't wait on it
+    knn_op = None
+    if k_neighbors:
+        knn_op = _rig_kernels.knn_smoothing_operator(
+            *_rig_kernels.knn_query(P, k_neighbors, workers=workers), len(P)
+        )
+    A = _rig_kernels.smoothing_graph(len(P), np.stack([e0, e1], axis=1), knn_op)
+    smoother = _rig_kernels.ImplicitSmoother(A, lam)
+    
+    with _implicit_smoother_lock:
+        _implicit_smoother_cache[key] = smoother
+        _implicit_smoother_cache.move_to_end(key)
+        while len(_implicit_smoother_cache) > max(Phase2Config.IMPLICIT_SMOOTHER_CACHE_SIZE, 0):
+            _implicit_smoother_cache.popitem(last=False)
+    return smoother, False
 
 
-def _build_unique_position_map(positions):
+def _implicit_smooth_weights(skin, indices, positions, num_verts, num_joints,
+                             lam=None, k_neighbors=None, max_delta=None, coloc=None, workers=1):
+    """
+    Smooth skinning weights with ONE implicit diffusion step: (I + λL) W = W0.
+    
+    Replaces the iterative Laplacian, KD-tree and gradient passes with a
+    single sparse solve of predictable cost. L is the graph Laplacian of the
+    mesh edges + UV seam bridges (optionally + k spatial neighbours, for
+    meshes made of disconnected pieces). The factorization is cached, so
+    re-rigging the same mesh only pays for the triangular solves.
+    
+    Args:
+        lam: diffusion time (default Phase2Config.IMPLICIT_SMOOTHING_LAMBDA)
+        k_neighbors: spatial neighbours added to the graph
+            (default Phase2Config.IMPLICIT_SMOOTHING_KNN)
+        max_delta: optional per-edge gradient bound, enforced afterwards with
+            vectorized scatter passes (default Phase2Config.IMPLICIT_MAX_WEIGHT_DELTA)
+    
+    Returns: smoothed SkinWeights
+    """
+    if indices is None or len(indices) < 3:
+        return skin
+    
+    lam = Phase2Config.IMPLICIT_SMOOTHING_LAMBDA if lam is None else lam
+    if k_neighbors is None:
+        k_neighbors = Phase2Config.IMPLICIT_SMOOTHING_KNN
+    if max_delta is None:
+        max_delta = Phase2Config.IMPLICIT_MAX_WEIGHT_DELTA
+    
+    P = np.asarray(positions, dtype=np.float64).reshape(-1, 3)
+    e0, e1 = _smoothing_edges(indices, P, coloc)
+    
+    t0 = time.time()
+    smoother, cached = _get_implicit_smoother(P, e0, e1, lam, k_neighbors, workers)
+    W = smoother(skin.to_dense(num_joints))
+    print(f"    🧊 Implicit smoothing: λ={lam}, k={k_neighbors}, {len(e0)} edges, "
+          f"{smoother.solver}{' (cached)' if cached else ''} ({time.time() - t0:.2f}s)")
+    
+    if max_delta is not None:
+        W, fixed = _rig_kernels.bound_edge_gradient(W, e0, e1, max_delta)
+        print(f"    📐 Gradient bound: max_delta={max_delta}, {fixed} edge fixes")
+    
+    W = np.maximum(W, 0.0)
+    W /= np.maximum(W.sum(axis=1, keepdims=True), 1e-10)
+    return SkinWeights.from_dense(W)
+
+
+class _ColocationIndex:
+    """
+    Co-location index for UV-seam split vertices (same position, different index).
+    
+    Positions are snapped to a 10^-DECIMALS grid as int64 and grouped with a
+    single np.unique; unique ids follow first-occurrence order. Built once per
+    rig request and shared by every seam-handling pass (unique position map,
+    geodesic bridge edges, Laplacian bridges, welding, gradient enforcement).
+    
+    Attributes:
+        inverse: (N,) original vertex → unique id
+        first: (U,) representative (first) original vertex of each unique id
+        counts: (U,) vertices per unique id
+        unique_positions: (U, 3) positions of the representatives
+    """
+    DECIMALS = 4  # ~0.1mm precision — catches all co-located vertices
+    
+    def __init__(self, positions, decimals: int = DECIMALS):
+        P = np.asarray(positions, dtype=np.float64).reshape(-1, 3)
+        self.num_verts = len(P)
+        
+        if len(P):
+            grid = np.round(P * 10.0 ** decimals).astype(np.int64)
+            keys = self._pack(grid)
+            if keys is not None:
+                _, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+            else:
+                _, first, inverse = np.unique(grid, axis=0, return_index=True, return_inverse=True)
+            inverse = inverse.reshape(-1)
+            # np.unique sorts by key — relabel in first-occurrence order
+            order = np.argsort(first, kind='stable')
+            rank = np.empty_like(order)
+            rank[order] = np.arange(len(order))
+            self.first = first[order]
+            self.inverse = rank[inverse]
+        else:
+            self.first = np.empty(0, dtype=np.int64)
+            self.inverse = np.empty(0, dtype=np.int64)
+        
+        self.num_unique = len(self.first)
+        self.counts = np.bincount(self.inverse, minlength=self.num_unique)
+        self.unique_positions = P[self.first]
+    
+    @staticmethod
+    def _pack(grid):
+        """Pack (N, 3) grid coords into one int64 key (21 bits/axis), or None if too wide."""
+        lo = grid.min(axis=0)
+        g = grid - lo
+        if (g.max(axis=0) >= (1 << 21)).any():
+            return None
+        return (g[:, 0] << 42) | (g[:, 1] << 21) | g[:, 2]
+    
+    @classmethod
+    def identity(cls, positions):
+        """Index over positions already known to be unique (no bridges, no groups)."""
+        idx = cls.__new__(cls)
+        idx.unique_positions = np.asarray(positions, dtype=np.float64).reshape(-1, 3)
+        idx.num_verts = idx.num_unique = len(idx.unique_positions)
+        idx.first = idx.inverse = np.arange(idx.num_verts)
+        idx.counts = np.ones(idx.num_verts, dtype=np.int64)
+        return idx
+    
+    @property
+    def num_duplicates(self) -> int:
+        return self.num_verts - self.num_unique
+    
+    def bridge_pairs(self, symmetric: bool = True):
+        """
+        Co-located vertex pairs as (a, b) int arrays: every ordered pair a != b
+        within a group (symmetric=True) or each unordered pair once with a < b.
+        """
+        verts = np.flatnonzero(self.counts[self.inverse] > 1)
+        if not len(verts):
+            empty = np.empty(0, dtype=np.int64)
+            return empty, empty
+        verts = verts[np.argsort(self.inverse[verts], kind='stable')]
+        gid = self.inverse[verts]
+        c = self.counts[gid]  # group size per member
+        # Position in `verts` where each member's group starts
+        new_group = np.concatenate([[True], gid[1:] != gid[:-1]])
+        group_start = np.maximum.accumulate(np.where(new_group, np.arange(len(verts)), 0))
+
+        # Pair every member with each member of its group (k² pairs per group)
+        a = np.repeat(np.arange(len(verts)), c)
+        b = group_start[a] + (np.arange(len(a)) - np.repeat(np.cumsum(c) - c, c))
+        keep = (a != b) if symmetric else (a < b)
+        return verts[a[keep]], verts[b[keep]]
+
+
+def _build_unique_position_map(positions, coloc=None):
     """
     Build a de-duplicated position set and mapping from original → unique indices.
     
@@ -1160,36 +1308,17 @@ def _build_unique_position_map(positions):
     different weights → zero UV seam tearing, provably.
     
     Returns:
-        unique_positions: flat [x,y,z,...] list of unique positions
-        vert_to_unique: list mapping original vertex index → unique index
+        unique_positions: flat (3U,) float64 array [x,y,z,...] of unique positions
+        vert_to_unique: (N,) int array mapping original vertex index → unique index
         num_unique: number of unique positions
     """
-    num_verts = len(positions) // 3
-    DECIMALS = 4  # ~0.1mm precision — catches all co-located vertices
+    if coloc is None:
+        coloc = _ColocationIndex(positions)
     
-    pos_to_unique = {}
-    unique_positions = []
-    vert_to_unique = [0] * num_verts
-    unique_idx = 0
-    
-    for vi in range(num_verts):
-        x = positions[vi * 3]
-        y = positions[vi * 3 + 1]
-        z = positions[vi * 3 + 2]
-        key = (round(x, DECIMALS), round(y, DECIMALS), round(z, DECIMALS))
-        
-        if key not in pos_to_unique:
-            pos_to_unique[key] = unique_idx
-            unique_positions.extend([x, y, z])
-            unique_idx += 1
-        
-        vert_to_unique[vi] = pos_to_unique[key]
+    print(f"    🗺️ Unique position map: {coloc.num_verts} → {coloc.num_unique} "
+          f"({coloc.num_duplicates} UV seam duplicates collapsed)")
     
-    dup_count = num_verts - unique_idx
-    print(f"    🗺️ Unique position map: {num_verts} → {unique_idx} "
-          f"({dup_count} UV seam duplicates collapsed)")
-    
-    return unique_positions, vert_to_unique, unique_idx
+    return coloc.unique_positions.ravel(), coloc.inverse, coloc.num_unique
 
 
 def _identity_matrix():
@@ -1211,6 +1340,61 @@ def _inverse_bind_matrix(tx, ty, tz):
     ]
 
 
+SKIN_ENCODINGS = ("float", "compact16", "compact8")
+ANIMATION_OUTPUTS = ("model", "clips")
+PREVIEW_MODES = _skin_preview.PREVIEW_FORMATS + ("none",)
+WEIGHTING_ENGINES = ("geodesic", "heat", "template")
+WEIGHT_SMOOTHING_MODES = ("iterative", "implicit")
+
+
+def _quantize_weights_exact(weights, max_value):
+    """
+    Quantize (N, 4) weights to integers in [0, max_value] whose rows sum to
+    EXACTLY max_value (largest-remainder rounding), so normalized weights
+    decode to a sum of 1.0 with no drift.
+    """
+    w = np.asarray(weights, dtype=np.float64)
+    totals = w.sum(axis=1, keepdims=True)
+    empty = totals[:, 0] < 1e-10
+    w = np.where(empty[:, None], 0.0, w / np.maximum(totals, 1e-10))
+    w[empty, 0] = 1.0
+    
+    scaled = w * max_value
+    q = np.floor(scaled).astype(np.int64)
+    remainder = max_value - q.sum(axis=1)                 # units still to hand out (0..3)
+    frac = scaled - q
+    # Rank slots by fractional part (largest first) and give +1 to the top `remainder`
+    order = np.argsort(-frac, axis=1, kind='stable')
+    ranks = np.empty_like(order)
+    np.put_along_axis(ranks, order, np.arange(w.shape[1])[None, :], axis=1)
+    q += ranks < remainder[:, None]
+    return q
+
+
+def _encode_skin_attributes(joint_indices, joint_weights, num_joints, encoding="float"):
+    """
+    Pack per-vertex JOINTS_0 / WEIGHTS_0 arrays for glTF.
+    
+    Returns (joints_array, weights_array, weights_normalized). Compact modes use
+    UNSIGNED_BYTE joints (valid for < 256 joints — both our skeletons have ≤ 23)
+    and normalized UNSIGNED_SHORT / UNSIGNED_BYTE weights, exactly renormalized.
+    """
+    if encoding not in SKIN_ENCODINGS:
+        raise ValueError(f"Unknown skin encoding: {encoding}")
+    
+    ji = np.minimum(np.asarray(joint_indices, dtype=np.int64), num_joints - 1)
+    
+    if encoding == "float":
+        return ji.astype(np.uint16), np.asarray(joint_weights, dtype=np.float32), False
+    
+    w_dtype = np.uint16 if encoding == "compact16" else np.uint8
+    q = _quantize_weights_exact(joint_weights, np.iinfo(w_dtype).max)
+    # Zero-weight slots point at joint 0 so unused influences stay canonical
+    ji = np.where(q > 0, ji, 0)
+    j_dtype = np.uint8 if num_joints <= 256 else np.uint16
+    return ji.astype(j_dtype), q.astype(w_dtype), True
+
+
 def _manifold_repair_mesh(input_path: str) -> str:
     """
     Repair a GLB mesh to be watertight and manifold using Voxelization + Marching Cubes.
@@ -1228,7 +1412,7 @@ def _manifold_repair_mesh(input_path: str) -> str:
     print(f"  🔧 === Manifold Repair (Voxelization + Marching Cubes) ===")
     
     try:
-        loaded = _trimesh.load(input_path, force='mesh')
+        loaded = load_trimesh(input_path, force='mesh')
         if loaded is None or not hasattr(loaded, 'vertices') or len(loaded.vertices) == 0:
             print("  ⚠️ Could not load mesh for repair")
             return input_path
@@ -1299,20 +1483,20 @@ def _manifold_repair_mesh(input_path: str) -> str:
         return input_path
 
 
-def _refine_bone_positions(joints, positions):
+def _refine_bone_positions(joints, positions, tree=None):
     """
     Refine bone positions to be at the volumetric center of each limb.
     
     Bounding-box-based bone placement may put bones on the surface or outside
     the mesh for non-standard models. This function finds nearby vertices for
-    each bone and shifts the bone toward their centroid.
+    each bone and shifts the bone toward their centroid. Pass `tree` (a
+    KD-tree over `positions`) to reuse one.
     """
     P = np.array(positions, dtype=np.float64).reshape(-1, 3)
     if len(P) < 10:
         return joints
     
-    tree = None
-    if SCIPY_AVAILABLE:
+    if tree is None and SCIPY_AVAILABLE:
         tree = _KDTree(P)
     
     print(f"    📍 Refining bone positions using mesh vertex cloud...")
@@ -1354,63 +1538,512 @@ def _refine_bone_positions(joints, positions):
     return refined
 
 
-def _spatial_smooth_weights(all_joints, all_weights, positions, num_verts, num_joints,
-                            iterations=3, strength=0.25, k_neighbors=12):
+def _spatial_smooth_weights(skin, positions, num_verts, num_joints,
+                            iterations=3, strength=0.25, k_neighbors=12, knn=None, workers=1):
     """
     Smooth skinning weights using spatial KD-tree neighborhood.
     
     Unlike face-based Laplacian smoothing, this works even for non-manifold meshes
     because it uses spatial proximity rather than mesh connectivity.
-    Vectorized with numpy einsum for performance on 50K+ vertex meshes.
+    The inverse-distance kNN average is built once as a sparse (N, N) CSR
+    operator and applied as S @ W in float32 — no (N, k, J) gather per pass.
+    Pass `knn=rig_kernels.knn_query(P, k)` to reuse the KD-tree query.
     """
     if not SCIPY_AVAILABLE:
         print("    ⚠️ Spatial smoothing skipped (scipy not installed)")
-        return all_joints, all_weights
+        return skin
     
-    P = np.array(positions, dtype=np.float64).reshape(-1, 3)
-    tree = _KDTree(P)
-    
-    k_actual = min(k_neighbors + 1, num_verts)
-    dists, idx = tree.query(P, k=k_actual)
-    
-    # Build dense weight matrix (N, J) — vectorized
-    J_arr = np.array(all_joints, dtype=np.int32)    # (N, 4)
-    W_arr = np.array(all_weights, dtype=np.float64)  # (N, 4)
-    W = np.zeros((num_verts, num_joints), dtype=np.float64)
-    vi_idx = np.arange(num_verts)[:, None].repeat(4, axis=1)
-    np.add.at(W, (vi_idx.ravel(), J_arr.ravel()), W_arr.ravel())
-    
-    # Neighbor data (skip self at index 0)
-    n_idx = idx[:, 1:]       # (N, k)
-    n_dists = dists[:, 1:]   # (N, k)
-    
-    # Inverse-distance weights (closer neighbors have more influence)
-    inv_d = 1.0 / (n_dists + 1e-8)
-    inv_d_sum = inv_d.sum(axis=1, keepdims=True)
-    inv_d_norm = inv_d / inv_d_sum   # (N, k) normalized
-    
-    for _iter in range(iterations):
-        W_nbr = W[n_idx]      # (N, k, J)
-        W_avg = np.einsum('nk,nkj->nj', inv_d_norm, W_nbr)  # (N, J)
-        W = (1.0 - strength) * W + strength * W_avg
+    if knn is None:
+        knn = _rig_kernels.knn_query(positions, k_neighbors, workers=workers)
+    S = _rig_kernels.knn_smoothing_operator(*knn, num_verts)
     
-    # Convert back to top-4 sparse format (fully vectorized)
-    if num_joints > 4:
-        top4_idx = np.argpartition(-W, 4, axis=1)[:, :4]
-    else:
-        top4_idx = np.tile(np.arange(num_joints), (num_verts, 1))
-    top4_w = np.take_along_axis(W, top4_idx, axis=1)
-    totals = top4_w.sum(axis=1, keepdims=True)
-    totals[totals < 1e-10] = 1.0
-    top4_w /= totals
-    new_joints = top4_idx.astype(int).tolist()
-    new_weights = top4_w.tolist()
+    W = _rig_kernels.knn_smooth(S, skin.to_dense(num_joints), iterations, strength)
     
     print(f"    🔄 Spatial smoothing: {iterations} iterations, strength={strength}, k={k_neighbors}")
-    return new_joints, new_weights
+    return SkinWeights.from_dense(W)
+
 
+def _build_proxy_mesh(positions, indices, target_verts):
+    """
+    Decimate the de-duplicated mesh to ~target_verts vertices for proxy rigging.
+    Quadric edge collapse via pymeshlab when installed, NumPy vertex
+    clustering otherwise. Returns (V (P, 3) float64, T (F, 3) int64).
+    """
+    P = np.asarray(positions, dtype=np.float64).reshape(-1, 3)
+    tris = np.asarray(indices, dtype=np.int64).reshape(-1, 3)
+    t0 = time.time()
+    
+    V = T = None
+    if PYMESHLAB_AVAILABLE:
+        try:
+            ms = _pymeshlab.MeshSet()
+            ms.add_mesh(_pymeshlab.Mesh(P, tris.astype(np.int32)))
+            ms.meshing_decimation_quadric_edge_collapse(
+                targetfacenum=2 * target_verts,
+                preservenormal=True,
+                preservetopology=True,
+                qualitythr=0.5
+            )
+            result = ms.current_mesh()
+            V = result.vertex_matrix().astype(np.float64)
+            T = result.face_matrix().astype(np.int64)
+            method = "quadric"
+        except Exception as e:
+            print(f"    ⚠️ pymeshlab decimation failed ({e}), using vertex clustering")
+            V = T = None
+    if V is None:
+        V, T, _ = _rig_kernels.cluster_decimate(P, tris, target_verts)
+        method = "vertex clustering"
+    
+    print(f"    🪶 Proxy mesh ({method}): {len(P)} → {len(V)} verts, "
+          f"{len(tris)} → {len(T)} tris ({time.time() - t0:.2f}s)")
+    return V, T
 
-def rig_model_glb(input_path: str, output_path: str, character_type: str, markers=None):
+
+def _transfer_proxy_weights(proxy_skin, stencils, num_joints, block_rows=1 << 15, label="Proxy"):
+    """
+    Interpolate proxy SkinWeights through rig_kernels.proxy_stencils() output
+    (idx, coef, num_fallback): barycentric on the closest proxy triangle,
+    inverse-distance over the nearest proxy vertices where no triangle
+    applies. Blends the dense proxy weights in row blocks, then takes the top
+    4 per vertex.
+    """
+    idx, coef, num_fallback = stencils
+    t0 = time.time()
+    
+    W_proxy = proxy_skin.to_dense(num_joints)
+    joints = np.empty((len(idx), 4), dtype=np.int16)
+    weights = np.empty((len(idx), 4), dtype=np.float32)
+    for start in range(0, len(idx), block_rows):
+        sl = slice(start, start + block_rows)
+        block = SkinWeights.from_dense(np.einsum('ms,msj->mj', coef[sl], W_proxy[idx[sl]]))
+        joints[sl] = block.joints
+        weights[sl] = block.weights
+    
+    print(f"    🎯 {label} weight transfer: {len(idx)} verts from {len(proxy_skin)} "
+          f"{label.lower()} verts, {num_fallback} inverse-distance fallbacks ({time.time() - t0:.2f}s)")
+    return SkinWeights(joints, weights)
+
+
+def _smooth_transferred_weights(skin, indices, num_verts, num_joints, coloc, state=None):
+    """
+    Phase2Config.PROXY_RIG_SMOOTH_ITERATIONS Laplacian passes over weights
+    interpolated from a proxy. Barycentric transfer is only continuous across
+    proxy edges, so the field is faceted; a few passes on the full mesh
+    remove that. Reuses (and fills) state.laplacian.
+    """
+    iterations = Phase2Config.PROXY_RIG_SMOOTH_ITERATIONS
+    if not iterations or not SCIPY_AVAILABLE or len(indices) < 3:
+        return skin
+    if state is not None and state.laplacian is None:
+        state.laplacian = _laplacian_operator(indices, num_verts, coloc=coloc)
+    return _smooth_vertex_weights(
+        skin, indices, num_verts, num_joints,
+        iterations=iterations, strength=Phase2Config.PROXY_RIG_SMOOTH_STRENGTH, coloc=coloc,
+        adjacency=state.laplacian if state is not None else None
+    )
+
+
+# Procedural template bodies: canonical bounds (the skeleton is generated
+# from them) and a capsule radius per bone segment, in fractions of the
+# height; bones left out get no capsule
+RIG_TEMPLATE_BODIES = {
+    "humanoid": {
+        "bounds": ([-0.9, 0.0, -0.15], [0.9, 1.8, 0.15]),
+        "radii": {
+            "hips": 0.085, "spine": 0.09, "spine1": 0.095, "spine2": 0.085,
+            "neck": 0.035, "head": 0.06,
+            "shoulder_l": 0.04, "arm_l": 0.035, "forearm_l": 0.03, "hand_l": 0.025,
+            "shoulder_r": 0.04, "arm_r": 0.035, "forearm_r": 0.03, "hand_r": 0.025,
+            "thigh_l": 0.065, "shin_l": 0.05, "foot_l": 0.04, "toe_l": 0.03,
+            "thigh_r": 0.065, "shin_r": 0.05, "foot_r": 0.04, "toe_r": 0.03,
+        },
+    },
+    "quadruped": {
+        "bounds": ([-0.25, 0.0, -0.8], [0.25, 1.0, 0.8]),
+        "radii": {
+            "root": 0.18, "hips": 0.06, "spine": 0.18, "spine1": 0.16,
+            "neck": 0.08, "head": 0.1,
+            "front_shoulder_l": 0.07, "front_arm_l": 0.055, "front_hand_l": 0.04,
+            "front_shoulder_r": 0.07, "front_arm_r": 0.055, "front_hand_r": 0.04,
+            "back_thigh_l": 0.08, "back_shin_l": 0.055, "back_foot_l": 0.04,
+            "back_thigh_r": 0.08, "back_shin_r": 0.055, "back_foot_r": 0.04,
+            "tail1": 0.04, "tail2": 0.03,
+        },
+    },
+}
+
+
+def _skeleton_joints(character_type, bounds_min, bounds_max):
+    if character_type == "quadruped":
+        return _compute_quadruped_joints(bounds_min, bounds_max)
+    return _compute_humanoid_joints(bounds_min, bounds_max)
+
+
+def _build_rig_template(character_type):
+    """
+    Generate the procedural template for weighting="template": the capsule
+    body of RIG_TEMPLATE_BODIES voxelized into a closed surface, then rigged
+    once with the geodesic engine. Returns the rig_templates arrays.
+    """
+    body = RIG_TEMPLATE_BODIES[character_type]
+    bounds_min, bounds_max = body["bounds"]
+    height = bounds_max[1] - bounds_min[1]
+    joints = _skeleton_joints(character_type, bounds_min, bounds_max)
+    seg_a, seg_b = _bone_segments(joints)
+    radii = [body["radii"].get(name, 0.0) * height for name, _, _ in joints]
+    
+    t0 = time.time()
+    V, T = _rig_kernels.capsule_union_surface(seg_a, seg_b, radii,
+                                              resolution=Phase2Config.RIG_TEMPLATE_RESOLUTION)
+    print(f"  🧍 Building {character_type} rig template: {len(V)} verts, {len(T)} tris")
+    joints, skin = _compute_rig_weights(V, T.ravel(), character_type, "geodesic", "iterative", 1)
+    print(f"  🧍 {character_type} rig template ready ({time.time() - t0:.2f}s)")
+    return V, T, joints, skin.joints, skin.weights
+
+
+_rig_templates_loaded = {}
+_rig_templates_lock = threading.Lock()
+
+
+def _get_rig_template(character_type):
+    """
+    The rig_templates template for this character type: loaded from disk,
+    generated and stored on first use (or when a generated file is stale),
+    then kept in memory.
+    """
+    with _rig_templates_lock:
+        template = _rig_templates_loaded.get(character_type)
+        if template is not None:
+            return template
+        
+        template = _rig_templates.load(character_type)
+        if template is not None and template["version"] not in (None, _rig_templates.RigTemplateConfig.VERSION):
+            template = None
+        if template is None:
+            arrays = _build_rig_template(character_type)
+            if _rig_templates.store(character_type, *arrays):
+                template = _rig_templates.load(character_type)
+            if template is None:
+                V, T, joints, joint_indices, joint_weights = arrays
+                template = {
+                    "positions": V.astype(np.float32).astype(np.float64),
+                    "indices": T.astype(np.int64), "joints": joints,
+                    "joint_indices": np.asarray(joint_indices, dtype=np.int16),
+                    "joint_weights": np.asarray(joint_weights, dtype=np.float32),
+                    "version": _rig_templates.RigTemplateConfig.VERSION,
+                }
+                template["digest"] = _rig_templates.template_digest(template)
+        
+        bone_names = [j[0] for j in _skeleton_joints(character_type, [0, 0, 0], [1, 1, 1])]
+        if [j[0] for j in template["joints"]] != bone_names:
+            raise ValueError(f"Rig template for {character_type} does not match the "
+                             f"{character_type} skeleton ({len(bone_names)} bones)")
+        _rig_templates_loaded[character_type] = template
+        return template
+
+
+def _align_to_template(P, joints, template, workers=1):
+    """
+    Map target points into the template's space: a per-axis bounding-box
+    affine, then each point follows its nearest bone (found on a KD-tree of
+    points sampled along the bones) by the template-minus-target offsets of
+    that bone's end points, interpolated along the bone. Bones moved by
+    markers or refinement thus still land on the matching template limb.
+    """
+    lo, hi = P.min(axis=0), P.max(axis=0)
+    t_lo, t_hi = template["positions"].min(axis=0), template["positions"].max(axis=0)
+    scale = (t_hi - t_lo) / np.where(hi - lo > 1e-12, hi - lo, 1.0)
+    
+    def to_template(X):
+        return (np.asarray(X, dtype=np.float64) - lo) * scale + t_lo
+    
+    seg_a, seg_b = _bone_segments([(n, par, to_template(pos)) for n, par, pos in joints])
+    tmpl_a, tmpl_b = _bone_segments(template["joints"])
+    off_a, off_b = tmpl_a - seg_a, tmpl_b - seg_b
+    
+    aligned = to_template(P)
+    samples = 16
+    s = np.linspace(0.0, 1.0, samples)
+    tree = _KDTree((seg_a[:, None, :] + s[None, :, None] * (seg_b - seg_a)[:, None, :]).reshape(-1, 3))
+    _, nearest = tree.query(aligned, workers=workers)
+    bone = nearest // samples
+    
+    AB = seg_b[bone] - seg_a[bone]
+    t = np.einsum('nc,nc->n', aligned - seg_a[bone], AB) / np.maximum(np.einsum('nc,nc->n', AB, AB), 1e-12)
+    np.clip(t, 0.0, 1.0, out=t)
+    aligned += (1.0 - t)[:, None] * off_a[bone] + t[:, None] * off_b[bone]
+    return aligned
+
+
+def _compute_vertex_weights_template(positions, joints, character_type, workers=1):
+    """
+    weighting="template": fit the pre-weighted template (_get_rig_template)
+    to the mesh with _align_to_template, then give every vertex the
+    barycentric blend of the template weights on its closest template
+    triangle (rig_kernels.proxy_stencils) — O(N log M) lookups instead of
+    per-mesh geodesic weighting. Returns SkinWeights.
+    """
+    template = _get_rig_template(character_type)
+    P = np.asarray(positions, dtype=np.float64).reshape(-1, 3)
+    
+    t0 = time.time()
+    aligned = _align_to_template(P, joints, template, workers=workers)
+    stencils = _rig_kernels.proxy_stencils(aligned, template["positions"], template["indices"],
+                                           workers=workers)
+    print(f"    🧍 Template fit + stencils for {len(P)} verts ({time.time() - t0:.2f}s)")
+    template_skin = SkinWeights(template["joint_indices"], template["joint_weights"])
+    return _transfer_proxy_weights(template_skin, stencils, len(joints), label="Template")
+
+
+class _WeightingState:
+    """
+    Marker-independent caches for weighting one de-duplicated mesh: the
+    geodesic edge graph, per-bone geodesic distance fields (keyed on each
+    bone's segment), the Laplacian operator and the spatial kNN query.
+    """
+    __slots__ = ("graph", "segments", "geo_dists", "geo_limit", "laplacian", "knn")
+    
+    def __init__(self):
+        self.graph = self.segments = self.geo_dists = self.geo_limit = None
+        self.laplacian = self.knn = None
+
+
+def _weight_mesh(positions, indices, joints, character_type, weighting, smoothing, workers, coloc,
+                 state=None):
+    """
+    Steps 7-9 of rig_model_glb on one de-duplicated mesh (the unique-position
+    mesh or its proxy): weighting engine, then smoothing. Returns SkinWeights.
+    A _WeightingState carries the marker-independent parts between calls.
+    """
+    num_verts = len(positions) // 3
+    num_joints = len(joints)
+    has_graph = len(indices) and SCIPY_AVAILABLE
+    
+    if weighting == "heat" and has_graph:
+        print(f"  🔥 Heat-diffusion weights on {num_verts} unique verts "
+              f"({len(indices)} triangle indices)")
+        skin = _compute_vertex_weights_heat(positions, joints, indices, character_type,
+                                            workers=workers)
+    elif weighting == "template" and SCIPY_AVAILABLE:
+        print(f"  🧍 Template weights on {num_verts} unique verts")
+        skin = _compute_vertex_weights_template(positions, joints, character_type, workers=workers)
+        if has_graph:
+            # ── Laplacian smoothing: soften seams where neighbours followed different bones ──
+            if state is not None and state.laplacian is None:
+                state.laplacian = _laplacian_operator(indices, num_verts, coloc=coloc)
+            skin = _smooth_vertex_weights(
+                skin, indices,
+                num_verts, num_joints,
+                iterations=8, strength=0.38, coloc=coloc,
+                adjacency=state.laplacian if state is not None else None
+            )
+    else:
+        if has_graph:
+            print(f"  🔗 SMPL geodesic weights on {num_verts} unique verts "
+                  f"({len(indices)} triangle indices)")
+            skin = _compute_vertex_weights_geodesic(
+                positions, joints, indices, character_type, coloc=coloc,
+                workers=workers, state=state
+            )
+        else:
+            print(f"  ⚠️ Using Euclidean fallback on {num_verts} unique positions")
+            skin = _compute_vertex_weights(positions, joints, character_type, workers=workers)
+    
+        if smoothing == "implicit" and has_graph:
+            # ── One implicit diffusion step on unique mesh (cached factorization) ──
+            skin = _implicit_smooth_weights(
+                skin, indices, positions,
+                num_verts, num_joints, coloc=coloc, workers=workers
+            )
+        else:
+            # ── Laplacian smoothing on unique mesh (no UV seam issues → moderate params) ──
+            if has_graph:
+                if state is not None and state.laplacian is None:
+                    state.laplacian = _laplacian_operator(indices, num_verts, coloc=coloc)
+                skin = _smooth_vertex_weights(
+                    skin, indices,
+                    num_verts, num_joints,
+                    iterations=8, strength=0.38, coloc=coloc,
+                    adjacency=state.laplacian if state is not None else None
+                )
+        
+            # ── Spatial KD-tree smoothing on unique mesh ──
+            knn = None
+            if state is not None and SCIPY_AVAILABLE:
+                if state.knn is None:
+                    state.knn = _rig_kernels.knn_query(positions, 20, workers=workers)
+                knn = state.knn
+            skin = _spatial_smooth_weights(
+                skin, positions,
+                num_verts, num_joints, iterations=4, strength=0.28, k_neighbors=20,
+                knn=knn, workers=workers
+            )
+    
+    return skin
+
+
+class _RigSession:
+    """
+    Everything about one mesh that does not depend on the skeleton: the
+    co-location index and unique position map (steps 4 and 6 of
+    rig_model_glb), the KD-tree used to refine bones, and _WeightingState
+    caches for the unique mesh and its proxy. Kept per geometry so a marker
+    tweak skips that setup and the Dijkstra passes of unmoved bones; `lock`
+    serializes requests on one session.
+    """
+    
+    def __init__(self, P_all, all_indices):
+        self.lock = threading.Lock()
+        
+        # ══════════════════════════════════════════════════════════════════
+        # UNIQUE POSITION MAP — the definitive fix for UV seam tearing
+        # ══════════════════════════════════════════════════════════════════
+        # GLB meshes have split vertices at UV seams (same position, different index).
+        # Previous approach: UV bridges + welding + gradient enforcement = heuristic,
+        # always missed some edge cases → still tearing at small points.
+        # 
+        # New approach: de-duplicate ALL vertices by position. Compute weights on
+        # the unique set only. Map back. Co-located vertices share the SAME unique
+        # index → they get BITWISE-IDENTICAL weights → ZERO tearing, provably.
+        # ══════════════════════════════════════════════════════════════════
+        
+        # One co-location index per mesh, shared by every seam-handling pass
+        self.coloc = _ColocationIndex(P_all)
+        self.unique_pos, self.vert_to_unique, self.num_unique = _build_unique_position_map(
+            P_all, self.coloc
+        )
+        self.unique_coloc = _ColocationIndex.identity(self.coloc.unique_positions)
+        
+        # ── Remap triangle indices to unique vertex space ──
+        self.unique_indices = self.vert_to_unique[all_indices]
+        
+        self.tree = None
+        if SCIPY_AVAILABLE and self.num_unique >= 10:
+            self.tree = _KDTree(self.coloc.unique_positions)
+        self.state = _WeightingState()
+        self._proxy = {}
+    
+    def proxy(self, target_verts, workers=1):
+        """
+        (V, T, coloc, stencils, state) of the decimated proxy mesh, built on
+        first use: proxy geometry plus the rig_kernels.proxy_stencils() that
+        carry its weights back to the unique vertices.
+        """
+        entry = self._proxy.get(target_verts)
+        if entry is None:
+            V, T = _build_proxy_mesh(self.unique_pos, self.unique_indices, target_verts)
+            t0 = time.time()
+            stencils = _rig_kernels.proxy_stencils(self.coloc.unique_positions, V, T, workers=workers)
+            print(f"    📐 Proxy stencils for {self.num_unique} verts ({time.time() - t0:.2f}s)")
+            entry = (V, T, _ColocationIndex(V), stencils, _WeightingState())
+            self._proxy[target_verts] = entry
+        return entry
+
+
+# Rig sessions keyed on rig_cache.geometry_digest(), least recently used first
+_rig_sessions = OrderedDict()
+_rig_sessions_lock = threading.Lock()
+
+
+def _get_rig_session(geometry, P_all, all_indices):
+    """The cached _RigSession for this geometry, or a new one. Returns (session, reused)."""
+    with _rig_sessions_lock:
+        session = _rig_sessions.get(geometry)
+        if session is not None:
+            _rig_sessions.move_to_end(geometry)
+            return session, True
+    
+    session = _RigSession(P_all, all_indices)
+    with _rig_sessions_lock:
+        _rig_sessions[geometry] = session
+        while len(_rig_sessions) > max(Phase2Config.RIG_SESSION_CACHE_SIZE, 0):
+            _rig_sessions.popitem(last=False)
+    return session, False
+
+
+def _compute_rig_weights(P_all, all_indices, character_type, weighting, smoothing, workers,
+                         markers=None, session=None):
+    """
+    Steps 2 and 4-11 of rig_model_glb: joints from the mesh bounds and the
+    markers, then per-vertex weights on the unique-position mesh mapped back
+    to every original vertex. Returns (joints, SkinWeights) — exactly what the
+    rig cache stores. Pass a _RigSession to reuse its marker-independent state.
+    """
+    total_verts = len(P_all)
+    if session is None:
+        session = _RigSession(P_all, all_indices)
+    
+    # ── Compute bounding box from ALL vertices ──
+    bounds_min = P_all.min(axis=0).tolist()
+    bounds_max = P_all.max(axis=0).tolist()
+    
+    print(f"  📏 Mesh bounds: min={[round(v,3) for v in bounds_min]} max={[round(v,3) for v in bounds_max]}")
+    
+    # ── Compute joint positions ──
+    joints = _skeleton_joints(character_type, bounds_min, bounds_max)
+    joints = _apply_markers(joints, markers, character_type, bounds_min, bounds_max)
+    
+    num_joints = len(joints)
+    bone_names = [j[0] for j in joints]
+    print(f"  🦴 Created {num_joints} bones: {bone_names[:8]}...")
+    
+    # ── Refine bone positions using unique positions (no duplicate bias) ──
+    joints = _refine_bone_positions(joints, session.unique_pos, tree=session.tree)
+    bone_names = [j[0] for j in joints]  # refresh after refinement
+    
+    # ── Compute vertex weights on UNIQUE positions (no UV seam splits exist) ──
+    proxy_min = Phase2Config.PROXY_RIG_MIN_VERTS
+    if proxy_min is not None and session.num_unique > proxy_min and len(session.unique_indices):
+        # Very dense mesh: weight a decimated proxy, then interpolate back.
+        # Transfer targets the UNIQUE vertices, so the zero-tear map-back holds.
+        proxy_pos, proxy_tris, proxy_coloc, stencils, proxy_state = session.proxy(
+            Phase2Config.PROXY_RIG_TARGET_VERTS, workers
+        )
+        p_skin = _weight_mesh(proxy_pos.ravel(), proxy_tris.ravel(), joints, character_type,
+                              weighting, smoothing, workers, proxy_coloc, state=proxy_state)
+        u_skin = _transfer_proxy_weights(p_skin, stencils, num_joints)
+        u_skin = _smooth_transferred_weights(u_skin, session.unique_indices, session.num_unique,
+                                             num_joints, session.unique_coloc, state=session.state)
+    else:
+        u_skin = _weight_mesh(session.unique_pos, session.unique_indices, joints, character_type,
+                              weighting, smoothing, workers, session.unique_coloc,
+                              state=session.state)
+    
+    # ── Cleanup tiny weights (<2%) on unique mesh ──
+    u_skin = _cleanup_tiny_weights(u_skin, min_weight=0.02)
+    
+    # ── Map weights back to ALL original vertices ──
+    # ZERO-TEAR GUARANTEE: co-located vertices share the SAME unique index
+    # → they get BITWISE-IDENTICAL weights → impossible to tear at UV seams
+    skin_weights = u_skin.take(session.vert_to_unique)
+    
+    dup_count = total_verts - session.num_unique
+    print(f"  ✅ Weight transfer: {session.num_unique} unique → {total_verts} total "
+          f"({dup_count} duplicates get identical weights, 0 possible tears)")
+    
+    return joints, skin_weights
+
+
+def _rig_preview(output_path: str, preview: str = None):
+    """Preview of a saved rig playing Phase2Config.RIG_PREVIEW_ANIMATION."""
+    preview = preview or Phase2Config.PREVIEW_FORMAT
+    animation_id = Phase2Config.RIG_PREVIEW_ANIMATION
+    info = AnimationService.ANIMATION_LIBRARY.get(animation_id)
+    if preview == "none" or info is None:
+        return None
+    gltf, bin_data = _read_glb(output_path)
+    joint_node_indices = gltf["skins"][0]["joints"]
+    bone_names = [gltf["nodes"][idx].get("name", f"joint_{idx}") for idx in joint_node_indices]
+    duration, is_loop = info.get("duration", 1.0), info.get("loop", False)
+    tracks, _ = _clip_tracks(gltf["nodes"], joint_node_indices, bone_names, animation_id, duration, is_loop)
+    clips = [{"name": info.get("name", animation_id), "tracks": tracks, "duration": duration, "loop": is_loop}]
+    return _render_preview(gltf, bin_data, clips, output_path, preview)
+
+
+def rig_model_glb(input_path: str, output_path: str, character_type: str, markers=None,
+                  skin_encoding: str = None, weighting: str = None, smoothing: str = None,
+                  workers: int = None, preview: str = None):
     """
     Add a skeleton (skin) to a GLB model.
     Processes ALL meshes and ALL primitives with ZERO-TEAR guarantee.
@@ -1429,7 +2062,36 @@ def rig_model_glb(input_path: str, output_path: str, character_type: str, marker
     11. Map weights back to ALL original vertices via unique index
         → ZERO-TEAR GUARANTEE: co-located vertices share the SAME unique index
         → bitwise-identical weights, mathematically impossible to tear
-    12. Write skinning data to GLB
+    12. Write skinning data to GLB (skin_encoding: "float", "compact16" or "compact8";
+        defaults to Phase2Config.SKIN_ENCODING)
+    
+    weighting="heat" replaces steps 7-9 with a single heat-diffusion solve;
+    weighting="template" replaces step 7 with closest-point lookups into a
+    pre-weighted template body fitted to the mesh and skips step 9 (defaults
+    to Phase2Config.WEIGHTING_ENGINE); smoothing="implicit" replaces
+    steps 8-9 with one (I + λL) W = W0 solve (defaults to Phase2Config.WEIGHT_SMOOTHING).
+    workers parallelizes steps 7-9 (defaults to Phase2Config.RIG_WORKERS; 0 = all
+    cores) with output identical to serial mode.
+    
+    Meshes with more than Phase2Config.PROXY_RIG_MIN_VERTS unique vertices run
+    steps 7-9 on a decimated proxy, interpolate the weights back onto the
+    unique vertices and smooth them there before step 10.
+    
+    markers (the rig panel's [{"id", "position": {"x", "y"}}, ...]) move the
+    joints of step 2 by their offsets from the default layout (_apply_markers).
+    
+    preview ("sprite", "gif" or "none"; None = Phase2Config.PREVIEW_FORMAT)
+    renders the saved rig playing Phase2Config.RIG_PREVIEW_ANIMATION (_rig_preview).
+    
+    Steps 2 and 4-11 are cached on disk (rig_cache) under a hash of the position
+    and index buffers, character_type, markers and weighting settings; a hit
+    goes straight to step 12. On a miss, the marker-independent state of steps
+    4-9 (unique map, KD-tree, mesh graph, per-bone geodesic distance fields,
+    smoothing operators, proxy) is kept in memory per geometry, so re-rigging
+    after a marker tweak only re-runs Dijkstra for bones whose segment moved.
+    The Gaussian blend, smoothing and cleanup still recompute every bone's
+    column (with the cached operators); heat weighting reuses only the
+    unique map, KD-tree and proxy, and template weighting also the Laplacian.
     """
     print(f"  🦴 Rigging model: {input_path}")
     print(f"  📐 Character type: {character_type}")
@@ -1441,127 +2103,109 @@ def rig_model_glb(input_path: str, output_path: str, character_type: str, marker
     gltf, bin_data = _read_glb(input_path)
     
     # ── Collect ALL primitives and their vertex data ──
+    # Accessors are read as NumPy views (no per-vertex unpacking); astype()
+    # copies into float64 so no view keeps the bytearray pinned for appends.
+    # Quantized inputs (KHR_mesh_quantization) are restored to original local
+    # space via mesh.extras["quantization"]; skinned meshes ignore the node
+    # transform that held the dequantization, so those positions are rewritten
+    # as float below.
     primitives_info = []
-    all_positions = []
+    pos_chunks = []
+    restored_positions = {}
     
     for mesh_idx, mesh in enumerate(gltf.get("meshes", [])):
+        quant = mesh.get("extras", {}).get("quantization")
         for prim_idx, prim in enumerate(mesh.get("primitives", [])):
             attrs = prim.get("attributes", {})
             if "POSITION" not in attrs:
                 continue
-            pos_acc = gltf["accessors"][attrs["POSITION"]]
-            pos_bv = gltf["bufferViews"][pos_acc["bufferView"]]
-            pos_off = pos_bv.get("byteOffset", 0) + pos_acc.get("byteOffset", 0)
-            pos_cnt = pos_acc["count"]
-            pos_stride = pos_bv.get("byteStride", 12)
-            
-            positions = []
-            for i in range(pos_cnt):
-                off = pos_off + i * pos_stride
-                x, y, z = struct.unpack_from('<fff', bin_data, off)
-                positions.extend([x, y, z])
-            
-            all_positions.extend(positions)
-            primitives_info.append({"prim": prim, "pos_count": pos_cnt})
-    
-    total_verts = len(all_positions) // 3
+            P = _glb_io.read_accessor(gltf, bin_data, attrs["POSITION"]).astype(np.float64)
+            if quant:
+                P = P * quant["scale"] + np.asarray(quant["offset"])
+                restored_positions[attrs["POSITION"]] = P
+            pos_chunks.append(P)
+            primitives_info.append({"prim": prim, "pos_count": len(pos_chunks[-1])})
+    
+    P_all = np.concatenate(pos_chunks) if pos_chunks else np.empty((0, 3))
+    del pos_chunks
+    total_verts = len(P_all)
     if total_verts == 0:
         return {"success": False, "error": "No vertices found in model"}
     
-    print(f"  📦 Found {len(primitives_info)} primitive(s), {total_verts} total vertices")
-    
-    # ── Compute bounding box from ALL vertices ──
-    xs = all_positions[0::3]
-    ys = all_positions[1::3]
-    zs = all_positions[2::3]
-    bounds_min = [min(xs), min(ys), min(zs)]
-    bounds_max = [max(xs), max(ys), max(zs)]
-    
-    print(f"  📏 Mesh bounds: min={[round(v,3) for v in bounds_min]} max={[round(v,3) for v in bounds_max]}")
-    
-    # ── Compute joint positions ──
-    if character_type == "quadruped":
-        joints = _compute_quadruped_joints(bounds_min, bounds_max)
-    else:
-        joints = _compute_humanoid_joints(bounds_min, bounds_max)
-    
-    num_joints = len(joints)
-    bone_names = [j[0] for j in joints]
-    print(f"  🦴 Created {num_joints} bones: {bone_names[:8]}...")
+    print(f"  📦 Found {len(primitives_info)} primitive(s), {total_verts} total vertices")
     
     # ── Gather ALL triangle indices (needed for geodesic weights + smoothing) ──
-    all_indices = []
+    idx_chunks = []
     vert_offset = 0
     for info in primitives_info:
         prim_indices = _read_mesh_indices(gltf, bin_data, info["prim"])
-        if prim_indices:
-            all_indices.extend([idx + vert_offset for idx in prim_indices])
+        if prim_indices is not None and len(prim_indices):
+            idx_chunks.append(prim_indices.astype(np.int64) + vert_offset)
+        prim_indices = None  # release the buffer view
         vert_offset += info["pos_count"]
-    
-    # ══════════════════════════════════════════════════════════════════
-    # UNIQUE POSITION MAP — the definitive fix for UV seam tearing
-    # ══════════════════════════════════════════════════════════════════
-    # GLB meshes have split vertices at UV seams (same position, different index).
-    # Previous approach: UV bridges + welding + gradient enforcement = heuristic,
-    # always missed some edge cases → still tearing at small points.
-    # 
-    # New approach: de-duplicate ALL vertices by position. Compute weights on
-    # the unique set only. Map back. Co-located vertices share the SAME unique
-    # index → they get BITWISE-IDENTICAL weights → ZERO tearing, provably.
-    # ══════════════════════════════════════════════════════════════════
-    
-    unique_pos, vert_to_unique, num_unique = _build_unique_position_map(all_positions)
-    
-    # ── Remap triangle indices to unique vertex space ──
-    unique_indices = [vert_to_unique[i] for i in all_indices] if all_indices else []
-    
-    # ── Refine bone positions using unique positions (no duplicate bias) ──
-    joints = _refine_bone_positions(joints, unique_pos)
-    bone_names = [j[0] for j in joints]  # refresh after refinement
-    
-    # ── Compute vertex weights on UNIQUE positions (no UV seam splits exist) ──
-    if unique_indices and SCIPY_AVAILABLE:
-        print(f"  🔗 SMPL geodesic weights on {num_unique} unique verts "
-              f"({len(unique_indices)} triangle indices)")
-        u_ji, u_jw = _compute_vertex_weights_geodesic(
-            unique_pos, joints, unique_indices, character_type
-        )
-    else:
-        print(f"  ⚠️ Using Euclidean fallback on {num_unique} unique positions")
-        u_ji, u_jw = _compute_vertex_weights(unique_pos, joints, character_type)
-    
-    # ── Laplacian smoothing on unique mesh (no UV seam issues → moderate params) ──
-    if unique_indices and SCIPY_AVAILABLE:
-        u_ji, u_jw = _smooth_vertex_weights(
-            u_ji, u_jw, unique_indices,
-            num_unique, num_joints,
-            iterations=8, strength=0.38
-        )
-    
-    # ── Spatial KD-tree smoothing on unique mesh ──
-    u_ji, u_jw = _spatial_smooth_weights(
-        u_ji, u_jw, unique_pos,
-        num_unique, num_joints, iterations=4, strength=0.28, k_neighbors=20
+    all_indices = np.concatenate(idx_chunks) if idx_chunks else np.empty(0, dtype=np.int64)
+    
+    weighting = weighting or Phase2Config.WEIGHTING_ENGINE
+    if weighting not in WEIGHTING_ENGINES:
+        raise ValueError(f"Unknown weighting engine: {weighting}")
+    smoothing = smoothing or Phase2Config.WEIGHT_SMOOTHING
+    if smoothing not in WEIGHT_SMOOTHING_MODES:
+        raise ValueError(f"Unknown weight smoothing mode: {smoothing}")
+    workers = _rig_kernels.resolve_workers(Phase2Config.RIG_WORKERS if workers is None else workers)
+    
+    # ── Rig cache: same geometry + character type + markers → reuse the weights ──
+    geometry = _rig_cache.geometry_digest(P_all, all_indices)
+    cache_key = _rig_cache.rig_key(
+        geometry, character_type, markers,
+        weighting=weighting, smoothing=smoothing,
+        geodesic_cutoff_sigmas=Phase2Config.GEODESIC_CUTOFF_SIGMAS,
+        implicit_smoothing=[Phase2Config.IMPLICIT_SMOOTHING_LAMBDA,
+                            Phase2Config.IMPLICIT_SMOOTHING_KNN,
+                            Phase2Config.IMPLICIT_MAX_WEIGHT_DELTA],
+        proxy=[Phase2Config.PROXY_RIG_MIN_VERTS, Phase2Config.PROXY_RIG_TARGET_VERTS,
+               Phase2Config.PROXY_RIG_SMOOTH_ITERATIONS, Phase2Config.PROXY_RIG_SMOOTH_STRENGTH,
+               "quadric" if PYMESHLAB_AVAILABLE else "clustering"],
+        template=_get_rig_template(character_type)["digest"] if weighting == "template" else None,
     )
+    t0 = time.time()
+    cached = _rig_cache.load(cache_key, total_verts)
+    session_reused = False
+    coloc_groups = None
+    if cached is not None:
+        joints = cached["joints"]
+        skin_weights = SkinWeights(cached["joint_indices"], cached["joint_weights"])
+        print(f"  ⚡ Rig cache hit {cache_key[:12]}: reusing joints + weights "
+              f"({(time.time() - t0) * 1000:.0f} ms)")
+    else:
+        # ── Rig session: same geometry, new markers → cached setup, Dijkstra for moved bones only ──
+        session, session_reused = _get_rig_session(geometry, P_all, all_indices)
+        if session_reused:
+            print(f"  ♻️ Rig session {geometry[:12]}: reusing unique map, graph, "
+                  f"distance fields and smoothing operators")
+        with session.lock:
+            joints, skin_weights = _compute_rig_weights(
+                P_all, all_indices, character_type, weighting, smoothing, workers,
+                markers=markers, session=session
+            )
+        print(f"  ⏱️ Joints + weights in {time.time() - t0:.2f}s")
+        coloc_groups = session.coloc.first[session.coloc.inverse]
+        _rig_cache.store(cache_key, joints, skin_weights.joints, skin_weights.weights)
     
-    # ── Cleanup tiny weights (<2%) on unique mesh ──
-    u_ji, u_jw = _cleanup_tiny_weights(u_ji, u_jw, num_unique, min_weight=0.02)
-    
-    # ── Map weights back to ALL original vertices ──
-    # ZERO-TEAR GUARANTEE: co-located vertices share the SAME unique index
-    # → they get BITWISE-IDENTICAL weights → impossible to tear at UV seams
-    joint_indices = []
-    joint_weights = []
-    for vi in range(total_verts):
-        uid = vert_to_unique[vi]
-        joint_indices.append(u_ji[uid][:])
-        joint_weights.append(u_jw[uid][:])
-    
-    dup_count = total_verts - num_unique
-    print(f"  ✅ Weight transfer: {num_unique} unique → {total_verts} total "
-          f"({dup_count} duplicates get identical weights, 0 possible tears)")
+    num_joints = len(joints)
+    bone_names = [j[0] for j in joints]
     
     # --- Build glTF skin data ---
+    # New arrays are queued on the document; offsets are assigned in one
+    # layout pass at save time, after the (memory-mapped) original buffer.
+    doc = _glb_io.GLTFDocument(gltf, bin_data)
+    
+    for acc_idx, P in restored_positions.items():
+        doc.replace_accessor(acc_idx, P.astype(np.float32), "VEC3", target=34962, min_max=True)
+    if restored_positions:
+        for mesh in gltf.get("meshes", []):
+            mesh.get("extras", {}).pop("quantization", None)
+        drop_extension_if_unused(gltf)
+        print(f"  🗜️ Restored {len(restored_positions)} quantized POSITION accessor(s) to float")
     
     # 1. Create joint nodes
     if "nodes" not in gltf:
@@ -1605,43 +2249,40 @@ def rig_model_glb(input_path: str, output_path: str, character_type: str, marker
         scene["nodes"].append(root_joint_idx)
     
     # 2. Create inverse bind matrices
-    ibm_data = bytearray()
-    for name, parent_idx, pos in joints:
-        ibm = _inverse_bind_matrix(pos[0], pos[1], pos[2])
-        ibm_data += struct.pack('<16f', *ibm)
-    
-    ibm_offset = _append_to_buffer(bin_data, bytes(ibm_data), gltf)
-    ibm_bv_idx = _add_buffer_view(gltf, ibm_offset, len(ibm_data))
-    ibm_acc_idx = _add_accessor(gltf, ibm_bv_idx, 5126, num_joints, "MAT4")  # 5126 = FLOAT
+    ibm_data = np.array([_inverse_bind_matrix(pos[0], pos[1], pos[2])
+                         for name, parent_idx, pos in joints], dtype=np.float32)
+    ibm_acc_idx = doc.add_accessor(ibm_data, "MAT4")
     
     # ── Write JOINTS_0 + WEIGHTS_0 for EACH primitive ──
+    skin_encoding = skin_encoding or Phase2Config.SKIN_ENCODING
+    all_ji, all_jw, weights_normalized = _encode_skin_attributes(
+        skin_weights.joints, skin_weights.weights, num_joints, skin_encoding
+    )
+    skin_bytes = all_ji.nbytes + all_jw.nbytes
+    
     vert_offset = 0
     for info in primitives_info:
         cnt = info["pos_count"]
         prim = info["prim"]
-        prim_ji = joint_indices[vert_offset:vert_offset + cnt]
-        prim_jw = joint_weights[vert_offset:vert_offset + cnt]
         
-        # JOINTS_0 (4 joint indices per vertex, UNSIGNED_SHORT)
-        joints_data = bytearray()
-        for j4 in prim_ji:
-            joints_data += struct.pack('<4H', *[min(j, num_joints - 1) for j in j4])
-        joints_offset = _append_to_buffer(bin_data, bytes(joints_data), gltf)
-        joints_bv_idx = _add_buffer_view(gltf, joints_offset, len(joints_data))
-        joints_acc_idx = _add_accessor(gltf, joints_bv_idx, 5123, cnt, "VEC4")
-        
-        # WEIGHTS_0 (4 weights per vertex, FLOAT)
-        weights_data = bytearray()
-        for w4 in prim_jw:
-            weights_data += struct.pack('<4f', *w4)
-        weights_offset = _append_to_buffer(bin_data, bytes(weights_data), gltf)
-        weights_bv_idx = _add_buffer_view(gltf, weights_offset, len(weights_data))
-        weights_acc_idx = _add_accessor(gltf, weights_bv_idx, 5126, cnt, "VEC4")
+        joints_acc_idx = doc.add_accessor(all_ji[vert_offset:vert_offset + cnt], "VEC4")
+        weights_acc_idx = doc.add_accessor(all_jw[vert_offset:vert_offset + cnt], "VEC4",
+                                           normalized=weights_normalized)
         
         prim["attributes"]["JOINTS_0"] = joints_acc_idx
         prim["attributes"]["WEIGHTS_0"] = weights_acc_idx
         vert_offset += cnt
     
+    print(f"  📦 Skin attributes ({skin_encoding}): {skin_bytes / 1024:.1f} KB "
+          f"({skin_bytes / max(total_verts, 1):.0f} bytes/vertex)")
+    
+    # ── Inline QA of exactly what is written (decoded like a glTF reader) ──
+    skin_report = None
+    if Phase2Config.SKIN_QA:
+        qa_weights = all_jw.astype(np.float32) / np.iinfo(all_jw.dtype).max if weights_normalized else all_jw
+        skin_report = _skin_qa.check_skin(P_all, all_ji, qa_weights, num_joints, indices=all_indices,
+                                          bone_names=bone_names, groups=coloc_groups)
+        print(f"  🩺 Skin QA: {_skin_qa.summary(skin_report)}")
     print(f"  ✅ Skinning data written to {len(primitives_info)} primitive(s)")
     
     # 6. Create skin
@@ -1663,8 +2304,9 @@ def rig_model_glb(input_path: str, output_path: str, character_type: str, marker
         if "mesh" in node:
             node["skin"] = skin_idx
     
-    # Write output
-    _write_glb(output_path, gltf, bytes(bin_data))
+    # Write output (repack drops the replaced quantized position views)
+    doc.save(output_path, repack=bool(restored_positions))
+    quantization = maybe_quantize_glb(output_path)
     
     file_size = os.path.getsize(output_path)
     print(f"  ✅ Rigged model saved: {output_path} ({file_size / 1024:.1f} KB)")
@@ -1676,7 +2318,15 @@ def rig_model_glb(input_path: str, output_path: str, character_type: str, marker
         "character_type": character_type,
         "num_joints": num_joints,
         "num_vertices_weighted": total_verts,
-        "num_primitives_skinned": len(primitives_info)
+        "num_primitives_skinned": len(primitives_info),
+        "weighting": weighting,
+        "smoothing": smoothing,
+        "workers": workers,
+        "cache_hit": cached is not None,
+        "session_reused": session_reused,
+        "skin_qa": skin_report,
+        "quantization": quantization,
+        "preview": _rig_preview(output_path, preview)
     }
 
 
@@ -1712,14 +2362,22 @@ class RiggingService:
         self.loaded = True
         return True
     
-    def auto_rig(self, model_path: str, character_type: str, markers: list = None):
+    def auto_rig(self, model_path: str, character_type: str, markers: list = None,
+                 skin_encoding: str = None, weighting: str = None, smoothing: str = None,
+                 workers: int = None, preview: str = None):
         """
         Automatically rig a 3D model by adding a skeleton and vertex weights.
         
         Args:
             model_path: Path to GLB model
             character_type: "humanoid" or "quadruped"
-            markers: Optional list of marker positions for guided rigging
+            markers: Optional rig panel markers ({"id", "position": {"x", "y"}});
+                moved markers move the joints they drive
+            skin_encoding: "float", "compact16" or "compact8" (None = config default)
+            weighting: "geodesic", "heat" or "template" (None = config default)
+            smoothing: "iterative" or "implicit" (None = config default)
+            workers: parallel workers for this rig (None = config default, 0 = all cores)
+            preview: "sprite", "gif" or "none" (None = config default)
         
         Returns:
             Dict with rigged model path and bone list
@@ -1731,12 +2389,16 @@ class RiggingService:
             
             output_path = str(OUTPUT_DIR / f"{uuid.uuid4()}_rigged.glb")
             
-            result = rig_model_glb(model_path, output_path, character_type, markers)
+            result = rig_model_glb(model_path, output_path, character_type, markers,
+                                   skin_encoding=skin_encoding, weighting=weighting,
+                                   smoothing=smoothing, workers=workers, preview=preview)
             
             if result["success"]:
                 # Return URL path for frontend
                 rigged_filename = os.path.basename(output_path)
                 result["rigged_model_url"] = f"/outputs/{rigged_filename}"
+                if result.get("preview"):
+                    result["preview_url"] = f"/outputs/{os.path.basename(result['preview']['path'])}"
             
             return result
             
@@ -1749,1707 +2411,154 @@ class RiggingService:
 # ANIMATION SERVICE — Real Implementation
 # ============================================
 
-def _quaternion_from_euler(rx, ry, rz):
-    """Convert Euler angles (radians) to quaternion [x, y, z, w]."""
-    cx = math.cos(rx / 2); sx = math.sin(rx / 2)
-    cy = math.cos(ry / 2); sy = math.sin(ry / 2)
-    cz = math.cos(rz / 2); sz = math.sin(rz / 2)
-    
-    return [
-        sx * cy * cz - cx * sy * sz,
-        cx * sy * cz + sx * cy * sz,
-        cx * cy * sz - sx * sy * cz,
-        cx * cy * cz + sx * sy * sz
-    ]
-
-
-# ════════════════════════════════════════════════════════════════
-# SMOOTH ANIMATION HELPERS — Mixamo-quality easing & tangents
-# ════════════════════════════════════════════════════════════════
-
-def _ease_in_out(t):
-    """Smooth Hermite ease-in-out (S-curve). Maps [0,1]→[0,1]."""
-    return t * t * (3.0 - 2.0 * t)
-
-def _ease_in_out_quint(t):
-    """Quintic ease-in-out for very smooth transitions."""
-    if t < 0.5:
-        return 16 * t * t * t * t * t
-    p = 2 * t - 2
-    return 0.5 * p * p * p * p * p + 1
-
-def _ease_out_cubic(t):
-    """Cubic ease-out — fast start, smooth deceleration."""
-    p = 1 - t
-    return 1 - p * p * p
-
-def _ease_in_cubic(t):
-    """Cubic ease-in — smooth start, fast end."""
-    return t * t * t
-
-def _ease_out_elastic(t, amplitude=0.08):
-    """Subtle elastic overshoot for secondary motion (follow-through)."""
-    if t <= 0 or t >= 1:
-        return t
-    return 1.0 + amplitude * math.sin(-6.5 * math.pi * t) * (1 - t)
-
-def _blend_q(a, b, t):
-    """Blend two quaternions component-wise (nlerp). Good for small angles."""
-    r = [a[j] + (b[j] - a[j]) * t for j in range(4)]
-    ln = math.sqrt(sum(x*x for x in r))
-    return [x / ln for x in r] if ln > 1e-8 else [0, 0, 0, 1]
-
-def _q_mul(a, b):
-    """Multiply two quaternions a * b. Format: [x, y, z, w]."""
-    ax, ay, az, aw = a
-    bx, by, bz, bw = b
-    return [
-        aw*bx + ax*bw + ay*bz - az*by,
-        aw*by - ax*bz + ay*bw + az*bx,
-        aw*bz + ax*by - ay*bx + az*bw,
-        aw*bw - ax*bx - ay*by - az*bz,
-    ]
-
-def _compute_catmull_rom_tangents(times, values, component_count, is_loop=False):
+def _clip_tracks(nodes, joint_node_indices, bone_names, animation_id, duration, is_loop):
     """
-    Compute Catmull-Rom tangents for CUBICSPLINE interpolation.
-    
-    For each keyframe, computes in-tangent and out-tangent using
-    the Catmull-Rom formula: tangent[i] = (v[i+1] - v[i-1]) / (t[i+1] - t[i-1])
-    
-    Args:
-        times: list of keyframe times
-        values: list of keyframe values (each is a list of `component_count` floats)
-        component_count: 4 for quaternions (VEC4), 3 for translations (VEC3)
-        is_loop: whether animation loops (for wrap-around tangents)
-    
-    Returns:
-        (in_tangents, out_tangents) — each is list of lists matching values shape
+    CUBICSPLINE tracks of one clip on a rigged skeleton, in sampler order:
+    [{"node", "path", "interpolation", "times", "values"}] with (keys,)
+    float32 times and (keys, 3, C) float32 [inTangent, value, outTangent]
+    values. `node` indexes `nodes`, the rigged model's nodes (rest poses).
+    The same tracks become glTF samplers and drive skin_preview.
+    
+    Returns (tracks, rest_nodes): rest_nodes are the joints whose rotation
+    channel was dropped because the clip holds them at their identity rest
+    rotation. They are still driven by the clip (at rest), so skin QA must
+    count them as targeted.
     """
-    n = len(times)
-    in_tangents = []
-    out_tangents = []
-    
-    for i in range(n):
-        if n < 2:
-            tang = [0.0] * component_count
-            in_tangents.append(tang)
-            out_tangents.append(tang[:])
+    # Packed, key-reduced sampler blocks for this clip on this skeleton
+    # (clip_cache): times and rotation CUBICSPLINE outputs are used as they are
+    clip = _clip_cache.get(animation_id, bone_names, duration, is_loop)
+    identity = set(clip["identity"])
+    
+    tracks = []
+    rest_nodes = []
+    for bone_idx, node_idx in enumerate(joint_node_indices):
+        bone_name = bone_names[bone_idx]
+        rotation = clip["rotations"].get(bone_name)
+        if rotation is None:
             continue
         
-        if i == 0:
-            if is_loop:
-                prev_v = values[-1]
-                prev_t = times[0] - (times[-1] - times[-2])
-            else:
-                prev_v = values[0]
-                prev_t = times[0]
-            next_v = values[1]
-            next_t = times[1]
-        elif i == n - 1:
-            prev_v = values[-2]
-            prev_t = times[-2]
-            if is_loop:
-                next_v = values[0]
-                next_t = times[-1] + (times[1] - times[0])
-            else:
-                next_v = values[-1]
-                next_t = times[-1]
-        else:
-            prev_v = values[i - 1]
-            prev_t = times[i - 1]
-            next_v = values[i + 1]
-            next_t = times[i + 1]
-        
-        dt = next_t - prev_t
-        if abs(dt) < 1e-10:
-            dt = 1e-10
-        
-        tang = [(next_v[j] - prev_v[j]) / dt for j in range(component_count)]
-        
-        # Dampen tangents slightly for more stable interpolation
-        tang = [t * 0.85 for t in tang]
+        # ── Rotation channel — CUBICSPLINE for Mixamo-smooth interpolation ──
+        # Identity for the whole clip on a node at rest rotation: nothing to animate
+        node = nodes[node_idx]
+        if bone_name in identity and "matrix" not in node and \
+                np.allclose(node.get("rotation", [0, 0, 0, 1]), [0, 0, 0, 1], atol=1e-6):
+            rotation = None
+            rest_nodes.append(node_idx)
+        
+        if rotation is not None:
+            # CUBICSPLINE output format: [inTangent₀, value₀, outTangent₀, inTangent₁, value₁, outTangent₁, ...]
+            # This lets the GPU compute Hermite splines between keyframes → silky smooth.
+            # (keys, 3, 4) interleaved triplets; accessor count = number of keyframes × 3
+            tracks.append({"node": node_idx, "path": "rotation", "interpolation": "CUBICSPLINE",
+                           "times": rotation["times"], "values": rotation["block"]})
         
-        in_tangents.append(tang)
-        out_tangents.append(tang[:])
+        # ── Translation channel (hip bounce, etc.) — also CUBICSPLINE ──
+        translation = clip["translations"].get(bone_name)
+        if translation is not None:
+            rest_trans = node.get("translation", [0, 0, 0])
+            
+            # Absolute translations (rest + delta) with Catmull-Rom tangents (VEC3)
+            abs_trans = np.asarray(rest_trans, dtype=np.float64) + translation["values"]
+            tr_tang = _anim_math.catmull_rom_tangents(translation["times"], abs_trans, is_loop)
+            
+            # Pack as interleaved triplets
+            trans_data = np.stack([tr_tang, abs_trans, tr_tang], axis=1).astype(np.float32)  # (keys, 3, 3)
+            tracks.append({"node": node_idx, "path": "translation", "interpolation": "CUBICSPLINE",
+                           "times": translation["times"].astype(np.float32), "values": trans_data})
     
-    return in_tangents, out_tangents
+    return tracks, rest_nodes
 
 
-def _generate_animation_keyframes(animation_id: str, bone_names: list, duration: float):
+def _append_clip_channels(doc, tracks):
     """
-    Generate Mixamo-quality animation keyframes for each bone.
-    
-    KEY IMPROVEMENTS over old version:
-    - 60 keyframes (was 24) for much smoother curves
-    - Proper biomechanical gait phases for walk/run
-    - Overlapping action: extremities lag behind torso
-    - Follow-through: momentum overshoot on stops
-    - Anticipation: wind-up before fast actions
-    - Smooth easing: quintic/cubic ease curves, not just linear sin()
-    - Figure-8 hip motion pattern for locomotion
-    - Proper foot roll: heel-strike → flat → toe-off
-    
-    Returns dict: {bone_name: {"times": [...], "rotations": [...quaternions...]}}
-    Each rotation is [x, y, z, w] quaternion.
+    Add the samplers and channels of one clip's tracks (_clip_tracks) to
+    `doc` and return them as (channels, samplers) — indices local to one
+    glTF animation. Tracks with the same kept keys share one time accessor.
     """
-    identity_q = [0, 0, 0, 1]
-    keyframes = {}
-    
-    # 60 keyframes — Mixamo uses 30-60fps, we use 60 for ultra-smooth curves
-    n = 60
-    times = [i * duration / (n - 1) for i in range(n)]
-    
-    for bone in bone_names:
-        keyframes[bone] = {
-            "times": times,
-            "rotations": [identity_q[:] for _ in range(n)],
-            "translations": None
-        }
+    channels = []
+    samplers = []
+    for sampler_idx, track in enumerate(tracks):
+        values = track["values"]
+        samplers.append({
+            "input": doc.add_accessor(track["times"], "SCALAR", min_max=True),
+            "output": doc.add_accessor(values, "VEC4" if values.shape[-1] == 4 else "VEC3"),
+            "interpolation": track["interpolation"]
+        })
+        channels.append({
+            "sampler": sampler_idx,
+            "target": {"node": track["node"], "path": track["path"]}
+        })
     
-    # ══════════════════════════════════════════════════════════
-    # WALK — Biomechanically accurate gait cycle (Mixamo-quality)
-    # ══════════════════════════════════════════════════════════
-    if animation_id == "walk":
-        for i in range(n):
-            t = i / (n - 1)  # 0..1 over one full stride cycle
-            
-            # --- Phase generators ---
-            # Main stride: full sine wave (one complete L-R cycle)
-            stride = math.sin(t * 2 * math.pi)
-            # Double-time bounce (vertical oscillation, 2x per stride)
-            bounce = math.sin(t * 4 * math.pi)
-            # Asymmetric stride with sharper push-off (realistic gait)
-            stride_asym = math.sin(t * 2 * math.pi) + 0.15 * math.sin(t * 4 * math.pi)
-            # Phase-shifted for overlapping action on upper body
-            upper_lag = math.sin(t * 2 * math.pi - 0.18)  # upper body lags ~10° behind
-            arm_lag = math.sin(t * 2 * math.pi - 0.30)    # arms lag ~17° behind
-            # Foot contact phases (asymmetric — fast push-off, slow swing)
-            contact_l = max(0, math.sin(t * 2 * math.pi + 0.4))  # left foot on ground
-            contact_r = max(0, math.sin(t * 2 * math.pi - math.pi + 0.4))  # right foot
-            # Smooth absolute value for knee flex
-            knee_flex_l = max(0, -stride) ** 1.3 * 0.45  # flex during back-swing
-            knee_flex_r = max(0, stride) ** 1.3 * 0.45
-            
-            # === HIPS ===
-            if "hips" in keyframes:
-                hip_pitch = bounce * 0.025                   # vertical nod
-                hip_yaw = stride * 0.07                      # twist with stride
-                hip_roll = stride * 0.025                    # lateral sway
-                keyframes["hips"]["rotations"][i] = _quaternion_from_euler(hip_pitch, hip_yaw, hip_roll)
-            
-            # === SPINE CHAIN (counter-rotation cascade) ===
-            if "spine" in keyframes:
-                keyframes["spine"]["rotations"][i] = _quaternion_from_euler(
-                    bounce * 0.012, -upper_lag * 0.05, -upper_lag * 0.018)
-            if "spine1" in keyframes:
-                keyframes["spine1"]["rotations"][i] = _quaternion_from_euler(
-                    0, -upper_lag * 0.03, -upper_lag * 0.008)
-            if "spine2" in keyframes:
-                keyframes["spine2"]["rotations"][i] = _quaternion_from_euler(
-                    0, -upper_lag * 0.02, 0)
-            
-            # === NECK & HEAD (stabilized — minimal movement) ===
-            if "neck" in keyframes:
-                keyframes["neck"]["rotations"][i] = _quaternion_from_euler(
-                    bounce * 0.008, upper_lag * 0.015, 0)
-            if "head" in keyframes:
-                # Head counter-rotates slightly to stay level (vestibulo-ocular reflex)
-                keyframes["head"]["rotations"][i] = _quaternion_from_euler(
-                    bounce * 0.010, upper_lag * 0.02, -stride * 0.008)
-            
-            # === UPPER LEGS (thighs) — Main stride motion ===
-            if "thigh_l" in keyframes:
-                # Forward swing: smooth, Back swing: quicker (push-off power)
-                thigh_l_pitch = stride_asym * 0.30
-                thigh_l_roll = -0.02 + bounce * 0.008  # slight abduction
-                keyframes["thigh_l"]["rotations"][i] = _quaternion_from_euler(thigh_l_pitch, 0, thigh_l_roll)
-            if "thigh_r" in keyframes:
-                thigh_r_pitch = -stride_asym * 0.30
-                thigh_r_roll = 0.02 - bounce * 0.008
-                keyframes["thigh_r"]["rotations"][i] = _quaternion_from_euler(thigh_r_pitch, 0, thigh_r_roll)
-            
-            # === KNEES (shins) — Flex during swing phase ===
-            if "shin_l" in keyframes:
-                # Knee flexes during back-swing, extends for heel-strike
-                # Also slight flex at loading response (shock absorption)
-                loading = max(0, stride) * 0.08  # loading response flex
-                keyframes["shin_l"]["rotations"][i] = _quaternion_from_euler(knee_flex_l + loading, 0, 0)
-            if "shin_r" in keyframes:
-                loading = max(0, -stride) * 0.08
-                keyframes["shin_r"]["rotations"][i] = _quaternion_from_euler(knee_flex_r + loading, 0, 0)
-            
-            # === FEET — Heel-strike → Flat → Toe-off roll ===
-            if "foot_l" in keyframes:
-                # Dorsiflexion at heel-strike, plantarflexion at push-off
-                foot_l = -stride * 0.18 + max(0, -stride) * 0.10
-                keyframes["foot_l"]["rotations"][i] = _quaternion_from_euler(foot_l, 0, 0)
-            if "foot_r" in keyframes:
-                foot_r = stride * 0.18 + max(0, stride) * 0.10
-                keyframes["foot_r"]["rotations"][i] = _quaternion_from_euler(foot_r, 0, 0)
-            
-            # === TOES — Push-off flex ===
-            if "toe_l" in keyframes:
-                keyframes["toe_l"]["rotations"][i] = _quaternion_from_euler(contact_l * 0.15, 0, 0)
-            if "toe_r" in keyframes:
-                keyframes["toe_r"]["rotations"][i] = _quaternion_from_euler(contact_r * 0.15, 0, 0)
-            
-            # === SHOULDERS (overlapping action — lag behind spine) ===
-            if "shoulder_l" in keyframes:
-                keyframes["shoulder_l"]["rotations"][i] = _quaternion_from_euler(
-                    -arm_lag * 0.08, 0, -arm_lag * 0.025)
-            if "shoulder_r" in keyframes:
-                keyframes["shoulder_r"]["rotations"][i] = _quaternion_from_euler(
-                    arm_lag * 0.08, 0, arm_lag * 0.025)
-            
-            # === ARMS — Opposite to legs with natural pendulum ===
-            if "arm_l" in keyframes:
-                keyframes["arm_l"]["rotations"][i] = _quaternion_from_euler(
-                    -arm_lag * 0.18, 0, -0.04 - abs(arm_lag) * 0.02)
-            if "arm_r" in keyframes:
-                keyframes["arm_r"]["rotations"][i] = _quaternion_from_euler(
-                    arm_lag * 0.18, 0, 0.04 + abs(arm_lag) * 0.02)
-            
-            # === FOREARMS — Bent more during back-swing (momentum) ===
-            if "forearm_l" in keyframes:
-                forearm_bend = -0.12 + max(0, arm_lag) * 0.08
-                keyframes["forearm_l"]["rotations"][i] = _quaternion_from_euler(forearm_bend, 0, 0)
-            if "forearm_r" in keyframes:
-                forearm_bend = -0.12 + max(0, -arm_lag) * 0.08
-                keyframes["forearm_r"]["rotations"][i] = _quaternion_from_euler(forearm_bend, 0, 0)
-            
-            # === HANDS — Subtle wrist flex with arm swing ===
-            if "hand_l" in keyframes:
-                keyframes["hand_l"]["rotations"][i] = _quaternion_from_euler(
-                    arm_lag * 0.04, 0, arm_lag * 0.025)
-            if "hand_r" in keyframes:
-                keyframes["hand_r"]["rotations"][i] = _quaternion_from_euler(
-                    -arm_lag * 0.04, 0, -arm_lag * 0.025)
-    
-    # ══════════════════════════════════════════════════════════
-    # RUN — Exaggerated walk with flight phase
-    # ══════════════════════════════════════════════════════════
-    
-    elif animation_id == "run":
-        for i in range(n):
-            t = i / (n - 1)
-            # Phase generators with offset for overlapping action
-            stride = math.sin(t * 2 * math.pi)
-            stride_asym = stride + 0.2 * math.sin(t * 4 * math.pi)  # sharper push-off
-            bounce = math.sin(t * 4 * math.pi)
-            upper_lag = math.sin(t * 2 * math.pi - 0.22)
-            arm_lag = math.sin(t * 2 * math.pi - 0.35)
-            
-            # Knee flex — much higher than walk (heel almost touches butt)
-            knee_l = max(0, -stride) ** 1.2 * 0.65
-            knee_r = max(0, stride) ** 1.2 * 0.65
-            
-            # === Legs ===
-            if "thigh_l" in keyframes:
-                keyframes["thigh_l"]["rotations"][i] = _quaternion_from_euler(stride_asym * 0.42, 0, -0.02)
-            if "thigh_r" in keyframes:
-                keyframes["thigh_r"]["rotations"][i] = _quaternion_from_euler(-stride_asym * 0.42, 0, 0.02)
-            if "shin_l" in keyframes:
-                loading = max(0, stride) * 0.10
-                keyframes["shin_l"]["rotations"][i] = _quaternion_from_euler(knee_l + loading, 0, 0)
-            if "shin_r" in keyframes:
-                loading = max(0, -stride) * 0.10
-                keyframes["shin_r"]["rotations"][i] = _quaternion_from_euler(knee_r + loading, 0, 0)
-            if "foot_l" in keyframes:
-                keyframes["foot_l"]["rotations"][i] = _quaternion_from_euler(
-                    -stride * 0.22 + max(0, -stride) * 0.15, 0, 0)
-            if "foot_r" in keyframes:
-                keyframes["foot_r"]["rotations"][i] = _quaternion_from_euler(
-                    stride * 0.22 + max(0, stride) * 0.15, 0, 0)
-            if "toe_l" in keyframes:
-                keyframes["toe_l"]["rotations"][i] = _quaternion_from_euler(max(0, stride) * 0.18, 0, 0)
-            if "toe_r" in keyframes:
-                keyframes["toe_r"]["rotations"][i] = _quaternion_from_euler(max(0, -stride) * 0.18, 0, 0)
-            
-            # === Torso — forward lean + aggressive counter-rotation ===
-            if "hips" in keyframes:
-                keyframes["hips"]["rotations"][i] = _quaternion_from_euler(
-                    0.06 + bounce * 0.04, stride * 0.10, stride * 0.035)
-            if "spine" in keyframes:
-                keyframes["spine"]["rotations"][i] = _quaternion_from_euler(
-                    0.05 + bounce * 0.015, -upper_lag * 0.10, -upper_lag * 0.02)
-            if "spine1" in keyframes:
-                keyframes["spine1"]["rotations"][i] = _quaternion_from_euler(
-                    0.03, -upper_lag * 0.06, 0)
-            if "spine2" in keyframes:
-                keyframes["spine2"]["rotations"][i] = _quaternion_from_euler(
-                    0.02, -upper_lag * 0.03, 0)
-            if "neck" in keyframes:
-                keyframes["neck"]["rotations"][i] = _quaternion_from_euler(bounce * 0.018, 0, 0)
-            if "head" in keyframes:
-                keyframes["head"]["rotations"][i] = _quaternion_from_euler(bounce * 0.022, upper_lag * 0.015, 0)
-            
-            # === Arms — powerful pump ===
-            if "shoulder_l" in keyframes:
-                keyframes["shoulder_l"]["rotations"][i] = _quaternion_from_euler(
-                    -arm_lag * 0.12, 0, -arm_lag * 0.04)
-            if "shoulder_r" in keyframes:
-                keyframes["shoulder_r"]["rotations"][i] = _quaternion_from_euler(
-                    arm_lag * 0.12, 0, arm_lag * 0.04)
-            if "arm_l" in keyframes:
-                keyframes["arm_l"]["rotations"][i] = _quaternion_from_euler(
-                    -arm_lag * 0.30, 0, -0.05 - abs(arm_lag) * 0.03)
-            if "arm_r" in keyframes:
-                keyframes["arm_r"]["rotations"][i] = _quaternion_from_euler(
-                    arm_lag * 0.30, 0, 0.05 + abs(arm_lag) * 0.03)
-            if "forearm_l" in keyframes:
-                keyframes["forearm_l"]["rotations"][i] = _quaternion_from_euler(
-                    -0.25 + max(0, arm_lag) * 0.12, 0, 0)
-            if "forearm_r" in keyframes:
-                keyframes["forearm_r"]["rotations"][i] = _quaternion_from_euler(
-                    -0.25 + max(0, -arm_lag) * 0.12, 0, 0)
-            if "hand_l" in keyframes:
-                keyframes["hand_l"]["rotations"][i] = _quaternion_from_euler(0, 0, arm_lag * 0.05)
-            if "hand_r" in keyframes:
-                keyframes["hand_r"]["rotations"][i] = _quaternion_from_euler(0, 0, -arm_lag * 0.05)
-    
-    elif animation_id == "attack":
-        for i in range(n):
-            t = i / (n - 1)
-            
-            if t < 0.3:
-                # Wind up — ease-in (slow start) for anticipation
-                p = _ease_in_cubic(t / 0.3)
-                if "shoulder_r" in keyframes:
-                    keyframes["shoulder_r"]["rotations"][i] = _quaternion_from_euler(-p * 0.35, 0, -p * 0.08)
-                if "arm_r" in keyframes:
-                    keyframes["arm_r"]["rotations"][i] = _quaternion_from_euler(-p * 1.2, 0, -p * 0.2)
-                if "forearm_r" in keyframes:
-                    keyframes["forearm_r"]["rotations"][i] = _quaternion_from_euler(-p * 0.7, 0, 0)
-                if "hips" in keyframes:
-                    keyframes["hips"]["rotations"][i] = _quaternion_from_euler(0, p * 0.12, 0)
-                if "spine" in keyframes:
-                    keyframes["spine"]["rotations"][i] = _quaternion_from_euler(0, p * 0.08, 0)
-                if "spine2" in keyframes:
-                    keyframes["spine2"]["rotations"][i] = _quaternion_from_euler(0, p * 0.25, 0)
-                # Secondary: weight shift to back foot
-                if "thigh_r" in keyframes:
-                    keyframes["thigh_r"]["rotations"][i] = _quaternion_from_euler(-p * 0.08, 0, 0)
-                if "head" in keyframes:
-                    keyframes["head"]["rotations"][i] = _quaternion_from_euler(0, p * 0.08, 0)
-            elif t < 0.5:
-                # Strike forward — swing arm, twist torso
-                p = (t - 0.3) / 0.2
-                if "shoulder_r" in keyframes:
-                    keyframes["shoulder_r"]["rotations"][i] = _quaternion_from_euler(-0.35 + p * 0.55, 0, -0.08 + p * 0.08)
-                if "arm_r" in keyframes:
-                    keyframes["arm_r"]["rotations"][i] = _quaternion_from_euler(-1.2 + p * 1.8, 0, -0.2 + p * 0.2)
-                if "forearm_r" in keyframes:
-                    keyframes["forearm_r"]["rotations"][i] = _quaternion_from_euler(-0.7 + p * 0.7, 0, 0)
-                if "hips" in keyframes:
-                    keyframes["hips"]["rotations"][i] = _quaternion_from_euler(0, 0.12 - p * 0.24, 0)
-                if "spine" in keyframes:
-                    keyframes["spine"]["rotations"][i] = _quaternion_from_euler(p * 0.06, 0.08 - p * 0.16, 0)
-                if "spine2" in keyframes:
-                    keyframes["spine2"]["rotations"][i] = _quaternion_from_euler(p * 0.15, 0.25 - p * 0.55, 0)
-            else:
-                # Recovery — return to rest
-                p = (t - 0.5) / 0.5
-                ease = 1 - p  # linear ease-out
-                if "shoulder_r" in keyframes:
-                    keyframes["shoulder_r"]["rotations"][i] = _quaternion_from_euler(0.2 * ease, 0, 0)
-                if "arm_r" in keyframes:
-                    keyframes["arm_r"]["rotations"][i] = _quaternion_from_euler(0.6 * ease, 0, 0)
-                if "hips" in keyframes:
-                    keyframes["hips"]["rotations"][i] = _quaternion_from_euler(0, -0.12 * ease, 0)
-                if "spine" in keyframes:
-                    keyframes["spine"]["rotations"][i] = _quaternion_from_euler(0.06 * ease, -0.08 * ease, 0)
-                if "spine2" in keyframes:
-                    keyframes["spine2"]["rotations"][i] = _quaternion_from_euler(0.12 * ease, -0.30 * ease, 0)
-    
-    elif animation_id == "dance":
-        # Smooth dance — layered sine waves at different frequencies + offsets
-        for i in range(n):
-            t = i / (n - 1)
-            # Multiple layered rhythms for organic feel
-            beat = math.sin(t * 4 * math.pi)              # main beat (2 per cycle)
-            beat_lag = math.sin(t * 4 * math.pi - 0.25)   # upper body lags
-            half = math.sin(t * 2 * math.pi)              # half-time sway
-            double = math.sin(t * 8 * math.pi)            # double-time accent
-            groove = math.cos(t * 4 * math.pi)
-            groove_lag = math.cos(t * 4 * math.pi - 0.3)
-            
-            if "hips" in keyframes:
-                keyframes["hips"]["rotations"][i] = _quaternion_from_euler(
-                    beat * 0.04 + double * 0.01,  # bounce
-                    half * 0.18,                    # sway
-                    groove * 0.10)                  # tilt
-            if "spine" in keyframes:
-                keyframes["spine"]["rotations"][i] = _quaternion_from_euler(
-                    beat_lag * 0.03, -half * 0.12, -groove_lag * 0.06)
-            if "spine1" in keyframes:
-                keyframes["spine1"]["rotations"][i] = _quaternion_from_euler(
-                    0, -half * 0.06, 0)
-            if "spine2" in keyframes:
-                keyframes["spine2"]["rotations"][i] = _quaternion_from_euler(
-                    beat_lag * 0.02, -half * 0.04, groove_lag * 0.03)
-            if "neck" in keyframes:
-                keyframes["neck"]["rotations"][i] = _quaternion_from_euler(
-                    beat * 0.03, half * 0.05, groove * 0.02)
-            if "head" in keyframes:
-                keyframes["head"]["rotations"][i] = _quaternion_from_euler(
-                    beat * 0.05 + double * 0.015, half * 0.06, groove * 0.04)
-            
-            # Arms — expressive with lag
-            arm_beat = math.sin(t * 4 * math.pi - 0.35)
-            if "shoulder_l" in keyframes:
-                keyframes["shoulder_l"]["rotations"][i] = _quaternion_from_euler(
-                    groove_lag * 0.12, 0, arm_beat * 0.08)
-            if "shoulder_r" in keyframes:
-                keyframes["shoulder_r"]["rotations"][i] = _quaternion_from_euler(
-                    -groove_lag * 0.12, 0, -arm_beat * 0.08)
-            if "arm_l" in keyframes:
-                keyframes["arm_l"]["rotations"][i] = _quaternion_from_euler(
-                    groove_lag * 0.30 - 0.45, 0, arm_beat * 0.18)
-            if "arm_r" in keyframes:
-                keyframes["arm_r"]["rotations"][i] = _quaternion_from_euler(
-                    -groove_lag * 0.30 - 0.45, 0, -arm_beat * 0.18)
-            if "forearm_l" in keyframes:
-                keyframes["forearm_l"]["rotations"][i] = _quaternion_from_euler(
-                    -0.55 + arm_beat * 0.18, 0, 0)
-            if "forearm_r" in keyframes:
-                keyframes["forearm_r"]["rotations"][i] = _quaternion_from_euler(
-                    -0.55 - arm_beat * 0.18, 0, 0)
-            if "hand_l" in keyframes:
-                keyframes["hand_l"]["rotations"][i] = _quaternion_from_euler(
-                    arm_beat * 0.06, 0, arm_beat * 0.04)
-            if "hand_r" in keyframes:
-                keyframes["hand_r"]["rotations"][i] = _quaternion_from_euler(
-                    -arm_beat * 0.06, 0, -arm_beat * 0.04)
-            
-            # Legs — stepping with weight
-            if "thigh_l" in keyframes:
-                keyframes["thigh_l"]["rotations"][i] = _quaternion_from_euler(
-                    max(0, beat) * 0.28 + max(0, -half) * 0.05, 0, 0)
-            if "thigh_r" in keyframes:
-                keyframes["thigh_r"]["rotations"][i] = _quaternion_from_euler(
-                    max(0, -beat) * 0.28 + max(0, half) * 0.05, 0, 0)
-            if "shin_l" in keyframes:
-                keyframes["shin_l"]["rotations"][i] = _quaternion_from_euler(
-                    max(0, beat) * 0.15, 0, 0)
-            if "shin_r" in keyframes:
-                keyframes["shin_r"]["rotations"][i] = _quaternion_from_euler(
-                    max(0, -beat) * 0.15, 0, 0)
-    
-    elif animation_id == "agree":
-        for i in range(n):
-            t = i / (n - 1)
-            # Damped oscillation — nods get smaller over time (natural gesture)
-            envelope = 1.0 - 0.4 * t  # gentle decay
-            nod = math.sin(t * 6 * math.pi) * 0.28 * envelope
-            nod_lag = math.sin(t * 6 * math.pi - 0.2) * 0.28 * envelope
-            if "head" in keyframes:
-                keyframes["head"]["rotations"][i] = _quaternion_from_euler(nod, 0, nod * 0.03)
-            if "neck" in keyframes:
-                keyframes["neck"]["rotations"][i] = _quaternion_from_euler(nod_lag * 0.35, 0, 0)
-            if "spine2" in keyframes:
-                keyframes["spine2"]["rotations"][i] = _quaternion_from_euler(nod_lag * 0.08, 0, 0)
-            if "spine" in keyframes:
-                keyframes["spine"]["rotations"][i] = _quaternion_from_euler(nod_lag * 0.04, 0, 0)
-            # Subtle shoulder micro-movement
-            if "shoulder_l" in keyframes:
-                keyframes["shoulder_l"]["rotations"][i] = _quaternion_from_euler(nod * 0.02, 0, 0)
-            if "shoulder_r" in keyframes:
-                keyframes["shoulder_r"]["rotations"][i] = _quaternion_from_euler(nod * 0.02, 0, 0)
-    
-    elif animation_id == "alert":
-        for i in range(n):
-            t = i / (n - 1)
-            if t < 0.3:
-                p = _ease_in_out(t / 0.3)
-                if "spine" in keyframes:
-                    keyframes["spine"]["rotations"][i] = _quaternion_from_euler(-p * 0.1, 0, 0)
-                if "spine2" in keyframes:
-                    keyframes["spine2"]["rotations"][i] = _quaternion_from_euler(-p * 0.05, p * 0.06, 0)
-                if "head" in keyframes:
-                    keyframes["head"]["rotations"][i] = _quaternion_from_euler(0, p * 0.5, p * 0.03)
-                if "neck" in keyframes:
-                    keyframes["neck"]["rotations"][i] = _quaternion_from_euler(0, p * 0.15, 0)
-                # Weight shift
-                if "hips" in keyframes:
-                    keyframes["hips"]["rotations"][i] = _quaternion_from_euler(0, 0, -p * 0.02)
-            else:
-                look = math.sin((t - 0.3) / 0.7 * 2 * math.pi)
-                look_lag = math.sin((t - 0.3) / 0.7 * 2 * math.pi - 0.15)
-                if "head" in keyframes:
-                    keyframes["head"]["rotations"][i] = _quaternion_from_euler(
-                        math.sin((t-0.3)/0.7 * 4 * math.pi) * 0.04, 0.5 * look, look * 0.03)
-                if "neck" in keyframes:
-                    keyframes["neck"]["rotations"][i] = _quaternion_from_euler(0, 0.15 * look_lag, 0)
-                if "spine2" in keyframes:
-                    keyframes["spine2"]["rotations"][i] = _quaternion_from_euler(-0.05, look_lag * 0.08, 0)
-                if "spine" in keyframes:
-                    keyframes["spine"]["rotations"][i] = _quaternion_from_euler(-0.1, look_lag * 0.04, 0)
-                if "hips" in keyframes:
-                    keyframes["hips"]["rotations"][i] = _quaternion_from_euler(0, 0, look * 0.015)
-                if "spine" in keyframes:
-                    keyframes["spine"]["rotations"][i] = _quaternion_from_euler(-0.1, look * 0.1, 0)
-    
-    elif animation_id == "arise":
-        for i in range(n):
-            t = i / (n - 1)
-            # Smooth ease-out — fast at start (momentum), slows as standing
-            crouch_raw = max(0, 1 - t * 2)
-            crouch = crouch_raw * crouch_raw  # quadratic ease for natural deceleration
-            # Upper body leads, legs follow (overlapping action)
-            upper_t = min(1.0, t * 2.2)  # upper body finishes faster
-            upper_crouch = max(0, 1 - upper_t)
-            upper_crouch = upper_crouch * upper_crouch
-            # Head leads the way up (anticipation)
-            head_t = min(1.0, t * 2.5)
-            head_crouch = max(0, 1 - head_t) ** 2
-            
-            if "hips" in keyframes:
-                keyframes["hips"]["rotations"][i] = _quaternion_from_euler(crouch * 0.4, 0, 0)
-            if "spine" in keyframes:
-                keyframes["spine"]["rotations"][i] = _quaternion_from_euler(upper_crouch * 0.3, 0, 0)
-            if "spine1" in keyframes:
-                keyframes["spine1"]["rotations"][i] = _quaternion_from_euler(upper_crouch * 0.15, 0, 0)
-            if "neck" in keyframes:
-                keyframes["neck"]["rotations"][i] = _quaternion_from_euler(head_crouch * 0.12, 0, 0)
-            if "head" in keyframes:
-                keyframes["head"]["rotations"][i] = _quaternion_from_euler(head_crouch * 0.18, 0, 0)
-            if "shoulder_l" in keyframes:
-                keyframes["shoulder_l"]["rotations"][i] = _quaternion_from_euler(upper_crouch * 0.1, 0, upper_crouch * 0.05)
-            if "shoulder_r" in keyframes:
-                keyframes["shoulder_r"]["rotations"][i] = _quaternion_from_euler(upper_crouch * 0.1, 0, -upper_crouch * 0.05)
-            if "arm_l" in keyframes:
-                keyframes["arm_l"]["rotations"][i] = _quaternion_from_euler(upper_crouch * 0.2, 0, upper_crouch * 0.1)
-            if "arm_r" in keyframes:
-                keyframes["arm_r"]["rotations"][i] = _quaternion_from_euler(upper_crouch * 0.2, 0, -upper_crouch * 0.1)
-            if "forearm_l" in keyframes:
-                keyframes["forearm_l"]["rotations"][i] = _quaternion_from_euler(-upper_crouch * 0.3, 0, 0)
-            if "forearm_r" in keyframes:
-                keyframes["forearm_r"]["rotations"][i] = _quaternion_from_euler(-upper_crouch * 0.3, 0, 0)
-            if "thigh_l" in keyframes:
-                keyframes["thigh_l"]["rotations"][i] = _quaternion_from_euler(crouch * 0.8, 0, 0)
-            if "thigh_r" in keyframes:
-                keyframes["thigh_r"]["rotations"][i] = _quaternion_from_euler(crouch * 0.8, 0, 0)
-            if "shin_l" in keyframes:
-                keyframes["shin_l"]["rotations"][i] = _quaternion_from_euler(-crouch * 1.0, 0, 0)
-            if "shin_r" in keyframes:
-                keyframes["shin_r"]["rotations"][i] = _quaternion_from_euler(-crouch * 1.0, 0, 0)
-    
-    elif animation_id == "dead":
-        # Death animation — overlapping ragdoll collapse
-        # Principle: extremities go limp first, core follows, gravity accelerates
-        for i in range(n):
-            t = i / (n - 1)
-            
-            if t < 0.12:
-                # Initial hit reaction — head whips back, arms flinch (fast)
-                p = _ease_out_cubic(t / 0.12)
-                p_limb = _ease_out_cubic(min(1.0, t / 0.12 * 0.80))  # limbs lag
-                if "spine" in keyframes:
-                    keyframes["spine"]["rotations"][i] = _quaternion_from_euler(-p * 0.15, 0, 0)
-                if "spine1" in keyframes:
-                    keyframes["spine1"]["rotations"][i] = _quaternion_from_euler(-p * 0.08, 0, 0)
-                if "neck" in keyframes:
-                    keyframes["neck"]["rotations"][i] = _quaternion_from_euler(-p * 0.12, 0, p * 0.04)
-                if "head" in keyframes:
-                    keyframes["head"]["rotations"][i] = _quaternion_from_euler(-p * 0.28, 0, p * 0.06)
-                if "arm_l" in keyframes:
-                    keyframes["arm_l"]["rotations"][i] = _quaternion_from_euler(0, 0, p_limb * 0.22)
-                if "arm_r" in keyframes:
-                    keyframes["arm_r"]["rotations"][i] = _quaternion_from_euler(0, 0, -p_limb * 0.18)
-                if "shoulder_l" in keyframes:
-                    keyframes["shoulder_l"]["rotations"][i] = _quaternion_from_euler(0, 0, p_limb * 0.06)
-                if "shoulder_r" in keyframes:
-                    keyframes["shoulder_r"]["rotations"][i] = _quaternion_from_euler(0, 0, -p_limb * 0.05)
-                    
-            elif t < 0.38:
-                # Stagger — knees buckle, overlapping spine cascade forward
-                p = _ease_in_out((t - 0.12) / 0.26)
-                p_spine = _ease_in_out(min(1.0, (t - 0.12) / 0.26 * 1.10))
-                p_head = _ease_in_out(min(1.0, (t - 0.12) / 0.26 * 0.85))
-                if "hips" in keyframes:
-                    keyframes["hips"]["rotations"][i] = _quaternion_from_euler(p * 0.32, 0, p * 0.08)
-                if "spine" in keyframes:
-                    keyframes["spine"]["rotations"][i] = _quaternion_from_euler(-0.15 + p_spine * 0.38, 0, p_spine * 0.05)
-                if "spine1" in keyframes:
-                    keyframes["spine1"]["rotations"][i] = _quaternion_from_euler(-0.08 + p_spine * 0.15, 0, p_spine * 0.03)
-                if "neck" in keyframes:
-                    keyframes["neck"]["rotations"][i] = _quaternion_from_euler(-0.12 + p_head * 0.25, 0, p_head * 0.06)
-                if "head" in keyframes:
-                    keyframes["head"]["rotations"][i] = _quaternion_from_euler(-0.28 + p_head * 0.55, 0, p_head * 0.10)
-                if "thigh_l" in keyframes:
-                    keyframes["thigh_l"]["rotations"][i] = _quaternion_from_euler(p * 0.32, 0, 0)
-                if "thigh_r" in keyframes:
-                    keyframes["thigh_r"]["rotations"][i] = _quaternion_from_euler(p * 0.22, 0, 0)
-                if "shin_l" in keyframes:
-                    keyframes["shin_l"]["rotations"][i] = _quaternion_from_euler(-p * 0.52, 0, 0)
-                if "shin_r" in keyframes:
-                    keyframes["shin_r"]["rotations"][i] = _quaternion_from_euler(-p * 0.42, 0, 0)
-                # Arms go limp — gravity pulls down, forearms dangle
-                if "arm_l" in keyframes:
-                    keyframes["arm_l"]["rotations"][i] = _quaternion_from_euler(-p * 0.25, 0, 0.22 + p * 0.28)
-                if "arm_r" in keyframes:
-                    keyframes["arm_r"]["rotations"][i] = _quaternion_from_euler(-p * 0.18, 0, -0.18 - p * 0.22)
-                if "forearm_l" in keyframes:
-                    keyframes["forearm_l"]["rotations"][i] = _quaternion_from_euler(-p * 0.35, 0, 0)
-                if "forearm_r" in keyframes:
-                    keyframes["forearm_r"]["rotations"][i] = _quaternion_from_euler(-p * 0.28, 0, 0)
-                if "shoulder_l" in keyframes:
-                    keyframes["shoulder_l"]["rotations"][i] = _quaternion_from_euler(-p * 0.08, 0, 0.06 + p * 0.08)
-                if "shoulder_r" in keyframes:
-                    keyframes["shoulder_r"]["rotations"][i] = _quaternion_from_euler(-p * 0.06, 0, -0.05 - p * 0.06)
-                    
-            elif t < 0.68:
-                # Collapse — accelerating fall with gravity (ease-in for acceleration)
-                p = _ease_in_cubic((t - 0.38) / 0.30)
-                p_limb = _ease_in_cubic(min(1.0, (t - 0.38) / 0.30 * 0.85))
-                if "hips" in keyframes:
-                    keyframes["hips"]["rotations"][i] = _quaternion_from_euler(
-                        0.32 + p * 0.58, 0, 0.08 + p * 0.15)
-                if "spine" in keyframes:
-                    keyframes["spine"]["rotations"][i] = _quaternion_from_euler(0.23 + p * 0.14, 0, p * 0.08)
-                if "spine1" in keyframes:
-                    keyframes["spine1"]["rotations"][i] = _quaternion_from_euler(0.07 + p * 0.08, 0, p * 0.04)
-                if "neck" in keyframes:
-                    keyframes["neck"]["rotations"][i] = _quaternion_from_euler(0.13 + p * 0.10, 0, p * 0.06)
-                if "head" in keyframes:
-                    keyframes["head"]["rotations"][i] = _quaternion_from_euler(0.27 + p * 0.20, 0, p * 0.15)
-                if "thigh_l" in keyframes:
-                    keyframes["thigh_l"]["rotations"][i] = _quaternion_from_euler(0.32 + p * 0.15, 0, 0)
-                if "thigh_r" in keyframes:
-                    keyframes["thigh_r"]["rotations"][i] = _quaternion_from_euler(0.22 + p * 0.10, 0, p * 0.10)
-                if "shin_l" in keyframes:
-                    keyframes["shin_l"]["rotations"][i] = _quaternion_from_euler(-0.52 + p * 0.18, 0, 0)
-                if "shin_r" in keyframes:
-                    keyframes["shin_r"]["rotations"][i] = _quaternion_from_euler(-0.42 + p * 0.14, 0, 0)
-                # Arms flop outward
-                if "arm_l" in keyframes:
-                    keyframes["arm_l"]["rotations"][i] = _quaternion_from_euler(-0.25 - p_limb * 0.25, 0, 0.50 + p_limb * 0.30)
-                if "arm_r" in keyframes:
-                    keyframes["arm_r"]["rotations"][i] = _quaternion_from_euler(-0.18 - p_limb * 0.18, 0, -0.40 - p_limb * 0.22)
-                if "forearm_l" in keyframes:
-                    keyframes["forearm_l"]["rotations"][i] = _quaternion_from_euler(-0.35 - p_limb * 0.10, 0, p_limb * 0.08)
-                if "forearm_r" in keyframes:
-                    keyframes["forearm_r"]["rotations"][i] = _quaternion_from_euler(-0.28 - p_limb * 0.08, 0, -p_limb * 0.06)
-                if "hand_l" in keyframes:
-                    keyframes["hand_l"]["rotations"][i] = _quaternion_from_euler(-p_limb * 0.15, 0, 0)
-                if "hand_r" in keyframes:
-                    keyframes["hand_r"]["rotations"][i] = _quaternion_from_euler(-p_limb * 0.12, 0, 0)
-                if "shoulder_l" in keyframes:
-                    keyframes["shoulder_l"]["rotations"][i] = _quaternion_from_euler(-0.08 - p * 0.05, 0, 0.14 + p * 0.08)
-                if "shoulder_r" in keyframes:
-                    keyframes["shoulder_r"]["rotations"][i] = _quaternion_from_euler(-0.06 - p * 0.04, 0, -0.11 - p * 0.06)
-                    
-            else:
-                # Settled — damped bounce on ground contact
-                p = (t - 0.68) / 0.32
-                settle = 1 + math.sin(p * math.pi * 2) * 0.025 * (1 - p)  # damped bounce
-                sway = math.sin(p * math.pi) * 0.02 * (1 - p)
-                if "hips" in keyframes:
-                    keyframes["hips"]["rotations"][i] = _quaternion_from_euler(0.90 * settle, 0, 0.23)
-                if "spine" in keyframes:
-                    keyframes["spine"]["rotations"][i] = _quaternion_from_euler(0.37 * settle, 0, 0.08 + sway)
-                if "spine1" in keyframes:
-                    keyframes["spine1"]["rotations"][i] = _quaternion_from_euler(0.15 * settle, 0, sway * 0.5)
-                if "neck" in keyframes:
-                    keyframes["neck"]["rotations"][i] = _quaternion_from_euler(0.23, 0, (1 - p) * 0.03)
-                if "head" in keyframes:
-                    keyframes["head"]["rotations"][i] = _quaternion_from_euler(0.47, 0, 0.15 + (1 - p) * 0.05)
-                if "thigh_l" in keyframes:
-                    keyframes["thigh_l"]["rotations"][i] = _quaternion_from_euler(0.47, 0, 0)
-                if "thigh_r" in keyframes:
-                    keyframes["thigh_r"]["rotations"][i] = _quaternion_from_euler(0.32, 0, 0.10)
-                if "shin_l" in keyframes:
-                    keyframes["shin_l"]["rotations"][i] = _quaternion_from_euler(-0.34, 0, 0)
-                if "shin_r" in keyframes:
-                    keyframes["shin_r"]["rotations"][i] = _quaternion_from_euler(-0.28, 0, 0)
-                if "arm_l" in keyframes:
-                    keyframes["arm_l"]["rotations"][i] = _quaternion_from_euler(-0.50, 0, 0.80)
-                if "arm_r" in keyframes:
-                    keyframes["arm_r"]["rotations"][i] = _quaternion_from_euler(-0.36, 0, -0.62)
-                if "forearm_l" in keyframes:
-                    keyframes["forearm_l"]["rotations"][i] = _quaternion_from_euler(-0.45, 0, 0.08)
-                if "forearm_r" in keyframes:
-                    keyframes["forearm_r"]["rotations"][i] = _quaternion_from_euler(-0.36, 0, -0.06)
-                if "hand_l" in keyframes:
-                    keyframes["hand_l"]["rotations"][i] = _quaternion_from_euler(-0.15, 0, 0)
-                if "hand_r" in keyframes:
-                    keyframes["hand_r"]["rotations"][i] = _quaternion_from_euler(-0.12, 0, 0)
-                if "shoulder_l" in keyframes:
-                    keyframes["shoulder_l"]["rotations"][i] = _quaternion_from_euler(-0.13, 0, 0.22)
-                if "shoulder_r" in keyframes:
-                    keyframes["shoulder_r"]["rotations"][i] = _quaternion_from_euler(-0.10, 0, -0.17)
-    
-    elif animation_id == "run_fast":
-        # Sprint cycle — same structure as run but with overlapping action
-        for i in range(n):
-            t = i / (n - 1)
-            stride = math.sin(t * 2 * math.pi)
-            stride_asym = stride + 0.25 * math.sin(t * 4 * math.pi)
-            bounce = math.sin(t * 4 * math.pi)
-            upper_lag = math.sin(t * 2 * math.pi - 0.25)
-            arm_lag = math.sin(t * 2 * math.pi - 0.40)
-            knee_l = max(0, -stride) ** 1.15 * 0.75
-            knee_r = max(0, stride) ** 1.15 * 0.75
-            
-            if "thigh_l" in keyframes:
-                keyframes["thigh_l"]["rotations"][i] = _quaternion_from_euler(stride_asym * 0.50, 0, -0.025)
-            if "thigh_r" in keyframes:
-                keyframes["thigh_r"]["rotations"][i] = _quaternion_from_euler(-stride_asym * 0.50, 0, 0.025)
-            if "shin_l" in keyframes:
-                keyframes["shin_l"]["rotations"][i] = _quaternion_from_euler(knee_l + max(0, stride) * 0.12, 0, 0)
-            if "shin_r" in keyframes:
-                keyframes["shin_r"]["rotations"][i] = _quaternion_from_euler(knee_r + max(0, -stride) * 0.12, 0, 0)
-            if "foot_l" in keyframes:
-                keyframes["foot_l"]["rotations"][i] = _quaternion_from_euler(
-                    -stride * 0.25 + max(0, -stride) * 0.18, 0, 0)
-            if "foot_r" in keyframes:
-                keyframes["foot_r"]["rotations"][i] = _quaternion_from_euler(
-                    stride * 0.25 + max(0, stride) * 0.18, 0, 0)
-            if "toe_l" in keyframes:
-                keyframes["toe_l"]["rotations"][i] = _quaternion_from_euler(max(0, stride) * 0.20, 0, 0)
-            if "toe_r" in keyframes:
-                keyframes["toe_r"]["rotations"][i] = _quaternion_from_euler(max(0, -stride) * 0.20, 0, 0)
-            
-            if "hips" in keyframes:
-                keyframes["hips"]["rotations"][i] = _quaternion_from_euler(
-                    0.10 + bounce * 0.05, stride * 0.12, stride * 0.045)
-            if "spine" in keyframes:
-                keyframes["spine"]["rotations"][i] = _quaternion_from_euler(
-                    0.10 + bounce * 0.018, -upper_lag * 0.12, -upper_lag * 0.025)
-            if "spine1" in keyframes:
-                keyframes["spine1"]["rotations"][i] = _quaternion_from_euler(0.05, -upper_lag * 0.06, 0)
-            if "spine2" in keyframes:
-                keyframes["spine2"]["rotations"][i] = _quaternion_from_euler(0.03, -upper_lag * 0.03, 0)
-            if "neck" in keyframes:
-                keyframes["neck"]["rotations"][i] = _quaternion_from_euler(bounce * 0.022, 0, 0)
-            if "head" in keyframes:
-                keyframes["head"]["rotations"][i] = _quaternion_from_euler(bounce * 0.028, 0, 0)
-            
-            if "shoulder_l" in keyframes:
-                keyframes["shoulder_l"]["rotations"][i] = _quaternion_from_euler(
-                    -arm_lag * 0.14, 0, -arm_lag * 0.05)
-            if "shoulder_r" in keyframes:
-                keyframes["shoulder_r"]["rotations"][i] = _quaternion_from_euler(
-                    arm_lag * 0.14, 0, arm_lag * 0.05)
-            if "arm_l" in keyframes:
-                keyframes["arm_l"]["rotations"][i] = _quaternion_from_euler(
-                    -arm_lag * 0.40, 0, -0.06 - abs(arm_lag) * 0.04)
-            if "arm_r" in keyframes:
-                keyframes["arm_r"]["rotations"][i] = _quaternion_from_euler(
-                    arm_lag * 0.40, 0, 0.06 + abs(arm_lag) * 0.04)
-            if "forearm_l" in keyframes:
-                keyframes["forearm_l"]["rotations"][i] = _quaternion_from_euler(
-                    -0.45 + max(0, arm_lag) * 0.15, 0, 0)
-            if "forearm_r" in keyframes:
-                keyframes["forearm_r"]["rotations"][i] = _quaternion_from_euler(
-                    -0.45 + max(0, -arm_lag) * 0.15, 0, 0)
-            if "hand_l" in keyframes:
-                keyframes["hand_l"]["rotations"][i] = _quaternion_from_euler(0, 0, arm_lag * 0.06)
-            if "hand_r" in keyframes:
-                keyframes["hand_r"]["rotations"][i] = _quaternion_from_euler(0, 0, -arm_lag * 0.06)
-    
-    elif animation_id == "sit_down":
-        # Sit down — smooth transition with overlapping action
-        for i in range(n):
-            t = i / (n - 1)
-            # Different body parts reach final pose at different times
-            p_lower = _ease_in_out_quint(t)         # legs lead
-            p_upper = _ease_in_out_quint(max(0, (t - 0.05) / 0.95))  # torso follows
-            p_arms = _ease_in_out_quint(max(0, (t - 0.10) / 0.90))   # arms last
-            p_head = _ease_in_out_quint(max(0, (t - 0.12) / 0.88))   # head settles last
-            
-            if "hips" in keyframes:
-                keyframes["hips"]["rotations"][i] = _quaternion_from_euler(p_lower * 0.15, 0, 0)
-            if "spine" in keyframes:
-                keyframes["spine"]["rotations"][i] = _quaternion_from_euler(-p_upper * 0.10, 0, 0)
-            if "spine1" in keyframes:
-                keyframes["spine1"]["rotations"][i] = _quaternion_from_euler(-p_upper * 0.05, 0, 0)
-            if "neck" in keyframes:
-                keyframes["neck"]["rotations"][i] = _quaternion_from_euler(-p_head * 0.04, 0, 0)
-            if "head" in keyframes:
-                keyframes["head"]["rotations"][i] = _quaternion_from_euler(-p_head * 0.08, 0, 0)
-            if "thigh_l" in keyframes:
-                keyframes["thigh_l"]["rotations"][i] = _quaternion_from_euler(p_lower * 1.2, 0, 0)
-            if "thigh_r" in keyframes:
-                keyframes["thigh_r"]["rotations"][i] = _quaternion_from_euler(p_lower * 1.2, 0, 0)
-            if "shin_l" in keyframes:
-                keyframes["shin_l"]["rotations"][i] = _quaternion_from_euler(-p_lower * 1.1, 0, 0)
-            if "shin_r" in keyframes:
-                keyframes["shin_r"]["rotations"][i] = _quaternion_from_euler(-p_lower * 1.1, 0, 0)
-            if "arm_l" in keyframes:
-                keyframes["arm_l"]["rotations"][i] = _quaternion_from_euler(-p_arms * 0.3, 0, p_arms * 0.15)
-            if "arm_r" in keyframes:
-                keyframes["arm_r"]["rotations"][i] = _quaternion_from_euler(-p_arms * 0.3, 0, -p_arms * 0.15)
-            if "forearm_l" in keyframes:
-                keyframes["forearm_l"]["rotations"][i] = _quaternion_from_euler(-p_arms * 0.4, 0, 0)
-            if "forearm_r" in keyframes:
-                keyframes["forearm_r"]["rotations"][i] = _quaternion_from_euler(-p_arms * 0.4, 0, 0)
-    
-    elif animation_id == "jump":
-        # Jump — anticipation crouch, explosive launch, float, impact absorption
-        # Overlapping action: arms lag behind body, head/spine settle after landing
-        for i in range(n):
-            t = i / (n - 1)
-            
-            if t < 0.22:
-                # Anticipation — crouch with full body compression
-                p = _ease_in_out(t / 0.22)
-                p_upper = _ease_in_out(min(1.0, t / 0.22 * 1.15))  # upper body slightly ahead
-                if "hips" in keyframes:
-                    keyframes["hips"]["rotations"][i] = _quaternion_from_euler(p * 0.18, 0, 0)
-                if "spine" in keyframes:
-                    keyframes["spine"]["rotations"][i] = _quaternion_from_euler(p_upper * 0.08, 0, 0)
-                if "spine1" in keyframes:
-                    keyframes["spine1"]["rotations"][i] = _quaternion_from_euler(p_upper * 0.04, 0, 0)
-                if "head" in keyframes:
-                    keyframes["head"]["rotations"][i] = _quaternion_from_euler(-p_upper * 0.08, 0, 0)
-                if "neck" in keyframes:
-                    keyframes["neck"]["rotations"][i] = _quaternion_from_euler(-p_upper * 0.04, 0, 0)
-                if "thigh_l" in keyframes:
-                    keyframes["thigh_l"]["rotations"][i] = _quaternion_from_euler(p * 0.55, 0, 0)
-                if "thigh_r" in keyframes:
-                    keyframes["thigh_r"]["rotations"][i] = _quaternion_from_euler(p * 0.55, 0, 0)
-                if "shin_l" in keyframes:
-                    keyframes["shin_l"]["rotations"][i] = _quaternion_from_euler(-p * 0.70, 0, 0)
-                if "shin_r" in keyframes:
-                    keyframes["shin_r"]["rotations"][i] = _quaternion_from_euler(-p * 0.70, 0, 0)
-                if "foot_l" in keyframes:
-                    keyframes["foot_l"]["rotations"][i] = _quaternion_from_euler(p * 0.15, 0, 0)
-                if "foot_r" in keyframes:
-                    keyframes["foot_r"]["rotations"][i] = _quaternion_from_euler(p * 0.15, 0, 0)
-                # Arms wind back
-                p_arm = _ease_in_out(min(1.0, t / 0.22 * 0.85))  # arms lag
-                if "shoulder_l" in keyframes:
-                    keyframes["shoulder_l"]["rotations"][i] = _quaternion_from_euler(p_arm * 0.08, 0, p_arm * 0.04)
-                if "shoulder_r" in keyframes:
-                    keyframes["shoulder_r"]["rotations"][i] = _quaternion_from_euler(p_arm * 0.08, 0, -p_arm * 0.04)
-                if "arm_l" in keyframes:
-                    keyframes["arm_l"]["rotations"][i] = _quaternion_from_euler(p_arm * 0.35, 0, p_arm * 0.12)
-                if "arm_r" in keyframes:
-                    keyframes["arm_r"]["rotations"][i] = _quaternion_from_euler(p_arm * 0.35, 0, -p_arm * 0.12)
-                if "forearm_l" in keyframes:
-                    keyframes["forearm_l"]["rotations"][i] = _quaternion_from_euler(-p_arm * 0.20, 0, 0)
-                if "forearm_r" in keyframes:
-                    keyframes["forearm_r"]["rotations"][i] = _quaternion_from_euler(-p_arm * 0.20, 0, 0)
-                    
-            elif t < 0.40:
-                # Launch — explosive extension, arms sweep up
-                p = _ease_out_cubic((t - 0.22) / 0.18)
-                p_arm = _ease_out_cubic(min(1.0, (t - 0.22) / 0.18 * 0.80))  # arms lag
-                if "hips" in keyframes:
-                    keyframes["hips"]["rotations"][i] = _quaternion_from_euler(0.18 - p * 0.30, 0, 0)
-                if "spine" in keyframes:
-                    keyframes["spine"]["rotations"][i] = _quaternion_from_euler(0.08 - p * 0.14, 0, 0)
-                if "spine1" in keyframes:
-                    keyframes["spine1"]["rotations"][i] = _quaternion_from_euler(0.04 - p * 0.06, 0, 0)
-                if "head" in keyframes:
-                    keyframes["head"]["rotations"][i] = _quaternion_from_euler(-0.08 + p * 0.02, 0, 0)
-                if "thigh_l" in keyframes:
-                    keyframes["thigh_l"]["rotations"][i] = _quaternion_from_euler(0.55 - p * 0.65, 0, 0)
-                if "thigh_r" in keyframes:
-                    keyframes["thigh_r"]["rotations"][i] = _quaternion_from_euler(0.55 - p * 0.65, 0, 0)
-                if "shin_l" in keyframes:
-                    keyframes["shin_l"]["rotations"][i] = _quaternion_from_euler(-0.70 + p * 0.70, 0, 0)
-                if "shin_r" in keyframes:
-                    keyframes["shin_r"]["rotations"][i] = _quaternion_from_euler(-0.70 + p * 0.70, 0, 0)
-                if "foot_l" in keyframes:
-                    keyframes["foot_l"]["rotations"][i] = _quaternion_from_euler(0.15 - p * 0.40, 0, 0)
-                if "foot_r" in keyframes:
-                    keyframes["foot_r"]["rotations"][i] = _quaternion_from_euler(0.15 - p * 0.40, 0, 0)
-                if "arm_l" in keyframes:
-                    keyframes["arm_l"]["rotations"][i] = _quaternion_from_euler(0.35 - p_arm * 1.15, 0, 0.12 + p_arm * 0.18)
-                if "arm_r" in keyframes:
-                    keyframes["arm_r"]["rotations"][i] = _quaternion_from_euler(0.35 - p_arm * 1.15, 0, -0.12 - p_arm * 0.18)
-                if "forearm_l" in keyframes:
-                    keyframes["forearm_l"]["rotations"][i] = _quaternion_from_euler(-0.20 + p_arm * 0.10, 0, 0)
-                if "forearm_r" in keyframes:
-                    keyframes["forearm_r"]["rotations"][i] = _quaternion_from_euler(-0.20 + p_arm * 0.10, 0, 0)
-                    
-            elif t < 0.62:
-                # Airborne — extended pose with slight tuck, arms wide
-                p = (t - 0.40) / 0.22
-                float_bob = math.sin(p * math.pi) * 0.04  # subtle float
-                if "hips" in keyframes:
-                    keyframes["hips"]["rotations"][i] = _quaternion_from_euler(-0.12, 0, 0)
-                if "spine" in keyframes:
-                    keyframes["spine"]["rotations"][i] = _quaternion_from_euler(-0.06 + float_bob, 0, 0)
-                if "head" in keyframes:
-                    keyframes["head"]["rotations"][i] = _quaternion_from_euler(-0.06, 0, 0)
-                if "arm_l" in keyframes:
-                    keyframes["arm_l"]["rotations"][i] = _quaternion_from_euler(-0.80, 0, 0.30 + float_bob)
-                if "arm_r" in keyframes:
-                    keyframes["arm_r"]["rotations"][i] = _quaternion_from_euler(-0.80, 0, -0.30 - float_bob)
-                if "forearm_l" in keyframes:
-                    keyframes["forearm_l"]["rotations"][i] = _quaternion_from_euler(-0.10, 0, 0)
-                if "forearm_r" in keyframes:
-                    keyframes["forearm_r"]["rotations"][i] = _quaternion_from_euler(-0.10, 0, 0)
-                # Legs slightly tucked
-                if "thigh_l" in keyframes:
-                    keyframes["thigh_l"]["rotations"][i] = _quaternion_from_euler(-0.10 + p * 0.20, 0, 0)
-                if "thigh_r" in keyframes:
-                    keyframes["thigh_r"]["rotations"][i] = _quaternion_from_euler(-0.10 + p * 0.20, 0, 0)
-                if "shin_l" in keyframes:
-                    keyframes["shin_l"]["rotations"][i] = _quaternion_from_euler(-p * 0.15, 0, 0)
-                if "shin_r" in keyframes:
-                    keyframes["shin_r"]["rotations"][i] = _quaternion_from_euler(-p * 0.15, 0, 0)
-                    
-            else:
-                # Landing — impact absorption with overlapping settle
-                p = _ease_out_cubic((t - 0.62) / 0.38)
-                # Settle bounce: body compresses then springs back
-                settle = math.sin(p * math.pi * 2.5) * (1 - p) * 0.15
-                p_head = _ease_out_cubic(min(1.0, (t - 0.62) / 0.38 * 0.75))  # head settles late
-                p_arm = _ease_out_cubic(min(1.0, (t - 0.62) / 0.38 * 0.65))   # arms settle latest
-                if "hips" in keyframes:
-                    keyframes["hips"]["rotations"][i] = _quaternion_from_euler(-0.12 + p * 0.30 + settle, 0, 0)
-                if "spine" in keyframes:
-                    keyframes["spine"]["rotations"][i] = _quaternion_from_euler(-0.06 + p * 0.10 + settle * 0.6, 0, 0)
-                if "spine1" in keyframes:
-                    keyframes["spine1"]["rotations"][i] = _quaternion_from_euler(settle * 0.3, 0, 0)
-                if "head" in keyframes:
-                    keyframes["head"]["rotations"][i] = _quaternion_from_euler(-0.06 + p_head * 0.08 + settle * 0.4, 0, 0)
-                if "neck" in keyframes:
-                    keyframes["neck"]["rotations"][i] = _quaternion_from_euler(settle * 0.25, 0, 0)
-                if "thigh_l" in keyframes:
-                    keyframes["thigh_l"]["rotations"][i] = _quaternion_from_euler(0.10 + p * 0.25 + settle * 0.8, 0, 0)
-                if "thigh_r" in keyframes:
-                    keyframes["thigh_r"]["rotations"][i] = _quaternion_from_euler(0.10 + p * 0.25 + settle * 0.8, 0, 0)
-                if "shin_l" in keyframes:
-                    keyframes["shin_l"]["rotations"][i] = _quaternion_from_euler(-0.15 - p * 0.25, 0, 0)
-                if "shin_r" in keyframes:
-                    keyframes["shin_r"]["rotations"][i] = _quaternion_from_euler(-0.15 - p * 0.25, 0, 0)
-                if "foot_l" in keyframes:
-                    keyframes["foot_l"]["rotations"][i] = _quaternion_from_euler(settle * 0.3, 0, 0)
-                if "foot_r" in keyframes:
-                    keyframes["foot_r"]["rotations"][i] = _quaternion_from_euler(settle * 0.3, 0, 0)
-                if "arm_l" in keyframes:
-                    keyframes["arm_l"]["rotations"][i] = _quaternion_from_euler(-0.80 + p_arm * 0.80, 0, 0.30 - p_arm * 0.30)
-                if "arm_r" in keyframes:
-                    keyframes["arm_r"]["rotations"][i] = _quaternion_from_euler(-0.80 + p_arm * 0.80, 0, -0.30 + p_arm * 0.30)
-                if "forearm_l" in keyframes:
-                    keyframes["forearm_l"]["rotations"][i] = _quaternion_from_euler(-0.10 + p_arm * 0.10, 0, 0)
-                if "forearm_r" in keyframes:
-                    keyframes["forearm_r"]["rotations"][i] = _quaternion_from_euler(-0.10 + p_arm * 0.10, 0, 0)
-    
-    elif animation_id == "wave":
-        # Wave — arm raise, waving with overlapping body motion, lower
-        for i in range(n):
-            t = i / (n - 1)
-            # Phase structure: raise arm (0-0.15), wave loop (0.15-0.85), lower (0.85-1.0)
-            if t < 0.15:
-                # Raise arm up smoothly
-                p = _ease_in_out(t / 0.15)
-                arm_up = p
-                wave_v = 0
-            elif t < 0.85:
-                arm_up = 1.0
-                # Wave motion with overlapping lag
-                wave_t = (t - 0.15) / 0.70
-                wave_v = math.sin(wave_t * 7 * math.pi) * 0.28
-            else:
-                # Lower arm
-                p = _ease_in_out((t - 0.85) / 0.15)
-                arm_up = 1.0 - p
-                wave_v = math.sin(0) * 0.28 * (1 - p)
-            
-            # Lagged body sway (follows hand motion)
-            body_wave = math.sin(t * 7 * math.pi - 0.25) * 0.28 if t > 0.15 else 0
-            head_wave = math.sin(t * 7 * math.pi - 0.15) * 0.28 if t > 0.15 else 0
-            
-            if "shoulder_r" in keyframes:
-                keyframes["shoulder_r"]["rotations"][i] = _quaternion_from_euler(
-                    -arm_up * 0.22, 0, -arm_up * 0.15)
-            if "arm_r" in keyframes:
-                keyframes["arm_r"]["rotations"][i] = _quaternion_from_euler(
-                    -arm_up * 1.35, 0, -arm_up * 0.22)
-            if "forearm_r" in keyframes:
-                keyframes["forearm_r"]["rotations"][i] = _quaternion_from_euler(
-                    -arm_up * 0.50, 0, wave_v)
-            if "hand_r" in keyframes:
-                keyframes["hand_r"]["rotations"][i] = _quaternion_from_euler(
-                    0, wave_v * 0.9, wave_v * 0.3)
-            # Spine chain cascade
-            if "spine" in keyframes:
-                keyframes["spine"]["rotations"][i] = _quaternion_from_euler(
-                    0, body_wave * 0.03, body_wave * 0.02)
-            if "spine1" in keyframes:
-                keyframes["spine1"]["rotations"][i] = _quaternion_from_euler(
-                    0, body_wave * 0.02, 0)
-            if "neck" in keyframes:
-                keyframes["neck"]["rotations"][i] = _quaternion_from_euler(
-                    0, head_wave * 0.04, head_wave * 0.02)
-            if "head" in keyframes:
-                keyframes["head"]["rotations"][i] = _quaternion_from_euler(
-                    head_wave * 0.03, head_wave * 0.08, head_wave * 0.04)
-            # Counter arm subtly adjusts
-            if "arm_l" in keyframes:
-                keyframes["arm_l"]["rotations"][i] = _quaternion_from_euler(
-                    body_wave * 0.04, 0, -body_wave * 0.02)
-            # Subtle weight shift
-            if "hips" in keyframes:
-                keyframes["hips"]["rotations"][i] = _quaternion_from_euler(
-                    0, 0, body_wave * 0.015 - arm_up * 0.02)
-    
-    elif animation_id == "clap":
-        # Clap — enthusiastic rhythmic clapping with body engagement
-        for i in range(n):
-            t = i / (n - 1)
-            # Sharp clap contact + smooth return using asymmetric wave
-            raw_clap = math.sin(t * 8 * math.pi)
-            clap = max(0, raw_clap) ** 0.7       # sharper peak (hands meet)
-            clap_out = max(0, -raw_clap) ** 1.3   # slower separate
-            clap_mix = clap - clap_out * 0.4      # combined
-            # Body lag — reacts to clap impact
-            body_clap = max(0, math.sin(t * 8 * math.pi - 0.20)) ** 0.7
-            head_clap = max(0, math.sin(t * 8 * math.pi - 0.12)) ** 0.7
-            # Enthusiasm builds
-            energy = min(1.0, t * 1.3) if t < 0.9 else max(0.3, 1.0 - (t - 0.9) * 7)
-            
-            if "shoulder_l" in keyframes:
-                keyframes["shoulder_l"]["rotations"][i] = _quaternion_from_euler(
-                    -0.15 * energy, 0, -clap_mix * 0.10 * energy)
-            if "shoulder_r" in keyframes:
-                keyframes["shoulder_r"]["rotations"][i] = _quaternion_from_euler(
-                    -0.15 * energy, 0, clap_mix * 0.10 * energy)
-            if "arm_l" in keyframes:
-                keyframes["arm_l"]["rotations"][i] = _quaternion_from_euler(
-                    -0.65 * energy, 0, (-0.30 + clap * 0.35) * energy)
-            if "arm_r" in keyframes:
-                keyframes["arm_r"]["rotations"][i] = _quaternion_from_euler(
-                    -0.65 * energy, 0, (0.30 - clap * 0.35) * energy)
-            if "forearm_l" in keyframes:
-                keyframes["forearm_l"]["rotations"][i] = _quaternion_from_euler(
-                    (-0.85 + clap * 0.20) * energy, 0, 0)
-            if "forearm_r" in keyframes:
-                keyframes["forearm_r"]["rotations"][i] = _quaternion_from_euler(
-                    (-0.85 + clap * 0.20) * energy, 0, 0)
-            if "hand_l" in keyframes:
-                keyframes["hand_l"]["rotations"][i] = _quaternion_from_euler(
-                    clap * 0.12 * energy, 0, clap * 0.06 * energy)
-            if "hand_r" in keyframes:
-                keyframes["hand_r"]["rotations"][i] = _quaternion_from_euler(
-                    clap * 0.12 * energy, 0, -clap * 0.06 * energy)
-            # Head nod with body bounce (lagged)
-            if "head" in keyframes:
-                keyframes["head"]["rotations"][i] = _quaternion_from_euler(
-                    head_clap * 0.10 * energy, 0, 0)
-            if "neck" in keyframes:
-                keyframes["neck"]["rotations"][i] = _quaternion_from_euler(
-                    body_clap * 0.04 * energy, 0, 0)
-            if "spine" in keyframes:
-                keyframes["spine"]["rotations"][i] = _quaternion_from_euler(
-                    body_clap * 0.05 * energy, 0, 0)
-            if "spine1" in keyframes:
-                keyframes["spine1"]["rotations"][i] = _quaternion_from_euler(
-                    body_clap * 0.03 * energy, 0, 0)
-            # Weight shift with beat
-            if "hips" in keyframes:
-                keyframes["hips"]["rotations"][i] = _quaternion_from_euler(
-                    body_clap * 0.03 * energy, 0, 0)
-    
-    elif animation_id == "punch":
-        # Punch — anticipation wind-up, explosive strike, follow-through, recovery
-        # Overlapping: torso leads, arm follows, head whips, settling back
-        for i in range(n):
-            t = i / (n - 1)
-            
-            if t < 0.28:
-                # Wind up — weight back, rotate right, chambered fist
-                p = _ease_in_cubic(t / 0.28)
-                p_head = _ease_in_cubic(min(1.0, t / 0.28 * 0.85))  # head lags
-                if "hips" in keyframes:
-                    keyframes["hips"]["rotations"][i] = _quaternion_from_euler(
-                        -p * 0.04, p * 0.18, 0)
-                if "spine" in keyframes:
-                    keyframes["spine"]["rotations"][i] = _quaternion_from_euler(
-                        0, p * 0.22, 0)
-                if "spine1" in keyframes:
-                    keyframes["spine1"]["rotations"][i] = _quaternion_from_euler(
-                        0, p * 0.10, 0)
-                if "head" in keyframes:
-                    keyframes["head"]["rotations"][i] = _quaternion_from_euler(
-                        -p_head * 0.06, p_head * 0.10, 0)
-                if "neck" in keyframes:
-                    keyframes["neck"]["rotations"][i] = _quaternion_from_euler(
-                        0, p_head * 0.05, 0)
-                # Right arm chambers back
-                if "shoulder_r" in keyframes:
-                    keyframes["shoulder_r"]["rotations"][i] = _quaternion_from_euler(
-                        p * 0.10, 0, -p * 0.08)
-                if "arm_r" in keyframes:
-                    keyframes["arm_r"]["rotations"][i] = _quaternion_from_euler(
-                        -p * 0.55, p * 0.12, -p * 0.18)
-                if "forearm_r" in keyframes:
-                    keyframes["forearm_r"]["rotations"][i] = _quaternion_from_euler(
-                        -p * 0.90, 0, 0)
-                if "hand_r" in keyframes:
-                    keyframes["hand_r"]["rotations"][i] = _quaternion_from_euler(
-                        p * 0.20, 0, 0)
-                # Left arm guard
-                if "arm_l" in keyframes:
-                    keyframes["arm_l"]["rotations"][i] = _quaternion_from_euler(
-                        -p * 0.40, 0, p * 0.08)
-                if "forearm_l" in keyframes:
-                    keyframes["forearm_l"]["rotations"][i] = _quaternion_from_euler(
-                        -p * 0.65, 0, 0)
-                # Weight onto back leg
-                if "thigh_r" in keyframes:
-                    keyframes["thigh_r"]["rotations"][i] = _quaternion_from_euler(
-                        -p * 0.08, 0, 0)
-                if "thigh_l" in keyframes:
-                    keyframes["thigh_l"]["rotations"][i] = _quaternion_from_euler(
-                        p * 0.10, 0, 0)
-                    
-            elif t < 0.42:
-                # Strike — explosive torso rotation drives the fist forward
-                p = _ease_out_cubic((t - 0.28) / 0.14)
-                # Arm snaps out slightly after torso commits
-                p_arm = _ease_out_cubic(min(1.0, (t - 0.28) / 0.14 * 0.80))
-                p_head = _ease_out_cubic(min(1.0, (t - 0.28) / 0.14 * 0.70))
-                if "hips" in keyframes:
-                    keyframes["hips"]["rotations"][i] = _quaternion_from_euler(
-                        -0.04 + p * 0.08, 0.18 - p * 0.42, 0)
-                if "spine" in keyframes:
-                    keyframes["spine"]["rotations"][i] = _quaternion_from_euler(
-                        p * 0.10, 0.22 - p * 0.55, 0)
-                if "spine1" in keyframes:
-                    keyframes["spine1"]["rotations"][i] = _quaternion_from_euler(
-                        p * 0.05, 0.10 - p * 0.22, 0)
-                if "head" in keyframes:
-                    keyframes["head"]["rotations"][i] = _quaternion_from_euler(
-                        -0.06 + p_head * 0.06, 0.10 - p_head * 0.20, 0)
-                if "arm_r" in keyframes:
-                    keyframes["arm_r"]["rotations"][i] = _quaternion_from_euler(
-                        -0.55 + p_arm * 1.05, 0.12 - p_arm * 0.12, -0.18 + p_arm * 0.18)
-                if "forearm_r" in keyframes:
-                    keyframes["forearm_r"]["rotations"][i] = _quaternion_from_euler(
-                        -0.90 + p_arm * 0.72, 0, 0)
-                if "hand_r" in keyframes:
-                    keyframes["hand_r"]["rotations"][i] = _quaternion_from_euler(
-                        0.20 - p_arm * 0.20, 0, 0)
-                if "shoulder_r" in keyframes:
-                    keyframes["shoulder_r"]["rotations"][i] = _quaternion_from_euler(
-                        0.10 - p * 0.15, 0, -0.08 + p * 0.12)
-                # Guard arm stays
-                if "arm_l" in keyframes:
-                    keyframes["arm_l"]["rotations"][i] = _quaternion_from_euler(
-                        -0.40, 0, 0.08)
-                if "forearm_l" in keyframes:
-                    keyframes["forearm_l"]["rotations"][i] = _quaternion_from_euler(
-                        -0.65 - p * 0.10, 0, 0)
-                # Weight transfers forward
-                if "thigh_l" in keyframes:
-                    keyframes["thigh_l"]["rotations"][i] = _quaternion_from_euler(
-                        0.10 + p * 0.10, 0, 0)
-                    
-            else:
-                # Recovery — elastic settle back to neutral
-                p = _ease_in_out((t - 0.42) / 0.58)
-                overshoot = math.sin(p * math.pi * 1.5) * (1 - p) * 0.08
-                if "hips" in keyframes:
-                    keyframes["hips"]["rotations"][i] = _quaternion_from_euler(
-                        0.04 * (1 - p), -0.24 * (1 - p) + overshoot, 0)
-                if "spine" in keyframes:
-                    keyframes["spine"]["rotations"][i] = _quaternion_from_euler(
-                        0.10 * (1 - p), -0.33 * (1 - p) + overshoot, 0)
-                if "spine1" in keyframes:
-                    keyframes["spine1"]["rotations"][i] = _quaternion_from_euler(
-                        0.05 * (1 - p), -0.12 * (1 - p), 0)
-                if "head" in keyframes:
-                    keyframes["head"]["rotations"][i] = _quaternion_from_euler(
-                        0, -0.10 * (1 - p), 0)
-                if "arm_r" in keyframes:
-                    keyframes["arm_r"]["rotations"][i] = _quaternion_from_euler(
-                        0.50 * (1 - p), 0, 0)
-                if "forearm_r" in keyframes:
-                    keyframes["forearm_r"]["rotations"][i] = _quaternion_from_euler(
-                        -0.18 * (1 - p), 0, 0)
-                if "arm_l" in keyframes:
-                    keyframes["arm_l"]["rotations"][i] = _quaternion_from_euler(
-                        -0.40 * (1 - p), 0, 0.08 * (1 - p))
-                if "forearm_l" in keyframes:
-                    keyframes["forearm_l"]["rotations"][i] = _quaternion_from_euler(
-                        -0.75 * (1 - p), 0, 0)
-                if "thigh_l" in keyframes:
-                    keyframes["thigh_l"]["rotations"][i] = _quaternion_from_euler(
-                        0.20 * (1 - p), 0, 0)
-    
-    elif animation_id == "kick":
-        # Kick — weight shift, chamber, snap kick, follow-through, recovery
-        # Overlapping: hip rotation leads, leg follows, upper body counterbalances
-        for i in range(n):
-            t = i / (n - 1)
-            
-            if t < 0.20:
-                # Weight shift + chamber — load onto left leg, bring right knee up
-                p = _ease_in_out(t / 0.20)
-                p_upper = _ease_in_out(min(1.0, t / 0.20 * 0.85))  # upper body lags
-                if "hips" in keyframes:
-                    keyframes["hips"]["rotations"][i] = _quaternion_from_euler(
-                        p * 0.04, -p * 0.06, -p * 0.08)
-                if "spine" in keyframes:
-                    keyframes["spine"]["rotations"][i] = _quaternion_from_euler(
-                        -p_upper * 0.06, 0, p_upper * 0.04)
-                if "spine1" in keyframes:
-                    keyframes["spine1"]["rotations"][i] = _quaternion_from_euler(
-                        -p_upper * 0.03, 0, 0)
-                if "head" in keyframes:
-                    keyframes["head"]["rotations"][i] = _quaternion_from_euler(
-                        -p_upper * 0.04, -p_upper * 0.08, 0)
-                # Right leg chambers
-                if "thigh_r" in keyframes:
-                    keyframes["thigh_r"]["rotations"][i] = _quaternion_from_euler(
-                        p * 0.55, 0, 0)
-                if "shin_r" in keyframes:
-                    keyframes["shin_r"]["rotations"][i] = _quaternion_from_euler(
-                        -p * 0.70, 0, 0)
-                if "foot_r" in keyframes:
-                    keyframes["foot_r"]["rotations"][i] = _quaternion_from_euler(
-                        -p * 0.15, 0, 0)
-                # Support leg bends slightly
-                if "thigh_l" in keyframes:
-                    keyframes["thigh_l"]["rotations"][i] = _quaternion_from_euler(
-                        p * 0.12, 0, 0)
-                if "shin_l" in keyframes:
-                    keyframes["shin_l"]["rotations"][i] = _quaternion_from_euler(
-                        -p * 0.15, 0, 0)
-                # Arms in guard position
-                if "arm_l" in keyframes:
-                    keyframes["arm_l"]["rotations"][i] = _quaternion_from_euler(
-                        -p * 0.35, 0, p * 0.10)
-                if "arm_r" in keyframes:
-                    keyframes["arm_r"]["rotations"][i] = _quaternion_from_euler(
-                        -p * 0.30, 0, -p * 0.08)
-                if "forearm_l" in keyframes:
-                    keyframes["forearm_l"]["rotations"][i] = _quaternion_from_euler(
-                        -p * 0.50, 0, 0)
-                if "forearm_r" in keyframes:
-                    keyframes["forearm_r"]["rotations"][i] = _quaternion_from_euler(
-                        -p * 0.45, 0, 0)
-                    
-            elif t < 0.38:
-                # Snap kick — explosive extension, hip leads, shin snaps out
-                p = _ease_out_cubic((t - 0.20) / 0.18)
-                p_shin = _ease_out_cubic(min(1.0, (t - 0.20) / 0.18 * 0.75))  # shin lags
-                if "hips" in keyframes:
-                    keyframes["hips"]["rotations"][i] = _quaternion_from_euler(
-                        0.04 + p * 0.06, -0.06 - p * 0.04, -0.08)
-                if "spine" in keyframes:
-                    keyframes["spine"]["rotations"][i] = _quaternion_from_euler(
-                        -0.06 - p * 0.06, 0, 0.04)
-                if "head" in keyframes:
-                    keyframes["head"]["rotations"][i] = _quaternion_from_euler(
-                        -0.04, -0.08 + p * 0.04, 0)
-                if "thigh_r" in keyframes:
-                    keyframes["thigh_r"]["rotations"][i] = _quaternion_from_euler(
-                        0.55 + p * 0.50, 0, 0)
-                if "shin_r" in keyframes:
-                    keyframes["shin_r"]["rotations"][i] = _quaternion_from_euler(
-                        -0.70 + p_shin * 0.68, 0, 0)
-                if "foot_r" in keyframes:
-                    keyframes["foot_r"]["rotations"][i] = _quaternion_from_euler(
-                        -0.15 - p * 0.20, 0, 0)
-                # Counter-balance: lean back, arms out
-                if "arm_l" in keyframes:
-                    keyframes["arm_l"]["rotations"][i] = _quaternion_from_euler(
-                        -0.35 - p * 0.15, 0, 0.10 + p * 0.08)
-                if "arm_r" in keyframes:
-                    keyframes["arm_r"]["rotations"][i] = _quaternion_from_euler(
-                        -0.30 + p * 0.20, 0, -0.08 - p * 0.06)
-                    
-            elif t < 0.50:
-                # Hold kick peak briefly (impact frame)
-                p = (t - 0.38) / 0.12
-                if "hips" in keyframes:
-                    keyframes["hips"]["rotations"][i] = _quaternion_from_euler(
-                        0.10, -0.10, -0.08)
-                if "spine" in keyframes:
-                    keyframes["spine"]["rotations"][i] = _quaternion_from_euler(
-                        -0.12, 0, 0.04)
-                if "thigh_r" in keyframes:
-                    keyframes["thigh_r"]["rotations"][i] = _quaternion_from_euler(1.05, 0, 0)
-                if "shin_r" in keyframes:
-                    keyframes["shin_r"]["rotations"][i] = _quaternion_from_euler(
-                        -0.02 + p * 0.05, 0, 0)  # slight wobble at peak
-                if "foot_r" in keyframes:
-                    keyframes["foot_r"]["rotations"][i] = _quaternion_from_euler(-0.35, 0, 0)
-                if "arm_l" in keyframes:
-                    keyframes["arm_l"]["rotations"][i] = _quaternion_from_euler(
-                        -0.50, 0, 0.18)
-                if "head" in keyframes:
-                    keyframes["head"]["rotations"][i] = _quaternion_from_euler(
-                        -0.04, -0.04, 0)
-                    
-            else:
-                # Recovery — retract leg, settle body (overlapping)
-                p = _ease_in_out((t - 0.50) / 0.50)
-                settle = math.sin(p * math.pi * 1.5) * (1 - p) * 0.06
-                p_upper = _ease_in_out(min(1.0, (t - 0.50) / 0.50 * 0.80))
-                if "hips" in keyframes:
-                    keyframes["hips"]["rotations"][i] = _quaternion_from_euler(
-                        0.10 * (1 - p) + settle, -0.10 * (1 - p), -0.08 * (1 - p))
-                if "spine" in keyframes:
-                    keyframes["spine"]["rotations"][i] = _quaternion_from_euler(
-                        -0.12 * (1 - p_upper), 0, 0.04 * (1 - p_upper))
-                if "spine1" in keyframes:
-                    keyframes["spine1"]["rotations"][i] = _quaternion_from_euler(
-                        settle * 0.5, 0, 0)
-                if "head" in keyframes:
-                    keyframes["head"]["rotations"][i] = _quaternion_from_euler(
-                        settle * 0.3, 0, 0)
-                if "thigh_r" in keyframes:
-                    keyframes["thigh_r"]["rotations"][i] = _quaternion_from_euler(
-                        1.05 * (1 - p), 0, 0)
-                if "shin_r" in keyframes:
-                    keyframes["shin_r"]["rotations"][i] = _quaternion_from_euler(
-                        -p * 0.15, 0, 0)
-                if "foot_r" in keyframes:
-                    keyframes["foot_r"]["rotations"][i] = _quaternion_from_euler(
-                        -0.35 * (1 - p), 0, 0)
-                if "thigh_l" in keyframes:
-                    keyframes["thigh_l"]["rotations"][i] = _quaternion_from_euler(
-                        0.12 * (1 - p), 0, 0)
-                if "shin_l" in keyframes:
-                    keyframes["shin_l"]["rotations"][i] = _quaternion_from_euler(
-                        -0.15 * (1 - p), 0, 0)
-                if "arm_l" in keyframes:
-                    keyframes["arm_l"]["rotations"][i] = _quaternion_from_euler(
-                        -0.50 * (1 - p), 0, 0.18 * (1 - p))
-                if "arm_r" in keyframes:
-                    keyframes["arm_r"]["rotations"][i] = _quaternion_from_euler(
-                        -0.10 * (1 - p), 0, -0.14 * (1 - p))
-                if "forearm_l" in keyframes:
-                    keyframes["forearm_l"]["rotations"][i] = _quaternion_from_euler(
-                        -0.50 * (1 - p), 0, 0)
-                if "forearm_r" in keyframes:
-                    keyframes["forearm_r"]["rotations"][i] = _quaternion_from_euler(
-                        -0.45 * (1 - p), 0, 0)
-    
-    elif animation_id == "celebrate":
-        # Celebrate — fist pumps + body bounce with layered timing
-        for i in range(n):
-            t = i / (n - 1)
-            beat = math.sin(t * 4 * math.pi)
-            beat_lag = math.sin(t * 4 * math.pi - 0.25)
-            groove = math.cos(t * 4 * math.pi)
-            pump = max(0, math.sin(t * 4 * math.pi))
-            pump_lag = max(0, math.sin(t * 4 * math.pi - 0.3))  # arms lag behind
-            double = math.sin(t * 8 * math.pi) * 0.3  # micro-bounces
-            
-            if "hips" in keyframes:
-                keyframes["hips"]["rotations"][i] = _quaternion_from_euler(
-                    pump * 0.04 + double * 0.01, beat * 0.14, groove * 0.07)
-            if "spine" in keyframes:
-                keyframes["spine"]["rotations"][i] = _quaternion_from_euler(
-                    -pump_lag * 0.08, -beat_lag * 0.10, -groove * 0.04)
-            if "spine1" in keyframes:
-                keyframes["spine1"]["rotations"][i] = _quaternion_from_euler(
-                    -pump_lag * 0.04, -beat_lag * 0.05, 0)
-            if "neck" in keyframes:
-                keyframes["neck"]["rotations"][i] = _quaternion_from_euler(
-                    pump * 0.05, beat * 0.04, 0)
-            if "head" in keyframes:
-                keyframes["head"]["rotations"][i] = _quaternion_from_euler(
-                    -pump * 0.14 + double * 0.02, beat * 0.08, groove * 0.03)
-            if "shoulder_l" in keyframes:
-                keyframes["shoulder_l"]["rotations"][i] = _quaternion_from_euler(
-                    -pump_lag * 0.15, 0, pump_lag * 0.10)
-            if "shoulder_r" in keyframes:
-                keyframes["shoulder_r"]["rotations"][i] = _quaternion_from_euler(
-                    -pump_lag * 0.15, 0, -pump_lag * 0.10)
-            if "arm_l" in keyframes:
-                keyframes["arm_l"]["rotations"][i] = _quaternion_from_euler(
-                    -0.5 - pump_lag * 0.85, 0, 0.2 + pump_lag * 0.18)
-            if "arm_r" in keyframes:
-                keyframes["arm_r"]["rotations"][i] = _quaternion_from_euler(
-                    -0.5 - pump_lag * 0.85, 0, -0.2 - pump_lag * 0.18)
-            if "forearm_l" in keyframes:
-                keyframes["forearm_l"]["rotations"][i] = _quaternion_from_euler(
-                    -0.6 - pump_lag * 0.35, 0, 0)
-            if "forearm_r" in keyframes:
-                keyframes["forearm_r"]["rotations"][i] = _quaternion_from_euler(
-                    -0.6 - pump_lag * 0.35, 0, 0)
-            if "hand_l" in keyframes:
-                keyframes["hand_l"]["rotations"][i] = _quaternion_from_euler(
-                    pump_lag * 0.08, 0, pump_lag * 0.05)
-            if "hand_r" in keyframes:
-                keyframes["hand_r"]["rotations"][i] = _quaternion_from_euler(
-                    pump_lag * 0.08, 0, -pump_lag * 0.05)
-            if "thigh_l" in keyframes:
-                keyframes["thigh_l"]["rotations"][i] = _quaternion_from_euler(pump * 0.18, 0, 0)
-            if "thigh_r" in keyframes:
-                keyframes["thigh_r"]["rotations"][i] = _quaternion_from_euler(max(0, -beat) * 0.18, 0, 0)
-            if "shin_l" in keyframes:
-                keyframes["shin_l"]["rotations"][i] = _quaternion_from_euler(pump * 0.08, 0, 0)
-            if "shin_r" in keyframes:
-                keyframes["shin_r"]["rotations"][i] = _quaternion_from_euler(max(0, -beat) * 0.08, 0, 0)
-    
-    elif animation_id == "bow":
-        # Bow — respectful bow with overlapping spine cascade + breathing hold
-        for i in range(n):
-            t = i / (n - 1)
-            
-            if t < 0.30:
-                # Bend forward — spine cascade: hips start, head follows last
-                p = _ease_in_out(t / 0.30)
-                p_spine = _ease_in_out(min(1.0, t / 0.30 * 1.10))  # spine slightly ahead
-                p_head = _ease_in_out(min(1.0, t / 0.30 * 0.85))   # head lags
-                p_arms = _ease_in_out(min(1.0, t / 0.30 * 0.80))   # arms lag more
-                if "hips" in keyframes:
-                    keyframes["hips"]["rotations"][i] = _quaternion_from_euler(p * 0.35, 0, 0)
-                if "spine" in keyframes:
-                    keyframes["spine"]["rotations"][i] = _quaternion_from_euler(p_spine * 0.25, 0, 0)
-                if "spine1" in keyframes:
-                    keyframes["spine1"]["rotations"][i] = _quaternion_from_euler(p_spine * 0.15, 0, 0)
-                if "spine2" in keyframes:
-                    keyframes["spine2"]["rotations"][i] = _quaternion_from_euler(p_spine * 0.08, 0, 0)
-                if "neck" in keyframes:
-                    keyframes["neck"]["rotations"][i] = _quaternion_from_euler(p_head * 0.08, 0, 0)
-                if "head" in keyframes:
-                    keyframes["head"]["rotations"][i] = _quaternion_from_euler(p_head * 0.15, 0, 0)
-                # Arms slide to sides
-                if "shoulder_l" in keyframes:
-                    keyframes["shoulder_l"]["rotations"][i] = _quaternion_from_euler(p_arms * 0.04, 0, p_arms * 0.03)
-                if "shoulder_r" in keyframes:
-                    keyframes["shoulder_r"]["rotations"][i] = _quaternion_from_euler(p_arms * 0.04, 0, -p_arms * 0.03)
-                if "arm_l" in keyframes:
-                    keyframes["arm_l"]["rotations"][i] = _quaternion_from_euler(p_arms * 0.12, 0, p_arms * 0.06)
-                if "arm_r" in keyframes:
-                    keyframes["arm_r"]["rotations"][i] = _quaternion_from_euler(p_arms * 0.12, 0, -p_arms * 0.06)
-                if "forearm_l" in keyframes:
-                    keyframes["forearm_l"]["rotations"][i] = _quaternion_from_euler(-p_arms * 0.08, 0, 0)
-                if "forearm_r" in keyframes:
-                    keyframes["forearm_r"]["rotations"][i] = _quaternion_from_euler(-p_arms * 0.08, 0, 0)
-                # Slight knee bend for balance
-                if "thigh_l" in keyframes:
-                    keyframes["thigh_l"]["rotations"][i] = _quaternion_from_euler(p * 0.06, 0, 0)
-                if "thigh_r" in keyframes:
-                    keyframes["thigh_r"]["rotations"][i] = _quaternion_from_euler(p * 0.06, 0, 0)
-                if "shin_l" in keyframes:
-                    keyframes["shin_l"]["rotations"][i] = _quaternion_from_euler(-p * 0.04, 0, 0)
-                if "shin_r" in keyframes:
-                    keyframes["shin_r"]["rotations"][i] = _quaternion_from_euler(-p * 0.04, 0, 0)
-                    
-            elif t < 0.68:
-                # Hold bow — subtle breathing motion for life-like feel
-                hold_t = (t - 0.30) / 0.38
-                breath = math.sin(hold_t * math.pi * 2.5) * 0.012
-                micro_sway = math.sin(hold_t * math.pi * 5) * 0.004
-                if "hips" in keyframes:
-                    keyframes["hips"]["rotations"][i] = _quaternion_from_euler(0.35, 0, micro_sway)
-                if "spine" in keyframes:
-                    keyframes["spine"]["rotations"][i] = _quaternion_from_euler(0.25 + breath, 0, 0)
-                if "spine1" in keyframes:
-                    keyframes["spine1"]["rotations"][i] = _quaternion_from_euler(0.15 + breath * 0.6, 0, 0)
-                if "spine2" in keyframes:
-                    keyframes["spine2"]["rotations"][i] = _quaternion_from_euler(0.08 + breath * 0.3, 0, 0)
-                if "neck" in keyframes:
-                    keyframes["neck"]["rotations"][i] = _quaternion_from_euler(0.08, 0, 0)
-                if "head" in keyframes:
-                    keyframes["head"]["rotations"][i] = _quaternion_from_euler(0.15, 0, micro_sway * 0.5)
-                if "arm_l" in keyframes:
-                    keyframes["arm_l"]["rotations"][i] = _quaternion_from_euler(0.12, 0, 0.06)
-                if "arm_r" in keyframes:
-                    keyframes["arm_r"]["rotations"][i] = _quaternion_from_euler(0.12, 0, -0.06)
-                if "shoulder_l" in keyframes:
-                    keyframes["shoulder_l"]["rotations"][i] = _quaternion_from_euler(0.04 + breath * 0.3, 0, 0.03)
-                if "shoulder_r" in keyframes:
-                    keyframes["shoulder_r"]["rotations"][i] = _quaternion_from_euler(0.04 + breath * 0.3, 0, -0.03)
-                if "thigh_l" in keyframes:
-                    keyframes["thigh_l"]["rotations"][i] = _quaternion_from_euler(0.06, 0, 0)
-                if "thigh_r" in keyframes:
-                    keyframes["thigh_r"]["rotations"][i] = _quaternion_from_euler(0.06, 0, 0)
-                    
-            else:
-                # Rise back up — reverse cascade: head rises first, hips last
-                p = _ease_in_out((t - 0.68) / 0.32)
-                p_head = _ease_in_out(min(1.0, (t - 0.68) / 0.32 * 1.20))  # head leads
-                p_arms = _ease_in_out(min(1.0, (t - 0.68) / 0.32 * 1.10))  # arms lead
-                r = 1 - p
-                r_head = 1 - p_head
-                r_arms = 1 - p_arms
-                if "hips" in keyframes:
-                    keyframes["hips"]["rotations"][i] = _quaternion_from_euler(0.35 * r, 0, 0)
-                if "spine" in keyframes:
-                    keyframes["spine"]["rotations"][i] = _quaternion_from_euler(0.25 * r, 0, 0)
-                if "spine1" in keyframes:
-                    keyframes["spine1"]["rotations"][i] = _quaternion_from_euler(0.15 * r, 0, 0)
-                if "spine2" in keyframes:
-                    keyframes["spine2"]["rotations"][i] = _quaternion_from_euler(0.08 * r, 0, 0)
-                if "neck" in keyframes:
-                    keyframes["neck"]["rotations"][i] = _quaternion_from_euler(0.08 * r_head, 0, 0)
-                if "head" in keyframes:
-                    keyframes["head"]["rotations"][i] = _quaternion_from_euler(0.15 * r_head, 0, 0)
-                if "arm_l" in keyframes:
-                    keyframes["arm_l"]["rotations"][i] = _quaternion_from_euler(0.12 * r_arms, 0, 0.06 * r_arms)
-                if "arm_r" in keyframes:
-                    keyframes["arm_r"]["rotations"][i] = _quaternion_from_euler(0.12 * r_arms, 0, -0.06 * r_arms)
-                if "shoulder_l" in keyframes:
-                    keyframes["shoulder_l"]["rotations"][i] = _quaternion_from_euler(0.04 * r_arms, 0, 0.03 * r_arms)
-                if "shoulder_r" in keyframes:
-                    keyframes["shoulder_r"]["rotations"][i] = _quaternion_from_euler(0.04 * r_arms, 0, -0.03 * r_arms)
-                if "forearm_l" in keyframes:
-                    keyframes["forearm_l"]["rotations"][i] = _quaternion_from_euler(-0.08 * r_arms, 0, 0)
-                if "forearm_r" in keyframes:
-                    keyframes["forearm_r"]["rotations"][i] = _quaternion_from_euler(-0.08 * r_arms, 0, 0)
-                if "thigh_l" in keyframes:
-                    keyframes["thigh_l"]["rotations"][i] = _quaternion_from_euler(0.06 * r, 0, 0)
-                if "thigh_r" in keyframes:
-                    keyframes["thigh_r"]["rotations"][i] = _quaternion_from_euler(0.06 * r, 0, 0)
-                if "shin_l" in keyframes:
-                    keyframes["shin_l"]["rotations"][i] = _quaternion_from_euler(-0.04 * r, 0, 0)
-                if "shin_r" in keyframes:
-                    keyframes["shin_r"]["rotations"][i] = _quaternion_from_euler(-0.04 * r, 0, 0)
-    
-    elif animation_id == "look_around":
-        # Look around — smooth head/body scan with overlapping action
-        for i in range(n):
-            t = i / (n - 1)
-            # Smooth scan: look slowly left, then right, using sine wave
-            look = math.sin(t * 2 * math.pi)
-            look_lag = math.sin(t * 2 * math.pi - 0.20)   # neck lags head
-            look_body = math.sin(t * 2 * math.pi - 0.40)  # body lags further
-            # Subtle vertical bob as attention shifts
-            vertical = math.sin(t * 4 * math.pi) * 0.06
-            vertical_lag = math.sin(t * 4 * math.pi - 0.15) * 0.04
-            
-            if "head" in keyframes:
-                keyframes["head"]["rotations"][i] = _quaternion_from_euler(
-                    vertical,        # subtle up/down with attention
-                    look * 0.48,     # main left/right scan
-                    look * 0.06      # slight tilt follows gaze
-                )
-            if "neck" in keyframes:
-                keyframes["neck"]["rotations"][i] = _quaternion_from_euler(
-                    vertical_lag, look_lag * 0.18, look_lag * 0.02)
-            if "spine2" in keyframes:
-                keyframes["spine2"]["rotations"][i] = _quaternion_from_euler(
-                    0, look_body * 0.10, look_body * 0.015)
-            if "spine1" in keyframes:
-                keyframes["spine1"]["rotations"][i] = _quaternion_from_euler(
-                    0, look_body * 0.06, 0)
-            if "spine" in keyframes:
-                keyframes["spine"]["rotations"][i] = _quaternion_from_euler(
-                    0, look_body * 0.04, 0)
-            # Weight shifts with gaze direction
-            if "hips" in keyframes:
-                keyframes["hips"]["rotations"][i] = _quaternion_from_euler(0, 0, look_body * 0.025)
-            # Arms sway subtly with body
-            if "arm_l" in keyframes:
-                keyframes["arm_l"]["rotations"][i] = _quaternion_from_euler(
-                    look_body * 0.03, 0, look_body * 0.015)
-            if "arm_r" in keyframes:
-                keyframes["arm_r"]["rotations"][i] = _quaternion_from_euler(
-                    -look_body * 0.03, 0, -look_body * 0.015)
-    
-    # ── Post-processing: fill identity bones with subtle parent-inherited motion ──
-    # Ensures ALL bones have non-identity rotation → prevents mesh tearing
-    # Bones still at identity get ~15% of their parent's rotation as follow-through
-    BONE_PARENT = {
-        "hips": "root", "spine": "hips", "spine1": "spine",
-        "spine2": "spine1", "neck": "spine2", "head": "neck",
-        "shoulder_l": "spine2", "arm_l": "shoulder_l",
-        "forearm_l": "arm_l", "hand_l": "forearm_l",
-        "shoulder_r": "spine2", "arm_r": "shoulder_r",
-        "forearm_r": "arm_r", "hand_r": "forearm_r",
-        "thigh_l": "hips", "shin_l": "thigh_l",
-        "foot_l": "shin_l", "toe_l": "foot_l",
-        "thigh_r": "hips", "shin_r": "thigh_r",
-        "foot_r": "shin_r", "toe_r": "foot_r",
+    return channels, samplers
+
+
+def _clip_pack_gltf(nodes, animations, bone_names, source_name):
+    """
+    glTF JSON of a clip pack: one named node per animated joint and the
+    animations retargeted onto them (channels still hold source indices).
+    """
+    targeted = sorted({ch["target"]["node"] for anim in animations for ch in anim["channels"]})
+    remap = {node_idx: i for i, node_idx in enumerate(targeted)}
+    for anim in animations:
+        for ch in anim["channels"]:
+            ch["target"]["node"] = remap[ch["target"]["node"]]
+        # Joints held at rest have no node in the pack (nothing to play)
+        anim.pop("extras", None)
+    return {
+        "asset": {"version": "2.0", "generator": "Polyva Clip Pack"},
+        "scene": 0,
+        "scenes": [{"nodes": list(range(len(targeted)))}],
+        "nodes": [{"name": nodes[idx].get("name", f"joint_{idx}")} for idx in targeted],
+        "animations": animations,
+        "extras": {"clipPack": {"source": source_name, "skeleton": bone_names}},
     }
-    
-    # Process in parent-first order so cascading inheritance works
-    for bone_name in bone_names:
-        if bone_name not in keyframes or bone_name == "root":
-            continue
-        kf = keyframes[bone_name]
-        is_identity = True
-        for rot in kf["rotations"]:
-            if (abs(rot[0]) > 1e-5 or abs(rot[1]) > 1e-5 or
-                abs(rot[2]) > 1e-5 or abs(rot[3] - 1.0) > 1e-5):
-                is_identity = False
-                break
-        
-        if is_identity and bone_name in BONE_PARENT:
-            parent_name = BONE_PARENT[bone_name]
-            if parent_name in keyframes:
-                parent_rots = keyframes[parent_name]["rotations"]
-                factor = 0.15  # inherit 15% of parent rotation
-                for i in range(n):
-                    pr = parent_rots[i]
-                    # Scale quaternion rotation by factor (valid for small angles)
-                    nx = pr[0] * factor
-                    ny = pr[1] * factor
-                    nz = pr[2] * factor
-                    nw = pr[3]
-                    ln = math.sqrt(nx*nx + ny*ny + nz*nz + nw*nw)
-                    if ln > 1e-8:
-                        kf["rotations"][i] = [nx/ln, ny/ln, nz/ln, nw/ln]
-    
-    # ── Post-processing: add hip bounce for locomotion ──
-    # Figure-8 pattern: vertical bounce (2x per stride) + lateral sway (1x)
-    if animation_id in ("walk", "run", "run_fast", "dance", "celebrate"):
-        if "hips" in keyframes:
-            n_frames = len(keyframes["hips"]["times"])
-            amp = {
-                "walk": 0.010, "run": 0.018, "run_fast": 0.025,
-                "dance": 0.012, "celebrate": 0.014
-            }.get(animation_id, 0.010)
-            keyframes["hips"]["translations"] = []
-            for i in range(n_frames):
-                t = i / (n_frames - 1)
-                # Figure-8 hip motion: vertical is 2x frequency, lateral is 1x
-                bounce_y = math.sin(t * 4 * math.pi) * amp
-                sway_x = math.sin(t * 2 * math.pi) * amp * 0.4
-                # Subtle forward lean during push-off
-                lean_z = math.sin(t * 4 * math.pi + 0.5) * amp * 0.15
-                keyframes["hips"]["translations"].append([sway_x, bounce_y, lean_z])
-    
-    # ── Hip translation for sit_down and jump ──
-    if animation_id == "sit_down":
-        if "hips" in keyframes:
-            n_frames = len(keyframes["hips"]["times"])
-            keyframes["hips"]["translations"] = []
-            for i in range(n_frames):
-                t = i / (n_frames - 1)
-                p = t * t * (3 - 2 * t)  # smooth ease
-                keyframes["hips"]["translations"].append([0, -p * 0.08, 0])
-    
-    if animation_id == "jump":
-        if "hips" in keyframes:
-            n_frames = len(keyframes["hips"]["times"])
-            keyframes["hips"]["translations"] = []
-            for i in range(n_frames):
-                t = i / (n_frames - 1)
-                if t < 0.25:
-                    y = -(t / 0.25) * 0.02  # crouch down
-                elif t < 0.65:
-                    p = (t - 0.25) / 0.40
-                    y = -0.02 + p * 0.08  # jump up
-                else:
-                    p = (t - 0.65) / 0.35
-                    y = 0.06 * (1 - p * p)  # land
-                keyframes["hips"]["translations"].append([0, y, 0])
-    
-    return keyframes
 
 
-def animate_model_glb(input_path: str, output_path: str, animation_id: str, animation_info: dict):
+def _render_preview(gltf, bin_data, clips, output_path: str, preview: str = None):
     """
-    Real implementation: add animation keyframes to a rigged GLB model.
-    
-    The input must be a rigged GLB (with skins and joint nodes).
-    
-    Steps:
-    1. Parse the GLB file
-    2. Find the skin and joint nodes
-    3. Generate keyframe data for the animation
-    4. Create glTF animation channels and samplers
-    5. Write the animated GLB
+    Render clips ({"name", "tracks", "duration", "loop"}) of the skinned mesh
+    in gltf / bin_data to <output>_preview.png or .gif (skin_preview).
+    Returns the preview summary, or None when off or failed: a preview
+    never fails the job it belongs to.
+    """
+    preview = preview or Phase2Config.PREVIEW_FORMAT
+    if not preview or preview == "none" or not clips:
+        return None
+    path = f"{os.path.splitext(output_path)[0]}_preview.{'gif' if preview == 'gif' else 'png'}"
+    try:
+        summary = _skin_preview.render_preview(gltf, bin_data, clips, path, preview)
+    except Exception as e:
+        traceback.print_exc()
+        print(f"  ⚠️ Preview failed: {e}")
+        return None
+    if summary:
+        print(f"  🖼️ Preview ({preview}): {len(clips)} clip(s) × {summary['frames']} frames, "
+              f"{summary['rendered_vertices']} of {summary['vertices']} verts in {summary['ms']:.0f} ms")
+    return summary
+
+
+def animate_model_glb_clips(input_path: str, output_path: str, clips: list, output: str = "model",
+                            preview: str = None):
+    """
+    Add several animation clips to a rigged GLB in one pass.
+    
+    clips is a list of (animation_id, animation_info) pairs; animation_info
+    carries "name", "duration" and "loop" as in ANIMATION_LIBRARY (with
+    any per-clip overrides applied). The GLB is read once, every clip's
+    samplers go through one GLTFDocument (shared keyframe times collapse
+    to one accessor across clips) and the file is written once. Each clip
+    becomes its own glTF animation, appended after any already present.
+    
+    output="clips" writes a clip pack instead of a copy of the model: a
+    GLB holding only the animations and one node per animated joint,
+    named like the rig's joints (no mesh, skin or textures). Loaders bind
+    tracks by node name, so its clips play on the rigged model itself.
+    
+    preview ("sprite", "gif" or "none"; None = Phase2Config.PREVIEW_FORMAT)
+    renders the clips on the rigged mesh next to output_path (_render_preview).
     """
     print(f"  🎬 Animating model: {input_path}")
-    print(f"  🎭 Animation: {animation_id} ({animation_info.get('name', '')})")
+    print(f"  🎭 Animations: {', '.join(aid for aid, _ in clips)}")
     
     gltf, bin_data = _read_glb(input_path)
     
@@ -3465,150 +2574,107 @@ def animate_model_glb(input_path: str, output_path: str, animation_id: str, anim
     for idx in joint_node_indices:
         bone_names.append(gltf["nodes"][idx].get("name", f"joint_{idx}"))
     
-    duration = animation_info.get("duration", 1.0)
-    is_loop = animation_info.get("loop", False)
-    
-    # Generate keyframes
-    keyframes = _generate_animation_keyframes(animation_id, bone_names, duration)
-    
-    # Create glTF animation
-    if "animations" not in gltf:
-        gltf["animations"] = []
-    
-    channels = []
-    samplers = []
-    sampler_idx = 0
-    
-    for bone_idx, node_idx in enumerate(joint_node_indices):
-        bone_name = bone_names[bone_idx]
-        if bone_name not in keyframes:
+    # Identical arrays (e.g. the shared keyframe times) collapse to one accessor
+    if output == "clips":
+        doc = _glb_io.GLTFDocument({})
+    else:
+        doc = _glb_io.GLTFDocument(gltf, bin_data)
+    
+    animations = []
+    summaries = []
+    preview_clips = []
+    targeted_nodes = set()
+    for animation_id, animation_info in clips:
+        duration = animation_info.get("duration", 1.0)
+        is_loop = animation_info.get("loop", False)
+        tracks, rest_nodes = _clip_tracks(gltf["nodes"], joint_node_indices, bone_names,
+                                          animation_id, duration, is_loop)
+        channels, samplers = _append_clip_channels(doc, tracks)
+        if not channels:
+            print(f"  ⚠️ No animated bones found for animation {animation_id}")
             continue
-        
-        kf = keyframes[bone_name]
-        times = kf["times"]
-        rotations = kf["rotations"]
-        
-        # ── Rotation channel — CUBICSPLINE for Mixamo-smooth interpolation ──
-        # CUBICSPLINE output format: [inTangent₀, value₀, outTangent₀, inTangent₁, value₁, outTangent₁, ...]
-        # This lets the GPU compute Hermite splines between keyframes → silky smooth.
-        time_data = struct.pack(f'<{len(times)}f', *times)
-        time_offset = _append_to_buffer(bin_data, time_data, gltf)
-        time_bv_idx = _add_buffer_view(gltf, time_offset, len(time_data))
-        time_acc_idx = _add_accessor(
-            gltf, time_bv_idx, 5126, len(times), "SCALAR",
-            min_val=[min(times)], max_val=[max(times)]
-        )
-        
-        # Compute Catmull-Rom tangents for rotation (VEC4 quaternion)
-        rot_in_tang, rot_out_tang = _compute_catmull_rom_tangents(
-            times, rotations, 4, is_loop
-        )
-        
-        # Pack as interleaved triplets: [inTangent, value, outTangent] per keyframe
-        rot_flat = []
-        for i in range(len(rotations)):
-            rot_flat.extend(rot_in_tang[i])     # inTangent (4 floats)
-            rot_flat.extend(rotations[i])        # value     (4 floats)
-            rot_flat.extend(rot_out_tang[i])     # outTangent(4 floats)
-        
-        rot_data = struct.pack(f'<{len(rot_flat)}f', *rot_flat)
-        rot_offset = _append_to_buffer(bin_data, rot_data, gltf)
-        rot_bv_idx = _add_buffer_view(gltf, rot_offset, len(rot_data))
-        # For CUBICSPLINE, accessor count = number of keyframes, but data has 3x elements
-        rot_acc_idx = _add_accessor(gltf, rot_bv_idx, 5126, len(rotations) * 3, "VEC4")
-        
-        samplers.append({
-            "input": time_acc_idx,
-            "output": rot_acc_idx,
-            "interpolation": "CUBICSPLINE"
-        })
-        channels.append({
-            "sampler": sampler_idx,
-            "target": {"node": node_idx, "path": "rotation"}
+        animations.append({
+            "name": animation_info.get("name", animation_id),
+            "channels": channels,
+            "samplers": samplers
         })
-        sampler_idx += 1
-        
-        # ── Translation channel (hip bounce, etc.) — also CUBICSPLINE ──
-        translations = kf.get("translations")
-        if translations:
-            rest_trans = gltf["nodes"][node_idx].get("translation", [0, 0, 0])
-            
-            t_time_data = struct.pack(f'<{len(times)}f', *times)
-            t_time_offset = _append_to_buffer(bin_data, t_time_data, gltf)
-            t_time_bv = _add_buffer_view(gltf, t_time_offset, len(t_time_data))
-            t_time_acc = _add_accessor(
-                gltf, t_time_bv, 5126, len(times), "SCALAR",
-                min_val=[min(times)], max_val=[max(times)]
-            )
-            
-            # Compute absolute translations (rest + delta)
-            abs_trans = []
-            for dt in translations:
-                abs_trans.append([
-                    rest_trans[0] + dt[0],
-                    rest_trans[1] + dt[1],
-                    rest_trans[2] + dt[2]
-                ])
-            
-            # Compute Catmull-Rom tangents for translation (VEC3)
-            tr_in_tang, tr_out_tang = _compute_catmull_rom_tangents(
-                times, abs_trans, 3, is_loop
-            )
-            
-            # Pack as interleaved triplets
-            trans_flat = []
-            for i in range(len(abs_trans)):
-                trans_flat.extend(tr_in_tang[i])    # inTangent (3 floats)
-                trans_flat.extend(abs_trans[i])      # value     (3 floats)
-                trans_flat.extend(tr_out_tang[i])    # outTangent(3 floats)
-            
-            trans_data = struct.pack(f'<{len(trans_flat)}f', *trans_flat)
-            trans_offset = _append_to_buffer(bin_data, trans_data, gltf)
-            trans_bv = _add_buffer_view(gltf, trans_offset, len(trans_data))
-            trans_acc = _add_accessor(gltf, trans_bv, 5126, len(abs_trans) * 3, "VEC3")
-            
-            samplers.append({
-                "input": t_time_acc,
-                "output": trans_acc,
-                "interpolation": "CUBICSPLINE"
-            })
-            channels.append({
-                "sampler": sampler_idx,
-                "target": {"node": node_idx, "path": "translation"}
-            })
-            sampler_idx += 1
-    
-    if not channels:
-        print("  ⚠️ No animated bones found for this animation")
+        if rest_nodes:
+            # Joints held at rest without a channel: recorded so QA of the
+            # saved file (skin_qa.check_glb) counts them as driven
+            animations[-1]["extras"] = {"restNodes": rest_nodes}
+        preview_clips.append({"name": animations[-1]["name"], "tracks": tracks,
+                              "duration": duration, "loop": is_loop})
+        summaries.append({"id": animation_id, "name": animations[-1]["name"],
+                          "duration": duration, "loop": is_loop, "num_channels": len(channels)})
+        targeted_nodes.update(ch["target"]["node"] for ch in channels)
+        targeted_nodes.update(rest_nodes)
+    
+    if not animations:
         return {
             "success": True,
             "animated_model_path": input_path,
-            "animation": animation_info,
+            "animations": [],
             "warning": "No bones were animated"
         }
     
-    gltf["animations"].append({
-        "name": animation_info.get("name", animation_id),
-        "channels": channels,
-        "samplers": samplers
-    })
+    skin_report = None
+    if Phase2Config.SKIN_QA:
+        skin_report = _skin_qa.check_glb(gltf, bin_data, targeted_nodes=targeted_nodes)
+        print(f"  🩺 Skin QA: {_skin_qa.summary(skin_report)}")
+    
+    if output == "clips":
+        doc.gltf.update(_clip_pack_gltf(gltf["nodes"], animations, bone_names,
+                                        os.path.basename(input_path)))
+    else:
+        gltf.setdefault("animations", []).extend(animations)
     
     # Write output
-    _write_glb(output_path, gltf, bytes(bin_data))
+    doc.save(output_path)
     
+    num_channels = sum(a["num_channels"] for a in summaries)
     file_size = os.path.getsize(output_path)
-    print(f"  ✅ Animated model saved: {output_path} ({file_size / 1024:.1f} KB)")
-    print(f"  🎬 Animation: {len(channels)} bone channels, {duration}s duration")
+    label = "Clip pack" if output == "clips" else "Animated model"
+    print(f"  ✅ {label} saved: {output_path} ({file_size / 1024:.1f} KB)")
+    print(f"  🎬 Animation: {len(summaries)} clip(s), {num_channels} bone channels, "
+          f"{doc.dedup_hits} duplicate accessors shared")
     
     return {
         "success": True,
         "animated_model_path": output_path,
-        "animation": animation_info,
-        "num_channels": len(channels),
-        "duration": duration
+        "output": output,
+        "animations": summaries,
+        "num_channels": num_channels,
+        "skin_qa": skin_report,
+        "preview": _render_preview(gltf, bin_data, preview_clips, output_path, preview)
     }
 
 
+def animate_model_glb(input_path: str, output_path: str, animation_id: str, animation_info: dict,
+                      output: str = "model", preview: str = None):
+    """
+    Real implementation: add animation keyframes to a rigged GLB model.
+    
+    The input must be a rigged GLB (with skins and joint nodes).
+    
+    Steps:
+    1. Parse the GLB file
+    2. Find the skin and joint nodes
+    3. Fetch the packed keyframe blocks for the clip (clip_cache)
+    4. Create glTF animation channels and samplers
+    5. Write the animated GLB (or, with output="clips", only the clip pack)
+    6. Render the preview sprite sheet / GIF (see animate_model_glb_clips)
+    """
+    result = animate_model_glb_clips(input_path, output_path, [(animation_id, animation_info)], output,
+                                     preview)
+    if not result.get("success"):
+        return result
+    result.pop("animations")
+    result["animation"] = animation_info
+    if "warning" not in result:
+        result["duration"] = animation_info.get("duration", 1.0)
+    return result
+
+
 class AnimationService:
     """
     Animation service — generates real glTF animations with bone keyframes.
@@ -3639,17 +2705,37 @@ class AnimationService:
         self.animations_dir = Path(__file__).parent / "animations"
         self.animations_dir.mkdir(exist_ok=True)
     
+    def start_prewarm(self):
+        """Pack the library clips on a background thread (server startup only)."""
+        if Phase2Config.CLIP_CACHE_PREWARM:
+            threading.Thread(target=self._prewarm_clips, daemon=True).start()
+    
+    def _prewarm_clips(self):
+        """Pack every library clip for the skeletons rig_model_glb produces."""
+        try:
+            t0 = time.time()
+            bone_sets = [[name for name, _, _ in _skeleton_joints(character_type, np.zeros(3), np.ones(3))]
+                         for character_type in ("humanoid", "quadruped")]
+            count = _clip_cache.prewarm(self.ANIMATION_LIBRARY, bone_sets)
+            print(f"🎬 Clip cache ready: {count} clips in {time.time() - t0:.2f}s")
+        except Exception as e:
+            print(f"⚠️ Clip cache prewarm failed: {e}")
+    
     def get_available_animations(self):
         """Get list of available animations"""
         return self.ANIMATION_LIBRARY
     
-    def apply_animation(self, rigged_model_path: str, animation_id: str):
+    def apply_animation(self, rigged_model_path: str, animation_id: str, output: str = "model",
+                        preview: str = None):
         """
         Apply animation to a rigged model by embedding keyframe data into the GLB.
         
         Args:
             rigged_model_path: Path to rigged GLB model (must have skins)
             animation_id: ID of animation to apply
+            output: "model" (animated copy of the model) or "clips" (clip pack
+                GLB with only the animation, played on the rigged model)
+            preview: "sprite", "gif" or "none" (None = config default)
         
         Returns:
             Dict with animated model path
@@ -3662,13 +2748,89 @@ class AnimationService:
         
         try:
             animation_info = self.ANIMATION_LIBRARY[animation_id]
-            output_path = str(OUTPUT_DIR / f"{uuid.uuid4()}_animated.glb")
+            output_path = str(OUTPUT_DIR / f"{uuid.uuid4()}_{'clips' if output == 'clips' else 'animated'}.glb")
+            
+            result = animate_model_glb(rigged_model_path, output_path, animation_id, animation_info, output,
+                                       preview)
             
-            result = animate_model_glb(rigged_model_path, output_path, animation_id, animation_info)
+            if result.get("success"):
+                animated_filename = os.path.basename(result["animated_model_path"])
+                result["animated_model_url"] = f"/outputs/{animated_filename}"
+                if result.get("preview"):
+                    result["preview_url"] = f"/outputs/{os.path.basename(result['preview']['path'])}"
+            
+            return result
+            
+        except Exception as e:
+            traceback.print_exc()
+            return {"success": False, "error": f"Animation failed: {str(e)}"}
+    
+    def resolve_clip(self, spec):
+        """
+        (animation_id, animation_info) for one entry of a multi-clip request:
+        an animation ID, or {"animationId", "duration"?, "loop"?, "name"?}
+        overriding the library settings. Raises ValueError if invalid.
+        """
+        if isinstance(spec, str):
+            spec = {"animationId": spec}
+        if not isinstance(spec, dict):
+            raise ValueError("each animation must be an ID or an object with animationId")
+        animation_id = spec.get("animationId")
+        if animation_id not in self.ANIMATION_LIBRARY:
+            raise ValueError(f"Unknown animation: {animation_id}")
+        
+        animation_info = dict(self.ANIMATION_LIBRARY[animation_id])
+        duration = spec.get("duration")
+        if duration is not None:
+            if isinstance(duration, bool) or not isinstance(duration, (int, float)) or \
+                    not 0 < duration <= 60:
+                raise ValueError(f"Invalid duration for {animation_id}: must be in (0, 60] seconds")
+            animation_info["duration"] = float(duration)
+        loop = spec.get("loop")
+        if loop is not None:
+            if not isinstance(loop, bool):
+                raise ValueError(f"Invalid loop flag for {animation_id}")
+            animation_info["loop"] = loop
+        if spec.get("name"):
+            animation_info["name"] = str(spec["name"])
+        return animation_id, animation_info
+    
+    def apply_animations(self, rigged_model_path: str, clip_specs: list, output: str = "model",
+                         preview: str = None):
+        """
+        Apply several animations to a rigged model in one read / write.
+        
+        Args:
+            rigged_model_path: Path to rigged GLB model (must have skins)
+            clip_specs: animation IDs or {"animationId", "duration", "loop", "name"}
+                objects (see resolve_clip), one glTF animation each
+            output: "model" or "clips" (see apply_animation)
+            preview: "sprite", "gif" or "none" (None = config default)
+        
+        Returns:
+            Dict with animated model path and per-clip summaries
+        """
+        if not clip_specs:
+            return {"success": False, "error": "At least one animation required"}
+        
+        try:
+            clips = [self.resolve_clip(spec) for spec in clip_specs]
+        except ValueError as e:
+            return {"success": False, "error": str(e)}
+        
+        if not os.path.exists(rigged_model_path):
+            return {"success": False, "error": f"Model file not found: {rigged_model_path}"}
+        
+        try:
+            output_path = str(OUTPUT_DIR / f"{uuid.uuid4()}_{'clips' if output == 'clips' else 'animated'}.glb")
+            
+            result = animate_model_glb_clips(rigged_model_path, output_path, clips, output, preview)
             
             if result.get("success"):
-                animated_filename = os.path.basename(output_path)
+                animated_filename = os.path.basename(result["animated_model_path"])
                 result["animated_model_url"] = f"/outputs/{animated_filename}"
+                if result.get("preview"):
+                    result["preview_url"] = f"/outputs/{os.path.basename(result['preview']['path'])}"
             
             return result
             
@@ -3774,7 +2936,6 @@ class ExportService:
             return {"success": False, "error": f"Unsupported format: {format}"}
         
         try:
-            import trimesh
             import shutil
             
             ext = self.SUPPORTED_FORMATS[format]['extension']
@@ -3792,7 +2953,7 @@ class ExportService:
             
             # Trimesh-supported formats: OBJ, STL, 3MF, PLY
             elif format in ("obj", "stl", "3mf", "ply"):
-                mesh = trimesh.load(model_path, force='mesh')
+                mesh = load_trimesh(model_path, force='mesh')
                 mesh.export(output_path, file_type=format)
             
             # Unsupported formats: inform user
@@ -3952,6 +3113,7 @@ def apply_texture():
                 response_data["texturePath"] = f"/outputs/{texture_filename}"
             
             response_data["style"] = style
+            response_data["quantization"] = result.get("quantization")
             
             return jsonify(response_data)
         else:
@@ -3988,7 +3150,11 @@ def apply_rig():
         data = request.get_json()
         model_path = data.get('modelPath')
         character_type = data.get('characterType', 'humanoid')
-        markers = data.get('markers', [])
+        markers = data.get('markers') or []
+        skin_encoding = data.get('skinEncoding')
+        weighting = data.get('weighting')
+        smoothing = data.get('smoothing')
+        preview = data.get('preview')
         
         if not model_path:
             return jsonify({"ok": False, "error": "Model path required"}), 400
@@ -4003,10 +3169,27 @@ def apply_rig():
         if character_type not in ['humanoid', 'quadruped']:
             return jsonify({"ok": False, "error": "Invalid character type"}), 400
         
+        if skin_encoding is not None and skin_encoding not in SKIN_ENCODINGS:
+            return jsonify({"ok": False, "error": f"Invalid skin encoding. Use one of {list(SKIN_ENCODINGS)}"}), 400
+        
+        if not isinstance(markers, list):
+            return jsonify({"ok": False, "error": "markers must be a list"}), 400
+        
+        if weighting is not None and weighting not in WEIGHTING_ENGINES:
+            return jsonify({"ok": False, "error": f"Invalid weighting engine. Use one of {list(WEIGHTING_ENGINES)}"}), 400
+        
+        if smoothing is not None and smoothing not in WEIGHT_SMOOTHING_MODES:
+            return jsonify({"ok": False, "error": f"Invalid smoothing mode. Use one of {list(WEIGHT_SMOOTHING_MODES)}"}), 400
+        
+        if preview is not None and preview not in PREVIEW_MODES:
+            return jsonify({"ok": False, "error": f"Invalid preview. Use one of {list(PREVIEW_MODES)}"}), 400
+        
         job_id = str(uuid.uuid4())
         phase2_jobs[job_id] = {"status": "processing", "type": "rig"}
         
-        result = rigging_service.auto_rig(model_path, character_type, markers)
+        result = rigging_service.auto_rig(model_path, character_type, markers,
+                                          skin_encoding=skin_encoding, weighting=weighting,
+                                          smoothing=smoothing, preview=preview)
         
         if result.get("success"):
             phase2_jobs[job_id]["status"] = "completed"
@@ -4036,17 +3219,73 @@ def apply_animation():
         data = request.get_json()
         model_path = data.get('modelPath')
         animation_id = data.get('animationId')
+        output = data.get('output', 'model')
+        preview = data.get('preview')
         
         if not model_path or not animation_id:
             return jsonify({"ok": False, "error": "Model path and animation ID required"}), 400
         
+        if output not in ANIMATION_OUTPUTS:
+            return jsonify({"ok": False, "error": f"Invalid output. Use one of {list(ANIMATION_OUTPUTS)}"}), 400
+        
+        if preview is not None and preview not in PREVIEW_MODES:
+            return jsonify({"ok": False, "error": f"Invalid preview. Use one of {list(PREVIEW_MODES)}"}), 400
+        
+        # Resolve model path - handle URLs, relative paths, etc.
+        model_path = resolve_model_path(model_path)
+        
+        job_id = str(uuid.uuid4())
+        phase2_jobs[job_id] = {"status": "processing", "type": "animate"}
+        
+        result = animation_service.apply_animation(model_path, animation_id, output, preview)
+        
+        if result.get("success"):
+            phase2_jobs[job_id]["status"] = "completed"
+            return jsonify({"ok": True, "jobId": job_id, **result})
+        else:
+            phase2_jobs[job_id]["status"] = "failed"
+            return jsonify({"ok": False, **result}), 500
+            
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify({"ok": False, "error": str(e)}), 500
+
+
+@phase2_bp.route('/animate-batch', methods=['POST'])
+def apply_animations():
+    """Apply several animations to a rigged model, written as one GLB"""
+    try:
+        data = request.get_json()
+        model_path = data.get('modelPath')
+        animations = data.get('animations')
+        output = data.get('output', 'model')
+        preview = data.get('preview')
+        
+        if not model_path or not animations:
+            return jsonify({"ok": False, "error": "Model path and animations required"}), 400
+        
+        if not isinstance(animations, list):
+            return jsonify({"ok": False, "error": "animations must be a list"}), 400
+        
+        try:
+            for spec in animations:
+                animation_service.resolve_clip(spec)
+        except ValueError as e:
+            return jsonify({"ok": False, "error": str(e)}), 400
+        
+        if output not in ANIMATION_OUTPUTS:
+            return jsonify({"ok": False, "error": f"Invalid output. Use one of {list(ANIMATION_OUTPUTS)}"}), 400
+        
+        if preview is not None and preview not in PREVIEW_MODES:
+            return jsonify({"ok": False, "error": f"Invalid preview. Use one of {list(PREVIEW_MODES)}"}), 400
+        
         # Resolve model path - handle URLs, relative paths, etc.
         model_path = resolve_model_path(model_path)
         
         job_id = str(uuid.uuid4())
         phase2_jobs[job_id] = {"status": "processing", "type": "animate"}
         
-        result = animation_service.apply_animation(model_path, animation_id)
+        result = animation_service.apply_animations(model_path, animations, output, preview)
         
         if result.get("success"):
             phase2_jobs[job_id]["status"] = "completed"
@@ -4160,4 +3399,5 @@ def get_phase2_job(job_id):
 def register_phase2(app):
     """Register Phase 2 blueprint with main Flask app"""
     app.register_blueprint(phase2_bp)
+    animation_service.start_prewarm()
     print("✅ Phase 2 API routes registered")
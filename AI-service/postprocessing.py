@@ -17,11 +17,12 @@ from pathlib import Path
 import trimesh
 import trimesh.transformations
 from config import ProcessingConfig as cfg
+from mesh_quantization import load_trimesh
 
 
 def load_mesh(path: str) -> trimesh.Trimesh:
     """Load mesh from file"""
-    return trimesh.load(path, force='mesh')
+    return load_trimesh(path, force='mesh')
 
 
 def remove_disconnected_components(mesh: trimesh.Trimesh, keep_largest: bool = True) -> trimesh.Trimesh:
@@ -789,7 +790,7 @@ def render_mesh_thumbnail(mesh_path: str, output_image_path: str, resolution: tu
     print(f"  📸 Rendering 3D thumbnail...")
     
     try:
-        mesh = trimesh.load(mesh_path, force='mesh')
+        mesh = load_trimesh(mesh_path, force='mesh')
     except Exception as e:
         print(f"    ⚠️ Could not load mesh for thumbnail: {e}")
         return None
@@ -11,6 +11,8 @@ import traceback
 from pathlib import Path
 import numpy as np
 
+from mesh_quantization import maybe_quantize_glb, load_trimesh
+
 try:
     import trimesh
     TRIMESH_AVAILABLE = True
@@ -72,7 +74,7 @@ class RemeshService:
             print(f"🔄 Remeshing model to {topology} topology...")
             
             # Load mesh
-            mesh = trimesh.load(model_path)
+            mesh = load_trimesh(model_path)
             
             # Handle scene vs mesh
             if isinstance(mesh, trimesh.Scene):
@@ -109,6 +111,7 @@ class RemeshService:
             
             # Export
             result_mesh.export(str(output_path), file_type="glb")
+            quantization = maybe_quantize_glb(output_path)
             
             new_faces = len(result_mesh.faces)
             new_vertices = len(result_mesh.vertices)
@@ -127,7 +130,8 @@ class RemeshService:
                 "new_stats": {
                     "vertices": new_vertices,
                     "faces": new_faces
-                }
+                },
+                "quantization": quantization
             }
             
         except Exception as e:
@@ -259,7 +263,7 @@ class RemeshService:
             return {"success": False, "error": "trimesh not available"}
         
         try:
-            mesh = trimesh.load(model_path)
+            mesh = load_trimesh(model_path)
             
             if isinstance(mesh, trimesh.Scene):
                 total_vertices = 0
@@ -0,0 +1,141 @@
+"""
+Content-addressed on-disk cache of rigging (skinning) results.
+
+A rig depends only on the mesh geometry, the character type, the markers
+and the weighting settings, so the expensive part of rig_model_glb — joint
+refinement and per-vertex weights — is stored under a hash of exactly
+those inputs. A repeat request for the same model (character type toggled
+back, page reload, ...) skips straight to writing the GLB.
+
+Each entry is one uncompressed .npz holding the refined joints and the
+(N, 4) JOINTS_0 / WEIGHTS_0 arrays for every original vertex, in the same
+order rig_model_glb collects them. Recency is tracked through file mtimes;
+when the directory grows past RigCacheConfig.MAX_MB the least recently used
+entries are evicted.
+
+Configure with AI_SERVICE_RIG_CACHE=true|false and AI_SERVICE_RIG_CACHE_MB.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from pathlib import Path
+
+import numpy as np
+
+
+class RigCacheConfig:
+    """Configuration for the rig result cache"""
+    ENABLED = os.getenv("AI_SERVICE_RIG_CACHE", "true").lower() == "true"
+    DIR = Path(os.getenv("AI_SERVICE_RIG_CACHE_DIR", Path(__file__).parent / "cache" / "rigs"))
+    MAX_MB = int(os.getenv("AI_SERVICE_RIG_CACHE_MB", "512"))
+
+    # Part of every key: bump whenever the weighting pipeline changes its
+    # output, so stale entries are never served
+    VERSION = 2
+
+
+_lock = threading.Lock()
+
+
+def geometry_digest(positions, indices) -> str:
+    """Hash of the raw position / index buffers (also keys in-memory rig sessions)."""
+    h = hashlib.blake2b(digest_size=20)
+    for arr in (positions, indices):
+        arr = np.ascontiguousarray(arr)
+        h.update(f"{arr.dtype.str}{arr.shape}".encode())
+        h.update(arr.tobytes())
+    return h.hexdigest()
+
+
+def rig_key(geometry: str, character_type: str, markers=None, **settings) -> str:
+    """
+    Cache key for one rig: the geometry_digest() of the mesh plus the
+    character type, markers and any result-affecting settings (weighting
+    engine, smoothing mode, tuning knobs).
+    """
+    h = hashlib.blake2b(digest_size=20)
+    h.update(geometry.encode())
+    params = {
+        "version": RigCacheConfig.VERSION,
+        "character_type": character_type,
+        "markers": markers or [],
+        "settings": settings,
+    }
+    h.update(json.dumps(params, sort_keys=True, separators=(",", ":"), default=str).encode())
+    return h.hexdigest()
+
+
+def _entry_path(key: str) -> Path:
+    return RigCacheConfig.DIR / f"{key}.npz"
+
+
+def load(key: str, num_verts: int):
+    """
+    Cached rig for `key`, or None. Returns a dict with "joints" (list of
+    (name, parent, [x, y, z])), "joint_indices" (N, 4) int16 and
+    "joint_weights" (N, 4) float32. Marks the entry as recently used.
+    """
+    if not RigCacheConfig.ENABLED:
+        return None
+    path = _entry_path(key)
+    try:
+        with np.load(path) as data:
+            joints = [tuple(j) for j in json.loads(str(data["joints"]))]
+            joint_indices = data["joint_indices"]
+            joint_weights = data["joint_weights"]
+        if joint_indices.shape != (num_verts, 4) or joint_weights.shape != (num_verts, 4):
+            raise ValueError("vertex count mismatch")
+        os.utime(path)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"   ⚠️ Discarding unreadable rig cache entry {path.name}: {e}")
+        path.unlink(missing_ok=True)
+        return None
+    return {"joints": joints, "joint_indices": joint_indices, "joint_weights": joint_weights}
+
+
+def store(key: str, joints, joint_indices, joint_weights) -> bool:
+    """Write one entry atomically, then evict down to the size limit."""
+    if not RigCacheConfig.ENABLED:
+        return False
+    try:
+        RigCacheConfig.DIR.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(suffix=".npz.tmp", dir=RigCacheConfig.DIR)
+        with os.fdopen(fd, "wb") as f:
+            np.savez(f, joints=np.array(json.dumps([list(j) for j in joints])),
+                     joint_indices=np.asarray(joint_indices, dtype=np.int16),
+                     joint_weights=np.asarray(joint_weights, dtype=np.float32))
+        os.replace(tmp, _entry_path(key))
+    except OSError as e:
+        print(f"   ⚠️ Rig cache write failed: {e}")
+        return False
+    _evict()
+    return True
+
+
+def _evict():
+    limit = RigCacheConfig.MAX_MB << 20
+    with _lock:
+        entries = []
+        for path in RigCacheConfig.DIR.glob("*.npz"):
+            try:
+                st = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries, key=lambda e: e[0]):
+            if total <= limit:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+
+
+def clear():
+    """Remove every cached rig."""
+    with _lock:
+        for path in RigCacheConfig.DIR.glob("*.npz"):
+            path.unlink(missing_ok=True)
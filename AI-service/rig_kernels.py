@@ -0,0 +1,802 @@
+"""
+Numerical kernels for the rigging pipeline.
+
+Kept free of service/Flask imports so they can be benchmarked in isolation
+(see benchmark_rigging.py).
+"""
+import os
+import sys
+import types
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import multiprocessing
+
+import numpy as np
+
+# Optional: CHOLMOD (scikit-sparse) for the heat-weight factorization;
+# SuperLU from scipy is used otherwise
+try:
+    from sksparse.cholmod import cholesky as _cholmod_cholesky
+    CHOLMOD_AVAILABLE = True
+except ImportError:
+    CHOLMOD_AVAILABLE = False
+
+# Column ordering for the SuperLU fallback. MMD_AT_PLUS_A produces the
+# sparsest factors but its ordering step alone can take minutes on
+# scanned meshes (56s vs 0.9s at 90k vertices); COLAMD is never far off
+_SUPERLU_ORDERING = "COLAMD"
+
+# Default ceiling for the temporaries of one distance tile
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+# float32 (J,)-wide temporaries held per vertex row inside a tile:
+# AP (3), t·AB (3), t (1), d (1)
+_TILE_FLOATS_PER_JOINT = 8
+
+# Distances that differ by less than the float32 kernel's rounding noise are
+# ties (mirrored vertices on symmetric meshes). Ties resolve to the lowest
+# index, as np.argmin did on the exact float64 ties of the old broadcast code.
+TIE_RTOL = 1e-5
+# Low mantissa bits dropped from seed-selection keys (2^-17 ≈ TIE_RTOL)
+_TIE_BITS = 6
+
+
+# ── Parallel execution ──
+# Every parallel path splits work into pieces whose results do not depend on
+# how they are scheduled, and reassembles them in a fixed order, so any
+# worker count gives results identical to serial mode.
+
+def resolve_workers(workers) -> int:
+    """Worker count: None / 0 / negative → all cores, otherwise as given."""
+    if workers is None or workers <= 0:
+        return os.cpu_count() or 1
+    return int(workers)
+
+
+def _map_ordered(fn, items, workers: int):
+    """map() over a thread pool (for GIL-releasing NumPy/SciPy calls), in input order."""
+    if workers <= 1:
+        yield from map(fn, items)
+        return
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        yield from pool.map(fn, items)
+
+
+# Process pool for work that holds the GIL (csgraph Dijkstra); kept across
+# calls so workers are spawned once per process, not once per rig. A
+# request for another worker count replaces the current pool; a replaced
+# (or broken) pool is shut down once no caller is still submitting to it.
+#
+# We never fork the (threaded) server itself, and workers must not
+# re-import its entry script either: forkserver/spawn workers normally run
+# the parent's __main__ as __mp_main__ before their first task, which under
+# app.py means torch/diffusers and the SD generator in every worker (on
+# Windows, where spawn is the only option, for every pool). Workers are
+# launched with __main__ hidden, so they import only this module (its
+# tasks never reference __main__); the fork server preloads it, so forked
+# workers start with NumPy/SciPy already imported.
+_process_pool = None
+_process_pool_workers = 0
+_process_pool_users = {}            # pool → callers holding it
+_process_pool_lock = threading.Lock()
+_main_swap_lock = threading.Lock()
+
+
+@contextmanager
+def _entry_module_hidden():
+    """Stand in a bare __main__ (no __file__, no __spec__) while a worker launches."""
+    with _main_swap_lock:
+        main = sys.modules.get("__main__")
+        sys.modules["__main__"] = types.ModuleType("__main__")
+        try:
+            yield
+        finally:
+            sys.modules["__main__"] = main
+
+
+# forkserver where available, spawn on Windows
+_POOL_START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+_PoolBaseContext = type(multiprocessing.get_context(_POOL_START_METHOD))
+
+
+class _WorkerProcess(_PoolBaseContext.Process):
+    @staticmethod
+    def _Popen(process_obj):
+        # Launching pickles the parent's preparation data, which names the
+        # entry script for the child to re-run unless it is hidden
+        with _entry_module_hidden():
+            return _PoolBaseContext.Process._Popen(process_obj)
+
+
+class _WorkerContext(_PoolBaseContext):
+    Process = _WorkerProcess
+
+
+def _pool_context():
+    ctx = _WorkerContext()
+    if _POOL_START_METHOD == "forkserver":
+        ctx.set_forkserver_preload(["rig_kernels"])  # no effect once the server runs
+    return ctx
+
+
+def _retire_pool(pool):
+    """Shut `pool` down if it is no longer current and unused (lock held)."""
+    if pool is not _process_pool and not _process_pool_users.get(pool):
+        _process_pool_users.pop(pool, None)
+        pool.shutdown(wait=False)
+
+
+@contextmanager
+def _process_pool_for(workers: int):
+    global _process_pool, _process_pool_workers
+    with _process_pool_lock:
+        if _process_pool is None or _process_pool_workers != workers:
+            previous = _process_pool
+            _process_pool = ProcessPoolExecutor(max_workers=workers, mp_context=_pool_context())
+            _process_pool_workers = workers
+            if previous is not None:
+                _retire_pool(previous)
+        pool = _process_pool
+        _process_pool_users[pool] = _process_pool_users.get(pool, 0) + 1
+    try:
+        yield pool
+    finally:
+        with _process_pool_lock:
+            _process_pool_users[pool] -= 1
+            _retire_pool(pool)
+
+
+def _drop_process_pool(pool):
+    """Stop handing out `pool` (a worker died); it is shut down by its last user."""
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is pool:
+            _process_pool = None
+
+
+def _dijkstra_rows(graph, seeds, limit):
+    from scipy.sparse.csgraph import dijkstra
+
+    out = np.empty((len(seeds), graph.shape[0]), dtype=np.float64)
+    for row, row_seeds in enumerate(seeds):
+        out[row] = dijkstra(graph, directed=False, indices=row_seeds, min_only=True, limit=limit)
+    return out
+
+
+def multi_source_dijkstra(graph, seeds, limit=np.inf, workers: int = 1):
+    """
+    Distance from every vertex to the nearest seed of each row of `seeds`
+    (J, k) → (J, N) float64, one min_only Dijkstra per row.
+
+    SciPy's Dijkstra holds the GIL, so with workers > 1 the rows are split
+    into contiguous groups run in a process pool and concatenated in order.
+    """
+    seeds = np.asarray(seeds)
+    if workers <= 1 or len(seeds) <= 1:
+        return _dijkstra_rows(graph, seeds, limit)
+
+    groups = np.array_split(np.arange(len(seeds)), min(workers, len(seeds)))
+    with _process_pool_for(workers) as pool:
+        try:
+            futures = [pool.submit(_dijkstra_rows, graph, seeds[g], limit) for g in groups]
+            return np.concatenate([f.result() for f in futures])
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM-killed): drop the pool, finish serially
+            _drop_process_pool(pool)
+        except RuntimeError:
+            # Pool shut down under us (e.g. interpreter exit): finish serially
+            pass
+    return _dijkstra_rows(graph, seeds, limit)
+
+
+def _tile_rows(num_segments: int, max_bytes: int) -> int:
+    return max(1, int(max_bytes // (max(num_segments, 1) * 4 * _TILE_FLOATS_PER_JOINT)))
+
+
+def _tile_dist_sq(Pb, A, AB, ab_sq):
+    """Squared point-to-segment distances for one (B, 3) tile → (B, J) float32."""
+    AP = Pb[:, None, :] - A[None, :, :]                  # (B, J, 3)
+    t = np.einsum('bjc,jc->bj', AP, AB) / ab_sq          # projection onto the bone line
+    np.clip(t, 0.0, 1.0, out=t)                          # clamp to the segment
+    AP -= t[:, :, None] * AB[None, :, :]                 # → vector from closest point
+    return np.einsum('bjc,bjc->bj', AP, AP)
+
+
+def _prepare(points, seg_a, seg_b, origin=None):
+    # Work relative to the skeleton centre so float32 keeps precision far
+    # from the origin
+    seg_a = np.asarray(seg_a, dtype=np.float64)
+    seg_b = np.asarray(seg_b, dtype=np.float64)
+    if origin is None:
+        origin = seg_a.mean(axis=0) if len(seg_a) else np.zeros(3)
+    A = (seg_a - origin).astype(np.float32)
+    AB = (seg_b - seg_a).astype(np.float32)
+    ab_sq = np.maximum((AB * AB).sum(axis=1), np.float32(1e-12))
+    return np.asarray(points).reshape(-1, 3), origin, A, AB, ab_sq
+
+
+def point_segment_dist_sq(points, seg_a, seg_b, max_bytes: int = DEFAULT_MAX_BYTES,
+                          workers: int = 1):
+    """
+    Squared distance from every point to every segment [seg_a[j], seg_b[j]].
+
+    Points are processed in tiles so the (B, J, 3) temporaries never exceed
+    `max_bytes`; only the (N, J) float32 result is allocated at full size.
+    With workers > 1, tiles run on a thread pool (up to `workers` tiles live
+    at once).
+    """
+    P, origin, A, AB, ab_sq = _prepare(points, seg_a, seg_b)
+    out = np.empty((len(P), len(A)), dtype=np.float32)
+    rows = _tile_rows(len(A), max_bytes)
+
+    def tile(start):
+        Pb = (P[start:start + rows] - origin).astype(np.float32)
+        out[start:start + rows] = _tile_dist_sq(Pb, A, AB, ab_sq)
+
+    for _ in _map_ordered(tile, range(0, len(P), rows), workers):
+        pass
+    return out
+
+
+def nearest_points_per_segment(points, seg_a, seg_b, k: int,
+                               max_bytes: int = DEFAULT_MAX_BYTES, workers: int = 1):
+    """
+    Indices of the k points closest to each segment, as a (J, k) int64 array
+    (fewer columns if there are fewer than k points).
+
+    Streams over tiles keeping a running (k, J) candidate set, so no (N, J)
+    array is ever allocated. With workers > 1 the per-tile top-k runs on a
+    thread pool; candidates are still merged in tile order.
+
+    Distances are measured relative to the point cloud's centre and ties
+    (within ~TIE_RTOL, so float32 rounding never decides between mirrored
+    points) go to the lowest point index. Each segment's row depends on that
+    segment alone: calling with a subset of segments returns exactly the
+    matching rows of the full call (incremental re-rigging relies on this).
+    """
+    P = np.asarray(points).reshape(-1, 3)
+    origin = (P.min(axis=0) + P.max(axis=0)) / 2 if len(P) else np.zeros(3)
+    P, origin, A, AB, ab_sq = _prepare(P, seg_a, seg_b, origin=origin)
+    num_points, num_segments = len(P), len(A)
+    k = min(k, num_points)
+    if k == 0:
+        return np.empty((num_segments, 0), dtype=np.int64)
+
+    rows = _tile_rows(num_segments, max_bytes)
+
+    def tile_candidates(start):
+        Pb = (P[start:start + rows] - origin).astype(np.float32)
+        d = _tile_dist_sq(Pb, A, AB, ab_sq)              # (B, J), >= 0
+        d += np.float32(0.0)                             # -0.0 → +0.0
+        # Non-negative float32 bits order like the values, so (distance,
+        # index) packs into one int64 sort key with a total order; the
+        # dropped low bits turn rounding-level differences into index ties
+        key = (d.view(np.int32) >> _TIE_BITS).astype(np.int64) << 32
+        key |= np.arange(start, start + len(d), dtype=np.int64)[:, None]
+        if len(key) > k:
+            key = np.take_along_axis(key, np.argpartition(key, k - 1, axis=0)[:k], axis=0)
+        return key
+
+    best = np.empty((0, num_segments), dtype=np.int64)
+    for key in _map_ordered(tile_candidates, range(0, num_points, rows), workers):
+        best = np.concatenate([best, key])
+        if len(best) > k:
+            best = np.take_along_axis(best, np.argpartition(best, k - 1, axis=0)[:k], axis=0)
+
+    best_i = best & 0xFFFFFFFF
+    return np.ascontiguousarray(best_i.T)
+
+
+def argmin_ties_low(dist, rtol: float = TIE_RTOL):
+    """Row-wise argmin of (N, J) `dist`; values within `rtol` of the minimum tie to the lowest column."""
+    dmin = dist.min(axis=1, keepdims=True)
+    return np.argmax(dist <= dmin + np.abs(dmin) * rtol, axis=1)
+
+
+# ── Spatial kNN smoothing ──
+
+def knn_query(P, k_neighbors: int, workers: int = 1):
+    """
+    k nearest neighbours of every point, excluding the point itself (column 0
+    of the KD-tree result). Returns (dists, idx), each (N, k); pass it back to
+    spatial smoothing to reuse the query across calls on the same positions.
+    `workers` is passed to the KD-tree query (SciPy's own threads).
+    """
+    from scipy.spatial import KDTree
+
+    P = np.asarray(P, dtype=np.float64).reshape(-1, 3)
+    k_actual = min(k_neighbors + 1, len(P))
+    dists, idx = KDTree(P).query(P, k=k_actual, workers=workers)
+    dists = np.asarray(dists).reshape(len(P), k_actual)
+    idx = np.asarray(idx).reshape(len(P), k_actual)
+    return dists[:, 1:], idx[:, 1:]
+
+
+def knn_smoothing_operator(dists, idx, num_points: int):
+    """
+    Row-stochastic CSR matrix S (float32) with inverse-distance weights over
+    each point's neighbours, so one smoothing step is a single S @ W.
+    """
+    from scipy.sparse import csr_matrix
+
+    inv_d = np.array(dists, dtype=np.float32)
+    inv_d += np.float32(1e-8)
+    np.reciprocal(inv_d, out=inv_d)
+    totals = inv_d.sum(axis=1, keepdims=True)
+    np.divide(inv_d, totals, out=inv_d, where=totals > 0)
+    k = idx.shape[1]
+    index_dtype = np.int32 if num_points * k < 2**31 else np.int64
+    indptr = np.arange(0, num_points * k + 1, k, dtype=index_dtype)
+    return csr_matrix((inv_d.ravel(), idx.astype(index_dtype).ravel(), indptr),
+                      shape=(num_points, num_points))
+
+
+def knn_smooth(S, W, iterations: int, strength: float, block_columns: int = 8):
+    """
+    W ← (1 - strength)·W + strength·(S @ W), repeated `iterations` times, in
+    float32. Columns are independent under S, so they are smoothed in blocks
+    and only one full (N, J) array is ever held.
+    """
+    W = np.array(W, dtype=np.float32)
+    for start in range(0, W.shape[1], block_columns):
+        block = np.ascontiguousarray(W[:, start:start + block_columns])
+        for _ in range(iterations):
+            SW = S @ block
+            SW *= strength
+            block *= 1.0 - strength
+            block += SW
+        W[:, start:start + block_columns] = block
+    return W
+
+
+# ── Implicit (single-solve) weight smoothing ──
+
+def mesh_edges(tris):
+    """Unique undirected (min, max) edges of a triangle list → (E, 2) int64."""
+    tris = np.asarray(tris, dtype=np.int64).reshape(-1, 3)
+    e = np.concatenate([tris[:, [0, 1]], tris[:, [1, 2]], tris[:, [0, 2]]])
+    e.sort(axis=1)
+    e = e[e[:, 0] != e[:, 1]]
+    # One int64 key per edge: 1-D unique is far cheaper than unique(axis=0)
+    stride = int(e.max()) + 1 if len(e) else 1
+    keys = np.sort(e[:, 0] * stride + e[:, 1])
+    first = np.ones(len(keys), dtype=bool)
+    first[1:] = keys[1:] != keys[:-1]
+    keys = keys[first]
+    return np.stack([keys // stride, keys % stride], axis=1)
+
+
+def smoothing_graph(num_points: int, edges, knn_operator=None, knn_weight: float = 1.0):
+    """
+    Symmetric adjacency (CSR float64) for implicit smoothing: unit weight per
+    undirected edge, plus the symmetrized kNN smoothing operator scaled by
+    knn_weight so disconnected pieces still exchange weight.
+    """
+    from scipy.sparse import coo_matrix
+
+    edges = np.asarray(edges, dtype=np.int64).reshape(-1, 2)
+    rows = np.concatenate([edges[:, 0], edges[:, 1]])
+    cols = np.concatenate([edges[:, 1], edges[:, 0]])
+    A = coo_matrix((np.ones(len(rows)), (rows, cols)), shape=(num_points, num_points)).tocsr()
+    A.data[:] = 1.0  # collapse repeated edges
+    if knn_operator is not None and knn_weight > 0:
+        K = knn_operator.astype(np.float64)
+        A = A + (0.5 * knn_weight) * (K + K.T)
+    return A.tocsr()
+
+
+class ImplicitSmoother:
+    """
+    One backward-Euler diffusion step on a weighted graph:
+        (D + λ·L) W = D·W0,   L = D − A
+    i.e. (I + λ·(I − D⁻¹A)) W = W0 made symmetric. The SPD system is factored
+    once at construction; every call is a pair of triangular solves for all
+    columns of W0 at once. Isolated vertices keep their input rows.
+    """
+
+    def __init__(self, A, lam: float):
+        from scipy.sparse import diags
+
+        degree = np.asarray(A.sum(axis=1)).ravel()
+        self.mass = np.where(degree > 0, degree, 1.0)
+        self.lam = float(lam)
+        M = (diags(self.mass + self.lam * degree) - self.lam * A).tocsc()
+        if CHOLMOD_AVAILABLE:
+            self._solve = _cholmod_cholesky(M)
+            self.solver = "cholmod"
+        else:
+            from scipy.sparse.linalg import splu
+            self._solve = splu(M, permc_spec=_SUPERLU_ORDERING).solve
+            self.solver = "superlu"
+        self.num_points = A.shape[0]
+
+    def __call__(self, W0):
+        W0 = np.asarray(W0, dtype=np.float64)
+        return np.asarray(self._solve(W0 * self.mass[:, None])).reshape(W0.shape)
+
+
+def _edges_over(W, e0, e1, max_delta, block_edges=1 << 16):
+    """Mask of edges whose endpoint weights differ by > max_delta in any column."""
+    bad = np.empty(len(e0), dtype=bool)
+    for start in range(0, len(e0), block_edges):
+        sl = slice(start, start + block_edges)
+        bad[sl] = np.abs(W[e0[sl]] - W[e1[sl]]).max(axis=1) > max_delta
+    return bad
+
+
+def bound_edge_gradient(W, e0, e1, max_delta: float, blend: float = 0.3,
+                        iterations: int = 5):
+    """
+    Pull the endpoints of every edge whose weight vectors differ by more than
+    max_delta (in any column) toward the edge average. Each pass is one
+    vectorized scatter: a vertex on several bad edges moves by the mean of its
+    per-edge pulls. Returns (W, number of edge fixes).
+    """
+    from scipy.sparse import coo_matrix
+
+    W = np.array(W, dtype=np.float64)
+    e0 = np.asarray(e0, dtype=np.int64)
+    e1 = np.asarray(e1, dtype=np.int64)
+    total = 0
+    for _ in range(iterations):
+        bad = _edges_over(W, e0, e1, max_delta)
+        num_bad = int(bad.sum())
+        if not num_bad:
+            break
+        a, b = e0[bad], e1[bad]
+        pull = (0.5 * blend) * (W[b] - W[a])                    # a → avg; b gets −pull
+        ends = np.concatenate([a, b])
+        incidence = coo_matrix(
+            (np.concatenate([np.ones(num_bad), -np.ones(num_bad)]),
+             (ends, np.tile(np.arange(num_bad), 2))),
+            shape=(len(W), num_bad)).tocsr()
+        counts = np.bincount(ends, minlength=len(W))
+        W += (incidence @ pull) / np.maximum(counts, 1)[:, None]
+        total += num_bad
+    return W, total
+
+
+# ── Proxy meshes: decimation + weight transfer stencils ──
+
+def _cluster_keys(P, origin, cell):
+    cells = np.floor((P - origin) / cell).astype(np.int64)
+    dims = cells.max(axis=0) + 1
+    return (cells[:, 0] * dims[1] + cells[:, 1]) * dims[2] + cells[:, 2]
+
+
+def cluster_decimate(P, tris, target_verts: int, max_iterations: int = 4):
+    """
+    Vertex-clustering decimation: snap vertices to a uniform grid and merge
+    each occupied cell into one vertex at the cell's mean position.
+
+    The cell size starts from the surface area (a surface of area A covers
+    about A / h² cells of size h) and is rescaled until the proxy is within
+    10% of `target_verts`. Returns (V, T, cluster) with `cluster` mapping
+    every input vertex to its proxy vertex. Triangles collapsed to an edge or
+    point are dropped; vertices in them survive as isolated proxy vertices.
+    """
+    P = np.asarray(P, dtype=np.float64).reshape(-1, 3)
+    tris = np.asarray(tris, dtype=np.int64).reshape(-1, 3)
+    origin = P.min(axis=0)
+    extent = float((P.max(axis=0) - origin).max()) or 1.0
+
+    area = 0.5 * np.linalg.norm(np.cross(P[tris[:, 1]] - P[tris[:, 0]],
+                                         P[tris[:, 2]] - P[tris[:, 0]]), axis=1).sum()
+    cell = np.sqrt(area / max(target_verts, 1)) if area > 0 else extent / np.cbrt(max(target_verts, 1))
+    cell = max(cell, extent / (1 << 20))
+    for _ in range(max_iterations):
+        _, cluster = np.unique(_cluster_keys(P, origin, cell), return_inverse=True)
+        count = int(cluster.max()) + 1
+        if abs(count - target_verts) <= 0.1 * target_verts:
+            break
+        cell = max(cell * np.sqrt(count / target_verts), extent / (1 << 20))
+    cluster = cluster.ravel()
+
+    num = int(cluster.max()) + 1
+    counts = np.bincount(cluster, minlength=num).astype(np.float64)
+    V = np.stack([np.bincount(cluster, weights=P[:, c], minlength=num) for c in range(3)], axis=1)
+    V /= counts[:, None]
+
+    T = cluster[tris]
+    T = T[(T[:, 0] != T[:, 1]) & (T[:, 1] != T[:, 2]) & (T[:, 0] != T[:, 2])]
+    if len(T):
+        key = np.sort(T, axis=1)
+        key = (key[:, 0] * num + key[:, 1]) * num + key[:, 2]
+        _, first = np.unique(key, return_index=True)
+        T = T[np.sort(first)]
+    return V, T, cluster
+
+
+def _closest_point_barycentric(p, a, b, c):
+    """
+    Barycentric coordinates (M, 3) of the closest point on triangle (a, b, c)
+    to p, all (M, 3) — Ericson, Real-Time Collision Detection §5.1.5,
+    vectorized over the seven Voronoi regions.
+    """
+    ab, ac = b - a, c - a
+    ap, bp, cp = p - a, p - b, p - c
+    d1 = np.einsum('ij,ij->i', ab, ap)
+    d2 = np.einsum('ij,ij->i', ac, ap)
+    d3 = np.einsum('ij,ij->i', ab, bp)
+    d4 = np.einsum('ij,ij->i', ac, bp)
+    d5 = np.einsum('ij,ij->i', ab, cp)
+    d6 = np.einsum('ij,ij->i', ac, cp)
+    va = d3 * d6 - d5 * d4
+    vb = d5 * d2 - d1 * d6
+    vc = d1 * d4 - d3 * d2
+
+    tiny = np.finfo(p.dtype).tiny
+
+    def safe(x):
+        return np.where(np.abs(x) > tiny, x, tiny)
+
+    # Interior (default), then overwrite edge and vertex regions in order
+    bary = np.empty((len(p), 3), dtype=p.dtype)
+    denom = safe(va + vb + vc)
+    bary[:, 1] = vb / denom
+    bary[:, 2] = vc / denom
+    bary[:, 0] = 1.0 - bary[:, 1] - bary[:, 2]
+
+    m = (vc <= 0) & (d1 >= 0) & (d3 <= 0)                       # edge AB
+    t = d1[m] / safe(d1[m] - d3[m])
+    bary[m] = np.stack([1 - t, t, np.zeros_like(t)], axis=1)
+    m = (vb <= 0) & (d2 >= 0) & (d6 <= 0)                       # edge AC
+    t = d2[m] / safe(d2[m] - d6[m])
+    bary[m] = np.stack([1 - t, np.zeros_like(t), t], axis=1)
+    e43, e56 = d4 - d3, d5 - d6
+    m = (va <= 0) & (e43 >= 0) & (e56 >= 0)                     # edge BC
+    t = e43[m] / safe(e43[m] + e56[m])
+    bary[m] = np.stack([np.zeros_like(t), 1 - t, t], axis=1)
+    bary[(d1 <= 0) & (d2 <= 0)] = (1.0, 0.0, 0.0)               # vertex A
+    bary[(d3 >= 0) & (d4 <= d3)] = (0.0, 1.0, 0.0)              # vertex B
+    bary[(d6 >= 0) & (d5 <= d6)] = (0.0, 0.0, 1.0)              # vertex C
+    return bary
+
+
+def proxy_stencils(points, V, T, ring_vertices: int = 1, k_fallback: int = 4,
+                   block_points: int = 1 << 16, workers: int = 1):
+    """
+    Interpolation stencils from a proxy mesh (V, T) to `points`.
+
+    Each point is projected onto the closest of the triangles incident to its
+    `ring_vertices` nearest proxy vertices (the nearest vertex's star is
+    enough on the fairly regular meshes decimation produces) and takes that
+    triangle's barycentric coordinates. Points whose neighbourhood has no
+    triangle (isolated proxy vertices) fall back to inverse-distance weights
+    over the `k_fallback` nearest proxy vertices. Returns (idx, coef, num_fallback): (M, s) proxy vertex indices
+    and coefficients (rows sum to 1), s = max(3, k_fallback).
+    """
+    from scipy.spatial import KDTree
+
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+    V = np.asarray(V, dtype=np.float64).reshape(-1, 3)
+    T = np.asarray(T, dtype=np.int64).reshape(-1, 3)
+    k = max(1, min(k_fallback, len(V)))
+    ring = max(1, min(ring_vertices, len(V)))
+    width = max(3, k)
+
+    # Vertex → incident triangles (CSR)
+    tri_of = np.argsort(T.ravel(), kind="stable") // 3
+    indptr = np.zeros(len(V) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(T.ravel(), minlength=len(V)), out=indptr[1:])
+
+    tree = KDTree(V)
+    # Candidate geometry in float32: half the memory traffic of the
+    # per-candidate projection, ample precision for weight interpolation
+    corners = [V[T[:, i]].astype(np.float32) for i in range(3)]
+
+    def block(start):
+        pts = points[start:start + block_points]
+        m = len(pts)
+        _, nbrs = tree.query(pts, k=ring)
+        nbrs = np.asarray(nbrs).reshape(m, ring)
+        b_idx = np.zeros((m, width), dtype=np.int64)
+        b_coef = np.zeros((m, width), dtype=np.float64)
+
+        # (point, incident triangle) candidates, contiguous per point
+        flat = nbrs.ravel()
+        lens = indptr[flat + 1] - indptr[flat]
+        total = int(lens.sum())
+        cand_pt = np.repeat(np.repeat(np.arange(m), ring), lens)
+        cand_tri = tri_of[np.repeat(indptr[flat] - np.cumsum(lens) + lens, lens) + np.arange(total)]
+
+        has_tri = np.zeros(m, dtype=bool)
+        if total:
+            a, b, c = (corner[cand_tri] for corner in corners)
+            p = pts.astype(np.float32)[cand_pt]
+            bary = _closest_point_barycentric(p, a, b, c)
+            a *= bary[:, :1]
+            a += bary[:, 1:2] * b
+            a += bary[:, 2:3] * c                           # a ← closest point
+            p -= a
+            d_sq = np.einsum('ij,ij->i', p, p)
+
+            # Per-point argmin over its contiguous candidate run
+            run_start = np.flatnonzero(np.r_[True, cand_pt[1:] != cand_pt[:-1]])
+            rows = cand_pt[run_start]
+            run_min = np.minimum.reduceat(d_sq, run_start)
+            hits = np.flatnonzero(d_sq <= np.repeat(run_min, np.diff(np.r_[run_start, total])))
+            first = hits[np.r_[True, cand_pt[hits][1:] != cand_pt[hits][:-1]]]
+            has_tri[rows] = True
+            b_idx[rows, :3] = T[cand_tri[first]]
+            b_coef[rows, :3] = bary[first]
+
+        lost = np.flatnonzero(~has_tri)
+        if len(lost):
+            l_dists, l_nbrs = tree.query(pts[lost], k=k)
+            inv_d = 1.0 / (np.asarray(l_dists).reshape(-1, k) + 1e-12)
+            b_idx[lost, :k] = np.asarray(l_nbrs).reshape(-1, k)
+            b_coef[lost, :k] = inv_d / inv_d.sum(axis=1, keepdims=True)
+        return b_idx, b_coef, len(lost)
+
+    parts = list(_map_ordered(block, range(0, len(points), block_points), workers))
+    if not parts:
+        return (np.zeros((0, width), dtype=np.int64), np.zeros((0, width)), 0)
+    idx = np.concatenate([part[0] for part in parts])
+    coef = np.concatenate([part[1] for part in parts])
+    return idx, coef, sum(part[2] for part in parts)
+
+
+# ── Template bodies: capsule unions as closed surfaces ──
+
+def _voxel_boundary(occupied):
+    """
+    Boundary faces of an occupancy grid (cuberille surface): one quad per
+    occupied/empty face pair, split into two outward-wound triangles.
+    Returns (V, T) with V in grid-corner coordinates.
+    """
+    occ = np.pad(np.asarray(occupied, dtype=bool), 1)
+    corner_shape = np.array(occ.shape) + 1
+    tris = []
+    for axis in range(3):
+        b, c = (axis + 1) % 3, (axis + 2) % 3
+        lo = [slice(None)] * 3
+        hi = [slice(None)] * 3
+        lo[axis], hi[axis] = slice(None, -1), slice(1, None)
+        a_in, b_in = occ[tuple(lo)], occ[tuple(hi)]
+        for outward, mask in ((1, a_in & ~b_in), (-1, ~a_in & b_in)):
+            cell = np.argwhere(mask)                       # face at cell[axis] + 1
+            if not len(cell):
+                continue
+            cell[:, axis] += 1
+            quad = np.repeat(cell[:, None, :], 4, axis=1)  # corners (0,0) (1,0) (1,1) (0,1)
+            quad[:, 1, b] += 1
+            quad[:, 2, b] += 1
+            quad[:, 2, c] += 1
+            quad[:, 3, c] += 1
+            q = np.ravel_multi_index(tuple(quad.reshape(-1, 3).T), corner_shape).reshape(-1, 4)
+            # e_b × e_c = e_axis: counter-clockwise in (b, c) faces +axis
+            order = [[0, 1, 2], [0, 2, 3]] if outward > 0 else [[0, 2, 1], [0, 3, 2]]
+            tris.append(q[:, order].reshape(-1, 3))
+    if not tris:
+        return np.empty((0, 3)), np.empty((0, 3), dtype=np.int64)
+    T = np.concatenate(tris)
+    used, T = np.unique(T, return_inverse=True)
+    V = np.stack(np.unravel_index(used, corner_shape), axis=1).astype(np.float64) - 1.0
+    return V, T.reshape(-1, 3)
+
+
+def capsule_union_surface(seg_a, seg_b, radii, resolution: int = 96,
+                          smoothing_iterations: int = 10, block_cells: int = 1 << 18):
+    """
+    Closed triangle surface of the union of capsules (segment j swollen by
+    radii[j]; radius <= 0 skips the segment). The union is voxelized with
+    `resolution` cells along its longest side, the voxel boundary extracted
+    and Taubin-smoothed (λ/μ passes, no shrinkage) to remove the stair steps.
+    Returns (V (M, 3) float64, T (F, 3) int64).
+    """
+    seg_a = np.asarray(seg_a, dtype=np.float64)
+    seg_b = np.asarray(seg_b, dtype=np.float64)
+    radii = np.asarray(radii, dtype=np.float64)
+    keep = radii > 0
+    seg_a, seg_b, radii = seg_a[keep], seg_b[keep], radii[keep]
+
+    lo = np.minimum(seg_a, seg_b) - radii[:, None]
+    hi = np.maximum(seg_a, seg_b) + radii[:, None]
+    lo, hi = lo.min(axis=0), hi.max(axis=0)
+    pitch = float((hi - lo).max()) / resolution
+    dims = np.ceil((hi - lo) / pitch).astype(np.int64) + 1
+    r_sq = (radii * radii).astype(np.float32)
+    occupied = np.empty(int(np.prod(dims)), dtype=bool)
+    for start in range(0, len(occupied), block_cells):
+        cells = np.arange(start, min(start + block_cells, len(occupied)))
+        centres = lo + (np.stack(np.unravel_index(cells, dims), axis=1) + 0.5) * pitch
+        occupied[cells] = (point_segment_dist_sq(centres, seg_a, seg_b) <= r_sq).any(axis=1)
+
+    V, T = _voxel_boundary(occupied.reshape(dims))
+    V = lo + V * pitch
+    if smoothing_iterations and len(T):
+        from scipy.sparse import diags
+
+        A = smoothing_graph(len(V), mesh_edges(T))
+        M = diags(1.0 / np.maximum(np.asarray(A.sum(axis=1)).ravel(), 1.0)) @ A
+        for _ in range(smoothing_iterations):
+            for step in (0.5, -0.53):
+                V = V + step * (M @ V - V)
+    return V, T
+
+
+# ── Heat-diffusion skinning weights (Baran & Popović, "Pinocchio") ──
+
+def cotangent_laplacian(P, tris, max_cot: float = 1e4):
+    """
+    Cotangent stiffness matrix K (N x N, positive semi-definite) and lumped
+    (barycentric) vertex areas for a triangle mesh.
+
+    Cotangents are clamped to [0, max_cot]: obtuse angles and degenerate
+    triangles in generated meshes would otherwise break the maximum principle
+    (weights outside [0, 1]) or blow up the system.
+    """
+    from scipy.sparse import coo_matrix
+
+    P = np.asarray(P, dtype=np.float64).reshape(-1, 3)
+    tris = np.asarray(tris, dtype=np.int64).reshape(-1, 3)
+    n = len(P)
+
+    rows, cols, vals = [], [], []
+    for k in range(3):
+        i, j, o = tris[:, (k + 1) % 3], tris[:, (k + 2) % 3], tris[:, k]
+        u = P[i] - P[o]
+        v = P[j] - P[o]
+        cross = np.linalg.norm(np.cross(u, v), axis=1)
+        cot = np.einsum('ij,ij->i', u, v) / np.maximum(cross, 1e-20)
+        w = 0.5 * np.clip(cot, 0.0, max_cot)            # weight of edge (i, j)
+        rows += [i, j]
+        cols += [j, i]
+        vals += [-w, -w]
+
+    rows = np.concatenate(rows)
+    cols = np.concatenate(cols)
+    vals = np.concatenate(vals)
+    off = coo_matrix((vals, (rows, cols)), shape=(n, n)).tocsr()
+    diag = -np.asarray(off.sum(axis=1)).ravel()
+    K = off + coo_matrix((diag, (np.arange(n), np.arange(n))), shape=(n, n)).tocsr()
+
+    area = 0.5 * np.linalg.norm(np.cross(P[tris[:, 1]] - P[tris[:, 0]],
+                                         P[tris[:, 2]] - P[tris[:, 0]]), axis=1)
+    mass = np.bincount(tris.ravel(), weights=np.repeat(area / 3.0, 3), minlength=n)
+    return K, mass
+
+
+def heat_weights(P, tris, seg_a, seg_b, heat: float = 1.0, tie_tolerance: float = 1e-4,
+                 max_bytes: int = DEFAULT_MAX_BYTES, workers: int = 1):
+    """
+    Solve (K + M H) W = M H B for all bones with ONE sparse factorization.
+
+    H_ii = heat / d_i² with d_i the distance to the nearest bone segment, and
+    B[i, j] = 1 if bone j is (within tie_tolerance of) the nearest bone.
+    Returns the (N, J) float64 weight matrix, clipped to >= 0 and
+    row-normalized, and the solver name.
+    """
+    from scipy.sparse import diags
+
+    P = np.asarray(P, dtype=np.float64).reshape(-1, 3)
+    num_verts, num_bones = len(P), len(seg_a)
+
+    K, mass = cotangent_laplacian(P, tris)
+    # Vertices touching no (non-degenerate) triangle would make rows singular
+    mass = np.maximum(mass, 1e-8 * max(float(mass.mean()), 1e-20))
+
+    d_sq = point_segment_dist_sq(P, seg_a, seg_b, max_bytes=max_bytes, workers=workers)  # (N, J) f32
+    nearest = d_sq.min(axis=1)
+    B = (d_sq <= nearest[:, None] * (1.0 + tie_tolerance) + 1e-12).astype(np.float64)
+    B /= B.sum(axis=1, keepdims=True)
+    H = heat / np.maximum(nearest.astype(np.float64), 1e-12)
+    MH = mass * H
+
+    A = (K + diags(MH)).tocsc()
+    rhs = B * MH[:, None]
+    if CHOLMOD_AVAILABLE:
+        W = _cholmod_cholesky(A)(rhs)
+        solver = "cholmod"
+    else:
+        from scipy.sparse.linalg import splu
+        W = splu(A, permc_spec=_SUPERLU_ORDERING).solve(rhs)
+        solver = "superlu"
+
+    W = np.maximum(np.asarray(W).reshape(num_verts, num_bones), 0.0)
+    totals = W.sum(axis=1, keepdims=True)
+    W = np.where(totals > 1e-12, W / np.maximum(totals, 1e-12), B)
+    return W, solver
@@ -0,0 +1,102 @@
+"""
+On-disk store of pre-weighted template bodies for template rigging.
+
+weighting="template" fits a stored, already skinned template of the
+character type to the target mesh and copies its weights by closest-point
+lookups instead of weighting the target itself. A template is one .npz per
+character type holding the template surface (positions, triangle indices),
+its skeleton (joints as JSON (name, parent, [x, y, z]) triples, same bone
+names and order as the procedural skeletons) and per-vertex (M, 4)
+JOINTS_0 / WEIGHTS_0.
+
+phase2_service builds a procedural capsule-body template on first use and
+stores it here. Dropping a hand-weighted <character_type>.npz with the same
+fields into the directory replaces it.
+
+Configure with AI_SERVICE_RIG_TEMPLATE_DIR.
+"""
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+
+class RigTemplateConfig:
+    """Configuration for the rig template store"""
+    DIR = Path(os.getenv("AI_SERVICE_RIG_TEMPLATE_DIR", Path(__file__).parent / "cache" / "templates"))
+
+    # Stored with every generated template: bump whenever the procedural
+    # template changes, so stale generated files are rebuilt
+    VERSION = 1
+
+
+_FIELDS = ("positions", "indices", "joints", "joint_indices", "joint_weights")
+
+
+def _template_path(character_type: str) -> Path:
+    return RigTemplateConfig.DIR / f"{character_type}.npz"
+
+
+def load(character_type: str):
+    """
+    Stored template for `character_type`, or None. Returns a dict with
+    "positions" (M, 3) float64, "indices" (F, 3) int64, "joints" (list of
+    (name, parent, [x, y, z])), "joint_indices" (M, 4) int16,
+    "joint_weights" (M, 4) float32, "version" (None for hand-made files)
+    and "digest" (hash of the arrays, for rig cache keys).
+    """
+    path = _template_path(character_type)
+    try:
+        with np.load(path) as data:
+            missing = [f for f in _FIELDS if f not in data]
+            if missing:
+                raise ValueError(f"missing {missing}")
+            template = {f: data[f] for f in _FIELDS}
+            version = int(data["version"]) if "version" in data else None
+        template["positions"] = template["positions"].astype(np.float64).reshape(-1, 3)
+        template["indices"] = template["indices"].astype(np.int64).reshape(-1, 3)
+        template["joints"] = [tuple(j) for j in json.loads(str(template["joints"]))]
+        num_verts = len(template["positions"])
+        if template["joint_indices"].shape != (num_verts, 4) or \
+                template["joint_weights"].shape != (num_verts, 4):
+            raise ValueError("vertex count mismatch")
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"   ⚠️ Ignoring unreadable rig template {path.name}: {e}")
+        return None
+
+    template["version"] = version
+    template["digest"] = template_digest(template)
+    return template
+
+
+def template_digest(template) -> str:
+    """Hash of a template's surface, skeleton and weights."""
+    h = hashlib.blake2b(digest_size=20)
+    for f in ("positions", "indices", "joint_indices", "joint_weights"):
+        h.update(np.ascontiguousarray(template[f]).tobytes())
+    h.update(json.dumps([list(j) for j in template["joints"]]).encode())
+    return h.hexdigest()
+
+
+def store(character_type: str, positions, indices, joints, joint_indices, joint_weights) -> bool:
+    """Write a generated template atomically (tagged with RigTemplateConfig.VERSION)."""
+    try:
+        RigTemplateConfig.DIR.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(suffix=".npz.tmp", dir=RigTemplateConfig.DIR)
+        with os.fdopen(fd, "wb") as f:
+            np.savez(f, positions=np.asarray(positions, dtype=np.float32),
+                     indices=np.asarray(indices, dtype=np.int32),
+                     joints=np.array(json.dumps([list(j) for j in joints])),
+                     joint_indices=np.asarray(joint_indices, dtype=np.int16),
+                     joint_weights=np.asarray(joint_weights, dtype=np.float32),
+                     version=np.array(RigTemplateConfig.VERSION))
+        os.replace(tmp, _template_path(character_type))
+    except OSError as e:
+        print(f"   ⚠️ Rig template write failed: {e}")
+        return False
+    return True
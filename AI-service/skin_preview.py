@@ -0,0 +1,486 @@
+"""
+CPU preview renderer for rigged / animated GLBs: linear blend skinning plus
+a small z-buffered rasterizer, all in NumPy, cheap enough to run inside the
+rig and animate jobs.
+
+- SkinnedMesh: bind-pose vertices, a dense (V, J) weight matrix built from
+  JOINTS_0 / WEIGHTS_0, triangles and the node hierarchy driving the joints
+- sample_track(): glTF sampler evaluation (STEP, LINEAR with slerp,
+  CUBICSPLINE) at many times in one call
+- pose(): per-frame joint matrices; skinned vertices for a whole batch of
+  frames come from one (V, J) @ (J, 12·F) product, so every frame costs a
+  few array passes instead of a Python loop over vertices
+- render_clip(): a fixed 3/4 orthographic camera fitted to the whole clip,
+  flat Lambert shading, one np.minimum.at z-buffer pass per batch of frames
+- render_preview(): one sprite-sheet row (PNG) per clip, or an animated GIF
+  playing the clips one after another
+
+Tracks are {"node", "path", "interpolation", "times" (K,), "values"}, the
+values (K, C), or (K, 3, C) [inTangent, value, outTangent] for
+CUBICSPLINE: glb_clips() reads them from the animations of a GLB, and
+phase2_service builds them straight from the packed clips.
+"""
+import copy
+import time
+
+import numpy as np
+
+import anim_math as _anim_math
+import rig_kernels as _rig_kernels
+from glb_io import read_accessor, read_indices
+
+PREVIEW_FORMATS = ("sprite", "gif")
+
+
+class SkinPreviewConfig:
+    """Defaults for the skinning preview"""
+    SIZE = 128                      # frame width / height in pixels
+    FRAMES = 24                     # frames per clip
+    YAW_DEG = 30.0                  # camera turned around the up axis (3/4 view)
+    PITCH_DEG = 12.0                # camera looking down at the model
+    MARGIN = 0.06                   # border around the framed clip, fraction of SIZE
+    COLOR = (186, 190, 200)         # clay
+    AMBIENT = 0.3                   # shade of faces turned away from the light
+    GIF_BACKGROUND = (38, 41, 48)   # GIFs have no partial alpha
+    LOD_VERTICES = 16_000           # denser meshes are clustered down first (~1 vertex per
+                                    # pixel of a 128-px frame; None = render every triangle)
+    BATCH_MB = 64                   # working memory per batch of frames
+    FRAMING_VERTICES = 4096         # vertices posed for every frame to fit the camera
+
+
+_LIGHT = np.array([-0.35, -0.6, 0.72]) / np.linalg.norm([-0.35, -0.6, 0.72])   # screen space, y down
+_EMPTY = np.iinfo(np.int64).max
+
+
+def _trs_matrices(translation, rotation, scale):
+    """(F, 3), (F, 4), (F, 3) → (F, 4, 4) local matrices T·R·S."""
+    m = np.zeros(translation.shape[:-1] + (4, 4))
+    m[..., :3, :3] = _anim_math.quat_to_matrix(rotation) * scale[..., None, :]
+    m[..., :3, 3] = translation
+    m[..., 3, 3] = 1.0
+    return m
+
+
+def _node_rest(node):
+    """Rest (translation, rotation, scale) of a node; matrices are decomposed."""
+    if "matrix" in node:
+        m = np.array(node["matrix"], dtype=np.float64).reshape(4, 4).T
+        scale = np.linalg.norm(m[:3, :3], axis=0)
+        r = m[:3, :3] / np.where(scale > 1e-12, scale, 1.0)
+        # Rotation matrix → quaternion (largest-diagonal branch for stability)
+        tr = np.trace(r)
+        if tr > 0:
+            s = np.sqrt(tr + 1.0) * 2
+            q = [(r[2, 1] - r[1, 2]) / s, (r[0, 2] - r[2, 0]) / s, (r[1, 0] - r[0, 1]) / s, s / 4]
+        else:
+            i = int(np.argmax(np.diag(r)))
+            j, k = (i + 1) % 3, (i + 2) % 3
+            s = np.sqrt(1.0 + r[i, i] - r[j, j] - r[k, k]) * 2
+            q = [0.0, 0.0, 0.0, (r[k, j] - r[j, k]) / s]
+            q[i] = s / 4
+            q[j] = (r[j, i] + r[i, j]) / s
+            q[k] = (r[k, i] + r[i, k]) / s
+        return m[:3, 3], np.asarray(q), scale
+    return (np.asarray(node.get("translation", [0.0, 0.0, 0.0]), dtype=np.float64),
+            np.asarray(node.get("rotation", [0.0, 0.0, 0.0, 1.0]), dtype=np.float64),
+            np.asarray(node.get("scale", [1.0, 1.0, 1.0]), dtype=np.float64))
+
+
+class SkinnedMesh:
+    """
+    What posing needs from one skin of a GLB, read once:
+
+    positions (V, 3) float32 bind-pose vertices of every primitive with
+    JOINTS_0 / WEIGHTS_0 (as stored: quantized positions are decoded by
+    the inverse bind matrices, like in any glTF viewer), weights (V, J)
+    float32 with each non-empty row normalized, triangles (T, 3), and the
+    nodes from the scene roots down to the joints in parent-first order.
+    """
+
+    def __init__(self, gltf: dict, bin_data, skin_index: int = 0):
+        skin = gltf["skins"][skin_index]
+        nodes = gltf.get("nodes", [])
+        self.joint_nodes = list(skin["joints"])
+        num_joints = len(self.joint_nodes)
+
+        if skin.get("inverseBindMatrices") is not None:
+            # Column-major storage → row-major matrices
+            self.inverse_bind = read_accessor(gltf, bin_data, skin["inverseBindMatrices"]) \
+                .astype(np.float64).reshape(-1, 4, 4).transpose(0, 2, 1)
+        else:
+            self.inverse_bind = np.tile(np.eye(4), (num_joints, 1, 1))
+
+        pos_chunks, tri_chunks, rows, cols, vals = [], [], [], [], []
+        offset = 0
+        for mesh in gltf.get("meshes", []):
+            for prim in mesh.get("primitives", []):
+                attrs = prim.get("attributes", {})
+                if prim.get("mode", 4) != 4 or \
+                        not all(k in attrs for k in ("POSITION", "JOINTS_0", "WEIGHTS_0")):
+                    continue
+                P = read_accessor(gltf, bin_data, attrs["POSITION"])
+                ji = read_accessor(gltf, bin_data, attrs["JOINTS_0"]).astype(np.int64)
+                jw = read_accessor(gltf, bin_data, attrs["WEIGHTS_0"]).astype(np.float32)
+                tris = read_indices(gltf, bin_data, prim)
+                if tris is None:
+                    tris = np.arange(len(P) - len(P) % 3)
+                pos_chunks.append(P.astype(np.float32))
+                tri_chunks.append(tris.astype(np.int64).reshape(-1, 3) + offset)
+                live = (jw > 0) & (ji < num_joints)
+                v = np.nonzero(live)[0]
+                rows.append(v + offset)
+                cols.append(ji[live])
+                vals.append(jw[live])
+                offset += len(P)
+
+        self.positions = np.concatenate(pos_chunks) if pos_chunks else np.empty((0, 3), np.float32)
+        self.triangles = np.concatenate(tri_chunks) if tri_chunks else np.empty((0, 3), np.int64)
+        self.weights = np.zeros((len(self.positions), num_joints), dtype=np.float32)
+        if rows:
+            np.add.at(self.weights, (np.concatenate(rows), np.concatenate(cols)), np.concatenate(vals))
+        total = self.weights.sum(axis=1, keepdims=True)
+        np.divide(self.weights, total, out=self.weights, where=total > 0)
+
+        # Joints and their ancestors, parents before children
+        parents = {}
+        for idx, node in enumerate(nodes):
+            for child in node.get("children", []):
+                parents[child] = idx
+        self.parents = parents
+        needed = set()
+        for j in self.joint_nodes:
+            while j is not None and j not in needed:
+                needed.add(j)
+                j = parents.get(j)
+
+        def depth(n):
+            d = 0
+            while n in parents:
+                n = parents[n]
+                d += 1
+            return d
+
+        self.order = sorted(needed, key=lambda n: (depth(n), n))
+        self.rest = {n: _node_rest(nodes[n]) for n in self.order}
+
+    def __len__(self):
+        return len(self.positions)
+
+    def decimated(self, target_verts: int):
+        """
+        Render copy with the vertices clustered down to about target_verts
+        (rig_kernels.cluster_decimate); each cluster is skinned with the
+        mean weights of its members. Returns self when already that small.
+        """
+        if not target_verts or len(self) <= target_verts:
+            return self
+        V, T, cluster = _rig_kernels.cluster_decimate(self.positions, self.triangles, target_verts)
+        lod = copy.copy(self)
+        lod.positions = V.astype(np.float32)
+        lod.triangles = T
+        lod.weights = np.zeros((len(V), self.weights.shape[1]), dtype=np.float32)
+        np.add.at(lod.weights, cluster, self.weights)
+        total = lod.weights.sum(axis=1, keepdims=True)
+        np.divide(lod.weights, total, out=lod.weights, where=total > 0)
+        return lod
+
+
+def sample_track(track, times):
+    """Values of one glTF sampler at `times` (F,) → (F, C), following the glTF rules."""
+    key_times = np.asarray(track["times"], dtype=np.float64).ravel()
+    interpolation = track.get("interpolation", "LINEAR")
+    cubic = interpolation == "CUBICSPLINE"
+    values = np.asarray(track["values"], dtype=np.float64).reshape((len(key_times), 3, -1) if cubic
+                                                                   else (len(key_times), -1))
+    points = values[:, 1] if cubic else values
+    rotation = track["path"] == "rotation"
+    t = np.clip(np.asarray(times, dtype=np.float64), key_times[0], key_times[-1])
+
+    if len(key_times) == 1:
+        out = np.broadcast_to(points[0], (len(t), points.shape[1])).copy()
+    elif interpolation == "STEP":
+        out = points[np.clip(np.searchsorted(key_times, t, side="right") - 1, 0, len(key_times) - 1)]
+    else:
+        i = np.clip(np.searchsorted(key_times, t, side="right") - 1, 0, len(key_times) - 2)
+        dt = key_times[i + 1] - key_times[i]
+        s = np.divide(t - key_times[i], dt, out=np.zeros_like(t), where=dt > 0)
+        if cubic:
+            out = _anim_math.hermite(values[i, 1], values[i, 2], values[i + 1, 1], values[i + 1, 0], s, dt)
+        elif rotation:
+            out = _anim_math.slerp(points[i], points[i + 1], s)
+        else:
+            out = points[i] + (points[i + 1] - points[i]) * s[:, None]
+    return _anim_math.quat_normalize(out) if rotation else out
+
+
+def pose(mesh: SkinnedMesh, tracks, times):
+    """(F, J, 4, 4) joint matrices (global joint transform · inverse bind) at `times`."""
+    num_frames = len(times)
+    samples = {}
+    for track in tracks:
+        if track["node"] in mesh.rest and track["path"] in ("translation", "rotation", "scale"):
+            samples.setdefault(track["node"], {})[track["path"]] = sample_track(track, times)
+
+    world = {}
+    for n in mesh.order:
+        t, r, s = mesh.rest[n]
+        animated = samples.get(n, {})
+        local = _trs_matrices(
+            animated.get("translation", np.broadcast_to(t, (num_frames, 3))),
+            animated.get("rotation", np.broadcast_to(r, (num_frames, 4))),
+            animated.get("scale", np.broadcast_to(s, (num_frames, 3))),
+        ) if animated else _trs_matrices(t, r, s)
+        parent = mesh.parents.get(n)
+        world[n] = local if parent is None else world[parent] @ local
+    joints = np.stack([np.broadcast_to(world[j], (num_frames, 4, 4)) for j in mesh.joint_nodes], axis=1)
+    return joints @ mesh.inverse_bind
+
+
+def skin_vertices(weights, positions, joint_matrices):
+    """
+    Linear blend skinning: (F, V, 3) posed vertices from (V, J) weights,
+    (V, 3) bind-pose positions and (F, J, 3 or 4, 4) joint matrices.
+    Blended per-vertex matrices for every frame come from one BLAS product.
+    """
+    num_frames, num_joints = joint_matrices.shape[:2]
+    rows = joint_matrices[:, :, :3, :].astype(np.float32)
+    blended = weights @ rows.transpose(1, 0, 2, 3).reshape(num_joints, num_frames * 12)
+    blended = blended.reshape(len(positions), num_frames, 3, 4)
+    x, y, z = (positions[:, i, None, None] for i in range(3))
+    posed = blended[..., 3] + blended[..., 0] * x + blended[..., 1] * y + blended[..., 2] * z
+    return posed.transpose(1, 0, 2)
+
+
+def camera_rotation(yaw_deg: float = None, pitch_deg: float = None):
+    """(3, 3) world → camera rotation: x right, y up, z toward the viewer."""
+    yaw = np.radians(SkinPreviewConfig.YAW_DEG if yaw_deg is None else yaw_deg)
+    pitch = np.radians(SkinPreviewConfig.PITCH_DEG if pitch_deg is None else pitch_deg)
+    ry = np.array([[np.cos(yaw), 0, -np.sin(yaw)], [0, 1, 0], [np.sin(yaw), 0, np.cos(yaw)]])
+    rx = np.array([[1, 0, 0], [0, np.cos(pitch), -np.sin(pitch)], [0, np.sin(pitch), np.cos(pitch)]])
+    return rx @ ry
+
+
+def rasterize(screen, triangles, size: int):
+    """
+    Flat-shaded z-buffer render of (F, V, 3) screen-space vertices (pixels,
+    y down, z toward the viewer) → (F, size, size) uint8 shade, 0 = empty.
+    Triangles inside one pixel are splatted; larger ones are scan-converted
+    (pixel centres inside, a half-open rule on shared edges). The z-buffer
+    holds (depth, triangle) keys, so only the visible triangles get shaded.
+    Faces are two-sided: the mesh winding doesn't matter.
+    """
+    num_frames = len(screen)
+    x, y, z = (np.ascontiguousarray(screen[..., i]) for i in range(3))
+    corners = [np.ascontiguousarray(triangles[:, i]) for i in range(3)]
+    x0, x1, x2 = (np.take(x, c, axis=1) for c in corners)      # (F, T) each
+    y0, y1, y2 = (np.take(y, c, axis=1) for c in corners)
+
+    x_min = np.minimum(np.minimum(x0, x1), x2)
+    x_max = np.maximum(np.maximum(x0, x1), x2)
+    y_min = np.minimum(np.minimum(y0, y1), y2)
+    y_max = np.maximum(np.maximum(y0, y1), y2)
+    single = (x_max - x_min < 1) & (y_max - y_min < 1)
+
+    z_near = float(z.max())
+    z_scale = np.float32((1 << 30) / max(z_near - float(z.min()), 1e-6))
+    zbuffer = np.full(num_frames * size * size, _EMPTY, dtype=np.int64)
+
+    def depth_keys(depth, t):
+        return ((np.float32(z_near) - depth) * z_scale).astype(np.int64) << 32 | t
+
+    # Sub-pixel triangles: one sample at the centroid, at the depth of their
+    # first corner (dense meshes are mostly these, and their centroids cover
+    # every pixel the surface does). Keys and pixels for the whole (F, T)
+    # block, then one boolean selection of each.
+    third = np.float32(1 / 3)
+    px = np.floor((x0 + x1 + x2) * third).astype(np.int32)
+    py = np.floor((y0 + y1 + y2) * third).astype(np.int32)
+    ok = single & (px >= 0) & (px < size) & (py >= 0) & (py < size)
+    pixel = (np.arange(num_frames, dtype=np.int32)[:, None] * size + py) * size + px
+    keys = depth_keys(np.take(z, corners[0], axis=1), np.arange(len(triangles)))
+    np.minimum.at(zbuffer, pixel[ok], keys[ok])
+    del px, py, ok, pixel, keys
+
+    # Larger triangles: scanlines. Each pixel row whose centre line crosses
+    # the triangle gets the span between its edge crossings, so the work
+    # follows the covered pixels even for long slivers.
+    f, t = np.nonzero(~single & (x_max >= 0) & (x_min < size) & (y_max >= 0) & (y_min < size))
+    X = [x0[f, t], x1[f, t], x2[f, t]]
+    Y = [y0[f, t], y1[f, t], y2[f, t]]
+    az = z[f, corners[0][t]]
+    abx, aby, abz = X[1] - X[0], Y[1] - Y[0], z[f, corners[1][t]] - az
+    acx, acy, acz = X[2] - X[0], Y[2] - Y[0], z[f, corners[2][t]] - az
+    area = abx * acy - aby * acx
+    live = np.abs(area) > 1e-9
+    inv = 1 / np.where(live, area, 1)
+    dz_dx = (abz * acy - acz * aby) * inv                 # depth plane
+    dz_dy = (acz * abx - abz * acx) * inv
+
+    row_lo = np.maximum(np.ceil(y_min[f, t] - 0.5), 0).astype(np.int32)
+    row_hi = np.minimum(np.floor(y_max[f, t] - 0.5), size - 1).astype(np.int32)
+    rows = np.where(live, np.maximum(row_hi - row_lo + 1, 0), 0).astype(np.int64)
+    k = np.repeat(np.arange(len(t)), rows)
+    py = row_lo[k] + (np.arange(len(k)) - np.repeat(np.cumsum(rows) - rows, rows)).astype(np.int32)
+    yc = py + np.float32(0.5)
+    left = np.full(len(k), np.inf, dtype=np.float32)
+    right = np.full(len(k), -np.inf, dtype=np.float32)
+    for p, q in ((0, 1), (1, 2), (2, 0)):
+        ya, yb, xa = Y[p][k], Y[q][k], X[p][k]
+        crosses = (ya <= yc) != (yb <= yc)                 # half-open: shared edges drawn once
+        x_at = xa + (yc - ya) * (X[q][k] - xa) / np.where(crosses, yb - ya, 1)
+        left = np.where(crosses, np.minimum(left, x_at), left)
+        right = np.where(crosses, np.maximum(right, x_at), right)
+    spanned = left <= right
+    col_lo = np.maximum(np.ceil(np.where(spanned, left, 0) - 0.5), 0).astype(np.int32)
+    col_hi = np.minimum(np.floor(np.where(spanned, right, -1) - 0.5), size - 1).astype(np.int32)
+    cols = np.maximum(col_hi - col_lo + 1, 0).astype(np.int64)
+    r = np.repeat(np.arange(len(k)), cols)
+    px = col_lo[r] + (np.arange(len(r)) - np.repeat(np.cumsum(cols) - cols, cols)).astype(np.int32)
+    py = py[r]
+    k = k[r]
+    depth = az[k] + dz_dx[k] * (px + np.float32(0.5) - X[0][k]) + dz_dy[k] * (py + np.float32(0.5) - Y[0][k])
+    np.minimum.at(zbuffer, (f[k].astype(np.int64) * size + py) * size + px, depth_keys(depth, t[k]))
+
+    # Lambert shading of the visible triangles, normals turned toward the camera
+    hit = np.flatnonzero(zbuffer != _EMPTY)
+    f = hit // (size * size)
+    t = (zbuffer[hit] & 0xFFFFFFFF).astype(np.int64)
+    a = screen[f, triangles[t, 0]]
+    n = np.cross(screen[f, triangles[t, 1]] - a, screen[f, triangles[t, 2]] - a)
+    lit = (n @ _LIGHT) * np.sign(n[:, 2]) / np.maximum(np.linalg.norm(n, axis=1), 1e-12)
+    shade = SkinPreviewConfig.AMBIENT + (1 - SkinPreviewConfig.AMBIENT) * np.maximum(lit, 0)
+    out = np.zeros(num_frames * size * size, dtype=np.uint8)
+    out[hit] = np.clip(shade * 255, 1, 255).astype(np.uint8)
+    return out.reshape(num_frames, size, size)
+
+
+def clip_times(duration: float, loop: bool, frames: int):
+    """Frame times: looping clips stop one frame short of wrapping back to the start."""
+    if loop:
+        return np.arange(frames) * (duration / frames)
+    return np.linspace(0.0, duration, frames)
+
+
+def render_clip(mesh: SkinnedMesh, tracks, duration: float, loop: bool, frames: int = None,
+                size: int = None, camera=None):
+    """(F, size, size, 4) RGBA frames of one clip, framed to fit its whole motion."""
+    frames = frames or SkinPreviewConfig.FRAMES
+    size = size or SkinPreviewConfig.SIZE
+    camera = camera_rotation() if camera is None else camera
+    joints = pose(mesh, tracks, clip_times(duration, loop, frames))
+    joints = camera @ joints[:, :, :3, :]                     # (F, J, 3, 4) → camera space
+
+    # Fit the camera to a subsample posed over every frame
+    step = max(1, len(mesh) // SkinPreviewConfig.FRAMING_VERTICES)
+    sample = skin_vertices(mesh.weights[::step], mesh.positions[::step], joints)
+    lo = sample[..., :2].reshape(-1, 2).min(axis=0)
+    hi = sample[..., :2].reshape(-1, 2).max(axis=0)
+    scale = size * (1 - 2 * SkinPreviewConfig.MARGIN) / max(float((hi - lo).max()), 1e-9)
+    center = (lo + hi) / 2
+    to_screen = np.array([scale, -scale, scale], dtype=np.float32)
+    shift = np.array([size / 2 - center[0] * scale, size / 2 + center[1] * scale, 0], dtype=np.float32)
+
+    # Frames in batches that keep blended matrices and triangle arrays within BATCH_MB
+    per_frame = (len(mesh) + len(mesh.triangles)) * 100
+    batch = max(1, int((SkinPreviewConfig.BATCH_MB << 20) // max(per_frame, 1)))
+    shades = []
+    for start in range(0, frames, batch):
+        posed = skin_vertices(mesh.weights, mesh.positions, joints[start:start + batch])
+        shades.append(rasterize(posed * to_screen + shift, mesh.triangles, size))
+    shade = np.concatenate(shades)
+
+    rgba = np.zeros(shade.shape + (4,), dtype=np.uint8)
+    rgba[..., :3] = (shade[..., None].astype(np.uint16) * SkinPreviewConfig.COLOR // 255).astype(np.uint8)
+    rgba[..., 3] = np.where(shade > 0, 255, 0)
+    return rgba
+
+
+def glb_clips(gltf: dict, bin_data):
+    """Every animation of a GLB as {"name", "tracks", "duration", "loop"} (loop unknown → False)."""
+    clips = []
+    for a_idx, anim in enumerate(gltf.get("animations", [])):
+        samplers = anim.get("samplers", [])
+        tracks = []
+        for ch in anim.get("channels", []):
+            target = ch.get("target", {})
+            if "node" not in target:
+                continue
+            sampler = samplers[ch["sampler"]]
+            tracks.append({
+                "node": target["node"],
+                "path": target["path"],
+                "interpolation": sampler.get("interpolation", "LINEAR"),
+                "times": read_accessor(gltf, bin_data, sampler["input"]),
+                "values": read_accessor(gltf, bin_data, sampler["output"]),
+            })
+        if tracks:
+            clips.append({"name": anim.get("name", f"animation_{a_idx}"), "tracks": tracks,
+                          "duration": max(float(np.max(t["times"])) for t in tracks), "loop": False})
+    return clips
+
+
+def _save_sprite_sheet(rows, path):
+    from PIL import Image
+    height, width = rows[0].shape[1:3]
+    sheet = np.zeros((len(rows) * height, max(len(r) for r in rows) * width, 4), dtype=np.uint8)
+    for i, row in enumerate(rows):
+        strip = row.transpose(1, 0, 2, 3).reshape(height, len(row) * width, 4)
+        sheet[i * height:(i + 1) * height, :strip.shape[1]] = strip
+    Image.fromarray(sheet, "RGBA").save(path, optimize=False)
+
+
+def _save_gif(rows, frame_ms, path):
+    from PIL import Image
+    background = np.array(SkinPreviewConfig.GIF_BACKGROUND, dtype=np.uint16)
+    images, durations = [], []
+    for row, ms in zip(rows, frame_ms):
+        alpha = row[..., 3:] > 0
+        rgb = np.where(alpha, row[..., :3], background).astype(np.uint8)
+        images.extend(Image.fromarray(frame, "RGB").quantize(64) for frame in rgb)
+        durations.extend([max(int(round(ms)), 20)] * len(row))
+    images[0].save(path, save_all=True, append_images=images[1:], duration=durations,
+                   loop=0, disposal=1)
+
+
+def render_preview(gltf: dict, bin_data, clips, output_path: str, fmt: str = "sprite",
+                   frames: int = None, size: int = None, skin_index: int = 0):
+    """
+    Render clips ({"name", "tracks", "duration", "loop"}) of the skinned
+    mesh in gltf / bin_data and write them to output_path: "sprite" is a
+    PNG with one row of frames per clip, "gif" an animated GIF playing the
+    clips in order. Returns a JSON-ready summary, or None when the file has
+    no skinned triangles.
+    """
+    if fmt not in PREVIEW_FORMATS:
+        raise ValueError(f"Unknown preview format: {fmt}")
+    t0 = time.perf_counter()
+    skins = gltf.get("skins") or []
+    if skin_index >= len(skins):
+        return None
+    mesh = SkinnedMesh(gltf, bin_data, skin_index)
+    if not len(mesh.triangles) or not clips:
+        return None
+    vertices = len(mesh)
+    mesh = mesh.decimated(SkinPreviewConfig.LOD_VERTICES)
+    frames = frames or SkinPreviewConfig.FRAMES
+    size = size or SkinPreviewConfig.SIZE
+    camera = camera_rotation()
+
+    rows = [render_clip(mesh, clip["tracks"], clip["duration"], clip["loop"], frames, size, camera)
+            for clip in clips]
+    if fmt == "gif":
+        frame_ms = [1000.0 * clip["duration"] / (frames if clip["loop"] else max(frames - 1, 1))
+                    for clip in clips]
+        _save_gif(rows, frame_ms, output_path)
+    else:
+        _save_sprite_sheet(rows, output_path)
+    return {
+        "path": output_path,
+        "format": fmt,
+        "clips": [clip["name"] for clip in clips],
+        "frames": frames,
+        "size": size,
+        "vertices": vertices,
+        "rendered_vertices": len(mesh),
+        "ms": round((time.perf_counter() - t0) * 1000, 1),
+    }
@@ -0,0 +1,205 @@
+"""
+Inline skin QA: fast, vectorized tearing checks for rigged / animated GLBs.
+
+The checks that diagnose_rig.py and diagnose_animated.py print, as one
+importable pass cheap enough to run on every rig and animate request:
+
+- weight sums: every skinned vertex's weights add up to 1 (no negatives)
+- joint range: no non-zero weight points past the end of the skin
+- seams: co-located vertices (UV seam splits, primitive borders) carry the
+  same weights; diverging ones tear apart when the mesh bends
+- topology: non-manifold and boundary edges of the position-welded mesh
+- animation: bones no channel targets, and the vertices they dominate
+
+check_skin() works on arrays already in memory (rig_model_glb); check_glb()
+reads them from a parsed GLB (animate_model_glb, the diagnose scripts).
+Both return a JSON-ready report dict with an "issues" list and "ok" flag.
+"""
+import time
+
+import numpy as np
+
+from glb_io import read_accessor, read_indices
+
+
+class SkinQAConfig:
+    """Thresholds for the skin QA report"""
+    WEIGHT_SUM_TOLERANCE = 1e-3     # |Σw − 1| above this is a weight-sum error
+    SEAM_TOLERANCE = 1e-3           # L1 weight difference between co-located vertices
+    DECIMALS = 4                    # co-location grid (10^-DECIMALS, as the rigger)
+
+
+def _position_groups(P, decimals: int):
+    """(N,) representative of each vertex: one fixed vertex per snapped position."""
+    grid = np.round(P * 10.0 ** decimals).astype(np.int64)
+    g = grid - grid.min(axis=0)
+    if (g.max(axis=0) >= (1 << 21)).any():
+        _, first, inverse = np.unique(grid, axis=0, return_index=True, return_inverse=True)
+        return first[inverse.reshape(-1)]
+    keys = (g[:, 0] << 42) | (g[:, 1] << 21) | g[:, 2]
+    order = np.argsort(keys)
+    sorted_keys = keys[order]
+    run_start = np.concatenate([[True], sorted_keys[1:] != sorted_keys[:-1]])
+    groups = np.empty_like(order)
+    groups[order] = order[np.maximum.accumulate(np.where(run_start, np.arange(len(order)), 0))]
+    return groups
+
+
+def _weight_l1(ja, wa, jb, wb):
+    """L1 distance between rows of two sparse top-4 skins (J arrays int64, W float)."""
+    ja = np.where(wa > 0, ja, -1)
+    jb = np.where(wb > 0, jb, -2)
+    match = (ja[:, :, None] == jb[:, None, :]).astype(wb.dtype)   # (M, 4, 4)
+    wb_at_a = np.einsum('mik,mk->mi', match, wb)
+    unmatched_b = np.einsum('mk,mk->m', wb, 1.0 - match.max(axis=1))
+    return np.abs(wa - wb_at_a) @ np.ones(4, dtype=wb.dtype) + unmatched_b
+
+
+def check_skin(positions, joints, weights, num_joints: int, indices=None,
+               bone_names=None, targeted_joints=None, groups=None):
+    """
+    QA report for one skinned vertex set.
+
+    positions (N, 3), joints / weights (N, 4) JOINTS_0 / WEIGHTS_0 (decoded
+    to floats), indices a triangle list over the same vertices (None skips
+    the topology check). targeted_joints (skin joint indices driven by an
+    animation) enables the animation check; groups (N,) co-location
+    representatives skips re-hashing positions when the caller has them.
+    """
+    t0 = time.perf_counter()
+    P = np.asarray(positions, dtype=np.float64).reshape(-1, 3)
+    J = np.asarray(joints).reshape(-1, 4).astype(np.int64)
+    W = np.asarray(weights, dtype=np.float32).reshape(-1, 4)
+    num_verts = len(P)
+    names = list(bone_names) if bone_names is not None else [str(i) for i in range(num_joints)]
+    report = {"vertices": num_verts, "joints": num_joints}
+    issues = []
+
+    # ── Weight sums ──
+    sums = W @ np.ones(4, dtype=np.float32)             # faster than sum(axis=1) on 4 columns
+    sum_err = np.abs(sums - 1.0)
+    bad_sum = sum_err > SkinQAConfig.WEIGHT_SUM_TOLERANCE
+    report["weight_sum_errors"] = int(bad_sum.sum())
+    report["max_weight_sum_error"] = float(sum_err.max()) if num_verts else 0.0
+    report["unweighted_vertices"] = int((sums <= 0).sum())
+    report["negative_weights"] = int((W < 0).sum())
+    if report["weight_sum_errors"]:
+        issues.append(f"{report['weight_sum_errors']} vertices with weights not summing to 1 "
+                      f"(max error {report['max_weight_sum_error']:.3g})")
+    if report["negative_weights"]:
+        issues.append(f"{report['negative_weights']} negative weights")
+
+    # ── Joint range ──
+    out_of_range = ((J < 0) | (J >= num_joints)) & (W != 0)
+    report["out_of_range_joints"] = int(np.count_nonzero(out_of_range @ np.ones(4, dtype=np.int8)))
+    if report["out_of_range_joints"]:
+        issues.append(f"{report['out_of_range_joints']} vertices weighted to joints "
+                      f"outside the skin ({num_joints} joints)")
+
+    # ── Seams: co-located vertices with diverging weights ──
+    if groups is None:
+        groups = _position_groups(P, SkinQAConfig.DECIMALS) if num_verts else np.empty(0, np.int64)
+    groups = np.asarray(groups, dtype=np.int64)
+    dup = np.flatnonzero(groups != np.arange(num_verts))
+    rep = groups[dup]
+    diff = _weight_l1(J[dup], W[dup], J[rep], W[rep]) if len(dup) else np.empty(0)
+    report["colocated_vertices"] = int(len(dup))
+    report["diverging_colocated_vertices"] = int((diff > SkinQAConfig.SEAM_TOLERANCE).sum())
+    report["max_colocated_weight_diff"] = float(diff.max()) if len(diff) else 0.0
+    if report["diverging_colocated_vertices"]:
+        issues.append(f"{report['diverging_colocated_vertices']} co-located vertices with "
+                      f"diverging weights (max L1 {report['max_colocated_weight_diff']:.3f}) — seams tear")
+
+    # ── Topology of the welded mesh ──
+    if indices is not None:
+        a, b, c = groups[np.asarray(indices, dtype=np.int64).reshape(-1, 3)].T
+        lo = np.concatenate([np.minimum(a, b), np.minimum(b, c), np.minimum(c, a)])
+        hi = np.concatenate([np.maximum(a, b), np.maximum(b, c), np.maximum(c, a)])
+        keep = lo != hi                                  # edges collapsed by welding
+        keys = np.sort(lo[keep] * num_verts + hi[keep])
+        if len(keys):
+            starts = np.flatnonzero(np.concatenate([[True], keys[1:] != keys[:-1]]))
+            counts = np.diff(np.append(starts, len(keys)))
+        else:
+            counts = np.empty(0, dtype=np.int64)
+        report["non_manifold_edges"] = int((counts > 2).sum())
+        report["boundary_edges"] = int((counts == 1).sum())
+        if report["non_manifold_edges"]:
+            issues.append(f"{report['non_manifold_edges']} non-manifold edges")
+
+    # ── Animation: bones no channel drives ──
+    if targeted_joints is not None:
+        targeted = np.zeros(num_joints, dtype=bool)
+        t_idx = np.asarray(list(targeted_joints), dtype=np.int64)
+        targeted[t_idx[(t_idx >= 0) & (t_idx < num_joints)]] = True
+        dominant = np.take_along_axis(J, W.argmax(axis=1)[:, None], axis=1)[:, 0]
+        dominant = dominant[(dominant >= 0) & (dominant < num_joints)]
+        report["untargeted_bones"] = [names[i] for i in np.flatnonzero(~targeted)]
+        report["untargeted_vertices"] = int((~targeted[dominant]).sum())
+
+    report["issues"] = issues
+    report["ok"] = not issues
+    report["ms"] = round((time.perf_counter() - t0) * 1000, 2)
+    return report
+
+
+def check_glb(gltf: dict, bin_data, skin_index: int = 0, targeted_nodes=None):
+    """
+    QA report for a parsed GLB: every primitive with JOINTS_0 / WEIGHTS_0,
+    concatenated. targeted_nodes (node indices) defaults to the targets of
+    all animation channels in the file plus the joints each animation holds
+    at rest without a channel (extras.restNodes, written by
+    animate_model_glb); with no animations the animation check is skipped.
+    Returns None when the file has no skin.
+    """
+    t0 = time.perf_counter()
+    skins = gltf.get("skins") or []
+    if skin_index >= len(skins):
+        return None
+    joint_nodes = skins[skin_index]["joints"]
+    nodes = gltf.get("nodes", [])
+    bone_names = [nodes[n].get("name", f"joint_{n}") for n in joint_nodes]
+
+    pos_chunks, j_chunks, w_chunks, idx_chunks = [], [], [], []
+    offset = 0
+    for mesh in gltf.get("meshes", []):
+        for prim in mesh.get("primitives", []):
+            attrs = prim.get("attributes", {})
+            if not all(k in attrs for k in ("POSITION", "JOINTS_0", "WEIGHTS_0")):
+                continue
+            pos_chunks.append(read_accessor(gltf, bin_data, attrs["POSITION"]))
+            j_chunks.append(read_accessor(gltf, bin_data, attrs["JOINTS_0"]))
+            w_chunks.append(read_accessor(gltf, bin_data, attrs["WEIGHTS_0"]))
+            prim_indices = read_indices(gltf, bin_data, prim)
+            if prim_indices is None:
+                prim_indices = np.arange(len(pos_chunks[-1]))
+            idx_chunks.append(prim_indices.astype(np.int64) + offset)
+            offset += len(pos_chunks[-1])
+    if not pos_chunks:
+        return None
+
+    if targeted_nodes is None and gltf.get("animations"):
+        targeted_nodes = {ch["target"]["node"] for anim in gltf["animations"]
+                          for ch in anim.get("channels", []) if "node" in ch.get("target", {})}
+        targeted_nodes.update(n for anim in gltf["animations"]
+                              for n in anim.get("extras", {}).get("restNodes", []))
+    targeted_joints = None
+    if targeted_nodes is not None:
+        node_to_joint = {n: i for i, n in enumerate(joint_nodes)}
+        targeted_joints = [node_to_joint[n] for n in targeted_nodes if n in node_to_joint]
+
+    report = check_skin(np.concatenate(pos_chunks), np.concatenate(j_chunks),
+                        np.concatenate(w_chunks), len(joint_nodes),
+                        indices=np.concatenate(idx_chunks), bone_names=bone_names,
+                        targeted_joints=targeted_joints)
+    report["ms"] = round((time.perf_counter() - t0) * 1000, 2)
+    return report
+
+
+def summary(report) -> str:
+    """One-line summary for logs."""
+    if report is None:
+        return "no skinned primitives"
+    if report["ok"]:
+        return f"ok, {report['vertices']} verts ({report['ms']:.0f} ms)"
+    return f"{len(report['issues'])} issue(s): {'; '.join(report['issues'])} ({report['ms']:.0f} ms)"
@@ -21,6 +21,8 @@ from pathlib import Path
 
 import numpy as np
 
+from mesh_quantization import maybe_quantize_glb, load_trimesh
+
 # Fix encoding issues on Windows
 if sys.platform == "win32":
     sys.stdout.reconfigure(encoding="utf-8", errors="replace")
@@ -220,7 +222,7 @@ class AITexturingService:
         t_start = time.time()
 
         # Load mesh
-        mesh = trimesh.load(model_path)
+        mesh = load_trimesh(model_path)
         if isinstance(mesh, trimesh.Scene):
             mesh = mesh.dump(concatenate=True)
 
@@ -323,7 +325,7 @@ class AITexturingService:
 
         # Step 7: Export GLB
         output_path = str(OUTPUT_DIR / f"{job_id}_textured.glb")
-        self._export_textured_glb(
+        quantization = self._export_textured_glb(
             mesh, texture_image, mesh.visual.uv, output_path
         )
 
@@ -345,6 +347,7 @@ class AITexturingService:
             "style": style,
             "controlnet": True,
             "object_type": obj_type,
+            "quantization": quantization,
         }
 
     # ─── Stub for backward compat (phase2_service calls this) ──
@@ -441,7 +444,7 @@ class AITexturingService:
 
         # ── 1. Load mesh ──
         print("📦 Step 1: Loading mesh...")
-        mesh = trimesh.load(model_path)
+        mesh = load_trimesh(model_path)
         if isinstance(mesh, trimesh.Scene):
             mesh = mesh.dump(concatenate=True)
 
@@ -524,7 +527,7 @@ class AITexturingService:
         output_path = str(OUTPUT_DIR / f"{job_id}_textured.glb")
         texture_image.save(texture_path)
 
-        self._export_textured_glb(mesh, texture_image, mesh.visual.uv, output_path)
+        quantization = self._export_textured_glb(mesh, texture_image, mesh.visual.uv, output_path)
 
         elapsed = time.time() - t_start
         print(f"\n✅ ComfyUI texturing complete in {elapsed:.1f}s")
@@ -538,6 +541,7 @@ class AITexturingService:
             "procedural": False,
             "object_type": obj_type,
             "elapsed_time": elapsed,
+            "quantization": quantization,
         }
 
     # ─── Depth Map Rendering (numpy + PIL) ────────────────────
@@ -850,6 +854,8 @@ class AITexturingService:
         THE CRITICAL FIX: baseColorFactor = [1, 1, 1, 1] (pure white).
         Without this, trimesh's default can set a grayish factor that
         multiplies with the texture, causing the 'everything looks gray' bug.
+
+        Returns the maybe_quantize_glb() stats (None when quantization is off).
         """
         import trimesh
 
@@ -891,6 +897,7 @@ class AITexturingService:
 
         mesh.export(output_path)
         print(f"   💾 Exported: {output_path}")
+        return maybe_quantize_glb(output_path)
 
     def _generate_uv_box_projection(self, mesh):
         """Generate UV coordinates using box projection."""
@@ -952,7 +959,7 @@ class AITexturingService:
             t_start = time.time()
 
             # Load mesh
-            mesh = trimesh.load(model_path)
+            mesh = load_trimesh(model_path)
             if isinstance(mesh, trimesh.Scene):
                 mesh = mesh.dump(concatenate=True)
 
@@ -1332,7 +1339,7 @@ class AITexturingService:
 
             # ── Export GLB with UV texture + WHITE PBRMaterial ──
             output_path = str(OUTPUT_DIR / f"{job_id}_textured.glb")
-            self._export_textured_glb(
+            quantization = self._export_textured_glb(
                 mesh, texture_image, mesh.visual.uv, output_path
             )
 
@@ -1349,6 +1356,7 @@ class AITexturingService:
                 "style": style,
                 "procedural": True,
                 "object_type": obj_type,
+                "quantization": quantization,
             }
 
         except Exception as e:
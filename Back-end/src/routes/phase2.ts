@@ -143,6 +143,24 @@ router.post("/animate", async (req: Request, res: Response) => {
   }
 });
 
+// Apply Several Animations (one GLB, one round trip)
+router.post("/animate-batch", async (req: Request, res: Response) => {
+  try {
+    const response = await axios.post(
+      `${AI_SERVICE_URL}/api/phase2/animate-batch`,
+      req.body,
+      { timeout: 300000, headers: { "Content-Type": "application/json" } }
+    );
+    return res.json(response.data);
+  } catch (error: any) {
+    console.error("Phase 2 animate-batch error:", error.message);
+    return res.status(error.response?.status || 500).json({
+      ok: false,
+      error: error.response?.data?.error || error.message
+    });
+  }
+});
+
 // Remesh Model
 router.post("/remesh", async (req: Request, res: Response) => {
   try {